@@ -0,0 +1,227 @@
+"""
+Benchmark da query de ConnectionRepository.select_all.
+
+Compara a versão antiga (subquery correlacionada por conexão + self-join em
+Conexao_WTS) com a atual (agregação agrupada via sql_dialect, sem self-join).
+
+Uso:
+    python scripts/benchmark_select_all.py                 # SQLite em memória, 10k conexões
+    python scripts/benchmark_select_all.py --connections 50000 --runs 10
+    python scripts/benchmark_select_all.py --sqlserver     # banco configurado (somente leitura)
+    python scripts/benchmark_select_all.py --sqlserver --plan
+
+No modo SQLite a massa de dados é gerada localmente e o plano de execução
+(EXPLAIN QUERY PLAN) das duas versões é exibido. No modo SQL Server as
+queries rodam contra o banco configurado no config.json/.env, sem alterar
+dados; ``--plan`` mostra o SHOWPLAN_TEXT de cada versão.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.wats.db.sql_dialect import (  # noqa: E402
+    FOR_XML,
+    GROUP_CONCAT,
+    STRING_AGG,
+    string_agg_subquery,
+)
+
+SELECT_COLUMNS = """
+    Con.Con_Codigo, Con.Con_IP, Con.Con_Nome, Con.Con_Usuario, Con.Con_Senha,
+    Gru.Gru_Nome, {isnull}(Uco.Usu_Nome, '') AS Usu_Nome, NULL AS Usu_Dat_Conexao,
+    {isnull}(Con.Extra, '') AS Extra, Con.con_particularidade,
+    {isnull}({cliente}.con_cliente, '') AS con_cliente,
+    Con.con_tipo
+"""
+
+TAIL = """
+    WHERE Con.Gru_Codigo <> 33
+    ORDER BY {isnull}(Gru.Gru_Nome, Con.Con_Nome), Con.Con_Nome
+"""
+
+
+def build_old_query(mode: str, isnull: str) -> str:
+    """Query anterior: agregação correlacionada + self-join para con_cliente."""
+    if mode == GROUP_CONCAT:
+        users = """
+            SELECT Con_Codigo, (
+                SELECT GROUP_CONCAT(Usu_Nome, '|') FROM (
+                    SELECT Usu_Nome FROM Usuario_Conexao_WTS uc2
+                    WHERE uc2.Con_Codigo = uc1.Con_Codigo ORDER BY Usu_Nome
+                )
+            ) AS Usu_Nome
+            FROM Usuario_Conexao_WTS uc1
+            GROUP BY Con_Codigo
+        """
+    else:
+        users = string_agg_subquery(
+            FOR_XML, "Usuario_Conexao_WTS", "Con_Codigo", "Usu_Nome", "Usu_Nome"
+        )
+
+    return f"""
+        SELECT {SELECT_COLUMNS.format(isnull=isnull, cliente="C2")}
+        FROM Conexao_WTS Con
+        LEFT JOIN Grupo_WTS Gru ON Con.Gru_Codigo = Gru.Gru_Codigo and Gru.Gru_codigo <> 33
+        LEFT JOIN ({users}) Uco ON Con.Con_Codigo = Uco.Con_Codigo
+        LEFT JOIN Conexao_WTS C2 ON Con.Con_Codigo = C2.Con_Codigo
+        {TAIL.format(isnull=isnull)}
+    """
+
+
+def build_new_query(mode: str, isnull: str) -> str:
+    """Query atual (mesma estrutura de ConnectionRepository.select_all)."""
+    users = string_agg_subquery(mode, "Usuario_Conexao_WTS", "Con_Codigo", "Usu_Nome", "Usu_Nome")
+    return f"""
+        SELECT {SELECT_COLUMNS.format(isnull=isnull, cliente="Con")}
+        FROM Conexao_WTS Con
+        LEFT JOIN Grupo_WTS Gru ON Con.Gru_Codigo = Gru.Gru_Codigo and Gru.Gru_codigo <> 33
+        LEFT JOIN ({users}) Uco ON Con.Con_Codigo = Uco.Con_Codigo
+        {TAIL.format(isnull=isnull)}
+    """
+
+
+def seed_sqlite(conn: sqlite3.Connection, connections: int, sessions: int, groups: int):
+    """Cria as tabelas e a massa de dados (índices equivalentes aos do SQL Server)."""
+    conn.executescript(
+        """
+        CREATE TABLE Grupo_WTS (Gru_Codigo INTEGER PRIMARY KEY, Gru_Nome TEXT NOT NULL);
+        CREATE TABLE Conexao_WTS (
+            Con_Codigo INTEGER PRIMARY KEY, Con_Nome TEXT NOT NULL, Con_IP TEXT NOT NULL,
+            Con_Usuario TEXT, Con_Senha TEXT, Gru_Codigo INTEGER, con_tipo TEXT,
+            con_particularidade TEXT, con_cliente TEXT, Extra TEXT
+        );
+        CREATE TABLE Usuario_Conexao_WTS (
+            UCon_Id INTEGER PRIMARY KEY, Con_Codigo INTEGER NOT NULL, Usu_Nome TEXT NOT NULL
+        );
+        CREATE INDEX IX_Conexao_Grupo ON Conexao_WTS(Gru_Codigo, Con_Nome);
+        CREATE INDEX IX_Usuario_Conexao_Heartbeat ON Usuario_Conexao_WTS(Con_Codigo, Usu_Nome);
+        """
+    )
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO Grupo_WTS VALUES (?, ?)", [(g, f"Grupo {g:03d}") for g in range(1, groups + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO Conexao_WTS VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                c,
+                f"Servidor {c:05d}",
+                f"10.{c // 65536 % 256}.{c // 256 % 256}.{c % 256}",
+                "administrador",
+                "senha",
+                rng.randint(1, groups),
+                "RDP",
+                None,
+                f"Cliente {c % 500}",
+                "",
+            )
+            for c in range(1, connections + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO Usuario_Conexao_WTS (Con_Codigo, Usu_Nome) VALUES (?, ?)",
+        [(rng.randint(1, connections), f"usuario{rng.randint(1, 300)}") for _ in range(sessions)],
+    )
+    conn.execute("ANALYZE")
+
+
+def time_query(cursor, query: str, runs: int):
+    """Executa a query ``runs`` vezes e retorna (mediana em ms, nº de linhas)."""
+    timings = []
+    rows = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(query)
+        rows = len(cursor.fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), rows
+
+
+def run_sqlite(args):
+    conn = sqlite3.connect(":memory:")
+    print(
+        f"SQLite: {args.connections} conexões, {args.sessions} sessões ativas, "
+        f"{args.groups} grupos"
+    )
+    seed_sqlite(conn, args.connections, args.sessions, args.groups)
+    cursor = conn.cursor()
+
+    old_query = build_old_query(GROUP_CONCAT, "IFNULL")
+    new_query = build_new_query(GROUP_CONCAT, "IFNULL")
+    report(cursor, old_query, new_query, args.runs)
+
+    for name, query in (("antiga", old_query), ("nova", new_query)):
+        print(f"\nPlano ({name}):")
+        for row in cursor.execute(f"EXPLAIN QUERY PLAN {query}"):
+            print(f"  {row[-1]}")
+
+
+def run_sqlserver(args):
+    from src.wats.config import Settings
+    from src.wats.db.database_manager import DatabaseManager
+
+    db = DatabaseManager(Settings(), use_connection_pool=False)
+    mode = db.get_string_agg_mode()
+    print(f"SQL Server (modo de agregação detectado: {mode})")
+
+    conn = db._connect_autocommit()
+    cursor = conn.cursor()
+    old_query = build_old_query(FOR_XML, "ISNULL")
+    new_query = build_new_query(mode, "ISNULL")
+    report(cursor, old_query, new_query, args.runs)
+
+    if mode == STRING_AGG:
+        # Também compara com o fallback FOR XML sem o self-join
+        ms, _ = time_query(cursor, build_new_query(FOR_XML, "ISNULL"), args.runs)
+        print(f"  nova (FOR XML) : {ms:8.1f} ms")
+
+    if args.plan:
+        for name, query in (("antiga", old_query), ("nova", new_query)):
+            print(f"\nPlano ({name}):")
+            cursor.execute("SET SHOWPLAN_TEXT ON")
+            cursor.execute(query)
+            while True:
+                for row in cursor.fetchall():
+                    print(f"  {row[0]}")
+                if not cursor.nextset():
+                    break
+            cursor.execute("SET SHOWPLAN_TEXT OFF")
+    conn.close()
+
+
+def report(cursor, old_query: str, new_query: str, runs: int):
+    old_ms, old_rows = time_query(cursor, old_query, runs)
+    new_ms, new_rows = time_query(cursor, new_query, runs)
+    print(f"\nMediana de {runs} execuções:")
+    print(f"  antiga         : {old_ms:8.1f} ms ({old_rows} linhas)")
+    print(f"  nova           : {new_ms:8.1f} ms ({new_rows} linhas)")
+    if new_ms > 0:
+        print(f"  ganho          : {old_ms / new_ms:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sqlserver", action="store_true", help="usa o banco configurado")
+    parser.add_argument("--plan", action="store_true", help="exibe o plano no SQL Server")
+    args = parser.parse_args()
+
+    if args.sqlserver:
+        run_sqlserver(args)
+    else:
+        run_sqlite(args)
+
+
+if __name__ == "__main__":
+    main()
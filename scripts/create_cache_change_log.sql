@@ -0,0 +1,120 @@
+-- Script para criar o log de alterações usado na invalidação de cache
+-- WATS Project - Cache Change Log
+--
+-- Triggers gravam uma linha por registro alterado (tabela + chave). Os clientes
+-- com cache.change_log_enabled consultam o log a cada poucos segundos e invalidam
+-- apenas as entradas afetadas, permitindo TTLs maiores no cache.
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Cache_Change_Log_WTS' AND xtype='U')
+BEGIN
+    CREATE TABLE Cache_Change_Log_WTS (
+        Chg_Id BIGINT IDENTITY(1,1) NOT NULL,
+        Chg_Tabela VARCHAR(100) NOT NULL,
+        Chg_Chave INT NULL, -- NULL = tabela inteira
+        Chg_Data DATETIME2(3) NOT NULL DEFAULT GETDATE(),
+
+        CONSTRAINT PK_Cache_Change_Log_WTS PRIMARY KEY CLUSTERED (Chg_Id)
+    );
+
+    PRINT 'Tabela Cache_Change_Log_WTS criada com sucesso.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela Cache_Change_Log_WTS já existe.';
+END
+GO
+
+-- Índice para a limpeza por data
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Cache_Change_Log_Data')
+BEGIN
+    CREATE INDEX IX_Cache_Change_Log_Data ON Cache_Change_Log_WTS (Chg_Data);
+    PRINT 'Índice IX_Cache_Change_Log_Data criado.';
+END
+GO
+
+-- ================================================================
+-- TRIGGERS (uma linha por chave distinta em inserted/deleted)
+-- ================================================================
+
+CREATE OR ALTER TRIGGER TR_Conexao_WTS_CacheLog ON Conexao_WTS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+    SELECT 'Conexao_WTS', Con_Codigo FROM inserted
+    UNION
+    SELECT 'Conexao_WTS', Con_Codigo FROM deleted;
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_Grupo_WTS_CacheLog ON Grupo_WTS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+    SELECT 'Grupo_WTS', Gru_Codigo FROM inserted
+    UNION
+    SELECT 'Grupo_WTS', Gru_Codigo FROM deleted;
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_Usuario_Sistema_WTS_CacheLog ON Usuario_Sistema_WTS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+    SELECT 'Usuario_Sistema_WTS', Usu_Id FROM inserted
+    UNION
+    SELECT 'Usuario_Sistema_WTS', Usu_Id FROM deleted;
+END
+GO
+
+-- Permissões são registradas pelo usuário afetado (Usu_Id)
+CREATE OR ALTER TRIGGER TR_Permissao_Grupo_WTS_CacheLog ON Permissao_Grupo_WTS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+    SELECT 'Permissao_Grupo_WTS', Usu_Id FROM inserted
+    UNION
+    SELECT 'Permissao_Grupo_WTS', Usu_Id FROM deleted;
+END
+GO
+
+IF EXISTS (SELECT * FROM sysobjects WHERE name='Permissao_Conexao_Individual_WTS' AND xtype='U')
+EXEC('
+CREATE OR ALTER TRIGGER TR_Permissao_Conexao_Individual_WTS_CacheLog
+ON Permissao_Conexao_Individual_WTS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+    SELECT ''Permissao_Conexao_Individual_WTS'', Usu_Id FROM inserted
+    UNION
+    SELECT ''Permissao_Conexao_Individual_WTS'', Usu_Id FROM deleted;
+END
+');
+GO
+
+-- ================================================================
+-- LIMPEZA (agendar no SQL Server Agent, ex: diariamente)
+-- ================================================================
+
+CREATE OR ALTER PROCEDURE sp_Cleanup_Cache_Change_Log_WTS
+    @RetencaoHoras INT = 24
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DELETE FROM Cache_Change_Log_WTS
+    WHERE Chg_Data < DATEADD(HOUR, -@RetencaoHoras, GETDATE());
+
+    PRINT CONCAT('Cache_Change_Log_WTS: ', @@ROWCOUNT, ' registros removidos.');
+END
+GO
+
+PRINT 'Log de alterações do cache configurado.';
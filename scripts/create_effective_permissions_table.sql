@@ -0,0 +1,66 @@
+-- Script para criar a tabela de permissões efetivas (usuário -> conexão)
+-- WATS Project - Effective Permissions
+--
+-- Materializa as permissões de grupo (Permissao_Grupo_WTS + Conexao_WTS.Gru_Codigo)
+-- e as permissões individuais ativas (Permissao_Conexao_Individual_WTS), com a
+-- janela de validade. Com database.effective_permissions = true, o select_all de
+-- usuários não-admin faz um JOIN simples nesta tabela em vez de dois EXISTS por
+-- conexão. A tabela é mantida pelos repositórios (EffectivePermissionRepository).
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Permissao_Efetiva_WTS' AND xtype='U')
+BEGIN
+    CREATE TABLE Permissao_Efetiva_WTS (
+        Usu_Id INT NOT NULL,
+        Con_Codigo INT NOT NULL,
+        Origem CHAR(1) NOT NULL, -- 'G' = grupo, 'I' = individual
+        Data_Inicio DATETIME NULL, -- NULL = sem início (grupo)
+        Data_Fim DATETIME NULL -- NULL = permanente
+    );
+
+    -- Clusterizado por usuário: a consulta do select_all lê um intervalo contíguo
+    CREATE CLUSTERED INDEX CX_Permissao_Efetiva_Usuario
+    ON Permissao_Efetiva_WTS (Usu_Id, Con_Codigo);
+
+    -- Atualizações por conexão (edição/exclusão de conexões)
+    CREATE INDEX IX_Permissao_Efetiva_Conexao ON Permissao_Efetiva_WTS (Con_Codigo);
+
+    PRINT 'Tabela Permissao_Efetiva_WTS criada com sucesso.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela Permissao_Efetiva_WTS já existe.';
+END
+GO
+
+-- Carga inicial / reconstrução completa (pode ser executada a qualquer momento)
+BEGIN TRANSACTION;
+
+DELETE FROM Permissao_Efetiva_WTS;
+
+INSERT INTO Permissao_Efetiva_WTS (Usu_Id, Con_Codigo, Origem, Data_Inicio, Data_Fim)
+SELECT p.Usu_Id, c.Con_Codigo, 'G', NULL, NULL
+FROM Permissao_Grupo_WTS p
+INNER JOIN Conexao_WTS c ON c.Gru_Codigo = p.Gru_Codigo;
+
+INSERT INTO Permissao_Efetiva_WTS (Usu_Id, Con_Codigo, Origem, Data_Inicio, Data_Fim)
+SELECT pci.Usu_Id, pci.Con_Codigo, 'I', pci.Data_Inicio, pci.Data_Fim
+FROM Permissao_Conexao_Individual_WTS pci
+WHERE pci.Ativo = 1;
+
+COMMIT TRANSACTION;
+
+PRINT 'Permissao_Efetiva_WTS carregada.';
+GO
+
+-- Script para SQLite (desenvolvimento local)
+/*
+CREATE TABLE IF NOT EXISTS Permissao_Efetiva_WTS (
+    Usu_Id INTEGER NOT NULL,
+    Con_Codigo INTEGER NOT NULL,
+    Origem TEXT NOT NULL,
+    Data_Inicio TIMESTAMP NULL,
+    Data_Fim TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS CX_Permissao_Efetiva_Usuario ON Permissao_Efetiva_WTS (Usu_Id, Con_Codigo);
+CREATE INDEX IF NOT EXISTS IX_Permissao_Efetiva_Conexao ON Permissao_Efetiva_WTS (Con_Codigo);
+*/
@@ -0,0 +1,160 @@
+-- ================================================================
+-- SCRIPT SQLITE - BANCO WATS (Windows Access To Servers)
+-- Estrutura para o modo local/offline (DB_TYPE=sqlite) e testes
+-- Mesmas tabelas e colunas de create_wats_database.sql
+--
+-- Uso: sqlite3 wats.db < scripts/create_wats_database_sqlite.sql
+-- As procedures do SQL Server não existem aqui: os repositórios usam
+-- o SQL equivalente quando DB_TYPE=sqlite.
+-- ================================================================
+
+PRAGMA journal_mode = WAL;
+PRAGMA foreign_keys = ON;
+
+-- Configurações do sistema
+CREATE TABLE IF NOT EXISTS Config_Sistema_WTS (
+    Cfg_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Cfg_Chave TEXT NOT NULL UNIQUE,
+    Cfg_Valor TEXT NULL,
+    Cfg_Descricao TEXT NULL,
+    Cfg_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Cfg_Data_Alteracao TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Grupos de permissão
+CREATE TABLE IF NOT EXISTS Grupo_WTS (
+    Gru_Codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+    Gru_Nome TEXT NOT NULL UNIQUE,
+    Gru_Descricao TEXT NULL,
+    Gru_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Gru_Data_Alteracao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Gru_Ativo INTEGER DEFAULT 1
+);
+
+-- Usuários do sistema
+CREATE TABLE IF NOT EXISTS Usuario_Sistema_WTS (
+    Usu_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Usu_Nome TEXT NOT NULL UNIQUE,
+    Usu_Email TEXT NULL,
+    Usu_Ativo INTEGER DEFAULT 1,
+    Usu_Is_Admin INTEGER DEFAULT 0,
+    Usu_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Usu_Data_Alteracao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Usu_Ultimo_Login TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Usuario_Sistema_WTS_Nome_Ativo ON Usuario_Sistema_WTS (Usu_Nome, Usu_Ativo);
+
+-- Permissões grupo x usuário
+CREATE TABLE IF NOT EXISTS Permissao_Grupo_WTS (
+    Perm_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Usu_Id INTEGER NOT NULL REFERENCES Usuario_Sistema_WTS (Usu_Id) ON DELETE CASCADE,
+    Gru_Codigo INTEGER NOT NULL REFERENCES Grupo_WTS (Gru_Codigo) ON DELETE CASCADE,
+    Perm_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (Usu_Id, Gru_Codigo)
+);
+CREATE INDEX IF NOT EXISTS IX_Permissao_Grupo_WTS_Grupo ON Permissao_Grupo_WTS (Gru_Codigo);
+
+-- Conexões/servidores
+CREATE TABLE IF NOT EXISTS Conexao_WTS (
+    Con_Codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+    Con_Nome TEXT NOT NULL,
+    Con_IP TEXT NOT NULL,
+    Con_Usuario TEXT NULL,
+    Con_Senha TEXT NULL,
+    Gru_Codigo INTEGER NULL REFERENCES Grupo_WTS (Gru_Codigo) ON DELETE SET NULL,
+    Con_Tipo TEXT DEFAULT 'RDP',
+    Con_Particularidade TEXT NULL,
+    Con_Cliente TEXT NULL,
+    Extra TEXT NULL,
+    Sec TEXT NULL,
+    Con_Porta INTEGER NULL,
+    Con_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Con_Data_Alteracao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Con_Ativo INTEGER DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS IX_Conexao_WTS_Nome ON Conexao_WTS (Con_Nome);
+CREATE INDEX IF NOT EXISTS IX_Conexao_WTS_Grupo ON Conexao_WTS (Gru_Codigo);
+
+-- Usuários conectados (presença)
+CREATE TABLE IF NOT EXISTS Usuario_Conexao_WTS (
+    UCon_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Con_Codigo INTEGER NOT NULL REFERENCES Conexao_WTS (Con_Codigo) ON DELETE CASCADE,
+    Usu_Nome TEXT NOT NULL,
+    Usu_IP TEXT NULL,
+    Usu_Nome_Maquina TEXT NULL,
+    Usu_Usuario_Maquina TEXT NULL,
+    Usu_Dat_Conexao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Usu_Last_Heartbeat TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS IX_Usuario_Conexao_WTS_Conexao ON Usuario_Conexao_WTS (Con_Codigo);
+CREATE INDEX IF NOT EXISTS IX_Usuario_Conexao_WTS_Usuario ON Usuario_Conexao_WTS (Usu_Nome);
+CREATE INDEX IF NOT EXISTS IX_Usuario_Conexao_WTS_Heartbeat ON Usuario_Conexao_WTS (Usu_Last_Heartbeat);
+
+-- Log de acessos
+CREATE TABLE IF NOT EXISTS Log_Acesso_WTS (
+    Log_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Usu_Nome_Maquina TEXT NOT NULL,
+    Con_Codigo INTEGER NOT NULL REFERENCES Conexao_WTS (Con_Codigo) ON DELETE CASCADE,
+    Con_Nome_Acessado TEXT NULL,
+    Log_DataHora_Inicio TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Log_DataHora_Fim TIMESTAMP NULL,
+    Log_Tipo_Conexao TEXT DEFAULT 'RDP',
+    Log_IP_Usuario TEXT NULL,
+    Log_Observacoes TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Log_Acesso_WTS_Conexao ON Log_Acesso_WTS (Con_Codigo);
+CREATE INDEX IF NOT EXISTS IX_Log_Acesso_WTS_Usuario ON Log_Acesso_WTS (Usu_Nome_Maquina);
+CREATE INDEX IF NOT EXISTS IX_Log_Acesso_WTS_Data_Inicio ON Log_Acesso_WTS (Log_DataHora_Inicio);
+
+-- Proteção de sessões
+CREATE TABLE IF NOT EXISTS Sessao_Protecao_WTS (
+    Prot_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Con_Codigo INTEGER NOT NULL REFERENCES Conexao_WTS (Con_Codigo) ON DELETE CASCADE,
+    Usu_Nome_Protetor TEXT NOT NULL,
+    Usu_Maquina_Protetor TEXT NULL,
+    Prot_Senha_Hash TEXT NOT NULL,
+    Prot_Observacoes TEXT NULL,
+    Prot_Data_Criacao TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    Prot_Data_Expiracao TIMESTAMP NOT NULL,
+    Prot_Duracao_Minutos INTEGER NOT NULL,
+    Prot_Status TEXT DEFAULT 'ATIVA' CHECK (Prot_Status IN ('ATIVA', 'EXPIRADA', 'REMOVIDA')),
+    Prot_IP_Criador TEXT NULL,
+    Prot_Data_Remocao TIMESTAMP NULL,
+    Prot_Removida_Por TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Sessao_Protecao_WTS_Conexao_Status ON Sessao_Protecao_WTS (Con_Codigo, Prot_Status);
+CREATE INDEX IF NOT EXISTS IX_Sessao_Protecao_WTS_Protetor ON Sessao_Protecao_WTS (Usu_Nome_Protetor);
+CREATE INDEX IF NOT EXISTS IX_Sessao_Protecao_WTS_Expiracao ON Sessao_Protecao_WTS (Prot_Data_Expiracao, Prot_Status);
+
+-- Tentativas de acesso a sessões protegidas
+CREATE TABLE IF NOT EXISTS Log_Tentativa_Protecao_WTS (
+    LTent_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Prot_Id INTEGER NOT NULL REFERENCES Sessao_Protecao_WTS (Prot_Id) ON DELETE CASCADE,
+    Con_Codigo INTEGER NOT NULL REFERENCES Conexao_WTS (Con_Codigo) ON DELETE CASCADE,
+    Usu_Nome_Solicitante TEXT NOT NULL,
+    Usu_Maquina_Solicitante TEXT NULL,
+    LTent_Senha_Tentativa TEXT NULL,
+    LTent_Resultado TEXT NOT NULL
+        CHECK (LTent_Resultado IN ('SUCESSO', 'SENHA_INCORRETA', 'EXPIRADA', 'NEGADA', 'CANCELADA')),
+    LTent_Data_Hora TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    LTent_IP_Solicitante TEXT NULL,
+    LTent_Observacoes TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Log_Tentativa_Protecao_WTS_Protecao ON Log_Tentativa_Protecao_WTS (Prot_Id);
+CREATE INDEX IF NOT EXISTS IX_Log_Tentativa_Protecao_WTS_Data ON Log_Tentativa_Protecao_WTS (LTent_Data_Hora);
+
+-- Permissões individuais (temporárias) por conexão
+CREATE TABLE IF NOT EXISTS Permissao_Conexao_Individual_WTS (
+    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Usu_Id INTEGER NOT NULL REFERENCES Usuario_Sistema_WTS (Usu_Id),
+    Con_Codigo INTEGER NOT NULL REFERENCES Conexao_WTS (Con_Codigo),
+    Data_Inicio TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    Data_Fim TIMESTAMP NULL,
+    Criado_Por_Usu_Id INTEGER NOT NULL REFERENCES Usuario_Sistema_WTS (Usu_Id),
+    Data_Criacao TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    Ativo INTEGER NOT NULL DEFAULT 1,
+    Observacoes TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_PCI_Usuario_Ativo ON Permissao_Conexao_Individual_WTS (Usu_Id, Ativo);
+CREATE INDEX IF NOT EXISTS IX_PCI_Conexao_Ativo ON Permissao_Conexao_Individual_WTS (Con_Codigo, Ativo);
+CREATE INDEX IF NOT EXISTS IX_PCI_Datas ON Permissao_Conexao_Individual_WTS (Data_Inicio, Data_Fim);
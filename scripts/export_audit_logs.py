@@ -0,0 +1,73 @@
+"""
+Exporta a auditoria (logs de acesso e tentativas em sessões protegidas).
+
+Grava arquivos CSV compactados (gzip) com no máximo ``--rows-per-file``
+linhas em ``<saida>/<conjunto>/``, com um manifest.json por conjunto.
+Executar de novo com os mesmos filtros retoma a exportação interrompida
+(ou exporta apenas os registros novos).
+
+Uso:
+    python scripts/export_audit_logs.py --output exportacao
+    python scripts/export_audit_logs.py --output exportacao --dataset access_logs
+    python scripts/export_audit_logs.py --output 2025-01 --since 2025-01-01 --until 2025-02-01
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.wats.services.audit_export import AUDIT_DATASETS, export_audit_logs  # noqa: E402
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {value} (use AAAA-MM-DD[ HH:MM])")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--output", required=True, help="diretório de saída")
+    parser.add_argument(
+        "--dataset", choices=[*AUDIT_DATASETS, "all"], default="all", help="conjunto de dados"
+    )
+    parser.add_argument("--since", type=parse_date, help="início do período (inclusive)")
+    parser.add_argument("--until", type=parse_date, help="fim do período (exclusivo)")
+    parser.add_argument("--rows-per-file", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from src.wats.config import Settings
+    from src.wats.db.db_service import DBService
+
+    db_service = DBService(Settings())
+    datasets = list(AUDIT_DATASETS) if args.dataset == "all" else [args.dataset]
+    try:
+        manifests = export_audit_logs(
+            db_service,
+            args.output,
+            datasets=datasets,
+            since=args.since,
+            until=args.until,
+            rows_per_file=args.rows_per_file,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db_service.db_manager.close()
+
+    for dataset, manifest in manifests.items():
+        print(
+            f"{dataset}: {manifest['total_rows']} registros em {len(manifest['files'])} "
+            f"arquivo(s), última chave {manifest['last_key']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
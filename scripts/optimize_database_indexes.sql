@@ -115,10 +115,11 @@ PRINT ''
 
 PRINT '2. Criando índices para Conexao_WTS...'
 
--- Índice para filtros por grupo
+-- Índice de cobertura para ConnectionRepository.select_all (query mais pesada):
+-- filtro por grupo + todas as colunas lidas, sem lookup no índice clusterizado
 CREATE NONCLUSTERED INDEX IX_Conexao_Grupo
-ON Conexao_WTS(Gru_Codigo)
-INCLUDE (Con_Codigo, Con_Nome, Con_IP, con_tipo);
+ON Conexao_WTS(Gru_Codigo, Con_Nome)
+INCLUDE (Con_Codigo, Con_IP, Con_Usuario, Con_Senha, Extra, con_particularidade, con_cliente, con_tipo);
 PRINT '  ✓ IX_Conexao_Grupo criado'
 
 -- Índice para ordenação por nome
@@ -208,6 +209,8 @@ PRINT ''
 PRINT '5. Criando índices para Usuario_Conexao_WTS...'
 
 -- Índice CRÍTICO para heartbeat (query mais frequente!)
+-- Também cobre a agregação de usuários conectados do select_all
+-- (STRING_AGG ... WITHIN GROUP (ORDER BY Usu_Nome) GROUP BY Con_Codigo já ordenado)
 CREATE NONCLUSTERED INDEX IX_Usuario_Conexao_Heartbeat
 ON Usuario_Conexao_WTS(Con_Codigo, Usu_Nome)
 INCLUDE (Usu_Last_Heartbeat, Usu_Dat_Conexao);
@@ -228,15 +231,17 @@ PRINT ''
 
 PRINT '6. Criando índices para Log_Acesso_WTS...'
 
--- Índice para ordenação DESC (relatórios mais recentes primeiro)
+-- Índice para ordenação DESC (relatórios mais recentes primeiro) e paginação
+-- por chave (Log_DataHora_Inicio, Log_Id) em LogRepository.get_access_logs_page
 CREATE NONCLUSTERED INDEX IX_Log_Acesso_DataInicio
-ON Log_Acesso_WTS(Log_DataHora_Inicio DESC)
-INCLUDE (Con_Codigo, Usu_Nome_Maquina, Log_DataHora_Fim);
+ON Log_Acesso_WTS(Log_DataHora_Inicio DESC, Log_Id DESC)
+INCLUDE (Con_Codigo, Usu_Nome_Maquina, Con_Nome_Acessado, Log_DataHora_Fim, Log_Tipo_Conexao);
 PRINT '  ✓ IX_Log_Acesso_DataInicio criado'
 
--- Índice para filtros por usuário
+-- Índice para filtros por usuário (histórico paginado por chave)
 CREATE NONCLUSTERED INDEX IX_Log_Acesso_Usuario
-ON Log_Acesso_WTS(Usu_Nome_Maquina, Log_DataHora_Inicio);
+ON Log_Acesso_WTS(Usu_Nome_Maquina, Log_DataHora_Inicio DESC, Log_Id DESC)
+INCLUDE (Con_Codigo, Con_Nome_Acessado, Log_DataHora_Fim, Log_Tipo_Conexao);
 PRINT '  ✓ IX_Log_Acesso_Usuario criado'
 
 -- Índice para filtros por conexão
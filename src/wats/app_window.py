@@ -25,9 +25,12 @@ from .config import (
 )
 from .db.db_service import DBService
 from .db.exceptions import DatabaseError
+from .db.query_registry import log_query_report
 from .dialogs import ClientSelectorDialog
 from .utils import hash_password_md5, parse_particularities
 from .utils.process_monitor import is_rdp_connection_active, get_rdp_monitor
+from .util_cache.catalog_snapshot import load_catalog_snapshot, save_catalog_snapshot
+from .util_cache.change_listener import start_cache_change_listener, stop_cache_change_listener
 from .util_cache.thread_pool import get_thread_pool, shutdown_thread_pool
 
 # Importação condicional do RecordingManager em modo demo
@@ -80,15 +83,18 @@ def get_current_session_protection_manager():
 
 # Define uma estrutura para facilitar a comparação
 class ConnectionData:
-    def __init__(self, row):
+    def __init__(self, row, connected_user: Optional[str] = None):
         # Mapeia a linha do DB para atributos nomeados
+        # connected_user: presença vinda de select_presence (sobrepõe a coluna da linha)
         self.con_codigo: int = row[0]
         self.ip: str = row[1]
         self.nome: str = row[2]
         self.user: str = row[3]
         self.pwd: str = row[4]
         self.group_name: Optional[str] = row[5]
-        self.connected_user: Optional[str] = row[6]  # Usuário(s) conectado(s)
+        self.connected_user: Optional[str] = (
+            row[6] if connected_user is None else connected_user
+        )  # Usuário(s) conectado(s)
         self.extra: Optional[str] = row[8]
         self.particularidade: Optional[str] = row[9]  # Link Wiki cru
         self.cliente: Optional[str] = row[10]
@@ -158,6 +164,18 @@ class ConnectionData:
     def __hash__(self):
         return hash((self.con_codigo,))
 
+    def same_target(self, other: "ConnectionData") -> bool:
+        """Compara os dados de destino (IP, credenciais, cliente, tipo), ignorados pelo __eq__."""
+        return (
+            self.ip == other.ip
+            and self.user == other.user
+            and self.pwd == other.pwd
+            and self.extra == other.extra
+            and self.particularidade == other.particularidade
+            and self.cliente == other.cliente
+            and self.con_tipo == other.con_tipo
+        )
+
 
 class Application(ctk.CTk):
     def __init__(self, settings_instance):
@@ -189,6 +207,12 @@ class Application(ctk.CTk):
 
         # Lightweight initial state
         self.data_cache: List[ConnectionData] = []
+        # True enquanto a árvore exibe o snapshot local (sem senhas/presença)
+        self._catalog_from_snapshot = False
+        # Erro da última sincronização com o banco enquanto o snapshot é exibido
+        self._catalog_offline_reason: Optional[str] = None
+        # Versão do último catálogo recebido (select_catalog)
+        self._catalog_version: Optional[str] = None
         self.active_heartbeats: Dict[int, Event] = {}
         self._refresh_job = None
         self.tree_item_map: Dict[int, str] = {}
@@ -290,6 +314,12 @@ class Application(ctk.CTk):
         # Cleanup collaborative sessions
         self._cleanup_collaborative_sessions()
 
+        stop_cache_change_listener()
+
+        # Execuções e latência por consulta nomeada (log estruturado)
+        if self.db:
+            log_query_report(self.db.db_manager.queries)
+
         # Shutdown thread pool gracefully
         try:
             logging.info("Shutting down thread pool...")
@@ -298,6 +328,11 @@ class Application(ctk.CTk):
         except Exception as e:
             logging.error(f"Error shutting down thread pool: {e}")
 
+        # Aplica as gravações diferidas pendentes (o que sobrar fica no diário)
+        write_behind = getattr(self.db, "write_behind", None)
+        if write_behind is not None:
+            write_behind.stop()
+
         self.destroy()
 
     # --- Deferred initialization helpers ---
@@ -358,6 +393,12 @@ class Application(ctk.CTk):
             except Exception as e:
                 logging.warning(f"Falha ao configurar proteção de sessão: {e}")
 
+            # Invalidação do cache pelas alterações feitas por outros clientes
+            if getattr(self.settings, "CACHE_CHANGE_LOG_ENABLED", False):
+                start_cache_change_listener(
+                    self.db.change_log, interval=self.settings.CACHE_CHANGE_LOG_INTERVAL
+                )
+
             # Initialize recording manager
             self.recording_manager = RecordingManager(self.settings)
             if self.recording_manager.initialize():
@@ -631,6 +672,16 @@ class Application(ctk.CTk):
         )
         # Será posicionado sobre a Treeview quando necessário
 
+        # Aviso de catálogo desatualizado: snapshot local exibido sem acesso ao banco
+        self.catalog_status_label = ctk.CTkLabel(
+            tree_container,
+            text="⚠️ Catálogo desatualizado (offline): exibindo a última lista salva. "
+            "As conexões serão liberadas quando o banco responder.",
+            font=("Segoe UI", 12),
+            text_color="#D08000",
+        )
+        # Exibido abaixo da Treeview por _set_catalog_offline
+
     # [NOVO] Método para mostrar/ocultar "Carregando..."
     def _show_loading_message(self, show: bool):
         def task():
@@ -743,8 +794,7 @@ class Application(ctk.CTk):
         def fetch_data_task():
             """Task para buscar dados do banco em background."""
             try:
-                raw_data = self.db.connections.select_all(self.user_session_name)
-                return [ConnectionData(row) for row in raw_data]
+                return self._fetch_connection_data()
             except Exception as e:
                 logging.error(f"Erro ao buscar dados para refresh: {e}")
                 return None
@@ -777,6 +827,24 @@ class Application(ctk.CTk):
         # Aguardar resultado e processar no main thread
         self.after(100, schedule_callback)
     
+    def _fetch_connection_data(self) -> List[ConnectionData]:
+        """
+        Busca o catálogo (em cache, versionado) e a presença, e junta os dois.
+
+        Executa em background. O catálogo só é consultado de novo quando sai do
+        cache; a cada refresh apenas os usuários conectados trafegam.
+        """
+        version, catalog_rows = self.db.connections.select_catalog(self.user_session_name)
+        presence = self.db.connections.select_presence()
+
+        if version != self._catalog_version:
+            logging.debug(f"Catálogo de conexões: versão {version} ({len(catalog_rows)} conexões)")
+            self._catalog_version = version
+            if getattr(self.settings, "CACHE_WARM_START_ENABLED", True):
+                save_catalog_snapshot(self.user_session_name, catalog_rows)
+
+        return [ConnectionData(row, presence.get(row[0], "")) for row in catalog_rows]
+
     def _process_tree_update(self, new_data_list: List[ConnectionData]):
         """
         Processa atualização diferencial da Treeview (executa no main thread).
@@ -855,8 +923,13 @@ class Application(ctk.CTk):
                     )
                     if old_conn:
                         simulated_row = simulated_row[:-1] + (old_conn.con_tipo,)
+                        # IP/credenciais só mudam via banco: o cache guarda o valor exibido
+                        if not old_conn.same_target(new_conn_data):
+                            simulated_row = None
 
-                    current_conn_data = ConnectionData(simulated_row)
+                    current_conn_data = (
+                        ConnectionData(simulated_row) if simulated_row else None
+                    )
                 except Exception as e:
                     logging.error(
                         f"Erro ao recriar ConnectionData para ID {con_codigo} a partir da Treeview: {e}. Reconstruindo item."
@@ -867,8 +940,8 @@ class Application(ctk.CTk):
                     del self.tree_item_map[con_codigo]
                     continue
 
-                # Compara (usando o __eq__ que definimos)
-                if current_conn_data != new_conn_data:
+                # Compara (usando o __eq__ que definimos); None = destino alterado
+                if current_conn_data is None or current_conn_data != new_conn_data:
                     # Atualiza os campos na Treeview
                     self.tree.item(
                         item_iid,
@@ -953,6 +1026,9 @@ class Application(ctk.CTk):
 
             # --- 7. Finalização ---
             self.data_cache = new_data_list  # Atualiza o cache principal
+            self._catalog_from_snapshot = False
+            if self._catalog_offline_reason:
+                self._set_catalog_offline(None)
 
         except Exception as e:
             logging.error(f"Erro inesperado durante atualização diferencial: {e}", exc_info=True)
@@ -970,6 +1046,20 @@ class Application(ctk.CTk):
     # --- [NOVO] Métodos de carregamento inicial movidos para background ---
     def _initial_load_in_background(self):
         """Busca os dados iniciais e agenda a construção da Treeview."""
+        # 0. Warm start: exibe o último catálogo salvo enquanto as limpezas e a
+        # consulta rodam; o resultado real entra pela atualização diferencial.
+        snapshot_data = None
+        if getattr(self.settings, "CACHE_WARM_START_ENABLED", True):
+            snapshot_rows = load_catalog_snapshot(self.user_session_name)
+            if snapshot_rows:
+                try:
+                    snapshot_data = [ConnectionData(row) for row in snapshot_rows]
+                    self._catalog_from_snapshot = True
+                    self.after(0, self._build_initial_tree, snapshot_data)
+                except Exception as e:
+                    logging.warning(f"Snapshot do catálogo descartado: {e}")
+                    snapshot_data = None
+
         try:
             # 1. Limpa conexões fantasmas primeiro
             self.db.logs.cleanup_ghost_connections()
@@ -982,24 +1072,47 @@ class Application(ctk.CTk):
             # 3. Limpa proteções órfãs
             self._cleanup_orphaned_protections()
 
-            # 4. Busca os dados
-            initial_raw_data = self.db.connections.select_all(self.user_session_name)
-            initial_data = [ConnectionData(row) for row in initial_raw_data]
+            # 4. Busca os dados (o snapshot é salvo ao receber um catálogo novo)
+            initial_data = self._fetch_connection_data()
+
             # 5. Agenda a construção da UI na thread principal
-            self.after(0, self._build_initial_tree, initial_data)
+            if snapshot_data:
+                # Árvore já exibida a partir do snapshot: reconcilia diferencialmente
+                self.after(0, self._process_tree_update, initial_data)
+            else:
+                self.after(0, self._build_initial_tree, initial_data)
         except DatabaseError as e:
             logging.error(f"Falha CRÍTICA no carregamento inicial: {e}", exc_info=True)
-            self.after(
-                0,
-                messagebox.showerror,
-                "Erro de Conexão Inicial",
-                f"Não foi possível carregar os dados iniciais:\n{e}",
+            self._on_initial_load_failed(
+                e, "Erro de Conexão Inicial", f"Não foi possível carregar os dados iniciais:\n{e}"
             )
-            self.after(0, self._show_loading_message, False)  # Esconde loading
         except Exception as e:
             logging.error(f"Erro INESPERADO no carregamento inicial: {e}", exc_info=True)
-            self.after(0, messagebox.showerror, "Erro Inesperado", f"Ocorreu um erro:\n{e}")
-            self.after(0, self._show_loading_message, False)
+            self._on_initial_load_failed(e, "Erro Inesperado", f"Ocorreu um erro:\n{e}")
+
+    def _on_initial_load_failed(self, error: Exception, title: str, message: str):
+        """Trata a falha do carregamento inicial (chamado da thread de background)."""
+        if self._catalog_from_snapshot:
+            # A árvore continua com o snapshot, que não tem senhas: a conexão segue
+            # bloqueada até o refresh periódico (já agendado) sincronizar com o banco
+            self.after(0, self._set_catalog_offline, str(error))
+        else:
+            self.after(0, messagebox.showerror, title, message)
+        self.after(0, self._show_loading_message, False)  # Esconde loading
+
+    def _set_catalog_offline(self, reason: Optional[str]):
+        """Mostra (``reason``) ou oculta o aviso de catálogo desatualizado."""
+        self._catalog_offline_reason = reason
+        label = getattr(self, "catalog_status_label", None)
+        if label is None:
+            return
+        try:
+            if reason:
+                label.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+            else:
+                label.grid_remove()
+        except Exception as e:
+            logging.warning(f"_set_catalog_offline UI error: {e}")
 
     def _build_initial_tree(self, initial_data: List[ConnectionData]):
         """Constrói a Treeview pela primeira vez com os dados carregados."""
@@ -1029,6 +1142,25 @@ class Application(ctk.CTk):
         if not data:
             return
 
+        if self._catalog_from_snapshot:
+            # Snapshot local não contém senhas nem usuários conectados
+            if self._catalog_offline_reason:
+                messagebox.showwarning(
+                    "Catálogo desatualizado",
+                    "Não foi possível atualizar a lista de conexões com o banco de dados:\n"
+                    f"{self._catalog_offline_reason}\n\n"
+                    "A lista exibida é a última salva neste computador e não contém as "
+                    "credenciais. A conexão será liberada assim que o banco responder "
+                    "(novas tentativas são feitas automaticamente).",
+                )
+            else:
+                messagebox.showinfo(
+                    "Sincronizando",
+                    "A lista de conexões ainda está sendo atualizada.\n"
+                    "Tente novamente em instantes.",
+                )
+            return
+
         # 🔒 VERIFICAÇÃO PRIORITÁRIA DE PROTEÇÃO DE SESSÃO
         con_codigo = data.get("db_id")
         session_protection_manager = get_current_session_protection_manager()
@@ -301,6 +301,7 @@ class Settings:
         self._load_database_settings()
         self._load_recording_settings()
         self._load_api_settings()
+        self._load_cache_settings()
         
         # Log das configurações carregadas
         self._log_loaded_settings()
@@ -348,6 +349,30 @@ class Settings:
         self.DB_UID = self._get_config_value(["database", "username"], "DB_UID")
         self.DB_PWD = self._get_config_value(["database", "password"], "DB_PWD")
         self.DB_PORT = self._get_config_value(["database", "port"], "DB_PORT")
+        # Permissões efetivas materializadas (scripts/create_effective_permissions_table.sql)
+        self.DB_EFFECTIVE_PERMISSIONS = self._get_bool_config(
+            ["database", "effective_permissions"], "DB_EFFECTIVE_PERMISSIONS", False
+        )
+        # Réplica somente leitura (AG) para listagens e relatórios; vazio = desativada
+        self.DB_READ_REPLICA_SERVER = self._get_config_value(
+            ["database", "read_replica_server"], "DB_READ_REPLICA_SERVER"
+        )
+        self.DB_READ_REPLICA_DRIVER = self._get_config_value(
+            ["database", "read_replica_driver"], "DB_READ_REPLICA_DRIVER", "ODBC Driver 17 for SQL Server"
+        )
+        # Gravação diferida dos logs de auditoria (diário local + thread em lotes)
+        self.DB_WRITE_BEHIND = self._get_bool_config(
+            ["database", "write_behind"], "DB_WRITE_BEHIND", False
+        )
+        # Um diário por usuário do Windows (servidores de terminais compartilham a pasta)
+        os_user = os.getenv("USERNAME") or os.getenv("USER") or "default"
+        default_journal_dir = os.path.join(get_user_data_dir(), "journal", os_user)
+        journal_dir = self._get_config_value(
+            ["database", "write_behind_dir"], "DB_WRITE_BEHIND_DIR", default_journal_dir
+        )
+        self.DB_WRITE_BEHIND_DIR = (
+            expand_system_variables(journal_dir) if journal_dir else default_journal_dir
+        )
 
     def _load_recording_settings(self):
         """Carrega configurações de gravação de sessão."""
@@ -367,6 +392,55 @@ class Settings:
         self.RECORDING_RESOLUTION_SCALE = self._get_float_config(
             ["recording", "resolution_scale"], "RECORDING_RESOLUTION_SCALE", 1.0
         )
+
+        # Pipeline captura → encoder (fila de frames e política quando enche)
+        self.RECORDING_FRAME_QUEUE_SIZE = self._get_int_config(
+            ["recording", "frame_queue_size"], "RECORDING_FRAME_QUEUE_SIZE", 10
+        )
+        self.RECORDING_FRAME_DROP_POLICY = self._get_config_value(
+            ["recording", "frame_drop_policy"], "RECORDING_FRAME_DROP_POLICY", "drop_oldest"
+        ).lower()
+
+        # Tela parada: repete o último frame em vez de converter/codificar de novo
+        self.RECORDING_SKIP_UNCHANGED_FRAMES = self._get_bool_config(
+            ["recording", "skip_unchanged_frames"], "RECORDING_SKIP_UNCHANGED_FRAMES", True
+        )
+        self.RECORDING_CHANGE_DETECTION_STRIDE = self._get_int_config(
+            ["recording", "change_detection_stride"], "RECORDING_CHANGE_DETECTION_STRIDE", 4
+        )
+
+        # Captura grande com pouca mudança: converte só os tiles que mudaram
+        self.RECORDING_DIRTY_REGION_CAPTURE = self._get_bool_config(
+            ["recording", "dirty_region_capture"], "RECORDING_DIRTY_REGION_CAPTURE", False
+        )
+        self.RECORDING_DIRTY_TILE_SIZE = self._get_int_config(
+            ["recording", "dirty_tile_size"], "RECORDING_DIRTY_TILE_SIZE", 64
+        )
+
+        # Encoder: ffmpeg (libx264 por pipe) ou opencv (VideoWriter + compressão posterior)
+        self.RECORDING_ENCODER = self._get_config_value(
+            ["recording", "encoder"], "RECORDING_ENCODER", "ffmpeg"
+        ).lower()
+        self.RECORDING_FFMPEG_PATH = self._get_config_value(
+            ["recording", "ffmpeg_path"], "RECORDING_FFMPEG_PATH", ""
+        )
+        # Calibração por máquina: escolhe codec/preset que sustenta o FPS
+        self.RECORDING_ENCODER_AUTO_TUNE = self._get_bool_config(
+            ["recording", "encoder_auto_tune"], "RECORDING_ENCODER_AUTO_TUNE", True
+        )
+        self.RECORDING_COMPRESSION_ENABLED = self._get_bool_config(
+            ["recording", "compression", "enabled"], "RECORDING_COMPRESSION_ENABLED", True
+        )
+        self.RECORDING_COMPRESSION_CRF = self._get_int_config(
+            ["recording", "compression", "crf"], "RECORDING_COMPRESSION_CRF", 28
+        )
+        self.RECORDING_COMPRESSION_PRESET = self._get_config_value(
+            ["recording", "compression", "preset"], "RECORDING_COMPRESSION_PRESET", "veryfast"
+        )
+        # Compressões simultâneas em segundo plano (0 = automático: núcleos / 4)
+        self.RECORDING_COMPRESSION_MAX_JOBS = self._get_int_config(
+            ["recording", "compression", "max_jobs"], "RECORDING_COMPRESSION_MAX_JOBS", 0
+        )
         
         # Limites de gravação
         self.RECORDING_MAX_FILE_SIZE_MB = self._get_int_config(
@@ -424,6 +498,55 @@ class Settings:
             ["api", "max_file_age_days"], "API_MAX_FILE_AGE_DAYS", 30
         )
 
+    def _load_cache_settings(self):
+        """Carrega configurações do cache de consultas."""
+        # Cache compartilhado entre instâncias no mesmo host (servidores de terminais);
+        # credenciais e permissões não vão para o arquivo (ver shared_cache.PRIVATE_NAMESPACES)
+        self.CACHE_SHARED_ENABLED = self._get_bool_config(
+            ["cache", "shared_enabled"], "CACHE_SHARED_ENABLED", False
+        )
+        default_shared_path = os.path.join(get_user_data_dir(), "cache", "wats_shared_cache.db")
+        shared_path = self._get_config_value(
+            ["cache", "shared_path"], "CACHE_SHARED_PATH", default_shared_path
+        )
+        self.CACHE_SHARED_PATH = (
+            expand_system_variables(shared_path) if shared_path else default_shared_path
+        )
+
+        # Invalidação por log de alterações (scripts/create_cache_change_log.sql)
+        self.CACHE_CHANGE_LOG_ENABLED = self._get_bool_config(
+            ["cache", "change_log_enabled"], "CACHE_CHANGE_LOG_ENABLED", False
+        )
+        self.CACHE_CHANGE_LOG_INTERVAL = self._get_float_config(
+            ["cache", "change_log_interval"], "CACHE_CHANGE_LOG_INTERVAL", 5.0
+        )
+
+        # TTL por namespace dos decorators de cache (cache.ttl.<namespace> no JSON)
+        from src.wats.util_cache.intelligent_cache import (
+            CHANGE_LOG_NAMESPACE_TTLS,
+            DEFAULT_NAMESPACE_TTLS,
+        )
+
+        default_ttls = dict(DEFAULT_NAMESPACE_TTLS)
+        if self.CACHE_CHANGE_LOG_ENABLED:
+            default_ttls.update(CHANGE_LOG_NAMESPACE_TTLS)
+        self.CACHE_NAMESPACE_TTLS = {
+            namespace: self._get_int_config(
+                ["cache", "ttl", namespace], f"CACHE_TTL_{namespace.upper()}", default_ttl
+            )
+            for namespace, default_ttl in default_ttls.items()
+        }
+
+        # Intervalo (s) do relatório de estatísticas de cache no log estruturado (0 = desativado)
+        self.CACHE_STATS_LOG_INTERVAL = self._get_int_config(
+            ["cache", "stats_log_interval"], "CACHE_STATS_LOG_INTERVAL", 900
+        )
+
+        # Snapshot local do catálogo para exibir a árvore imediatamente na abertura
+        self.CACHE_WARM_START_ENABLED = self._get_bool_config(
+            ["cache", "warm_start_enabled"], "CACHE_WARM_START_ENABLED", True
+        )
+
     def _log_loaded_settings(self):
         """Registra as configurações carregadas (com senhas mascaradas)."""
         pwd_status = "***" if self.DB_PWD else "None"
@@ -479,6 +602,21 @@ class Settings:
             "fps": self.RECORDING_FPS,
             "quality": self.RECORDING_QUALITY,
             "resolution_scale": self.RECORDING_RESOLUTION_SCALE,
+            "frame_queue_size": self.RECORDING_FRAME_QUEUE_SIZE,
+            "frame_drop_policy": self.RECORDING_FRAME_DROP_POLICY,
+            "skip_unchanged_frames": self.RECORDING_SKIP_UNCHANGED_FRAMES,
+            "change_detection_stride": self.RECORDING_CHANGE_DETECTION_STRIDE,
+            "dirty_region_capture": self.RECORDING_DIRTY_REGION_CAPTURE,
+            "dirty_tile_size": self.RECORDING_DIRTY_TILE_SIZE,
+            "encoder": self.RECORDING_ENCODER,
+            "ffmpeg_path": self.RECORDING_FFMPEG_PATH,
+            "encoder_auto_tune": self.RECORDING_ENCODER_AUTO_TUNE,
+            "compression": {
+                "enabled": self.RECORDING_COMPRESSION_ENABLED,
+                "crf": self.RECORDING_COMPRESSION_CRF,
+                "preset": self.RECORDING_COMPRESSION_PRESET,
+                "max_jobs": self.RECORDING_COMPRESSION_MAX_JOBS,
+            },
             "max_file_size_mb": self.RECORDING_MAX_FILE_SIZE_MB,
             "max_duration_minutes": self.RECORDING_MAX_DURATION_MINUTES,
             "max_total_size_gb": self.RECORDING_MAX_TOTAL_SIZE_GB,
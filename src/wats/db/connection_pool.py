@@ -7,8 +7,10 @@ import logging
 import threading
 from contextlib import contextmanager
 from queue import Queue, Empty
-from typing import Optional
-import pyodbc
+from typing import Any, Optional
+
+# pyodbc é importado ao criar a primeira conexão: o modo SQLite não precisa
+# do driver ODBC instalado
 
 
 class ConnectionPool:
@@ -48,9 +50,11 @@ class ConnectionPool:
         except Exception as e:
             logging.error(f"Error initializing connection pool: {e}")
 
-    def _create_connection(self) -> Optional[pyodbc.Connection]:
+    def _create_connection(self) -> Optional[Any]:
         """Cria uma nova conexão."""
         try:
+            import pyodbc
+
             conn = pyodbc.connect(
                 self.connection_string,
                 timeout=10,
@@ -117,7 +121,7 @@ class ConnectionPool:
                     with self.lock:
                         self.current_size -= 1
 
-    def _is_connection_valid(self, conn: pyodbc.Connection) -> bool:
+    def _is_connection_valid(self, conn: Any) -> bool:
         """Verifica se a conexão ainda está válida."""
         try:
             cursor = conn.cursor()
@@ -1,9 +1,14 @@
 # WATS_Project/wats_app/db/database_manager.py
 import logging
-from typing import Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 
 from src.wats.config import Settings, is_demo_mode
 from src.wats.db.exceptions import DatabaseConfigError, DatabaseConnectionError
+from src.wats.db.query_registry import DIALECT_FIELDS, QueryRegistry
+from src.wats.db.read_replica import ReadReplicaRouter
+from src.wats.db.sql_dialect import FOR_XML, GROUP_CONCAT, SQLITE_NOW, STRING_AGG
 
 # NOTE: DB drivers are intentionally imported lazily inside the
 # specific configuration methods below. Importing heavy DB drivers
@@ -22,6 +27,14 @@ class DatabaseManager:
         self.is_demo = is_demo_mode()
         self.use_connection_pool = use_connection_pool
         self.connection_pool = None
+        # Usa Permissao_Efetiva_WTS no select_all em vez dos EXISTS de permissão
+        self.use_effective_permissions = getattr(settings, "DB_EFFECTIVE_PERMISSIONS", False)
+        # Fila de gravação diferida (WriteBehindJournal), ativada pelo DBService
+        self.write_behind = None
+        # Réplica somente leitura para leituras pesadas (SQL Server, opcional)
+        self.read_replica: Optional[ReadReplicaRouter] = None
+        # Conexões SQLite por thread (somente DB_TYPE=sqlite)
+        self.sqlite_pool = None
 
         # Propriedades de Dialeto SQL
         self.NOW: str = ""
@@ -29,11 +42,21 @@ class DatabaseManager:
         self.PARAM: str = ""  # Placeholder (e.g., ? ou %s)
         self.ISNULL: str = ""
         self.IDENTITY_QUERY: str = ""
+        # Agregação de strings (STRING_AGG / FOR_XML / GROUP_CONCAT); no SQL Server
+        # é detectada na primeira consulta que precisar (ver get_string_agg_mode)
+        self.STRING_AGG_MODE: Optional[str] = None
+
+        # Consultas nomeadas (renderizadas após configurar o dialeto) e cursores
+        # preparados por conexão do pool: id(conn) -> (conn, {nome: cursor})
+        self.queries: QueryRegistry = QueryRegistry({})
+        self._prepared_cursors: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self._prepared_lock = threading.Lock()
 
         # Se está em modo demo, não configura banco de dados real
         if self.is_demo:
             logging.info("DatabaseManager iniciado em MODO DEMO - não conectará ao banco de dados")
             self._configure_demo_mode()
+            self.queries = QueryRegistry(self._dialect_properties())
             return
 
         try:
@@ -49,6 +72,8 @@ class DatabaseManager:
             logging.error(f"Erro fatal ao configurar DatabaseManager: {e}")
             raise DatabaseConfigError(f"Erro ao ler as configurações do banco: {e}")
 
+        self.queries = QueryRegistry(self._dialect_properties())
+
         # Inicializa Connection Pool se habilitado
         if self.use_connection_pool and not self.is_demo:
             self._initialize_connection_pool()
@@ -62,9 +87,15 @@ class DatabaseManager:
         self.PARAM = "?"
         self.ISNULL = "ISNULL"
         self.IDENTITY_QUERY = "SELECT 1 AS ID;"
+        self.STRING_AGG_MODE = FOR_XML
 
     def _initialize_connection_pool(self):
         """Inicializa o Connection Pool para melhor performance."""
+        if self.sqlite_pool is not None:
+            # SQLite: o "pool" são as conexões transacionais por thread
+            self.connection_pool = self.sqlite_pool
+            return
+
         try:
             from src.wats.db.connection_pool import get_connection_pool
             
@@ -106,33 +137,115 @@ class DatabaseManager:
             f"PWD={s.DB_PWD};"
             "TrustServerCertificate=yes;"
         )
+        if s.DB_READ_REPLICA_SERVER and self.use_connection_pool:
+            self._configure_read_replica(s, pyodbc)
+
         # Dialeto SQL Server
         self.NOW = "GETDATE()"
         self.CURRENT_TIMESTAMP = "GETDATE()"
         self.PARAM = "?"
         self.ISNULL = "ISNULL"
-        self.IDENTITY_QUERY = "SELECT @@IDENTITY AS ID;"
+        # No mesmo lote do INSERT (BaseRepository._insert_returning_id): @@IDENTITY
+        # devolveria a identidade gerada pelos triggers (Cache_Change_Log_WTS)
+        self.IDENTITY_QUERY = "SELECT SCOPE_IDENTITY() AS ID;"
+
+    def _configure_read_replica(self, s: Settings, pyodbc: Any):
+        """
+        Configura a réplica de leitura (Always On, secundário legível).
+
+        ApplicationIntent=ReadOnly exige um driver ODBC moderno (o driver
+        legado "SQL Server" ignora o parâmetro e conectaria no primário).
+        """
+        replica_connection_string = (
+            f"DRIVER={{{s.DB_READ_REPLICA_DRIVER}}};"
+            f"SERVER={s.DB_READ_REPLICA_SERVER};"
+            f"DATABASE={s.DB_DATABASE};"
+            f"UID={s.DB_UID};"
+            f"PWD={s.DB_PWD};"
+            "TrustServerCertificate=yes;"
+            "ApplicationIntent=ReadOnly;"
+        )
+
+        def create_pool():
+            from src.wats.db.connection_pool import ConnectionPool
+
+            # Pool próprio (não o singleton do primário)
+            return ConnectionPool(replica_connection_string, pool_size=2, max_overflow=6)
+
+        self.read_replica = ReadReplicaRouter(create_pool, driver_error=pyodbc.Error)
+        self.read_replica.connect_async()
+        logging.info(f"Réplica de leitura configurada: {s.DB_READ_REPLICA_SERVER}")
 
     def _configure_sqlite(self, s: Settings):
-        """Configura SQLite para desenvolvimento/testes locais."""
+        """
+        Configura SQLite (instalação local/offline e testes).
+
+        As conexões são reaproveitadas por thread, em modo WAL (ver SQLiteConnectionPool).
+        """
         try:
             import sqlite3
+
+            from src.wats.db.sqlite_pool import SQLiteConnectionPool
         except ImportError:
             raise DatabaseConfigError("Driver 'sqlite3' não disponível.")
 
         self.driver_module = sqlite3
         db_path = s.DB_DATABASE or "wats.db"
         self.connection_string = db_path
+        self.sqlite_pool = SQLiteConnectionPool(db_path)
 
         # Dialeto SQLite
-        self.NOW = "datetime('now')"
-        self.CURRENT_TIMESTAMP = "datetime('now')"
+        self.NOW = SQLITE_NOW
+        self.CURRENT_TIMESTAMP = SQLITE_NOW
         self.PARAM = "?"
         self.ISNULL = "IFNULL"
         self.IDENTITY_QUERY = "SELECT last_insert_rowid() AS ID;"
+        self.STRING_AGG_MODE = GROUP_CONCAT
+
+    def _dialect_properties(self) -> Dict[str, str]:
+        """Propriedades de dialeto usadas nos templates do QueryRegistry."""
+        return {field: getattr(self, field) for field in DIALECT_FIELDS}
+
+    def get_string_agg_mode(self) -> str:
+        """
+        Retorna o modo de agregação de strings suportado pelo servidor.
+
+        No SQL Server testa STRING_AGG (2017+) uma única vez; versões anteriores
+        usam FOR XML PATH. Se não for possível conectar, usa FOR XML sem
+        memorizar o resultado, para tentar de novo na próxima chamada.
+        """
+        if self.STRING_AGG_MODE is None:
+            mode = self._detect_string_agg_mode()
+            if mode is None:
+                return FOR_XML
+            self.STRING_AGG_MODE = mode
+            logging.info(f"Agregação de strings do SQL Server: {mode}")
+        return self.STRING_AGG_MODE
+
+    def _detect_string_agg_mode(self) -> Optional[str]:
+        """Testa STRING_AGG no servidor (None se não conseguir conectar)."""
+        try:
+            conn = self._connect_autocommit()
+        except DatabaseConnectionError:
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT STRING_AGG(CAST(v AS NVARCHAR(MAX)), ',') FROM (VALUES ('a')) AS t(v)"
+            )
+            cursor.fetchall()
+            return STRING_AGG
+        except self.driver_module.Error:
+            return FOR_XML
+        finally:
+            conn.close()
 
     def _get_connection(self) -> Any:
         """Retorna um objeto de conexão (para transações)."""
+        if self.sqlite_pool is not None:
+            return self.sqlite_pool.transactional_connection()
+
         try:
             if self.conn is None or (hasattr(self.conn, "closed") and self.conn.closed):
                 self.conn = self.driver_module.connect(self.connection_string)
@@ -155,7 +268,14 @@ class DatabaseManager:
                 raise DatabaseConnectionError(f"Não foi possível conectar: {e_inner}")
 
     def _connect_autocommit(self) -> Any:
-        """Retorna uma *nova* conexão com autocommit=True."""
+        """Retorna uma *nova* conexão com autocommit=True (SQLite: a da thread)."""
+        if self.sqlite_pool is not None:
+            try:
+                return self.sqlite_pool.connection()
+            except self.driver_module.Error as e:
+                logging.error(f"Não foi possível abrir o SQLite: {e}")
+                raise DatabaseConnectionError(f"Não foi possível conectar: {e}")
+
         try:
             # Para selects simples, é mais seguro usar uma conexão nova
             conn = self.driver_module.connect(self.connection_string)
@@ -172,6 +292,12 @@ class DatabaseManager:
             logging.debug("[DEMO] get_cursor() retornando None - usando mock service")
             return None
 
+        # Leituras roteadas (replica_read) usam a réplica, se disponível
+        if self.read_replica is not None:
+            replica_cursor = self.read_replica.get_cursor()
+            if replica_cursor is not None:
+                return replica_cursor
+
         try:
             # Para cursores simples com autocommit, não usamos o pool
             # O pool é melhor para transações longas
@@ -210,6 +336,136 @@ class DatabaseManager:
             
             return _direct_connection()
 
+    def execute_query(
+        self, name: str, template: str, params: Sequence[Any] = (), fetch: Optional[str] = None
+    ) -> Any:
+        """
+        Executa uma consulta nomeada do QueryRegistry.
+
+        O SQL é renderizado uma vez por DatabaseManager e, com o pool ativo, cada
+        conexão mantém um cursor por consulta: o pyodbc reaproveita o statement
+        preparado quando o mesmo texto é executado de novo no mesmo cursor.
+        Escritas são confirmadas (commit) antes de devolver a conexão ao pool.
+
+        Args:
+            name: Nome da consulta (ex: "logs.update_heartbeat")
+            template: SQL com os campos de dialeto ({PARAM}, {NOW}, ...)
+            params: Parâmetros da consulta
+            fetch: None (retorna rowcount), "one" (fetchone) ou "all" (fetchall)
+
+        Raises:
+            DatabaseConnectionError: Sem conexão (ou modo demo)
+            driver_module.Error: Erros do banco, para o repositório tratar
+        """
+        sql = self.queries.sql(name, template)
+        with self.queries.track(name) as stats:
+            with self._statement_cursor(name) as (conn, cursor):
+                cursor.execute(sql, tuple(params))
+                if fetch == "all":
+                    result = cursor.fetchall()
+                    stats.rows += len(result)
+                elif fetch == "one":
+                    result = cursor.fetchone()
+                    stats.rows += 1 if result else 0
+                else:
+                    result = cursor.rowcount
+                    stats.rows += max(result, 0)
+                    if conn is not None:
+                        conn.commit()
+        return result
+
+    def execute_many(self, name: str, template: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """
+        Executa uma consulta nomeada para vários conjuntos de parâmetros.
+
+        No SQL Server usa ``fast_executemany`` (um único envio em lote pelo
+        ODBC em vez de uma ida ao servidor por linha).
+
+        Returns:
+            Número de conjuntos de parâmetros executados
+        """
+        rows = [tuple(params) for params in seq_of_params]
+        if not rows:
+            return 0
+
+        sql = self.queries.sql(name, template)
+        with self.queries.track(name) as stats:
+            with self._statement_cursor(name) as (conn, cursor):
+                self.enable_fast_executemany(cursor)
+                cursor.executemany(sql, rows)
+                if conn is not None:
+                    conn.commit()
+                stats.rows += len(rows)
+        return len(rows)
+
+    def enable_fast_executemany(self, cursor: Any):
+        """Ativa o envio em lote do pyodbc no cursor (somente SQL Server)."""
+        if self.db_type == "sqlserver" and hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+
+    @contextmanager
+    def _statement_cursor(self, name: str) -> Iterator[Tuple[Optional[Any], Any]]:
+        """
+        Fornece ``(conexão, cursor)`` para uma consulta nomeada.
+
+        Com o pool, a conexão é devolvida para o commit de escritas e o cursor é
+        o preparado daquela conexão. Sem o pool, usa uma conexão autocommit
+        nova (conexão None: não há o que confirmar).
+        """
+        if self.is_demo:
+            raise DatabaseConnectionError("Modo demo: sem conexão com o banco de dados.")
+
+        if self.use_connection_pool and self.connection_pool:
+            with self.connection_pool.get_connection() as conn:
+                if conn is None:
+                    raise DatabaseConnectionError("Falha ao obter conexão do pool.")
+                try:
+                    yield conn, self._get_prepared_cursor(conn, name)
+                except Exception:
+                    # Cursores podem ter ficado inválidos (ex: conexão perdida)
+                    self._discard_prepared_cursors(conn)
+                    raise
+            return
+
+        conn = self._connect_autocommit()
+        try:
+            yield None, conn.cursor()
+        finally:
+            conn.close()
+
+    def _get_prepared_cursor(self, conn: Any, name: str) -> Any:
+        """Retorna o cursor da consulta ``name`` na conexão (criado no primeiro uso)."""
+        with self._prepared_lock:
+            entry = self._prepared_cursors.get(id(conn))
+            if entry is None or entry[0] is not conn:
+                # Conexões fechadas pelo pool não voltam: descarta seus cursores
+                for key, (known_conn, _) in list(self._prepared_cursors.items()):
+                    if getattr(known_conn, "closed", False):
+                        del self._prepared_cursors[key]
+                entry = (conn, {})
+                self._prepared_cursors[id(conn)] = entry
+
+            cursor = entry[1].get(name)
+            if cursor is None:
+                cursor = conn.cursor()
+                entry[1][name] = cursor
+            return cursor
+
+    def _discard_prepared_cursors(self, conn: Any):
+        """Esquece os cursores preparados de uma conexão."""
+        with self._prepared_lock:
+            entry = self._prepared_cursors.pop(id(conn), None)
+        if entry:
+            for cursor in entry[1].values():
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    def get_query_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Execuções, erros e latência por consulta nomeada."""
+        return self.queries.get_stats()
+
     def get_transactional_connection(self) -> Any:
         """
         Retorna a conexão compartilhada para transações.
@@ -229,15 +485,49 @@ class DatabaseManager:
         except Exception as e:
             logging.error(f"Falha ao obter conexão transacional: {e}")
             return None  # Repositórios devem checar
-    
+
+    @contextmanager
+    def get_transactional_cursor(self) -> Iterator[Any]:
+        """
+        Cursor da conexão transacional: commit ao sair do bloco, rollback em exceção.
+
+        Para escritas que precisam ser aplicadas juntas (ex: uma permissão e a
+        atualização das permissões efetivas que dependem dela).
+
+        Raises:
+            DatabaseConnectionError: Sem conexão (ou modo demo)
+        """
+        conn = self.get_transactional_connection()
+        if not conn:
+            raise DatabaseConnectionError("Falha ao obter conexão transacional.")
+
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
     def close(self):
         """Fecha conexões e libera recursos."""
+        if self.read_replica is not None:
+            self.read_replica.close()
+
+        for conn, _ in list(self._prepared_cursors.values()):
+            self._discard_prepared_cursors(conn)
+
         if self.conn:
             try:
                 self.conn.close()
                 logging.debug("Conexão principal fechada")
             except Exception as e:
                 logging.error(f"Erro ao fechar conexão: {e}")
+
+        if self.sqlite_pool is not None:
+            self.sqlite_pool.close_all()
         
         # Não fecha o pool aqui - ele é singleton e será fechado no shutdown da aplicação
         if self.connection_pool:
@@ -26,12 +26,17 @@ except DatabaseError as e:
     sys.exit(1)
 """
 
+import logging
+
 from src.wats.config import Settings
 from src.wats.db.database_manager import DatabaseManager
+from src.wats.db.repositories.change_log_repository import ChangeLogRepository
 from src.wats.db.repositories.connection_repository import ConnectionRepository
 from src.wats.db.repositories.group_repository import GroupRepository
 from src.wats.db.repositories.log_repository import LogRepository
+from src.wats.db.repositories.session_protection_repository import SessionProtectionRepository
 from src.wats.db.repositories.user_repository import UserRepository
+from src.wats.db.write_behind import WriteBehindJournal
 
 
 class DBService:
@@ -56,6 +61,35 @@ class DBService:
         self.users = UserRepository(self.db_manager)
         self.groups = GroupRepository(self.db_manager)
         self.logs = LogRepository(self.db_manager)
+        self.change_log = ChangeLogRepository(self.db_manager)
 
         # Repositórios com dependências
         self.connections = ConnectionRepository(self.db_manager, self.users)
+
+        self.write_behind = None
+        if getattr(settings, "DB_WRITE_BEHIND", False) and not self.db_manager.is_demo:
+            self._start_write_behind(settings.DB_WRITE_BEHIND_DIR)
+
+    def _start_write_behind(self, journal_dir: str):
+        """Ativa a gravação diferida dos logs (reaplica o que ficou no diário)."""
+        journal = WriteBehindJournal(self.db_manager, journal_dir)
+        self.logs.register_write_behind(journal)
+        SessionProtectionRepository(self.db_manager).register_write_behind(journal)
+        try:
+            started = journal.start()
+        except OSError as e:
+            logging.error(f"Não foi possível abrir o diário de gravação diferida: {e}")
+            started = False
+
+        if started:
+            self.write_behind = journal
+            self.db_manager.write_behind = journal
+            logging.info(f"Gravação diferida de logs ativa ({journal_dir})")
+
+    def close(self):
+        """Aplica o que estiver na fila de gravação diferida e fecha as conexões."""
+        if self.write_behind is not None:
+            self.write_behind.stop()
+            self.db_manager.write_behind = None
+            self.write_behind = None
+        self.db_manager.close()
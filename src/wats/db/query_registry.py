@@ -0,0 +1,154 @@
+# WATS_Project/wats_app/db/query_registry.py
+"""
+Registro de consultas nomeadas do DatabaseManager.
+
+Os templates usam as propriedades de dialeto como campos de formatação
+(``{PARAM}``, ``{ISNULL}``, ``{NOW}``, ``{CURRENT_TIMESTAMP}``,
+``{IDENTITY_QUERY}``) e são renderizados uma única vez por DatabaseManager.
+O texto resultante é sempre o mesmo objeto, o que permite ao driver
+reaproveitar o statement preparado no mesmo cursor.
+
+Cada execução é contabilizada por nome (quantidade, erros e latência).
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+DIALECT_FIELDS = ("PARAM", "ISNULL", "NOW", "CURRENT_TIMESTAMP", "IDENTITY_QUERY")
+
+
+class StatementStats:
+    """Contadores de execução de uma consulta nomeada."""
+
+    __slots__ = ("executions", "errors", "rows", "time_total", "time_max")
+
+    def __init__(self):
+        self.executions = 0
+        self.errors = 0
+        self.rows = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Retorna os contadores em formato serializável."""
+        return {
+            'executions': self.executions,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.time_total * 1000, 2),
+            'avg_ms': (
+                round(self.time_total / self.executions * 1000, 2) if self.executions else 0
+            ),
+            'max_ms': round(self.time_max * 1000, 2),
+        }
+
+
+class QueryRegistry:
+    """
+    Consultas nomeadas renderizadas uma vez para o dialeto do banco.
+
+    Usage:
+        sql = db.queries.sql(
+            "logs.update_heartbeat",
+            "UPDATE Usuario_Conexao_WTS SET Usu_Last_Heartbeat = {NOW} "
+            "WHERE Con_Codigo = {PARAM} AND Usu_Nome = {PARAM}",
+        )
+    """
+
+    def __init__(self, dialect: Dict[str, str]):
+        """
+        Args:
+            dialect: Propriedades de dialeto (ver DIALECT_FIELDS)
+        """
+        self._dialect = dict(dialect)
+        self._templates: Dict[str, str] = {}
+        self._rendered: Dict[str, str] = {}
+        self._stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, template: str) -> str:
+        """
+        Registra (e renderiza) uma consulta.
+
+        Registrar o mesmo nome com outro template é erro de programação.
+
+        Returns:
+            SQL renderizado para o dialeto
+        """
+        with self._lock:
+            existing = self._templates.get(name)
+            if existing is not None:
+                if existing != template:
+                    raise ValueError(f"Consulta '{name}' já registrada com outro texto.")
+                return self._rendered[name]
+
+            rendered = template.format_map(self._dialect)
+            self._templates[name] = template
+            self._rendered[name] = rendered
+            return rendered
+
+    def sql(self, name: str, template: str) -> str:
+        """Retorna o SQL renderizado, registrando a consulta na primeira chamada."""
+        rendered = self._rendered.get(name)
+        if rendered is not None:
+            return rendered
+        return self.register(name, template)
+
+    def get(self, name: str) -> str:
+        """Retorna o SQL de uma consulta já registrada (KeyError se não existir)."""
+        return self._rendered[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rendered
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[StatementStats]:
+        """
+        Mede uma execução da consulta ``name``.
+
+        O contador de linhas pode ser atualizado pelo chamador via o objeto
+        retornado (``stats.rows += n``); exceções são contadas como erro.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(name, StatementStats())
+
+        started = time.perf_counter()
+        try:
+            yield stats
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats.executions += 1
+                stats.time_total += elapsed
+                stats.time_max = max(stats.time_max, elapsed)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estatísticas por consulta, da mais custosa (tempo total) para a menos."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: -item[1].time_total)
+            return {name: stats.as_dict() for name, stats in items}
+
+    def reset_stats(self):
+        """Zera as estatísticas (as consultas renderizadas são mantidas)."""
+        with self._lock:
+            self._stats.clear()
+
+
+def log_query_report(registry: QueryRegistry, logger_name: str = "performance"):
+    """
+    Grava as estatísticas das consultas no log estruturado.
+
+    Uma linha por consulta, com os contadores em ``extra_fields``
+    (mesmo formato de ``log_cache_report``).
+    """
+    logger = logging.getLogger(logger_name)
+    for name, counters in registry.get_stats().items():
+        extra_data = {"statement": name, **counters}
+        logger.info(f"Query stats: {name}", extra={"extra_fields": extra_data})
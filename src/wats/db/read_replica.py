@@ -0,0 +1,263 @@
+# WATS_Project/wats_app/db/read_replica.py
+"""
+Roteamento de leituras para uma réplica somente leitura (SQL Server AG).
+
+Métodos de leitura pesados e cacheáveis (decorados com ``replica_read``)
+executam seus cursores numa conexão ``ApplicationIntent=ReadOnly``, com pool
+próprio; o restante (escritas, leituras logo após escrever) continua no
+primário.
+
+- O pool da réplica é criado em segundo plano: até ficar pronto, as leituras
+  vão para o primário.
+- Se a réplica falhar, ela fica fora de uso por ``retry_seconds`` e a chamada
+  é repetida no primário.
+- Após uma invalidação de cache (ou seja, após uma escrita, local ou de outra
+  instância) as leituras ficam no primário por ``pin_seconds``, para não ler
+  dados atrasados da réplica.
+"""
+
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class _Routing:
+    """Estado do roteamento de uma chamada (thread atual)."""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+class _ReplicaCursor:
+    """
+    Cursor da réplica; ao sair do ``with`` (ou em ``close``) devolve a conexão
+    ao pool. Erros do driver marcam a réplica como indisponível.
+    """
+
+    def __init__(self, cursor: Any, connection_context: Any, router: "ReadReplicaRouter", routing: _Routing):
+        self._cursor = cursor
+        self._connection_context = connection_context
+        self._router = router
+        self._routing = routing
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and isinstance(exc, self._router.driver_error):
+            self._routing.failed = True
+            self._router.mark_failed(exc)
+        self.close()
+        return False
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+        self._connection_context.__exit__(None, None, None)
+
+
+class ReadReplicaRouter:
+    """Pool da réplica de leitura e roteamento por thread."""
+
+    def __init__(
+        self,
+        pool_factory: Callable[[], Any],
+        driver_error: Any = Exception,
+        retry_seconds: float = 60.0,
+        pin_seconds: float = 10.0,
+    ):
+        """
+        Args:
+            pool_factory: Cria o pool da réplica (objeto com ``get_connection()``)
+            driver_error: Classe de erro do driver (ex: pyodbc.Error)
+            retry_seconds: Tempo fora de uso após uma falha
+            pin_seconds: Tempo no primário após uma invalidação de cache
+        """
+        self.pool_factory = pool_factory
+        self.driver_error = driver_error
+        self.retry_seconds = retry_seconds
+        self.pin_seconds = pin_seconds
+
+        self.pool: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._connecting = False
+        self._retry_at = 0.0
+        self._primary_until = 0.0
+        self._local = threading.local()
+        self._hooked_cache: Optional[Any] = None
+        self._stats = {"replica_reads": 0, "fallbacks": 0, "failures": 0}
+
+    # ------------------------------------------------------------------ estado
+
+    def connect(self) -> bool:
+        """Cria e testa o pool da réplica (bloqueante)."""
+        try:
+            pool = self.pool_factory()
+            with pool.get_connection() as conn:
+                if conn is None:
+                    raise ConnectionError("réplica não retornou conexão")
+        except Exception as e:
+            logging.warning(f"Réplica de leitura indisponível, leituras no primário: {e}")
+            with self._lock:
+                self._connecting = False
+                self._retry_at = time.monotonic() + self.retry_seconds
+            return False
+
+        with self._lock:
+            self.pool = pool
+            self._connecting = False
+        logging.info("Réplica de leitura conectada")
+        return True
+
+    def connect_async(self):
+        """Conecta em segundo plano (uma tentativa por vez)."""
+        with self._lock:
+            if self._connecting:
+                return
+            self._connecting = True
+        threading.Thread(target=self.connect, name="ReadReplicaConnect", daemon=True).start()
+
+    def available(self) -> bool:
+        """True se as leituras roteáveis devem ir para a réplica agora."""
+        self._ensure_invalidation_hook()
+        now = time.monotonic()
+        if now < self._primary_until or now < self._retry_at:
+            return False
+        if self.pool is None:
+            self.connect_async()
+            return False
+        return True
+
+    def mark_failed(self, error: Exception):
+        """Tira a réplica de uso por ``retry_seconds``."""
+        with self._lock:
+            self._retry_at = time.monotonic() + self.retry_seconds
+            self._stats["failures"] += 1
+        logging.warning(
+            f"Réplica de leitura falhou, usando o primário por {self.retry_seconds:.0f}s: {error}"
+        )
+
+    def pin_primary(self, seconds: Optional[float] = None):
+        """Mantém as leituras no primário (leitura após escrita)."""
+        until = time.monotonic() + (self.pin_seconds if seconds is None else seconds)
+        with self._lock:
+            self._primary_until = max(self._primary_until, until)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "connected": self.pool is not None}
+
+    def close(self):
+        pool, self.pool = self.pool, None
+        if pool is not None and hasattr(pool, "close_all"):
+            pool.close_all()
+
+    # ------------------------------------------------------------------ roteamento
+
+    @contextmanager
+    def route(self) -> Iterator[_Routing]:
+        """Direciona ``get_cursor`` desta thread para a réplica dentro do bloco."""
+        previous = getattr(self._local, "routing", None)
+        routing = _Routing()
+        self._local.routing = routing
+        try:
+            yield routing
+        finally:
+            self._local.routing = previous
+
+    def get_cursor(self) -> Optional[Any]:
+        """
+        Cursor da réplica se a thread está numa chamada roteada; None caso
+        contrário (ou se a conexão falhar), e o chamador usa o primário.
+        """
+        routing = getattr(self._local, "routing", None)
+        pool = self.pool
+        if routing is None or routing.failed or pool is None:
+            return None
+
+        context = pool.get_connection()
+        try:
+            conn = context.__enter__()
+        except Exception as e:
+            return self._fail(routing, e)
+
+        try:
+            if conn is None:
+                raise ConnectionError("réplica não retornou conexão")
+            cursor = conn.cursor()
+        except Exception as e:
+            context.__exit__(None, None, None)
+            return self._fail(routing, e)
+
+        with self._lock:
+            self._stats["replica_reads"] += 1
+        return _ReplicaCursor(cursor, context, self, routing)
+
+    def _fail(self, routing: _Routing, error: Exception) -> None:
+        routing.failed = True
+        self.mark_failed(error)
+        return None
+
+    def record_fallback(self):
+        with self._lock:
+            self._stats["fallbacks"] += 1
+
+    def _ensure_invalidation_hook(self):
+        """Registra ``pin_primary`` no cache atual (o singleton pode ser trocado)."""
+        from src.wats.util_cache.intelligent_cache import get_cache
+
+        cache = get_cache()
+        if cache is self._hooked_cache:
+            return
+        register = getattr(cache, "register_invalidation_callback", None)
+        if register is not None:
+            register("*", self.pin_primary)
+        self._hooked_cache = cache
+
+
+def replica_read(method: Callable) -> Callable:
+    """
+    Executa um método de leitura do repositório na réplica, se configurada.
+
+    Se a réplica falhar durante a chamada (mesmo que o método trate o erro e
+    retorne um valor vazio), o método é executado de novo no primário. Use
+    abaixo do decorator de cache, para que acertos de cache não passem aqui.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        router = getattr(self.db, "read_replica", None)
+        if router is None or not router.available():
+            return method(self, *args, **kwargs)
+
+        with router.route() as routing:
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                if not routing.failed:
+                    raise
+
+        if routing.failed:
+            router.record_fallback()
+            logging.info(f"{method.__qualname__}: repetindo a leitura no primário")
+            return method(self, *args, **kwargs)
+        return result
+
+    return wrapper
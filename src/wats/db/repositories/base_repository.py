@@ -1,5 +1,9 @@
 # WATS_Project/wats_app/db/repositories/base_repository.py
+import logging
+from typing import Any, Dict, Iterator, Optional, Sequence
+
 from src.wats.db.database_manager import DatabaseManager
+from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
 
 
 class BaseRepository:
@@ -9,3 +13,63 @@ class BaseRepository:
         self.db = db_manager
         # Propriedade para facilitar o acesso ao módulo de driver (pyodbc/psycopg2)
         self.driver_module = db_manager.driver_module
+
+    @property
+    def write_behind(self):
+        """Fila de gravação diferida (WriteBehindJournal) ou None se desativada."""
+        return getattr(self.db, "write_behind", None)
+
+    def _insert_returning_id(
+        self, cursor: Any, query: str, params: Sequence[Any] = ()
+    ) -> Optional[int]:
+        """
+        Executa um INSERT e retorna a identidade gerada por ele.
+
+        No SQL Server o ``SCOPE_IDENTITY()`` vai no mesmo lote do INSERT: fora
+        do lote ele é NULL, e ``@@IDENTITY`` pegaria a identidade gerada pelos
+        triggers da tabela (ex: Chg_Id do Cache_Change_Log_WTS).
+        """
+        db_type = getattr(self.db, "db_type", None)
+        if db_type == "sqlserver":
+            cursor.execute(f"{query.rstrip().rstrip(';')};\n{self.db.IDENTITY_QUERY}", params)
+            # Pula as contagens de linhas do INSERT até o resultado do SELECT
+            while cursor.description is None:
+                if not cursor.nextset():
+                    return None
+            row = cursor.fetchone()
+        elif db_type == "sqlite":
+            # last_insert_rowid() é restaurado ao fim dos triggers
+            cursor.execute(query, params)
+            row = cursor.execute(self.db.IDENTITY_QUERY).fetchone()
+        else:
+            cursor.execute(query, params)
+            return cursor.lastrowid
+        return int(row[0]) if row and row[0] is not None else None
+
+    def _iter_query(
+        self, query: str, params: Sequence[Any] = (), batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Executa ``query`` e entrega as linhas como dicts, lidas em blocos com ``fetchmany``.
+
+        O cursor (forward-only no pyodbc) só mantém um bloco em memória por
+        vez e é fechado ao fim da iteração ou quando o gerador é descartado.
+        """
+        cursor = self.db.get_cursor()
+        if not cursor:
+            raise DatabaseConnectionError("Falha ao obter cursor.")
+
+        try:
+            cursor.execute(query, tuple(params))
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(zip(columns, row))
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao ler resultados em blocos: {e}")
+            raise DatabaseQueryError(f"Erro ao ler resultados: {e}")
+        finally:
+            cursor.close()
@@ -0,0 +1,60 @@
+# WATS_Project/wats_app/db/repositories/change_log_repository.py
+import logging
+from typing import List, Optional, Tuple
+
+from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.sql_dialect import top_clause
+
+
+class ChangeLogRepository(BaseRepository):
+    """
+    Lê o log de alterações (Cache_Change_Log_WTS) gravado pelos triggers de
+    scripts/create_cache_change_log.sql, usado para invalidar o cache.
+    """
+
+    def get_last_change_id(self) -> int:
+        """Retorna o maior Chg_Id atual (0 se o log estiver vazio)."""
+        query = f"SELECT {self.db.ISNULL}(MAX(Chg_Id), 0) FROM Cache_Change_Log_WTS"
+        try:
+            with self.db.get_cursor() as cursor:
+                if not cursor:
+                    raise DatabaseConnectionError("Falha ao obter cursor.")
+                cursor.execute(query)
+                result = cursor.fetchone()
+                return int(result[0]) if result else 0
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao ler o último Chg_Id do log de alterações: {e}")
+            raise DatabaseQueryError(f"Erro ao ler o log de alterações: {e}")
+
+    def list_changes_since(
+        self, last_id: int, limit: int = 500
+    ) -> List[Tuple[int, str, Optional[int]]]:
+        """
+        Retorna as alterações posteriores a ``last_id`` em ordem crescente.
+
+        Args:
+            last_id: Último Chg_Id já processado
+            limit: Máximo de linhas por chamada
+
+        Returns:
+            Lista de (Chg_Id, Chg_Tabela, Chg_Chave)
+        """
+        # Limite no SQL: após uma parada longa o servidor não materializa o backlog inteiro
+        top, limit_sql = top_clause(self.db.db_type, limit)
+        query = f"""
+            SELECT {top} Chg_Id, Chg_Tabela, Chg_Chave
+            FROM Cache_Change_Log_WTS
+            WHERE Chg_Id > {self.db.PARAM}
+            ORDER BY Chg_Id
+            {limit_sql}
+        """
+        try:
+            with self.db.get_cursor() as cursor:
+                if not cursor:
+                    raise DatabaseConnectionError("Falha ao obter cursor.")
+                cursor.execute(query, (last_id,))
+                return [(int(r[0]), r[1], r[2]) for r in cursor.fetchall()]
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao ler o log de alterações: {e}")
+            raise DatabaseQueryError(f"Erro ao ler o log de alterações: {e}")
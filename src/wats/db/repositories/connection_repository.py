@@ -4,8 +4,18 @@ from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from src.wats.db.database_manager import DatabaseManager
 from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.read_replica import replica_read
 from src.wats.db.repositories.base_repository import BaseRepository
-from src.wats.performance import cache_connections, invalidate_connection_caches
+from src.wats.db.repositories.effective_permission_repository import (
+    EffectivePermissionRepository,
+)
+from src.wats.db.sql_dialect import string_agg_subquery
+from src.wats.util_cache.catalog_snapshot import catalog_version
+from src.wats.performance import (
+    cache_catalog,
+    cache_connections,
+    invalidate_connection_caches,
+)
 
 if TYPE_CHECKING:
     from src.wats.db.repositories.user_repository import UserRepository
@@ -23,40 +33,106 @@ class ConnectionRepository(BaseRepository):
         )
 
         self.individual_perm_repo = IndividualPermissionRepository(db_manager)
+        self.effective_perm_repo = EffectivePermissionRepository(db_manager)
 
-    @cache_connections(ttl=60)
+    @cache_connections()
+    @replica_read
     def select_all(self, username: str) -> List[Any]:
+        """Catálogo de conexões do usuário com os usuários conectados ("a|b|c")."""
+        # Usuários conectados agregados em uma coluna ("a|b|c"), conforme o dialeto
+        connected_users = string_agg_subquery(
+            self.db.get_string_agg_mode(),
+            table="Usuario_Conexao_WTS",
+            group_column="Con_Codigo",
+            value_column="Usu_Nome",
+            alias="Usu_Nome",
+        )
+        presence_join = f"LEFT JOIN ({connected_users}) Uco ON Con.Con_Codigo = Uco.Con_Codigo"
+        return self._select_connections(
+            username, f"{self.db.ISNULL}(Uco.Usu_Nome, '')", presence_join
+        )
+
+    @cache_catalog()
+    @replica_read
+    def select_catalog(self, username: str) -> Tuple[str, List[Any]]:
+        """
+        Catálogo de conexões do usuário, sem os usuários conectados.
+
+        Muda pouco (nome, IP, grupo, credenciais, particularidades) e, com o
+        log de alterações ativo, fica no cache por mais tempo que ``select_all``;
+        a presença vem de ``select_presence``. As linhas têm o mesmo layout de ``select_all``,
+        com a coluna Usu_Nome vazia.
+
+        Returns:
+            (versão, linhas): a versão é um hash do conteúdo e só muda quando
+            o catálogo muda
+        """
+        rows = self._select_connections(username, "''", "")
+        return catalog_version(rows), rows
+
+    def select_presence(self) -> Dict[int, str]:
+        """
+        Usuários conectados por conexão (Con_Codigo -> "a|b|c"), para o refresh periódico.
+
+        Consulta leve (coberta por IX_Usuario_Conexao_Heartbeat) e sem cache:
+        a agregação é feita aqui, no mesmo formato de ``select_all``.
+        """
+        query = "SELECT Con_Codigo, Usu_Nome FROM Usuario_Conexao_WTS ORDER BY Con_Codigo, Usu_Nome"
+        try:
+            rows = self.db.execute_query("connections.select_presence", query, fetch="all")
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao buscar usuários conectados: {e}")
+            raise DatabaseQueryError(f"Erro ao buscar usuários conectados: {e}")
+
+        presence: Dict[int, List[str]] = {}
+        for con_codigo, usu_nome in rows:
+            presence.setdefault(con_codigo, []).append(usu_nome)
+        return {con_codigo: "|".join(names) for con_codigo, names in presence.items()}
+
+    def _select_connections(
+        self, username: str, connected_users_column: str, presence_join: str
+    ) -> List[Any]:
+        """Consulta comum de ``select_all`` e ``select_catalog`` (filtro de permissões)."""
         user_id, is_admin = self.user_repo.get_user_role(username)
 
+        permission_join = ""
+        params = []
+        if not is_admin and self.effective_perm_repo.enabled:
+            if user_id is None:
+                return []
+
+            # Permissões materializadas: um JOIN no intervalo do usuário
+            # (índice clusterizado Usu_Id, Con_Codigo) em vez de dois EXISTS por conexão
+            permission_join = f"""
+            INNER JOIN (
+                SELECT DISTINCT Con_Codigo
+                FROM Permissao_Efetiva_WTS
+                WHERE Usu_Id = {self.db.PARAM}
+                AND (Data_Inicio IS NULL OR Data_Inicio <= {self.db.PARAM})
+                AND (Data_Fim IS NULL OR Data_Fim >= {self.db.PARAM})
+            ) Pe ON Pe.Con_Codigo = Con.Con_Codigo"""
+            from datetime import datetime
+
+            now = datetime.now()
+            params.extend([user_id, now, now])
+
         # Dialeto: ISNULL -> COALESCE
         base_query = f"""
             SELECT
                 Con.Con_Codigo, Con.Con_IP, Con.Con_Nome, Con.Con_Usuario, Con.Con_Senha,
-                Gru.Gru_Nome, {self.db.ISNULL}(Uco.Usu_Nome, '') AS Usu_Nome, NULL AS Usu_Dat_Conexao,
-                {self.db.ISNULL}(Con.Extra, '') AS Extra, con.con_particularidade,
-                {self.db.ISNULL}(C2.con_cliente, '') AS con_cliente,
+                Gru.Gru_Nome, {connected_users_column} AS Usu_Nome, NULL AS Usu_Dat_Conexao,
+                {self.db.ISNULL}(Con.Extra, '') AS Extra, Con.con_particularidade,
+                {self.db.ISNULL}(Con.con_cliente, '') AS con_cliente,
                 Con.con_tipo
             FROM Conexao_WTS Con
             LEFT JOIN Grupo_WTS Gru ON Con.Gru_Codigo = Gru.Gru_Codigo and Gru.Gru_codigo <> 33
-            LEFT JOIN (
-                SELECT Con_Codigo,
-                    STUFF((
-                        SELECT '|' + Usu_Nome
-                        FROM usuario_conexao_wts uc2
-                        WHERE uc2.Con_Codigo = uc1.Con_Codigo
-                        ORDER BY Usu_Nome
-                        FOR XML PATH(''), TYPE
-                    ).value('.', 'NVARCHAR(MAX)'), 1, 1, '') AS Usu_Nome
-                FROM usuario_conexao_wts uc1
-                GROUP BY Con_Codigo
-            ) Uco ON Con.Con_Codigo = Uco.Con_Codigo
-            LEFT JOIN conexao_wts C2 ON Con.Con_Codigo = C2.Con_Codigo
+            {presence_join}
+            {permission_join}
         """
 
         where_clause = "WHERE Con.Gru_Codigo <> 33"
-        params = []
 
-        if not is_admin:
+        if not is_admin and not permission_join:
             if user_id is None:
                 return []
 
@@ -94,7 +170,8 @@ class ConnectionRepository(BaseRepository):
             raise DatabaseQueryError(f"Erro ao buscar dados: {e}")
         return []
 
-    @cache_connections(ttl=60)
+    @cache_connections()
+    @replica_read
     def admin_get_all_connections(self) -> List[Tuple]:
         """
         Retorna todas as conexões ATIVAS (exclui grupo 33 - Inativo).
@@ -163,7 +240,9 @@ class ConnectionRepository(BaseRepository):
             with self.db.get_cursor() as cursor:
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
-                cursor.execute(query, params)
+                new_id = self._insert_returning_id(cursor, query, params)
+                if new_id is not None:
+                    self.effective_perm_repo.refresh_connection(new_id, cursor)
                 invalidate_connection_caches()
                 return True, "Conexão criada."
         except self.driver_module.Error as e:
@@ -197,7 +276,9 @@ class ConnectionRepository(BaseRepository):
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
                 cursor.execute(query, params)
-                invalidate_connection_caches()
+                # O grupo da conexão pode ter mudado
+                self.effective_perm_repo.refresh_connection(con_id, cursor)
+                invalidate_connection_caches(con_id)
                 return True, "Conexão atualizada."
         except self.driver_module.Error as e:
             logging.error(f"Admin: Erro ao ATUALIZAR conexão: {e}")
@@ -216,8 +297,9 @@ class ConnectionRepository(BaseRepository):
                 cursor.execute(q_logs, (con_id,))
                 cursor.execute(q_access, (con_id,))
                 cursor.execute(q_conn, (con_id,))
+                self.effective_perm_repo.refresh_connection(con_id, cursor)
                 conn.commit()
-                invalidate_connection_caches()
+                invalidate_connection_caches(con_id)
                 return True, "Conexão e logs relacionados deletados."
         except self.driver_module.Error as e:
             conn.rollback()
@@ -244,6 +326,18 @@ class ConnectionRepository(BaseRepository):
         """Revoga acesso individual a uma conexão."""
         return self.individual_perm_repo.revoke_individual_access(user_id, connection_id)
 
+    def grant_individual_access_bulk(
+        self, pairs: List[Tuple[int, int]], granted_by_user_id: int, observations: str = None
+    ) -> Tuple[bool, str]:
+        """Concede acesso individual permanente a vários pares (usuário, conexão)."""
+        return self.individual_perm_repo.grant_individual_access_bulk(
+            pairs, granted_by_user_id, observations=observations
+        )
+
+    def revoke_individual_access_bulk(self, pairs: List[Tuple[int, int]]) -> Tuple[bool, str]:
+        """Revoga acesso individual de vários pares (usuário, conexão)."""
+        return self.individual_perm_repo.revoke_individual_access_bulk(pairs)
+
     def list_user_individual_permissions(self, user_id: int) -> List[Dict[str, Any]]:
         """Lista permissões individuais de um usuário."""
         return self.individual_perm_repo.list_user_individual_permissions(user_id)
@@ -0,0 +1,114 @@
+# WATS_Project/wats_app/db/repositories/effective_permission_repository.py
+import logging
+from typing import Any, Optional, Tuple
+
+from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.repositories.base_repository import BaseRepository
+
+
+class EffectivePermissionRepository(BaseRepository):
+    """
+    Mantém Permissao_Efetiva_WTS (usuário -> conexão, com janela de validade).
+
+    A tabela materializa as permissões de grupo e as individuais ativas
+    (scripts/create_effective_permissions_table.sql). Os repositórios chamam
+    ``refresh_*`` após cada alteração de permissão, grupo do usuário ou grupo
+    da conexão; com o recurso desativado os métodos não fazem nada.
+
+    Todos os métodos aceitam o cursor do chamador para que a atualização
+    faça parte da mesma transação da alteração original.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        """True se o select_all usa a tabela (database.effective_permissions)."""
+        return bool(getattr(self.db, "use_effective_permissions", False))
+
+    def refresh_user(self, user_id: int, cursor: Any = None):
+        """Recalcula as permissões efetivas de um usuário."""
+        self._refresh("Usu_Id", self.db.PARAM, (user_id,), cursor)
+
+    def refresh_connection(self, connection_id: int, cursor: Any = None):
+        """Recalcula as permissões efetivas de uma conexão (ex: mudança de grupo)."""
+        self._refresh("Con_Codigo", self.db.PARAM, (connection_id,), cursor)
+
+    def refresh_permission(self, permission_id: int, cursor: Any = None):
+        """Recalcula o usuário dono de uma permissão individual (pelo Id)."""
+        owner = f"SELECT Usu_Id FROM Permissao_Conexao_Individual_WTS WHERE Id = {self.db.PARAM}"
+        self._refresh("Usu_Id", owner, (permission_id,), cursor)
+
+    def rebuild_all(self, cursor: Any = None):
+        """Reconstrói a tabela inteira (ex: após excluir um grupo)."""
+        self._refresh(None, None, (), cursor)
+
+    def _refresh(
+        self,
+        scope_column: Optional[str],
+        scope_sql: Optional[str],
+        scope_params: Tuple,
+        cursor: Any = None,
+    ):
+        """
+        Apaga e recalcula as linhas do escopo (``scope_column IN (scope_sql)``).
+
+        Sem escopo, recalcula a tabela inteira.
+        """
+        if not self.enabled:
+            return
+
+        statements = self._build_refresh_statements(scope_column, scope_sql, scope_params)
+
+        if cursor is not None:
+            for query, params in statements:
+                cursor.execute(query, params)
+            return
+
+        try:
+            with self.db.get_cursor() as own_cursor:
+                if not own_cursor:
+                    raise DatabaseConnectionError("Falha ao obter cursor.")
+                for query, params in statements:
+                    own_cursor.execute(query, params)
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao atualizar permissões efetivas ({scope_column}): {e}")
+            raise DatabaseQueryError(f"Erro ao atualizar permissões efetivas: {e}")
+
+    def _build_refresh_statements(
+        self, scope_column: Optional[str], scope_sql: Optional[str], scope_params: Tuple
+    ):
+        """Monta DELETE + INSERTs (grupo e individual) para o escopo."""
+        if scope_column is None:
+            delete_where = group_where = individual_where = ""
+            params: Tuple = ()
+        else:
+            # Nas permissões de grupo, Usu_Id vem da permissão e Con_Codigo da conexão
+            group_alias = "p" if scope_column == "Usu_Id" else "c"
+            delete_where = f"WHERE {scope_column} IN ({scope_sql})"
+            group_where = f"WHERE {group_alias}.{scope_column} IN ({scope_sql})"
+            individual_where = f"AND pci.{scope_column} IN ({scope_sql})"
+            params = scope_params
+
+        return [
+            (f"DELETE FROM Permissao_Efetiva_WTS {delete_where}", params),
+            (
+                f"""
+                INSERT INTO Permissao_Efetiva_WTS
+                    (Usu_Id, Con_Codigo, Origem, Data_Inicio, Data_Fim)
+                SELECT p.Usu_Id, c.Con_Codigo, 'G', NULL, NULL
+                FROM Permissao_Grupo_WTS p
+                INNER JOIN Conexao_WTS c ON c.Gru_Codigo = p.Gru_Codigo
+                {group_where}
+                """,
+                params,
+            ),
+            (
+                f"""
+                INSERT INTO Permissao_Efetiva_WTS
+                    (Usu_Id, Con_Codigo, Origem, Data_Inicio, Data_Fim)
+                SELECT pci.Usu_Id, pci.Con_Codigo, 'I', pci.Data_Inicio, pci.Data_Fim
+                FROM Permissao_Conexao_Individual_WTS pci
+                WHERE pci.Ativo = {self.db.PARAM} {individual_where}
+                """,
+                (True,) + params,
+            ),
+        ]
@@ -3,14 +3,23 @@ import logging
 from typing import Dict, List, Optional, Tuple
 
 from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.read_replica import replica_read
 from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.repositories.effective_permission_repository import (
+    EffectivePermissionRepository,
+)
 from src.wats.performance import cache_groups, invalidate_group_caches
 
 
 class GroupRepository(BaseRepository):
     """Gerencia operações de Grupos (Grupo_WTS)."""
 
-    @cache_groups(ttl=300)
+    def __init__(self, db_manager):
+        super().__init__(db_manager)
+        self.effective_perm_repo = EffectivePermissionRepository(db_manager)
+
+    @cache_groups()
+    @replica_read
     def admin_get_all_groups(self) -> List[Tuple]:
         query = "SELECT Gru_Codigo, Gru_Nome FROM Grupo_WTS ORDER BY Gru_Nome"
         try:
@@ -61,7 +70,7 @@ class GroupRepository(BaseRepository):
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
                 cursor.execute(query, (nome, desc, group_id))
-                invalidate_group_caches()
+                invalidate_group_caches(group_id)
                 return True, "Grupo atualizado."
         except self.driver_module.Error as e:
             logging.error(f"Admin: Erro ao ATUALIZAR grupo: {e}")
@@ -76,7 +85,9 @@ class GroupRepository(BaseRepository):
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
                 cursor.execute(query, (group_id,))
-                invalidate_group_caches()
+                # Conexões e permissões do grupo são alteradas em cascata
+                self.effective_perm_repo.rebuild_all(cursor)
+                invalidate_group_caches(group_id)
                 return True, "Grupo deletado."
         except self.driver_module.Error as e:
             logging.error(f"Admin: Erro ao DELETAR grupo: {e}")
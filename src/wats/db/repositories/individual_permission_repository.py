@@ -1,11 +1,14 @@
 # WATS_Project/wats_app/db/repositories/individual_permission_repository.py
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from src.wats.db.database_manager import DatabaseManager
 from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
 from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.repositories.effective_permission_repository import (
+    EffectivePermissionRepository,
+)
 from src.wats.performance import cache_permissions, invalidate_user_caches
 
 
@@ -14,6 +17,7 @@ class IndividualPermissionRepository(BaseRepository):
 
     def __init__(self, db_manager: DatabaseManager):
         super().__init__(db_manager)
+        self.effective_perm_repo = EffectivePermissionRepository(db_manager)
 
     def grant_individual_access(
         self,
@@ -45,10 +49,8 @@ class IndividualPermissionRepository(BaseRepository):
         """
 
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-
+            # Permissão e permissões efetivas na mesma transação
+            with self.db.get_transactional_cursor() as cursor:
                 # Verificar se já existe
                 cursor.execute(existing_query, (user_id, connection_id, True))
                 existing = cursor.fetchone()
@@ -74,14 +76,15 @@ class IndividualPermissionRepository(BaseRepository):
                     observations,
                 )
                 cursor.execute(insert_query, params)
-
-                invalidate_user_caches()
-                return True, "Acesso individual concedido com sucesso."
+                self.effective_perm_repo.refresh_user(user_id, cursor)
 
         except self.driver_module.Error as e:
             logging.error(f"Erro ao conceder acesso individual: {e}")
             return False, f"Erro no banco de dados: {e}"
 
+        invalidate_user_caches(user_id)
+        return True, "Acesso individual concedido com sucesso."
+
     def revoke_individual_access(self, user_id: int, connection_id: int) -> Tuple[bool, str]:
         """Remove acesso individual de um usuário a uma conexão."""
         query = f"""
@@ -91,23 +94,21 @@ class IndividualPermissionRepository(BaseRepository):
         """
 
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-
+            with self.db.get_transactional_cursor() as cursor:
                 cursor.execute(query, (False, user_id, connection_id, True))
 
-                if cursor.rowcount > 0:
-                    invalidate_user_caches()
-                    return True, "Acesso individual revogado com sucesso."
-                else:
+                if cursor.rowcount <= 0:
                     return False, "Nenhuma permissão ativa encontrada para revogar."
+                self.effective_perm_repo.refresh_user(user_id, cursor)
 
         except self.driver_module.Error as e:
             logging.error(f"Erro ao revogar acesso individual: {e}")
             return False, f"Erro no banco de dados: {e}"
 
-    @cache_permissions(ttl=180)
+        invalidate_user_caches(user_id)
+        return True, "Acesso individual revogado com sucesso."
+
+    @cache_permissions(tags=lambda self, user_id: [f"user:{user_id}"])
     def list_user_individual_permissions(self, user_id: int) -> List[Dict[str, Any]]:
         """Lista todas as permissões individuais de um usuário."""
         query = f"""
@@ -301,10 +302,7 @@ class IndividualPermissionRepository(BaseRepository):
         """
 
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-
+            with self.db.get_transactional_cursor() as cursor:
                 # Verificar se já existe
                 cursor.execute(existing_query, (user_id, connection_id, True, datetime.now()))
                 existing = cursor.fetchone()
@@ -346,17 +344,18 @@ class IndividualPermissionRepository(BaseRepository):
                     final_observations,
                 )
                 cursor.execute(insert_query, params)
-
-                invalidate_user_caches()
-                return (
-                    True,
-                    f"Acesso temporário concedido até {end_date.strftime('%d/%m/%Y %H:%M')}.",
-                )
+                self.effective_perm_repo.refresh_user(user_id, cursor)
 
         except self.driver_module.Error as e:
             logging.error(f"Erro ao conceder acesso temporário: {e}")
             return False, f"Erro no banco de dados: {e}"
 
+        invalidate_user_caches(user_id)
+        return (
+            True,
+            f"Acesso temporário concedido até {end_date.strftime('%d/%m/%Y %H:%M')}.",
+        )
+
     def list_active_temporary_permissions(self) -> List[Dict[str, Any]]:
         """Lista todas as permissões temporárias ativas no sistema."""
         query = f"""
@@ -463,22 +462,236 @@ class IndividualPermissionRepository(BaseRepository):
         """
 
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-
+            with self.db.get_transactional_cursor() as cursor:
                 cursor.execute(query, (False, permission_id, True))
 
-                if cursor.rowcount > 0:
-                    invalidate_user_caches()
-                    return True, "Acesso temporário revogado com sucesso."
-                else:
+                if cursor.rowcount <= 0:
                     return False, "Permissão temporária não encontrada ou já inativa."
+                self.effective_perm_repo.refresh_permission(permission_id, cursor)
 
         except self.driver_module.Error as e:
             logging.error(f"Erro ao revogar acesso temporário {permission_id}: {e}")
             return False, f"Erro no banco de dados: {e}"
 
+        invalidate_user_caches()
+        return True, "Acesso temporário revogado com sucesso."
+
+    # ========== OPERAÇÕES EM LOTE ==========
+    # Uma transação para todos os pares (usuário, conexão): uma consulta das
+    # permissões existentes, um executemany (fast_executemany no SQL Server),
+    # a atualização das permissões efetivas e uma única invalidação de cache.
+
+    def grant_individual_access_bulk(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        granted_by_user_id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        observations: str = None,
+    ) -> Tuple[bool, str]:
+        """
+        Concede acesso individual a vários pares (usuário, conexão) de uma vez.
+
+        Pares que já possuem permissão ativa são ignorados, como em
+        ``grant_individual_access``.
+
+        Args:
+            pairs: Pares (user_id, connection_id)
+            granted_by_user_id: ID do usuário que está concedendo o acesso
+            start_date: Data de início (None = agora)
+            end_date: Data de fim (None = permanente)
+            observations: Observações sobre a concessão
+        """
+        if start_date is None:
+            start_date = datetime.now()
+
+        return self._bulk_grant(
+            pairs,
+            granted_by_user_id,
+            start_date,
+            end_date,
+            observations,
+            only_valid_now=False,
+            label="acesso individual",
+        )
+
+    def grant_temporary_access_bulk(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        granted_by_user_id: int,
+        duration_hours: float,
+        observations: str = None,
+    ) -> Tuple[bool, str]:
+        """
+        Concede acesso temporário a vários pares (usuário, conexão) de uma vez.
+
+        Pares com permissão ativa e não expirada (permanente ou temporária)
+        são ignorados, como em ``grant_temporary_access``.
+        """
+        from datetime import timedelta
+
+        start_date = datetime.now()
+        end_date = start_date + timedelta(hours=duration_hours)
+        duration_text = (
+            f"{duration_hours}h" if duration_hours >= 1 else f"{int(duration_hours * 60)}min"
+        )
+        final_observations = f"Acesso temporário ({duration_text}). {observations or ''}".strip()
+
+        return self._bulk_grant(
+            pairs,
+            granted_by_user_id,
+            start_date,
+            end_date,
+            final_observations,
+            only_valid_now=True,
+            label="acesso temporário",
+        )
+
+    def revoke_individual_access_bulk(self, pairs: Iterable[Tuple[int, int]]) -> Tuple[bool, str]:
+        """Revoga o acesso individual de vários pares (usuário, conexão) de uma vez."""
+        pairs = self._unique_pairs(pairs)
+        if not pairs:
+            return False, "Nenhum par usuário/conexão informado."
+
+        query = f"""
+            UPDATE Permissao_Conexao_Individual_WTS
+            SET Ativo = {self.db.PARAM}
+            WHERE Usu_Id = {self.db.PARAM} AND Con_Codigo = {self.db.PARAM} AND Ativo = {self.db.PARAM}
+        """
+
+        try:
+            with self.db.get_transactional_cursor() as cursor:
+                active = self._active_pairs(cursor, pairs, only_valid_now=False)
+                to_revoke = [pair for pair in pairs if pair in active]
+                if not to_revoke:
+                    return False, "Nenhuma permissão ativa encontrada para revogar."
+
+                self.db.enable_fast_executemany(cursor)
+                cursor.executemany(
+                    query, [(False, user_id, con_id, True) for user_id, con_id in to_revoke]
+                )
+                affected_users = {user_id for user_id, _ in to_revoke}
+                for user_id in affected_users:
+                    self.effective_perm_repo.refresh_user(user_id, cursor)
+        except DatabaseConnectionError:
+            return False, "Falha ao conectar."
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao revogar acessos individuais em lote: {e}")
+            return False, f"Erro no banco de dados: {e}"
+
+        self._invalidate_users_once(affected_users)
+        return True, f"{len(to_revoke)} acesso(s) individual(is) revogado(s)."
+
+    def _bulk_grant(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        granted_by_user_id: int,
+        start_date: datetime,
+        end_date: Optional[datetime],
+        observations: Optional[str],
+        only_valid_now: bool,
+        label: str,
+    ) -> Tuple[bool, str]:
+        """Insere as permissões dos pares sem permissão ativa, em uma transação."""
+        pairs = self._unique_pairs(pairs)
+        if not pairs:
+            return False, "Nenhum par usuário/conexão informado."
+
+        insert_query = f"""
+            INSERT INTO Permissao_Conexao_Individual_WTS
+            (Usu_Id, Con_Codigo, Data_Inicio, Data_Fim, Criado_Por_Usu_Id, Data_Criacao, Ativo, Observacoes)
+            VALUES ({self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM})
+        """
+
+        try:
+            with self.db.get_transactional_cursor() as cursor:
+                existing = self._active_pairs(cursor, pairs, only_valid_now)
+                to_grant = [pair for pair in pairs if pair not in existing]
+                if not to_grant:
+                    return False, "Todos os usuários já possuem acesso ativo a essas conexões."
+
+                created_at = datetime.now()
+                params = [
+                    (
+                        user_id,
+                        con_id,
+                        start_date,
+                        end_date,
+                        granted_by_user_id,
+                        created_at,
+                        True,
+                        observations,
+                    )
+                    for user_id, con_id in to_grant
+                ]
+                self.db.enable_fast_executemany(cursor)
+                cursor.executemany(insert_query, params)
+
+                affected_users = {user_id for user_id, _ in to_grant}
+                for user_id in affected_users:
+                    self.effective_perm_repo.refresh_user(user_id, cursor)
+        except DatabaseConnectionError:
+            return False, "Falha ao conectar."
+        except self.driver_module.Error as e:
+            logging.error(f"Erro ao conceder {label} em lote: {e}")
+            return False, f"Erro no banco de dados: {e}"
+
+        self._invalidate_users_once(affected_users)
+        skipped = len(pairs) - len(to_grant)
+        message = f"{label.capitalize()} concedido para {len(to_grant)} par(es) usuário/conexão."
+        if skipped:
+            message += f" {skipped} já possuía(m) acesso ativo."
+        return True, message
+
+    # Limite de parâmetros por consulta no SQL Server é 2100
+    _IN_CHUNK_SIZE = 500
+
+    def _active_pairs(
+        self, cursor: Any, pairs: List[Tuple[int, int]], only_valid_now: bool
+    ) -> Set[Tuple[int, int]]:
+        """
+        Pares (usuário, conexão) com permissão individual ativa, entre os informados.
+
+        Busca por usuário (poucos por operação) e filtra as conexões aqui.
+
+        Args:
+            only_valid_now: Considera apenas permissões não expiradas
+        """
+        user_ids = sorted({user_id for user_id, _ in pairs})
+        requested = set(pairs)
+        found: Set[Tuple[int, int]] = set()
+
+        for index in range(0, len(user_ids), self._IN_CHUNK_SIZE):
+            chunk = user_ids[index : index + self._IN_CHUNK_SIZE]
+            placeholders = ", ".join([self.db.PARAM] * len(chunk))
+            query = f"""
+                SELECT Usu_Id, Con_Codigo FROM Permissao_Conexao_Individual_WTS
+                WHERE Ativo = {self.db.PARAM} AND Usu_Id IN ({placeholders})
+            """
+            params: List[Any] = [True, *chunk]
+            if only_valid_now:
+                query += f" AND (Data_Fim IS NULL OR Data_Fim >= {self.db.PARAM})"
+                params.append(datetime.now())
+
+            cursor.execute(query, tuple(params))
+            for user_id, con_id in cursor.fetchall():
+                if (user_id, con_id) in requested:
+                    found.add((user_id, con_id))
+        return found
+
+    @staticmethod
+    def _unique_pairs(pairs: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Remove pares repetidos mantendo a ordem."""
+        return list(dict.fromkeys((int(user_id), int(con_id)) for user_id, con_id in pairs))
+
+    @staticmethod
+    def _invalidate_users_once(user_ids: Set[int]):
+        """Uma única invalidação de cache para todos os usuários afetados."""
+        if len(user_ids) == 1:
+            invalidate_user_caches(next(iter(user_ids)))
+        else:
+            invalidate_user_caches()
+
     def get_duration_options(self) -> List[Tuple[str, float]]:
         """Retorna opções de duração para permissões temporárias."""
         return [
@@ -1,9 +1,12 @@
 # WATS_Project/wats_app/db/repositories/log_repository.py
 import logging
-from typing import Optional, List, Dict, Any
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from src.wats.db.exceptions import DatabaseConnectionError
+from src.wats.db.read_replica import replica_read
 from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.sql_dialect import limit_clause, now_minus
 from src.wats.util_cache.cache import cached, invalidate_cache
 
 
@@ -13,23 +16,44 @@ class LogRepository(BaseRepository):
     def __init__(self, db_manager):
         super().__init__(db_manager)
 
+    INSERT_CONNECTION_LOG = """
+        INSERT INTO Usuario_Conexao_WTS
+        (Con_Codigo, Usu_Nome, Usu_IP, Usu_Nome_Maquina, Usu_Usuario_Maquina, Usu_Dat_Conexao, Usu_Last_Heartbeat)
+        VALUES ({PARAM}, {PARAM}, {PARAM}, {PARAM}, {PARAM}, {NOW}, {NOW})
+    """
+
+    # Gravação diferida: conexão e heartbeat com o horário do enfileiramento
+    INSERT_CONNECTION_LOG_AT = """
+        INSERT INTO Usuario_Conexao_WTS
+        (Con_Codigo, Usu_Nome, Usu_IP, Usu_Nome_Maquina, Usu_Usuario_Maquina, Usu_Dat_Conexao, Usu_Last_Heartbeat)
+        VALUES ({PARAM}, {PARAM}, {PARAM}, {PARAM}, {PARAM}, {PARAM}, {PARAM})
+    """
+
     def insert_connection_log(
         self, con_codigo: int, username: str, ip: str, computer_name: str, user_name: str
     ) -> bool:
-        """Insere log de conexão e invalida cache."""
-        # Dialeto: GETDATE() -> self.db.NOW
-        query = f"""
-            INSERT INTO Usuario_Conexao_WTS
-            (Con_Codigo, Usu_Nome, Usu_IP, Usu_Nome_Maquina, Usu_Usuario_Maquina, Usu_Dat_Conexao, Usu_Last_Heartbeat)
-            VALUES ({self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.PARAM}, {self.db.NOW}, {self.db.NOW})
         """
+        Insere log de conexão e invalida cache.
+
+        Com a gravação diferida ativa, a linha é enfileirada e o retorno é
+        True assim que a entrada está no diário local. O horário de conexão e
+        o heartbeat são os do momento da chamada: uma entrada reaplicada depois
+        de reiniciar não aparece como presença recente.
+        """
+        params = (con_codigo, username, ip, computer_name, user_name)
+        if self.write_behind is not None:
+            self.write_behind.enqueue(
+                "logs.insert_connection_log",
+                (*params, datetime.now()),
+                session=self._presence_session(con_codigo, username),
+            )
+            return True
+
+        # Dialeto: GETDATE() -> {NOW} (renderizado uma vez pelo QueryRegistry)
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-                cursor.execute(query, (con_codigo, username, ip, computer_name, user_name))
-                self._invalidate_log_caches()
-                return True
+            self.db.execute_query("logs.insert_connection_log", self.INSERT_CONNECTION_LOG, params)
+            self._invalidate_log_caches()
+            return True
         except self.driver_module.Error as e:
             logging.error(f"Erro ao inserir log de conexão: {e}")
         return False
@@ -47,6 +71,12 @@ class LogRepository(BaseRepository):
         Returns:
             True se removeu com sucesso, False caso contrário
         """
+        session = self._presence_session(con_codigo, username)
+        if self.write_behind is not None and self.write_behind.has_pending(session):
+            # O INSERT da presença ainda está na fila: o DELETE entra depois dele
+            self.write_behind.enqueue("logs.delete_connection_log", (con_codigo, username), session=session)
+            return True
+
         query = f"DELETE FROM Usuario_Conexao_WTS WHERE Con_Codigo = {self.db.PARAM} AND Usu_Nome = {self.db.PARAM}"
         try:
             with self.db.get_cursor() as cursor:
@@ -101,24 +131,32 @@ class LogRepository(BaseRepository):
 
     def update_heartbeat(self, con_codigo: int, username: str) -> bool:
         """Atualiza heartbeat do usuário. Retorna False se o registro não existe mais."""
-        # Dialeto: GETDATE() -> self.db.NOW
-        query = f"UPDATE Usuario_Conexao_WTS SET Usu_Last_Heartbeat = {self.db.NOW} WHERE Con_Codigo = {self.db.PARAM} AND Usu_Nome = {self.db.PARAM}"
+        if self.write_behind is not None and self.write_behind.has_pending(
+            self._presence_session(con_codigo, username)
+        ):
+            # Presença ainda na fila de gravação diferida (o INSERT grava o heartbeat)
+            return True
+
+        # Chamado a cada poucos segundos por conexão ativa: consulta nomeada,
+        # preparada uma vez por conexão do pool
+        query = (
+            "UPDATE Usuario_Conexao_WTS SET Usu_Last_Heartbeat = {NOW} "
+            "WHERE Con_Codigo = {PARAM} AND Usu_Nome = {PARAM}"
+        )
         try:
-            with self.db.get_cursor() as cursor:
-                if not cursor:
-                    raise DatabaseConnectionError("Falha ao obter cursor.")
-                cursor.execute(query, (con_codigo, username))
-                rows_affected = cursor.rowcount
-                
-                # CORREÇÃO: Se não atualizou nenhuma linha, o usuário foi removido do banco
-                if rows_affected == 0:
-                    logging.warning(
-                        f"[HEARTBEAT_SYNC] Usuário '{username}' não encontrado na conexão {con_codigo}. "
-                        "Registro foi removido (desconexão forçada ou limpeza automática)."
-                    )
-                    return False
-                    
-                return True
+            rows_affected = self.db.execute_query(
+                "logs.update_heartbeat", query, (con_codigo, username)
+            )
+
+            # CORREÇÃO: Se não atualizou nenhuma linha, o usuário foi removido do banco
+            if rows_affected == 0:
+                logging.warning(
+                    f"[HEARTBEAT_SYNC] Usuário '{username}' não encontrado na conexão {con_codigo}. "
+                    "Registro foi removido (desconexão forçada ou limpeza automática)."
+                )
+                return False
+
+            return True
         except self.driver_module.Error as e:
             logging.error(f"Erro ao atualizar heartbeat: {e}")
         return False
@@ -133,7 +171,8 @@ class LogRepository(BaseRepository):
         if self.db.db_type == "sqlserver":
             query = "EXEC sp_Limpar_Conexoes_Fantasma"
         elif self.db.db_type == "sqlite":
-            query = "DELETE FROM Conexoes_WTS WHERE datetime(Data_Disconnect, '+1 hour') < datetime('now')"
+            # Mesmo DELETE de sp_Limpar_Conexoes_Fantasma (sem heartbeat há mais de 1 hora)
+            query = f"DELETE FROM Usuario_Conexao_WTS WHERE Usu_Last_Heartbeat < {now_minus('sqlite', 60)}"
             logging.info("Executando cleanup no SQLite. Removendo conexões antigas.")
         else:
             logging.warning(f"Cleanup não implementado para o tipo de banco: {self.db.db_type}")
@@ -162,6 +201,8 @@ class LogRepository(BaseRepository):
         Returns:
             Número de logs processados
         """
+        if self.db.db_type == "sqlite":
+            return self._cleanup_orphaned_access_logs_sqlite(hours_limit, simulate)
         if self.db.db_type != "sqlserver":
             logging.warning(f"cleanup_orphaned_access_logs não implementado para {self.db.db_type}")
             return 0
@@ -206,6 +247,72 @@ class LogRepository(BaseRepository):
             logging.error(f"Erro ao executar cleanup de logs órfãos: {e}")
             return 0
 
+    def _cleanup_orphaned_access_logs_sqlite(self, hours_limit: int, simulate: bool) -> int:
+        """
+        Versão SQLite de sp_Limpar_Logs_Orfaos.
+
+        Logs sem conexão ativa do usuário são finalizados no último heartbeat
+        conhecido (ou 1 hora após o início); os demais só recebem a observação.
+        """
+        # Usuário do log: Usu_Nome_Maquina é "usuario@maquina"
+        user_expr = "substr(la.Usu_Nome_Maquina, 1, instr(la.Usu_Nome_Maquina || '@', '@') - 1)"
+        orphaned = f"""
+            la.Log_DataHora_Fim IS NULL
+            AND la.Log_DataHora_Inicio < {now_minus('sqlite', int(hours_limit) * 60)}
+        """
+        active = f"""
+            EXISTS (
+                SELECT 1 FROM Usuario_Conexao_WTS uc
+                WHERE uc.Con_Codigo = la.Con_Codigo AND uc.Usu_Nome = {user_expr}
+            )
+        """
+        note = (
+            "substr(IFNULL(la.Log_Observacoes, '') || "
+            "CASE WHEN length(IFNULL(la.Log_Observacoes, '')) > 0 THEN ' | ' ELSE '' END || "
+            "'{label} ' || strftime('%Y-%m-%d %H:%M', 'now', 'localtime'), 1, 1000)"
+        )
+
+        conn = self.db.get_transactional_connection()
+        if not conn:
+            return 0
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM Log_Acesso_WTS la WHERE {orphaned}")
+                rows_affected = cursor.fetchone()[0]
+                if simulate or rows_affected == 0:
+                    conn.rollback()
+                    logging.info(f"Logs órfãos encontrados: {rows_affected} (simulação={simulate})")
+                    return rows_affected
+
+                cursor.execute(
+                    f"""
+                    UPDATE Log_Acesso_WTS AS la
+                    SET Log_DataHora_Fim = IFNULL(
+                            (SELECT MAX(uc.Usu_Last_Heartbeat) FROM Usuario_Conexao_WTS uc
+                             WHERE uc.Con_Codigo = la.Con_Codigo AND uc.Usu_Nome = {user_expr}),
+                            datetime(la.Log_DataHora_Inicio, '+1 hour')
+                        ),
+                        Log_Observacoes = {note.format(label="Auto-finalizado")}
+                    WHERE {orphaned} AND NOT {active}
+                """
+                )
+                cursor.execute(
+                    f"""
+                    UPDATE Log_Acesso_WTS AS la
+                    SET Log_Observacoes = {note.format(label="Verificado")}
+                    WHERE {orphaned} AND {active}
+                """
+                )
+            conn.commit()
+            self._invalidate_log_caches()
+            logging.info(f"Cleanup de logs órfãos executado: {rows_affected} logs")
+            return rows_affected
+        except self.driver_module.Error as e:
+            conn.rollback()
+            logging.error(f"Erro ao executar cleanup de logs órfãos: {e}")
+            return 0
+
     def log_access_start(
         self, user_machine_name: str, con_codigo: int, con_nome: str, con_tipo: str
     ) -> Optional[int]:
@@ -224,19 +331,7 @@ class LogRepository(BaseRepository):
 
         try:
             with conn.cursor() as cursor:
-                log_id = None
-
-                # Tratamento de IDENTIDADE (SQLServer vs SQLite)
-                if self.db.db_type == "sqlserver":
-                    cursor.execute(query, params)
-                    log_id = cursor.execute(self.db.IDENTITY_QUERY).fetchone()[0]
-                elif self.db.db_type == "sqlite":
-                    cursor.execute(query, params)
-                    log_id = cursor.execute(self.db.IDENTITY_QUERY).fetchone()[0]
-                else:
-                    # Fallback genérico
-                    cursor.execute(query, params)
-                    log_id = cursor.lastrowid
+                log_id = self._insert_returning_id(cursor, query, params)
 
                 conn.commit()
                 self._invalidate_log_caches()
@@ -250,7 +345,18 @@ class LogRepository(BaseRepository):
             return None
 
     def log_access_end(self, log_id: int) -> bool:
-        """Finaliza log de acesso e invalida cache."""
+        """
+        Finaliza log de acesso e invalida cache.
+
+        Com a gravação diferida ativa, o horário de fim é o do momento da
+        chamada (relógio local), mesmo que a entrada seja aplicada depois.
+        """
+        if self.write_behind is not None:
+            self.write_behind.enqueue(
+                "logs.log_access_end", (log_id, datetime.now()), session=f"access:{log_id}"
+            )
+            return True
+
         # Dialeto: GETDATE() -> self.db.NOW
         query = f"UPDATE Log_Acesso_WTS SET Log_DataHora_Fim = {self.db.NOW} WHERE Log_Id = {self.db.PARAM}"
         try:
@@ -271,6 +377,51 @@ class LogRepository(BaseRepository):
             logging.error(f"Erro ao registrar fim do log de acesso ID {log_id}: {e}")
             return False
 
+    # ==================== Gravação Diferida ====================
+
+    def register_write_behind(self, journal):
+        """Registra as operações de log aplicadas pela fila de gravação diferida."""
+        journal.register(
+            "logs.insert_connection_log",
+            self._apply_insert_connection_log,
+            after_commit=self._invalidate_log_caches,
+        )
+        journal.register(
+            "logs.delete_connection_log",
+            self._apply_delete_connection_log,
+            after_commit=self._invalidate_log_caches,
+        )
+        journal.register(
+            "logs.log_access_end", self._apply_log_access_end, after_commit=self._invalidate_log_caches
+        )
+
+    def _apply_insert_connection_log(self, cursor, *params):
+        # Entradas gravadas antes do horário no diário: usa o momento da aplicação
+        connected_at = params[5] if len(params) > 5 else datetime.now()
+        cursor.execute(
+            self.db.queries.sql("logs.insert_connection_log_at", self.INSERT_CONNECTION_LOG_AT),
+            (*params[:5], connected_at, connected_at),
+        )
+
+    def _apply_delete_connection_log(self, cursor, con_codigo: int, username: str):
+        cursor.execute(
+            f"DELETE FROM Usuario_Conexao_WTS WHERE Con_Codigo = {self.db.PARAM} AND Usu_Nome = {self.db.PARAM}",
+            (con_codigo, username),
+        )
+
+    def _apply_log_access_end(self, cursor, log_id: int, ended_at: datetime):
+        cursor.execute(
+            f"UPDATE Log_Acesso_WTS SET Log_DataHora_Fim = {self.db.PARAM} WHERE Log_Id = {self.db.PARAM}",
+            (ended_at, log_id),
+        )
+        if cursor.rowcount == 0:
+            logging.warning(f"Log de acesso ID {log_id} não encontrado ao aplicar o fim (diferido)")
+
+    @staticmethod
+    def _presence_session(con_codigo: int, username: str) -> str:
+        """Chave de sessão da presença (Usuario_Conexao_WTS) na fila diferida."""
+        return f"presence:{con_codigo}:{username}"
+
     # ==================== Métodos de Consulta com Cache ====================
     
     @cached(namespace="logs", ttl=60)
@@ -316,21 +467,35 @@ class LogRepository(BaseRepository):
             logging.error(f"Erro ao buscar conexões ativas do usuário {username}: {e}")
             return []
 
+    # Colunas dos relatórios de acesso; a ordenação (Log_DataHora_Inicio, Log_Id)
+    # DESC é a chave de paginação (coberta por IX_Log_Acesso_DataInicio)
+    ACCESS_LOG_COLUMNS = (
+        "Log_Id, Usu_Nome_Maquina, Con_Codigo, Con_Nome_Acessado, "
+        "Log_DataHora_Inicio, Log_DataHora_Fim, Log_Tipo_Conexao"
+    )
+    ACCESS_LOG_ORDER = "ORDER BY Log_DataHora_Inicio DESC, Log_Id DESC"
+
     @cached(namespace="logs", ttl=300)
+    @replica_read
     def get_access_logs(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Retorna logs de acesso com paginação (cache de 5min)."""
+        """
+        Retorna logs de acesso com paginação por OFFSET (cache de 5min).
+
+        O custo cresce com o offset; para percorrer muitas páginas use
+        ``get_access_logs_page`` (por chave) ou ``iter_access_logs``.
+        """
+        page_clause, page_params = limit_clause(self.db.db_type, self.db.PARAM, limit, offset)
         query = f"""
-            SELECT Log_Id, Usu_Nome_Maquina, Con_Codigo, Con_Nome_Acessado,
-                   Log_DataHora_Inicio, Log_DataHora_Fim, Log_Tipo_Conexao
+            SELECT {self.ACCESS_LOG_COLUMNS}
             FROM Log_Acesso_WTS
-            ORDER BY Log_DataHora_Inicio DESC
-            OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY
+            {self.ACCESS_LOG_ORDER}
+            {page_clause}
         """
         try:
             with self.db.get_cursor() as cursor:
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
-                cursor.execute(query)
+                cursor.execute(query, page_params)
                 columns = [desc[0] for desc in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
         except self.driver_module.Error as e:
@@ -338,25 +503,149 @@ class LogRepository(BaseRepository):
             return []
 
     @cached(namespace="logs", ttl=300)
-    def get_user_access_history(self, user_machine_name: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Retorna histórico de acessos de um usuário (cache de 5min)."""
+    @replica_read
+    def get_access_logs_page(
+        self,
+        limit: int = 100,
+        after: Optional[Tuple[Any, int]] = None,
+        user_machine_name: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """
+        Página de logs de acesso com paginação por chave (seek), mais recentes primeiro.
+
+        Cada página custa o mesmo, qualquer que seja a posição: o banco
+        posiciona no índice pela chave em vez de contar e descartar linhas.
+
+        Args:
+            limit: Máximo de linhas da página
+            after: Chave retornada pela página anterior (None = primeira página)
+            user_machine_name: Filtra pelo usuário (opcional)
+
+        Returns:
+            (linhas, chave da próxima página); a chave é None na última página
+        """
+        where, params = self._access_log_filters(user_machine_name, after)
+        page_clause, page_params = limit_clause(self.db.db_type, self.db.PARAM, limit)
         query = f"""
-            SELECT TOP {limit} Log_Id, Con_Codigo, Con_Nome_Acessado,
-                   Log_DataHora_Inicio, Log_DataHora_Fim, Log_Tipo_Conexao
+            SELECT {self.ACCESS_LOG_COLUMNS}
             FROM Log_Acesso_WTS
-            WHERE Usu_Nome_Maquina = {self.db.PARAM}
-            ORDER BY Log_DataHora_Inicio DESC
+            {where}
+            {self.ACCESS_LOG_ORDER}
+            {page_clause}
         """
         try:
             with self.db.get_cursor() as cursor:
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
-                cursor.execute(query, (user_machine_name,))
+                cursor.execute(query, tuple(params) + page_params)
                 columns = [desc[0] for desc in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
         except self.driver_module.Error as e:
-            logging.error(f"Erro ao buscar histórico do usuário: {e}")
-            return []
+            logging.error(f"Erro ao buscar página de logs de acesso: {e}")
+            return [], None
+
+        next_key = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_key = (last["Log_DataHora_Inicio"], last["Log_Id"])
+        return rows, next_key
+
+    def iter_access_logs(
+        self,
+        batch_size: int = 1000,
+        user_machine_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os logs de acesso (mais recentes primeiro) sem carregar tudo em memória.
+
+        Uma única consulta lida em blocos de ``batch_size`` com ``fetchmany``;
+        indicado para exportações e auditorias sobre toda a tabela. O cursor
+        é fechado ao fim da iteração (ou quando o gerador é descartado).
+
+        Args:
+            batch_size: Linhas lidas do banco por vez
+            user_machine_name: Filtra pelo usuário (opcional)
+            since: Início mínimo (inclusive)
+            until: Início máximo (exclusivo)
+        """
+        where, params = self._access_log_filters(user_machine_name, None, since, until)
+        query = f"""
+            SELECT {self.ACCESS_LOG_COLUMNS}
+            FROM Log_Acesso_WTS
+            {where}
+            {self.ACCESS_LOG_ORDER}
+        """
+        return self._iter_query(query, params, batch_size)
+
+    def export_access_logs(
+        self,
+        after_id: int = 0,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os logs de acesso em ordem crescente de Log_Id, para exportação.
+
+        A ordem pela chave primária (índice clusterizado) permite retomar uma
+        exportação interrompida a partir do último Log_Id gravado.
+
+        Args:
+            after_id: Último Log_Id já exportado (0 = desde o início)
+            since: Início mínimo (inclusive)
+            until: Início máximo (exclusivo)
+            batch_size: Linhas lidas do banco por vez
+        """
+        where, params = self._access_log_filters(None, None, since, until)
+        key_condition = f"Log_Id > {self.db.PARAM}"
+        where = f"{where} AND {key_condition}" if where else f"WHERE {key_condition}"
+        query = f"""
+            SELECT {self.ACCESS_LOG_COLUMNS}
+            FROM Log_Acesso_WTS
+            {where}
+            ORDER BY Log_Id
+        """
+        return self._iter_query(query, params + [after_id], batch_size)
+
+    @cached(namespace="logs", ttl=300)
+    def get_user_access_history(self, user_machine_name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna histórico de acessos de um usuário (cache de 5min)."""
+        rows, _ = self.get_access_logs_page(limit=limit, user_machine_name=user_machine_name)
+        return rows
+
+    def _access_log_filters(
+        self,
+        user_machine_name: Optional[str],
+        after: Optional[Tuple[Any, int]],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Tuple[str, List[Any]]:
+        """Monta o WHERE (filtros + posição da chave) das consultas de logs de acesso."""
+        conditions: List[str] = []
+        params: List[Any] = []
+
+        if user_machine_name is not None:
+            conditions.append(f"Usu_Nome_Maquina = {self.db.PARAM}")
+            params.append(user_machine_name)
+        if since is not None:
+            conditions.append(f"Log_DataHora_Inicio >= {self.db.PARAM}")
+            params.append(since)
+        if until is not None:
+            conditions.append(f"Log_DataHora_Inicio < {self.db.PARAM}")
+            params.append(until)
+        if after is not None:
+            # Linhas "depois" da chave na ordem DESC
+            started_at, log_id = after
+            conditions.append(
+                f"(Log_DataHora_Inicio < {self.db.PARAM} "
+                f"OR (Log_DataHora_Inicio = {self.db.PARAM} AND Log_Id < {self.db.PARAM}))"
+            )
+            params.extend([started_at, started_at, log_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
 
     def _invalidate_log_caches(self):
         """Invalida todos os caches relacionados a logs."""
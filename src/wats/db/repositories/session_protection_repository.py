@@ -3,10 +3,18 @@
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from src.wats.db.exceptions import DatabaseConnectionError
+from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.read_replica import replica_read
 from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.sql_dialect import (
+    is_today,
+    minutes_until,
+    now_minus,
+    table_exists_query,
+    top_clause,
+)
 from src.wats.util_cache.cache import cached, invalidate_cache
 
 
@@ -20,6 +28,21 @@ class SessionProtectionRepository(BaseRepository):
         """Gera hash SHA-256 da senha."""
         return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
+    def _table_exists(self, cursor, table_name: str) -> bool:
+        """Verifica se a tabela existe (sys.tables / sqlite_master)."""
+        cursor.execute(table_exists_query(self.db.db_type, self.db.PARAM), (table_name,))
+        return cursor.fetchone()[0] > 0
+
+    def _procedure_exists(self, cursor, procedure_name: str) -> bool:
+        """Verifica se a stored procedure existe (o SQLite não tem procedures)."""
+        if self.db.db_type == "sqlite":
+            return False
+        cursor.execute(
+            f"SELECT COUNT(*) FROM sys.objects WHERE type = 'P' AND name = {self.db.PARAM}",
+            (procedure_name,),
+        )
+        return cursor.fetchone()[0] > 0
+
     def _create_protection_direct(
         self,
         cursor,
@@ -44,16 +67,10 @@ class SessionProtectionRepository(BaseRepository):
             )
 
             # Verifica se a tabela existe
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM sys.tables
-                WHERE name = 'Sessao_Protecao_WTS'
-            """
-            )
-            table_exists = cursor.fetchone()[0]
-            logging.info(f"[DB_PROTECTION] Verificação da tabela: existe={table_exists > 0}")
+            table_exists = self._table_exists(cursor, "Sessao_Protecao_WTS")
+            logging.info(f"[DB_PROTECTION] Verificação da tabela: existe={table_exists}")
 
-            if table_exists == 0:
+            if not table_exists:
                 logging.warning(
                     "[DB_PROTECTION] Tabela Sessao_Protecao_WTS não encontrada - criando..."
                 )
@@ -67,29 +84,32 @@ class SessionProtectionRepository(BaseRepository):
 
             # Insere diretamente na tabela
             logging.info("[DB_PROTECTION] Executando INSERT na tabela Sessao_Protecao_WTS...")
-            cursor.execute(
-                """
+            insert_query = f"""
                 INSERT INTO Sessao_Protecao_WTS (
                     Con_Codigo, Usu_Nome_Protetor, Usu_Maquina_Protetor,
                     Prot_Senha_Hash, Prot_Data_Criacao, Prot_Data_Expiracao,
                     Prot_Duracao_Minutos, Prot_Observacoes, Prot_IP_Criador,
                     Prot_Status
-                ) VALUES (?, ?, ?, ?, GETDATE(), ?, ?, ?, ?, 'ATIVA');
-                SELECT SCOPE_IDENTITY() AS ProtectionId;
-            """,
-                (
-                    con_codigo,
-                    user_name,
-                    machine_name,
-                    password_hash,
-                    expiry_time,
-                    duration_minutes,
-                    notes,
-                    ip_address,
-                ),
+                ) VALUES (?, ?, ?, ?, {self.db.NOW}, ?, ?, ?, ?, 'ATIVA');
+            """
+            params = (
+                con_codigo,
+                user_name,
+                machine_name,
+                password_hash,
+                expiry_time,
+                duration_minutes,
+                notes,
+                ip_address,
             )
 
-            result = cursor.fetchone()
+            if self.db.db_type == "sqlite":
+                # O SQLite executa um comando por chamada: o ID vem do cursor
+                cursor.execute(insert_query, params)
+                result = (cursor.lastrowid,)
+            else:
+                cursor.execute(insert_query + "SELECT SCOPE_IDENTITY() AS ProtectionId;", params)
+                result = cursor.fetchone()
             if result and result[0]:
                 protection_id = int(result[0])
                 logging.info("[DB_PROTECTION] ✅ Proteção criada com sucesso!")
@@ -127,18 +147,14 @@ class SessionProtectionRepository(BaseRepository):
             logging.info("[DB_PROTECTION] 🔨 Iniciando criação da tabela Sessao_Protecao_WTS...")
 
             # Verifica novamente se a tabela não existe
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM sys.tables
-                WHERE name = 'Sessao_Protecao_WTS'
-            """
-            )
-            table_exists = cursor.fetchone()[0]
-
-            if table_exists > 0:
+            if self._table_exists(cursor, "Sessao_Protecao_WTS"):
                 logging.warning("[DB_PROTECTION] ⚠️ Tabela já existe, pulando criação")
                 return
 
+            if self.db.db_type == "sqlite":
+                self._create_protection_table_sqlite(cursor)
+                return
+
             logging.info("[DB_PROTECTION] Executando DDL para criar tabela...")
             cursor.execute(
                 """
@@ -172,15 +188,7 @@ class SessionProtectionRepository(BaseRepository):
             logging.info("[DB_PROTECTION] ✅ Índices criados com sucesso")
 
             # Verifica se a tabela foi criada corretamente
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM sys.tables
-                WHERE name = 'Sessao_Protecao_WTS'
-            """
-            )
-            final_check = cursor.fetchone()[0]
-
-            if final_check > 0:
+            if self._table_exists(cursor, "Sessao_Protecao_WTS"):
                 logging.info(
                     "[DB_PROTECTION] ✅ Verificação final: Tabela Sessao_Protecao_WTS criada e verificada"
                 )
@@ -206,6 +214,36 @@ class SessionProtectionRepository(BaseRepository):
             logging.error(f"[DB_PROTECTION] Tipo do erro: {type(e).__name__}")
             raise
 
+    def _create_protection_table_sqlite(self, cursor):
+        """Cria a tabela de proteção no SQLite (mesmas colunas do SQL Server)."""
+        logging.info("[DB_PROTECTION] Executando DDL (SQLite)...")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS Sessao_Protecao_WTS (
+                Prot_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Con_Codigo INTEGER NOT NULL,
+                Usu_Nome_Protetor TEXT NOT NULL,
+                Usu_Maquina_Protetor TEXT NULL,
+                Prot_Senha_Hash TEXT NOT NULL,
+                Prot_Data_Criacao TIMESTAMP NOT NULL,
+                Prot_Data_Expiracao TIMESTAMP NOT NULL,
+                Prot_Data_Remocao TIMESTAMP NULL,
+                Prot_Duracao_Minutos INTEGER NOT NULL,
+                Prot_Observacoes TEXT NULL,
+                Prot_IP_Criador TEXT NULL,
+                Prot_Status TEXT NOT NULL DEFAULT 'ATIVA',
+                Prot_Removida_Por TEXT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS IX_Sessao_Protecao_Con_Status
+                ON Sessao_Protecao_WTS (Con_Codigo, Prot_Status, Prot_Data_Expiracao)
+        """
+        )
+        logging.info("[DB_PROTECTION] ✅ Tabela Sessao_Protecao_WTS criada (SQLite)")
+
     def _validate_password_direct(
         self, cursor, con_codigo, password_hash, requesting_user, requesting_machine, ip_address
     ):
@@ -218,15 +256,17 @@ class SessionProtectionRepository(BaseRepository):
 
             # Busca proteção ativa para a conexão
             logging.info(f"[DB_PROTECTION] Buscando proteção ativa para conexão {con_codigo}...")
+            top, limit = top_clause(self.db.db_type, 1)
             cursor.execute(
-                """
-                SELECT TOP 1 Prot_Id, Usu_Nome_Protetor, Prot_Senha_Hash,
+                f"""
+                SELECT {top} Prot_Id, Usu_Nome_Protetor, Prot_Senha_Hash,
                        Prot_Data_Criacao, Prot_Data_Expiracao, Prot_Status
                 FROM Sessao_Protecao_WTS
                 WHERE Con_Codigo = ?
                   AND Prot_Status = 'ATIVA'
-                  AND Prot_Data_Expiracao > GETDATE()
+                  AND Prot_Data_Expiracao > {self.db.NOW}
                 ORDER BY Prot_Data_Criacao DESC
+                {limit}
             """,
                 (con_codigo,),
             )
@@ -239,10 +279,10 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Busca estatísticas para diagnóstico
                 cursor.execute(
-                    """
+                    f"""
                     SELECT COUNT(*) as total,
                            COUNT(CASE WHEN Prot_Status = 'ATIVA' THEN 1 END) as ativas,
-                           COUNT(CASE WHEN Prot_Data_Expiracao > GETDATE() THEN 1 END) as nao_expiradas
+                           COUNT(CASE WHEN Prot_Data_Expiracao > {self.db.NOW} THEN 1 END) as nao_expiradas
                     FROM Sessao_Protecao_WTS
                     WHERE Con_Codigo = ?
                 """,
@@ -289,7 +329,7 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Registra tentativa bem-sucedida
                 logging.info("[DB_PROTECTION] Registrando tentativa bem-sucedida...")
-                self._log_access_attempt(
+                self._record_access_attempt(
                     cursor,
                     prot_id,
                     con_codigo,
@@ -316,7 +356,7 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Registra tentativa malsucedida
                 logging.warning("[DB_PROTECTION] Registrando tentativa malsucedida...")
-                self._log_access_attempt(
+                self._record_access_attempt(
                     cursor,
                     prot_id,
                     con_codigo,
@@ -353,6 +393,24 @@ class SessionProtectionRepository(BaseRepository):
                 "message": f"Erro na validação: {e}",
             }
 
+    def _record_access_attempt(self, cursor, *attempt) -> bool:
+        """
+        Registra a tentativa de acesso: na fila de gravação diferida, se ativa,
+        ou no cursor da validação.
+        """
+        if self.write_behind is not None:
+            self.write_behind.enqueue("protection.log_access_attempt", attempt)
+            return True
+        return self._log_access_attempt(cursor, *attempt)
+
+    def register_write_behind(self, journal):
+        """Registra o log de tentativas na fila de gravação diferida."""
+        journal.register("protection.log_access_attempt", self._apply_access_attempt)
+
+    def _apply_access_attempt(self, cursor, *attempt):
+        if not self._log_access_attempt(cursor, *attempt):
+            raise DatabaseQueryError("Falha ao registrar tentativa de acesso.")
+
     def _log_access_attempt(
         self,
         cursor,
@@ -395,30 +453,31 @@ class SessionProtectionRepository(BaseRepository):
                 logging.info("[DB_PROTECTION] Usando fallback - INSERT direto...")
 
                 # Verifica se a tabela de log existe
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM sys.tables
-                    WHERE name = 'Log_Tentativa_Protecao_WTS'
-                """
-                )
-                log_table_exists = cursor.fetchone()[0]
-                logging.info(f"[DB_PROTECTION] Tabela de log existe: {log_table_exists > 0}")
+                log_table_exists = self._table_exists(cursor, "Log_Tentativa_Protecao_WTS")
+                logging.info(f"[DB_PROTECTION] Tabela de log existe: {log_table_exists}")
 
-                # Cria tabela se não existir
-                if log_table_exists == 0:
+                # Cria tabela se não existir (colunas de scripts/create_wats_database.sql)
+                if not log_table_exists:
                     logging.info("[DB_PROTECTION] Criando tabela Log_Tentativa_Protecao_WTS...")
+                    if self.db.db_type == "sqlite":
+                        id_column = "LTent_Id INTEGER PRIMARY KEY AUTOINCREMENT"
+                        text_type, date_type = "TEXT", f"TIMESTAMP DEFAULT ({self.db.NOW})"
+                    else:
+                        id_column = "LTent_Id INT IDENTITY(1,1) PRIMARY KEY"
+                        text_type, date_type = "NVARCHAR(500)", "DATETIME2(3) DEFAULT GETDATE()"
                     cursor.execute(
-                        """
+                        f"""
                         CREATE TABLE Log_Tentativa_Protecao_WTS (
-                            LTent_Id INT IDENTITY(1,1) PRIMARY KEY,
+                            {id_column},
                             Prot_Id INT NOT NULL,
                             Con_Codigo INT NOT NULL,
-                            LTent_Usuario NVARCHAR(100) NOT NULL,
-                            LTent_Maquina NVARCHAR(100),
-                            LTent_IP NVARCHAR(50),
-                            LTent_Sucesso BIT NOT NULL,
-                            LTent_Data DATETIME2 DEFAULT GETDATE(),
-                            LTent_Resultado NVARCHAR(50)
+                            Usu_Nome_Solicitante {text_type} NOT NULL,
+                            Usu_Maquina_Solicitante {text_type} NULL,
+                            LTent_Senha_Tentativa {text_type} NULL,
+                            LTent_Resultado {text_type} NOT NULL,
+                            LTent_Data_Hora {date_type},
+                            LTent_IP_Solicitante {text_type} NULL,
+                            LTent_Observacoes {text_type} NULL
                         )
                     """
                     )
@@ -427,12 +486,13 @@ class SessionProtectionRepository(BaseRepository):
                 # Insere registro de log
                 logging.info("[DB_PROTECTION] Inserindo registro na tabela de log...")
                 cursor.execute(
-                    """
+                    f"""
                     INSERT INTO Log_Tentativa_Protecao_WTS
-                    (Prot_Id, Con_Codigo, LTent_Usuario, LTent_Maquina, LTent_IP, LTent_Sucesso, LTent_Resultado)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (Prot_Id, Con_Codigo, Usu_Nome_Solicitante, Usu_Maquina_Solicitante,
+                     LTent_IP_Solicitante, LTent_Resultado, LTent_Data_Hora)
+                    VALUES (?, ?, ?, ?, ?, ?, {self.db.NOW})
                 """,
-                    (prot_id, con_codigo, user, machine_name, ip_address, success, result),
+                    (prot_id, con_codigo, user, machine_name, ip_address, result),
                 )
 
                 logging.info("[DB_PROTECTION] ✅ Tentativa de acesso registrada via INSERT direto")
@@ -493,16 +553,10 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Verifica se a stored procedure existe
                 logging.info("[DB_PROTECTION] Verificando existência da stored procedure...")
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM sys.objects
-                    WHERE type = 'P' AND name = 'sp_Criar_Protecao_Sessao'
-                """
-                )
-                sp_exists = cursor.fetchone()[0]
-                logging.info(f"[DB_PROTECTION] SP sp_Criar_Protecao_Sessao existe: {sp_exists > 0}")
+                sp_exists = self._procedure_exists(cursor, "sp_Criar_Protecao_Sessao")
+                logging.info(f"[DB_PROTECTION] SP sp_Criar_Protecao_Sessao existe: {sp_exists}")
 
-                if sp_exists == 0:
+                if not sp_exists:
                     logging.warning(
                         "[DB_PROTECTION] ⚠️ Stored procedure não encontrada - usando método direto"
                     )
@@ -661,18 +715,12 @@ class SessionProtectionRepository(BaseRepository):
                 logging.info(
                     "[DB_PROTECTION] Verificando existência da stored procedure sp_Validar_Protecao_Sessao..."
                 )
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM sys.objects
-                    WHERE type = 'P' AND name = 'sp_Validar_Protecao_Sessao'
-                """
-                )
-                sp_exists = cursor.fetchone()[0]
+                sp_exists = self._procedure_exists(cursor, "sp_Validar_Protecao_Sessao")
                 logging.info(
-                    f"[DB_PROTECTION] SP sp_Validar_Protecao_Sessao existe: {sp_exists > 0}"
+                    f"[DB_PROTECTION] SP sp_Validar_Protecao_Sessao existe: {sp_exists}"
                 )
 
-                if sp_exists == 0:
+                if not sp_exists:
                     logging.warning(
                         "[DB_PROTECTION] ⚠️ SP de validação não encontrada - usando validação direta"
                     )
@@ -867,12 +915,12 @@ class SessionProtectionRepository(BaseRepository):
                     f"[DB_PROTECTION] Verificando proteção ativa para conexão {con_codigo}..."
                 )
                 cursor.execute(
-                    """
+                    f"""
                     SELECT Prot_Id, Usu_Nome_Protetor, Prot_Data_Criacao, Prot_Data_Expiracao
                     FROM Sessao_Protecao_WTS
                     WHERE Con_Codigo = ?
                       AND Prot_Status = 'ATIVA'
-                      AND Prot_Data_Expiracao > GETDATE()
+                      AND Prot_Data_Expiracao > {self.db.NOW}
                 """,
                     (con_codigo,),
                 )
@@ -896,18 +944,12 @@ class SessionProtectionRepository(BaseRepository):
                 logging.info(
                     "[DB_PROTECTION] Verificando stored procedure sp_Remover_Protecao_Sessao..."
                 )
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM sys.objects
-                    WHERE type = 'P' AND name = 'sp_Remover_Protecao_Sessao'
-                """
-                )
-                sp_exists = cursor.fetchone()[0]
+                sp_exists = self._procedure_exists(cursor, "sp_Remover_Protecao_Sessao")
                 logging.info(
-                    f"[DB_PROTECTION] SP sp_Remover_Protecao_Sessao existe: {sp_exists > 0}"
+                    f"[DB_PROTECTION] SP sp_Remover_Protecao_Sessao existe: {sp_exists}"
                 )
 
-                if sp_exists > 0:
+                if sp_exists:
                     # Chama stored procedure para remover
                     logging.info(
                         "[DB_PROTECTION] Executando stored procedure sp_Remover_Protecao_Sessao..."
@@ -949,14 +991,14 @@ class SessionProtectionRepository(BaseRepository):
                     logging.info("[DB_PROTECTION] Executando UPDATE direto na tabela...")
 
                     cursor.execute(
-                        """
+                        f"""
                         UPDATE Sessao_Protecao_WTS
                         SET Prot_Status = 'REMOVIDA',
-                            Prot_Data_Remocao = GETDATE(),
-                            Usu_Nome_Removedor = ?
+                            Prot_Data_Remocao = {self.db.NOW},
+                            Prot_Removida_Por = ?
                         WHERE Con_Codigo = ?
                           AND Prot_Status = 'ATIVA'
-                          AND Prot_Data_Expiracao > GETDATE()
+                          AND Prot_Data_Expiracao > {self.db.NOW}
                     """,
                         (removing_user, con_codigo),
                     )
@@ -1014,13 +1056,13 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Primeiro busca todas as proteções ativas do usuário
                 cursor.execute(
-                    """
+                    f"""
                     SELECT sp.Prot_Id, sp.Con_Codigo, c.Con_Nome
-                    FROM [dbo].[Sessao_Protecao_WTS] sp
-                    LEFT JOIN [dbo].[Conexao_WTS] c ON sp.Con_Codigo = c.Con_Codigo
+                    FROM [Sessao_Protecao_WTS] sp
+                    LEFT JOIN [Conexao_WTS] c ON sp.Con_Codigo = c.Con_Codigo
                     WHERE sp.Usu_Nome_Protetor = ?
                       AND sp.Prot_Status = 'ATIVA'
-                      AND sp.Prot_Data_Expiracao > GETDATE()
+                      AND sp.Prot_Data_Expiracao > {self.db.NOW}
                 """,
                     (user_name,),
                 )
@@ -1047,10 +1089,10 @@ class SessionProtectionRepository(BaseRepository):
 
                         # Remove a proteção
                         cursor.execute(
-                            """
-                            UPDATE [dbo].[Sessao_Protecao_WTS]
+                            f"""
+                            UPDATE [Sessao_Protecao_WTS]
                             SET [Prot_Status] = 'REMOVIDA',
-                                [Prot_Data_Remocao] = GETDATE(),
+                                [Prot_Data_Remocao] = {self.db.NOW},
                                 [Prot_Removida_Por] = ?
                             WHERE Prot_Id = ?
                         """,
@@ -1060,7 +1102,7 @@ class SessionProtectionRepository(BaseRepository):
                         # Log da remoção
                         cursor.execute(
                             """
-                            INSERT INTO [dbo].[Log_Tentativa_Protecao_WTS] (
+                            INSERT INTO [Log_Tentativa_Protecao_WTS] (
                                 [Prot_Id], [Con_Codigo], [Usu_Nome_Solicitante],
                                 [LTent_Resultado], [LTent_Observacoes]
                             ) VALUES (?, ?, ?, 'CANCELADA', 'Proteção removida automaticamente no logout')
@@ -1116,8 +1158,9 @@ class SessionProtectionRepository(BaseRepository):
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
 
-                query = """
-                    SELECT TOP 1
+                top, limit = top_clause(self.db.db_type, 1)
+                query = f"""
+                    SELECT {top}
                         sp.Prot_Id,
                         sp.Usu_Nome_Protetor,
                         sp.Usu_Maquina_Protetor,
@@ -1125,14 +1168,15 @@ class SessionProtectionRepository(BaseRepository):
                         sp.Prot_Data_Expiracao,
                         sp.Prot_Observacoes,
                         sp.Prot_Duracao_Minutos,
-                        DATEDIFF(MINUTE, GETDATE(), sp.Prot_Data_Expiracao) AS MinutosRestantes,
+                        {minutes_until(self.db.db_type, 'sp.Prot_Data_Expiracao')} AS MinutosRestantes,
                         c.Con_Nome
                     FROM Sessao_Protecao_WTS sp
                     INNER JOIN Conexao_WTS c ON sp.Con_Codigo = c.Con_Codigo
                     WHERE sp.Con_Codigo = ?
                       AND sp.Prot_Status = 'ATIVA'
-                      AND sp.Prot_Data_Expiracao > GETDATE()
+                      AND sp.Prot_Data_Expiracao > {self.db.NOW}
                     ORDER BY sp.Prot_Data_Criacao DESC
+                    {limit}
                 """
 
                 cursor.execute(query, (con_codigo,))
@@ -1179,12 +1223,12 @@ class SessionProtectionRepository(BaseRepository):
                         sp.Prot_Data_Criacao,
                         sp.Prot_Data_Expiracao,
                         sp.Prot_Observacoes,
-                        DATEDIFF(MINUTE, GETDATE(), sp.Prot_Data_Expiracao) AS MinutosRestantes
+                        {minutes_until(self.db.db_type, 'sp.Prot_Data_Expiracao')} AS MinutosRestantes
                     FROM Sessao_Protecao_WTS sp
                     INNER JOIN Conexao_WTS c ON sp.Con_Codigo = c.Con_Codigo
                     WHERE sp.Usu_Nome_Protetor = {self.db.PARAM}
                       AND sp.Prot_Status = 'ATIVA'
-                      AND sp.Prot_Data_Expiracao > GETDATE()
+                      AND sp.Prot_Data_Expiracao > {self.db.NOW}
                     ORDER BY sp.Prot_Data_Criacao DESC
                 """
 
@@ -1222,17 +1266,28 @@ class SessionProtectionRepository(BaseRepository):
                 if not cursor:
                     raise DatabaseConnectionError("Falha ao obter cursor.")
 
-                cursor.execute("EXEC sp_Limpar_Protecoes_Expiradas")
+                if self.db.db_type == "sqlite":
+                    # Mesmo UPDATE de sp_Limpar_Protecoes_Expiradas
+                    cursor.execute(
+                        f"""
+                        UPDATE Sessao_Protecao_WTS
+                        SET Prot_Status = 'EXPIRADA'
+                        WHERE Prot_Status = 'ATIVA'
+                          AND Prot_Data_Expiracao < {self.db.NOW}
+                    """
+                    )
+                else:
+                    cursor.execute("EXEC sp_Limpar_Protecoes_Expiradas")
 
                 # Procedure retorna número de registros atualizados
                 # Como é um EXEC, não conseguimos pegar o RETURN value facilmente
                 # então contamos manualmente
                 cursor.execute(
-                    """
+                    f"""
                     SELECT COUNT(*) FROM Sessao_Protecao_WTS
                     WHERE Prot_Status = 'EXPIRADA'
-                      AND Prot_Data_Expiracao < GETDATE()
-                      AND Prot_Data_Expiracao > DATEADD(MINUTE, -5, GETDATE())
+                      AND Prot_Data_Expiracao < {self.db.NOW}
+                      AND Prot_Data_Expiracao > {now_minus(self.db.db_type, 5)}
                 """
                 )
 
@@ -1252,6 +1307,7 @@ class SessionProtectionRepository(BaseRepository):
             return 0
 
     @cached(namespace="session_protection", ttl=60)
+    @replica_read
     def get_protection_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas do sistema de proteção (cache 60s)."""
         try:
@@ -1261,22 +1317,22 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Proteções ativas
                 cursor.execute(
-                    """
+                    f"""
                     SELECT COUNT(*) FROM Sessao_Protecao_WTS
-                    WHERE Prot_Status = 'ATIVA' AND Prot_Data_Expiracao > GETDATE()
+                    WHERE Prot_Status = 'ATIVA' AND Prot_Data_Expiracao > {self.db.NOW}
                 """
                 )
                 active_protections = cursor.fetchone()[0]
 
                 # Tentativas de hoje
                 cursor.execute(
-                    """
+                    f"""
                     SELECT
                         COUNT(*) as Total,
                         SUM(CASE WHEN LTent_Resultado = 'SUCESSO' THEN 1 ELSE 0 END) as Sucessos,
                         SUM(CASE WHEN LTent_Resultado = 'SENHA_INCORRETA' THEN 1 ELSE 0 END) as Falhas
                     FROM Log_Tentativa_Protecao_WTS
-                    WHERE CAST(LTent_Data_Hora AS DATE) = CAST(GETDATE() AS DATE)
+                    WHERE {is_today(self.db.db_type, 'LTent_Data_Hora')}
                 """
                 )
 
@@ -1313,17 +1369,16 @@ class SessionProtectionRepository(BaseRepository):
 
                 # Busca proteções ativas cujos criadores não estão mais conectados
                 cursor.execute(
-                    """
-                    UPDATE sp
-                    SET [Prot_Status] = 'REMOVIDA',
-                        [Prot_Data_Remocao] = GETDATE(),
-                        [Prot_Removida_Por] = 'SISTEMA_LIMPEZA_AUTOMATICA'
-                    FROM [dbo].[Sessao_Protecao_WTS] sp
-                    WHERE sp.Prot_Status = 'ATIVA'
+                    f"""
+                    UPDATE Sessao_Protecao_WTS
+                    SET Prot_Status = 'REMOVIDA',
+                        Prot_Data_Remocao = {self.db.NOW},
+                        Prot_Removida_Por = 'SISTEMA_LIMPEZA_AUTOMATICA'
+                    WHERE Prot_Status = 'ATIVA'
                       AND NOT EXISTS (
-                          SELECT 1 FROM [dbo].[Usuario_Conexao_WTS] uc
-                          WHERE uc.Con_Codigo = sp.Con_Codigo
-                            AND uc.Usu_Nome = sp.Usu_Nome_Protetor
+                          SELECT 1 FROM Usuario_Conexao_WTS uc
+                          WHERE uc.Con_Codigo = Sessao_Protecao_WTS.Con_Codigo
+                            AND uc.Usu_Nome = Sessao_Protecao_WTS.Usu_Nome_Protetor
                       )
                 """
                 )
@@ -1334,8 +1389,8 @@ class SessionProtectionRepository(BaseRepository):
                 # Log das proteções removidas
                 if count_removed > 0:
                     cursor.execute(
-                        """
-                        INSERT INTO [dbo].[Log_Tentativa_Protecao_WTS] (
+                        f"""
+                        INSERT INTO [Log_Tentativa_Protecao_WTS] (
                             [Prot_Id], [Con_Codigo], [Usu_Nome_Solicitante],
                             [LTent_Resultado], [LTent_Observacoes]
                         )
@@ -1345,10 +1400,10 @@ class SessionProtectionRepository(BaseRepository):
                             'SISTEMA_LIMPEZA',
                             'CANCELADA',
                             'Proteção órfã removida - usuário não está mais conectado'
-                        FROM [dbo].[Sessao_Protecao_WTS] sp
+                        FROM [Sessao_Protecao_WTS] sp
                         WHERE sp.Prot_Status = 'REMOVIDA'
                           AND sp.Prot_Removida_Por = 'SISTEMA_LIMPEZA_AUTOMATICA'
-                          AND sp.Prot_Data_Remocao >= DATEADD(MINUTE, -1, GETDATE())
+                          AND sp.Prot_Data_Remocao >= {now_minus(self.db.db_type, 1)}
                     """
                     )
 
@@ -1366,6 +1421,43 @@ class SessionProtectionRepository(BaseRepository):
             logging.error(f"Erro inesperada na limpeza: {e}")
             return False, f"Erro inesperado: {e}", 0
 
+    def export_access_attempts(
+        self,
+        after_id: int = 0,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as tentativas de acesso a sessões protegidas, para exportação de auditoria.
+
+        Ordem crescente de LTent_Id (chave primária), o que permite retomar a
+        partir do último registro exportado. O hash da senha tentada não é exportado.
+
+        Args:
+            after_id: Último LTent_Id já exportado (0 = desde o início)
+            since: Data/hora mínima da tentativa (inclusive)
+            until: Data/hora máxima da tentativa (exclusiva)
+            batch_size: Linhas lidas do banco por vez
+        """
+        conditions = [f"LTent_Id > {self.db.PARAM}"]
+        params: List[Any] = [after_id]
+        if since is not None:
+            conditions.append(f"LTent_Data_Hora >= {self.db.PARAM}")
+            params.append(since)
+        if until is not None:
+            conditions.append(f"LTent_Data_Hora < {self.db.PARAM}")
+            params.append(until)
+
+        query = f"""
+            SELECT LTent_Id, Prot_Id, Con_Codigo, Usu_Nome_Solicitante, Usu_Maquina_Solicitante,
+                   LTent_Resultado, LTent_Data_Hora, LTent_IP_Solicitante, LTent_Observacoes
+            FROM Log_Tentativa_Protecao_WTS
+            WHERE {' AND '.join(conditions)}
+            ORDER BY LTent_Id
+        """
+        return self._iter_query(query, params, batch_size)
+
     def _invalidate_protection_caches(self):
         """Invalida todos os caches relacionados a proteções de sessão."""
         invalidate_cache(namespace="session_protection")
@@ -3,7 +3,11 @@ import logging
 from typing import Any, Dict, List, Optional, Tuple
 
 from src.wats.db.exceptions import DatabaseConnectionError, DatabaseQueryError
+from src.wats.db.read_replica import replica_read
 from src.wats.db.repositories.base_repository import BaseRepository
+from src.wats.db.repositories.effective_permission_repository import (
+    EffectivePermissionRepository,
+)
 from src.wats.performance import cache_users, invalidate_user_caches
 
 
@@ -12,26 +16,29 @@ class UserRepository(BaseRepository):
 
     def __init__(self, db_manager):
         super().__init__(db_manager)
+        self.effective_perm_repo = EffectivePermissionRepository(db_manager)
 
-    @cache_users(ttl=300)
+    @cache_users()
     def get_user_role(self, username: str) -> Tuple[Optional[int], bool]:
-        # --- CORREÇÃO: "1" foi trocado por um parâmetro {self.db.PARAM} ---
-        query = f"SELECT Usu_Id, Usu_Is_Admin FROM Usuario_Sistema_WTS WHERE Usu_Nome = {self.db.PARAM} AND Usu_Ativo = {self.db.PARAM}"
-
-        cursor = self.db.get_cursor()
-        if not cursor:
-            return None, False
+        # --- CORREÇÃO: "1" foi trocado por um parâmetro {PARAM} ---
+        # Consulta nomeada: renderizada uma vez e preparada por conexão do pool
+        query = (
+            "SELECT Usu_Id, Usu_Is_Admin FROM Usuario_Sistema_WTS "
+            "WHERE Usu_Nome = {PARAM} AND Usu_Ativo = {PARAM}"
+        )
 
         try:
-            with cursor:
-                # --- CORREÇÃO: Passamos True como o segundo parâmetro ---
-                cursor.execute(query, (username, True))
-                result = cursor.fetchone()
-                if result:
-                    # --- CORREÇÃO: Usamos bool() para ser seguro ---
-                    # bool(1) -> True (SQL Server)
-                    # bool(True) -> True (SQL Server/SQLite)
-                    return result[0], bool(result[1])
+            # --- CORREÇÃO: Passamos True como o segundo parâmetro ---
+            result = self.db.execute_query(
+                "users.get_user_role", query, (username, True), fetch="one"
+            )
+            if result:
+                # --- CORREÇÃO: Usamos bool() para ser seguro ---
+                # bool(1) -> True (SQL Server)
+                # bool(True) -> True (SQL Server/SQLite)
+                return result[0], bool(result[1])
+        except DatabaseConnectionError:
+            return None, False
         except self.driver_module.Error as e:
             # O erro que você viu será logado aqui
             logging.error(f"Erro ao buscar permissão do usuário {username}: {e}")
@@ -55,7 +62,8 @@ class UserRepository(BaseRepository):
             logging.error(f"Erro ao buscar senha admin: {e}")
         return None
 
-    @cache_users(ttl=300)
+    @cache_users()
+    @replica_read
     def admin_get_all_users(self) -> List[Tuple]:
         # Código original do banco de dados
         query = "SELECT Usu_Id, Usu_Nome, Usu_Ativo, Usu_Is_Admin FROM Usuario_Sistema_WTS ORDER BY Usu_Nome"
@@ -122,18 +130,7 @@ class UserRepository(BaseRepository):
 
         try:
             with conn.cursor() as cursor:
-                new_user_id = None
-
-                if self.db.db_type == "sqlserver":
-                    cursor.execute(q_create, params_create)
-                    new_user_id = cursor.execute(self.db.IDENTITY_QUERY).fetchone()[0]
-                elif self.db.db_type == "sqlite":
-                    cursor.execute(q_create, params_create)
-                    new_user_id = cursor.execute(self.db.IDENTITY_QUERY).fetchone()[0]
-                else:
-                    # Fallback genérico
-                    cursor.execute(q_create, params_create)
-                    new_user_id = cursor.lastrowid
+                new_user_id = self._insert_returning_id(cursor, q_create, params_create)
 
                 if new_user_id and group_ids:
                     q_groups = f"INSERT INTO Permissao_Grupo_WTS (Usu_Id, Gru_Codigo) VALUES ({self.db.PARAM}, {self.db.PARAM})"
@@ -144,6 +141,9 @@ class UserRepository(BaseRepository):
                     cursor.executemany(q_groups, params_groups)
                     # --- FIM DA CORREÇÃO ---
 
+                if new_user_id:
+                    self.effective_perm_repo.refresh_user(new_user_id, cursor)
+
                 conn.commit()
                 invalidate_user_caches()
                 return True, "Usuário criado."
@@ -188,6 +188,8 @@ class UserRepository(BaseRepository):
                     cursor.executemany(q_insert, params_groups)
                     # --- FIM DA CORREÇÃO ---
 
+                self.effective_perm_repo.refresh_user(user_id, cursor)
+
                 conn.commit()
                 invalidate_user_caches()
                 return True, "Usuário atualizado."
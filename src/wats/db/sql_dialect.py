@@ -0,0 +1,149 @@
+# WATS_Project/wats_app/db/sql_dialect.py
+"""
+Trechos de SQL que variam entre os bancos suportados.
+
+Os repositórios montam as queries com as propriedades de dialeto do
+DatabaseManager (PARAM, ISNULL, NOW); aqui ficam as construções que não
+cabem em uma simples substituição de função.
+"""
+
+from typing import Tuple
+
+# Modos de agregação de strings (ver DatabaseManager.get_string_agg_mode)
+STRING_AGG = "string_agg"  # SQL Server 2017+
+FOR_XML = "for_xml"  # SQL Server 2016 e anteriores
+GROUP_CONCAT = "group_concat"  # SQLite
+
+STRING_AGG_MODES = (STRING_AGG, FOR_XML, GROUP_CONCAT)
+
+
+def limit_clause(db_type: str, param: str, limit: int, offset: int = 0) -> Tuple[str, Tuple]:
+    """
+    Cláusula para limitar o resultado, com os valores como parâmetros.
+
+    Vai no fim da query, após o ORDER BY (obrigatório no SQL Server).
+
+    Args:
+        db_type: "sqlserver" ou "sqlite"
+        param: Placeholder do driver (DatabaseManager.PARAM)
+        limit: Máximo de linhas
+        offset: Linhas a pular (prefira paginação por chave em tabelas grandes)
+
+    Returns:
+        (cláusula, parâmetros na ordem da cláusula)
+    """
+    if db_type == "sqlite":
+        return f"LIMIT {param} OFFSET {param}", (int(limit), int(offset))
+    return f"OFFSET {param} ROWS FETCH NEXT {param} ROWS ONLY", (int(offset), int(limit))
+
+
+def string_agg_subquery(
+    mode: str,
+    table: str,
+    group_column: str,
+    value_column: str,
+    alias: str,
+    separator: str = "|",
+) -> str:
+    """
+    Monta uma subquery ``(group_column, alias)`` com os valores concatenados por grupo.
+
+    Os valores são ordenados dentro de cada grupo em todos os modos.
+
+    Args:
+        mode: STRING_AGG, FOR_XML ou GROUP_CONCAT
+        table: Tabela de origem
+        group_column: Coluna de agrupamento (ex: "Con_Codigo")
+        value_column: Coluna a concatenar (ex: "Usu_Nome")
+        alias: Nome da coluna agregada no resultado
+        separator: Separador entre os valores (literal, sem aspas simples)
+
+    Returns:
+        SELECT pronto para ser usado em um JOIN
+    """
+    if "'" in separator:
+        raise ValueError("O separador não pode conter aspas simples.")
+
+    if mode == STRING_AGG:
+        # CAST para NVARCHAR(MAX): sem ele o resultado é truncado em 4000 caracteres
+        return f"""
+            SELECT {group_column},
+                STRING_AGG(CAST({value_column} AS NVARCHAR(MAX)), '{separator}')
+                    WITHIN GROUP (ORDER BY {value_column}) AS {alias}
+            FROM {table}
+            GROUP BY {group_column}
+        """
+
+    if mode == FOR_XML:
+        return f"""
+            SELECT {group_column},
+                STUFF((
+                    SELECT '{separator}' + {value_column}
+                    FROM {table} agg2
+                    WHERE agg2.{group_column} = agg1.{group_column}
+                    ORDER BY {value_column}
+                    FOR XML PATH(''), TYPE
+                ).value('.', 'NVARCHAR(MAX)'), 1, {len(separator)}, '') AS {alias}
+            FROM {table} agg1
+            GROUP BY {group_column}
+        """
+
+    if mode == GROUP_CONCAT:
+        # O SQLite concatena na ordem de leitura: a subquery ordenada garante a ordem
+        return f"""
+            SELECT {group_column}, GROUP_CONCAT({value_column}, '{separator}') AS {alias}
+            FROM (
+                SELECT {group_column}, {value_column}
+                FROM {table}
+                ORDER BY {group_column}, {value_column}
+            )
+            GROUP BY {group_column}
+        """
+
+    raise ValueError(f"Modo de agregação desconhecido: {mode}")
+
+
+# Data/hora atual no SQLite no horário local: os parâmetros datetime enviados
+# pelo WATS (datetime.now()) também são locais, como o GETDATE() do SQL Server
+SQLITE_NOW = "datetime('now', 'localtime')"
+
+
+def top_clause(db_type: str, count: int) -> Tuple[str, str]:
+    """
+    Limita o resultado às primeiras ``count`` linhas.
+
+    Returns:
+        (trecho após o SELECT, trecho no fim da query): ``("TOP n", "")`` no
+        SQL Server, ``("", "LIMIT n")`` no SQLite
+    """
+    if db_type == "sqlite":
+        return "", f"LIMIT {int(count)}"
+    return f"TOP {int(count)}", ""
+
+
+def minutes_until(db_type: str, column: str) -> str:
+    """Minutos inteiros entre agora e ``column`` (negativo se já passou)."""
+    if db_type == "sqlite":
+        return f"CAST(ROUND((julianday({column}) - julianday({SQLITE_NOW})) * 1440) AS INTEGER)"
+    return f"DATEDIFF(MINUTE, GETDATE(), {column})"
+
+
+def now_minus(db_type: str, minutes: int) -> str:
+    """Data/hora de ``minutes`` minutos atrás."""
+    if db_type == "sqlite":
+        return f"datetime('now', 'localtime', '-{int(minutes)} minutes')"
+    return f"DATEADD(MINUTE, -{int(minutes)}, GETDATE())"
+
+
+def is_today(db_type: str, column: str) -> str:
+    """Condição: ``column`` é uma data/hora de hoje."""
+    if db_type == "sqlite":
+        return f"date({column}) = date({SQLITE_NOW})"
+    return f"CAST({column} AS DATE) = CAST(GETDATE() AS DATE)"
+
+
+def table_exists_query(db_type: str, param: str) -> str:
+    """``SELECT COUNT(*)`` que retorna 1 se a tabela (parâmetro) existe."""
+    if db_type == "sqlite":
+        return f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = {param}"
+    return f"SELECT COUNT(*) FROM sys.tables WHERE name = {param}"
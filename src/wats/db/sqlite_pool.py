@@ -0,0 +1,167 @@
+# WATS_Project/wats_app/db/sqlite_pool.py
+"""
+Conexões SQLite por thread para o modo local/offline.
+
+Abrir uma conexão SQLite é barato, mas cada abertura perde o cache de
+páginas e de statements e reaplica os PRAGMAs. Aqui cada thread mantém duas
+conexões reaproveitadas:
+
+- autocommit (``get_cursor``): leituras e escritas simples;
+- transacional (``get_transactional_connection`` e ``get_connection``): o
+  chamador confirma com ``commit()``, como no pool do SQL Server.
+
+O banco usa WAL (leitores não bloqueiam o escritor), ``synchronous=NORMAL``
+e mmap. ``close()`` nas conexões só as devolve; ``close_all()`` fecha de fato.
+"""
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # 16 MB (valor negativo = KiB)
+    "busy_timeout": 5000,
+}
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """
+    Cursor com ``with``, como o do pyodbc: ao sair sem erro confirma a
+    transação pendente da conexão; sempre fecha o cursor.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.connection.in_transaction:
+            self.connection.commit()
+        self.close()
+        return False
+
+
+class PooledSQLiteConnection(sqlite3.Connection):
+    """Conexão da thread; ``close()`` a devolve em vez de fechá-la."""
+
+    def cursor(self, factory=SQLiteCursor):
+        return super().cursor(factory)
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self):
+        sqlite3.Connection.close(self)
+
+
+class SQLiteConnectionPool:
+    """Conexões SQLite reaproveitadas por thread, com os PRAGMAs de desempenho."""
+
+    def __init__(
+        self,
+        database: str,
+        pragmas: Optional[Dict[str, Any]] = None,
+        timeout: float = 5.0,
+    ):
+        """
+        Args:
+            database: Caminho do arquivo (":memory:" = banco em memória compartilhado)
+            pragmas: PRAGMAs aplicados em cada conexão (padrão: DEFAULT_PRAGMAS)
+            timeout: Espera por um lock de escrita (segundos)
+        """
+        self.database = database
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+
+        # Banco em memória: uma URI compartilhada para todas as threads verem os mesmos dados
+        self._uri = database.startswith("file:")
+        if database == ":memory:":
+            self.database = f"file:wats_memory_{id(self)}?mode=memory&cache=shared"
+            self._uri = True
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[PooledSQLiteConnection] = []
+        self._stats = {"opened": 0, "reused": 0}
+        self.journal_mode: Optional[str] = None
+
+    def connection(self) -> PooledSQLiteConnection:
+        """Conexão autocommit da thread atual."""
+        return self._thread_connection("autocommit", isolation_level=None)
+
+    def transactional_connection(self) -> PooledSQLiteConnection:
+        """Conexão transacional da thread atual (commit/rollback explícitos)."""
+        return self._thread_connection("transactional", isolation_level="")
+
+    @contextmanager
+    def get_connection(self) -> Iterator[PooledSQLiteConnection]:
+        """
+        Conexão transacional da thread, na interface do ConnectionPool.
+
+        Ao sair, desfaz o que não foi confirmado (se a transação começou dentro do bloco).
+        """
+        conn = self.transactional_connection()
+        outer_transaction = conn.in_transaction
+        try:
+            yield conn
+        finally:
+            if not outer_transaction and conn.in_transaction:
+                conn.rollback()
+
+    def _thread_connection(self, kind: str, isolation_level: Optional[str]) -> PooledSQLiteConnection:
+        conn = getattr(self._local, kind, None)
+        if conn is not None:
+            with self._lock:
+                self._stats["reused"] += 1
+            return conn
+
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            isolation_level=isolation_level,
+            check_same_thread=False,
+            factory=PooledSQLiteConnection,
+            uri=self._uri,
+        )
+        self._apply_pragmas(conn)
+        setattr(self._local, kind, conn)
+        with self._lock:
+            self._connections.append(conn)
+            self._stats["opened"] += 1
+        return conn
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        for name, value in self.pragmas.items():
+            try:
+                row = conn.execute(f"PRAGMA {name} = {value}").fetchone()
+            except sqlite3.Error as e:
+                logging.warning(f"SQLite: PRAGMA {name} = {value} ignorado: {e}")
+                continue
+            if name == "journal_mode" and row:
+                # Bancos em memória não usam WAL e respondem "memory"
+                self.journal_mode = str(row[0]).lower()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "open_connections": len(self._connections),
+                "journal_mode": self.journal_mode,
+            }
+
+    def close_all(self):
+        """Fecha as conexões de todas as threads."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close_for_real()
+            except Exception as e:
+                logging.debug(f"SQLite: erro ao fechar conexão: {e}")
+        self._local = threading.local()
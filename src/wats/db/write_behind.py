@@ -0,0 +1,417 @@
+# WATS_Project/wats_app/db/write_behind.py
+"""
+Fila de gravação diferida (write-behind) para escritas de auditoria.
+
+Escritas cujo resultado não é necessário na hora (fim de log de acesso,
+registro de presença, tentativas em sessões protegidas) são anexadas a um
+diário local (JSON por linha, com fsync) e aplicadas no banco por uma thread
+em segundo plano, em lotes dentro de uma transação. Entradas não aplicadas
+são reaplicadas na próxima execução.
+
+Garantias:
+- Ordem: as entradas são aplicadas na ordem em que foram enfileiradas, então
+  escritas da mesma sessão (ex: INSERT e DELETE de presença) nunca se invertem.
+- Durabilidade: a entrada está no disco antes de ``enqueue`` retornar; o
+  ponto de aplicação (checkpoint) só avança após o commit do lote.
+- Falhas: sem conexão, o lote é tentado de novo mais tarde; erro do banco
+  numa entrada conta uma tentativa, e após ``max_attempts`` ela é descartada
+  (com log de erro) para não travar a fila.
+
+Escritas que precisam do resultado (ex: o Log_Id de ``log_access_start``)
+continuam síncronas.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from src.wats.db.exceptions import DatabaseConnectionError
+
+JOURNAL_NAME = "write_behind.jsonl"
+CHECKPOINT_NAME = "write_behind.checkpoint"
+LOCK_NAME = "write_behind.lock"
+
+# handler(cursor, *args): executa a escrita no cursor do lote
+Handler = Callable[..., Any]
+
+
+class _Entry:
+    __slots__ = ("seq", "op", "args", "session", "attempts")
+
+    def __init__(self, seq: int, op: str, args: List[Any], session: Optional[str]):
+        self.seq = seq
+        self.op = op
+        self.args = args
+        self.session = session
+        self.attempts = 0
+
+
+class WriteBehindJournal:
+    """
+    Diário local + thread de aplicação em lotes.
+
+    Usage:
+        journal = WriteBehindJournal(db_manager, "C:/WATS/journal")
+        journal.register("logs.log_access_end", apply_log_access_end, after_commit=invalidate)
+        journal.start()
+        journal.enqueue("logs.log_access_end", (log_id, datetime.now()), session=f"access:{log_id}")
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        journal_dir: str,
+        flush_interval: float = 1.0,
+        batch_size: int = 100,
+        max_attempts: int = 5,
+        retry_interval: float = 15.0,
+        fsync: bool = True,
+    ):
+        """
+        Args:
+            db_manager: DatabaseManager (usa get_pooled_connection)
+            journal_dir: Diretório do diário (um diário por usuário do sistema)
+            flush_interval: Espera máxima (s) antes de aplicar entradas novas
+            batch_size: Máximo de entradas por transação
+            max_attempts: Tentativas com erro do banco antes de descartar a entrada
+            retry_interval: Espera (s) após falha de conexão ou erro
+            fsync: Força a gravação em disco a cada entrada
+        """
+        self.db = db_manager
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.fsync = fsync
+
+        self.journal_path = os.path.join(journal_dir, JOURNAL_NAME)
+        self.checkpoint_path = os.path.join(journal_dir, CHECKPOINT_NAME)
+
+        self._handlers: Dict[str, Handler] = {}
+        self._after_commit: Dict[str, Callable[[], None]] = {}
+        self._pending: Deque[_Entry] = deque()
+        self._sessions: Dict[str, int] = {}
+        self._next_seq = 1
+        self._applied_seq = 0
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._lock_file = None
+
+        self._stats = {"enqueued": 0, "applied": 0, "dropped": 0, "batches": 0, "retries": 0}
+
+    # ------------------------------------------------------------------ ciclo de vida
+
+    def register(self, op: str, handler: Handler, after_commit: Optional[Callable[[], None]] = None):
+        """
+        Registra a função que aplica as entradas ``op``.
+
+        ``after_commit`` é chamado uma vez por lote confirmado que contenha
+        ``op`` (ex: invalidação de cache).
+        """
+        with self._lock:
+            self._handlers[op] = handler
+            if after_commit is not None:
+                self._after_commit[op] = after_commit
+
+    def start(self) -> bool:
+        """
+        Abre o diário, carrega as entradas pendentes e inicia a thread.
+
+        Returns:
+            False se outro processo já usa o diário (escritas ficam síncronas)
+        """
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.journal_dir, LOCK_NAME), "a+")
+        if not _try_lock(self._lock_file):
+            logging.warning(
+                f"Diário de gravação diferida em uso por outra instância: {self.journal_dir}"
+            )
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+        self._load()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        if self._pending:
+            logging.info(f"Gravação diferida: {len(self._pending)} entrada(s) pendente(s) do diário")
+
+        self._thread = threading.Thread(target=self._run, name="WriteBehind", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Tenta aplicar o que estiver pendente e encerra (o restante fica no diário)."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # ------------------------------------------------------------------ fila
+
+    def enqueue(self, op: str, args: Sequence[Any] = (), session: Optional[str] = None) -> int:
+        """
+        Grava a entrada no diário e agenda a aplicação.
+
+        Args:
+            op: Operação registrada (ex: "logs.insert_connection_log")
+            args: Argumentos do handler (JSON + datetime)
+            session: Chave da sessão, para consultar pendências (has_pending)
+
+        Returns:
+            Número de sequência da entrada
+        """
+        with self._lock:
+            if self._file is None:
+                raise DatabaseConnectionError("Diário de gravação diferida não iniciado.")
+
+            entry = _Entry(self._next_seq, op, list(args), session)
+            self._next_seq += 1
+            line = json.dumps(
+                {"seq": entry.seq, "op": op, "args": entry.args, "session": session},
+                default=_encode_value,
+                ensure_ascii=False,
+            )
+            self._file.write(line + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            self._pending.append(entry)
+            if session is not None:
+                self._sessions[session] = self._sessions.get(session, 0) + 1
+            self._stats["enqueued"] += 1
+
+        self._wake.set()
+        return entry.seq
+
+    def has_pending(self, session: str) -> bool:
+        """True se a sessão tem entradas ainda não aplicadas."""
+        with self._lock:
+            return self._sessions.get(session, 0) > 0
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Acorda a thread e espera a fila esvaziar (False se o tempo acabar)."""
+        self._wake.set()
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._pending, timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+    # ------------------------------------------------------------------ aplicação
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._drain():
+                # Falha: espera antes de tentar de novo (ou até o encerramento)
+                self._stop.wait(self.retry_interval)
+
+    def _drain(self) -> bool:
+        """Aplica lotes até esvaziar a fila. False se parou por falha."""
+        while True:
+            with self._lock:
+                batch = self._next_batch()
+            if not batch:
+                return True
+            if not self._apply(batch):
+                return False
+
+    def _next_batch(self) -> List[_Entry]:
+        """Primeiras entradas da fila, até a primeira sem handler registrado."""
+        batch: List[_Entry] = []
+        for entry in self._pending:
+            if entry.op not in self._handlers or len(batch) >= self.batch_size:
+                break
+            batch.append(entry)
+        if not batch and self._pending:
+            logging.warning(
+                f"Gravação diferida: operação sem handler registrado ({self._pending[0].op})"
+            )
+        return batch
+
+    def _apply(self, batch: List[_Entry]) -> bool:
+        """
+        Aplica o lote numa transação. Se o banco rejeitar o lote, reaplica
+        entrada a entrada para isolar (e contar tentativas) da entrada com erro.
+        """
+        try:
+            self._execute(batch)
+        except DatabaseConnectionError as e:
+            self._stats["retries"] += 1
+            logging.warning(f"Gravação diferida: sem conexão, nova tentativa depois ({e})")
+            return False
+        except Exception as e:
+            if len(batch) > 1:
+                logging.warning(f"Gravação diferida: lote rejeitado, aplicando uma a uma ({e})")
+                return all(self._apply([entry]) for entry in batch)
+
+            entry = batch[0]
+            entry.attempts += 1
+            self._stats["retries"] += 1
+            if entry.attempts < self.max_attempts:
+                logging.warning(
+                    f"Gravação diferida: erro em {entry.op} (seq {entry.seq}, "
+                    f"tentativa {entry.attempts}/{self.max_attempts}): {e}"
+                )
+                return False
+
+            logging.error(
+                f"Gravação diferida: descartando {entry.op} (seq {entry.seq}) após "
+                f"{entry.attempts} tentativas: {e} - args={entry.args}"
+            )
+            self._stats["dropped"] += 1
+            self._complete([entry], applied=False)
+            return True
+
+        self._stats["batches"] += 1
+        self._complete(batch)
+        for op in dict.fromkeys(entry.op for entry in batch):
+            callback = self._after_commit.get(op)
+            if callback is not None:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(f"Gravação diferida: erro após commit de {op}: {e}")
+        return True
+
+    def _execute(self, batch: List[_Entry]):
+        """Executa os handlers do lote numa conexão do pool, com um único commit."""
+        connection = self.db.get_pooled_connection()
+        if connection is None:
+            raise DatabaseConnectionError("Sem conexão com o banco de dados.")
+
+        with connection as conn:
+            if conn is None:
+                raise DatabaseConnectionError("Falha ao obter conexão do pool.")
+            cursor = conn.cursor()
+            try:
+                for entry in batch:
+                    self._handlers[entry.op](cursor, *entry.args)
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                cursor.close()
+
+    def _complete(self, batch: List[_Entry], applied: bool = True):
+        """Remove as entradas concluídas, avança o checkpoint e compacta o diário."""
+        with self._changed:
+            for entry in batch:
+                self._pending.popleft()
+                if entry.session is not None:
+                    remaining = self._sessions.get(entry.session, 1) - 1
+                    if remaining > 0:
+                        self._sessions[entry.session] = remaining
+                    else:
+                        self._sessions.pop(entry.session, None)
+            if applied:
+                self._stats["applied"] += len(batch)
+            self._applied_seq = batch[-1].seq
+            self._write_checkpoint()
+
+            # Nada pendente: o diário pode ser esvaziado (o checkpoint preserva a sequência)
+            if not self._pending and self._file is not None:
+                self._file.seek(0)
+                self._file.truncate()
+            self._changed.notify_all()
+
+    # ------------------------------------------------------------------ disco
+
+    def _load(self):
+        """Lê o checkpoint e as entradas do diário ainda não aplicadas."""
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                    self._applied_seq = int(f.read().strip() or 0)
+            except (OSError, ValueError) as e:
+                logging.error(f"Checkpoint da gravação diferida ilegível: {e}")
+
+        last_seq = self._applied_seq
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        data = json.loads(line, object_hook=_decode_value)
+                    except ValueError:
+                        # Linha incompleta (queda durante a gravação)
+                        logging.warning(f"Diário: linha {line_number} inválida ignorada")
+                        continue
+
+                    last_seq = max(last_seq, data["seq"])
+                    if data["seq"] <= self._applied_seq:
+                        continue
+                    entry = _Entry(data["seq"], data["op"], data["args"], data.get("session"))
+                    self._pending.append(entry)
+                    if entry.session is not None:
+                        self._sessions[entry.session] = self._sessions.get(entry.session, 0) + 1
+
+        self._next_seq = last_seq + 1
+
+    def _write_checkpoint(self):
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(str(self._applied_seq))
+        os.replace(temp_path, self.checkpoint_path)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Valor não serializável no diário: {type(value).__name__}")
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _try_lock(file) -> bool:
+    """Trava exclusiva (não bloqueante) no arquivo; liberada pelo SO ao encerrar."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
@@ -9,10 +9,17 @@ from src.wats.db.connection_pool import get_connection_pool, close_connection_po
 from src.wats.util_cache.intelligent_cache import (
     get_cache,
     cached,
+    configure_namespace_ttls,
+    enable_shared_cache,
     invalidate_user_caches as _invalidate_user_caches,
     invalidate_group_caches as _invalidate_group_caches,
     invalidate_connection_caches as _invalidate_connection_caches,
 )
+from src.wats.util_cache.cache_stats import (
+    log_cache_report,
+    start_cache_stats_reporter,
+    stop_cache_stats_reporter,
+)
 from src.wats.config import Settings
 
 
@@ -26,25 +33,34 @@ def initialize_performance_optimizations(config: Settings):
         config: Instância de Settings com configurações do banco
     """
     try:
-        # 1. Inicializa Connection Pool
-        connection_string = _build_connection_string(config)
-        pool_size = 5  # Valor padrão
-        max_overflow = 10  # Valor padrão
-        
-        pool = get_connection_pool(
-            connection_string=connection_string,
-            pool_size=pool_size,
-            max_overflow=max_overflow
-        )
-        
-        logging.info(f"Connection Pool initialized (size={pool_size}, overflow={max_overflow})")
+        # 1. Inicializa Connection Pool (SQLite: conexões por thread no DatabaseManager)
+        if config.DB_TYPE != "sqlite":
+            connection_string = _build_connection_string(config)
+            pool_size = 5  # Valor padrão
+            max_overflow = 10  # Valor padrão
+
+            pool = get_connection_pool(
+                connection_string=connection_string,
+                pool_size=pool_size,
+                max_overflow=max_overflow
+            )
+
+            logging.info(f"Connection Pool initialized (size={pool_size}, overflow={max_overflow})")
         
         # 2. Inicializa Cache
         cache_ttl = 300  # 5 minutos default
+        if getattr(config, "CACHE_SHARED_ENABLED", False):
+            # Compartilhado entre as instâncias do WATS no mesmo host
+            enable_shared_cache(config.CACHE_SHARED_PATH, default_ttl=cache_ttl)
+            logging.info(f"Shared cache enabled at {config.CACHE_SHARED_PATH}")
         cache = get_cache(default_ttl=cache_ttl)
+        configure_namespace_ttls(getattr(config, "CACHE_NAMESPACE_TTLS", {}))
         
         logging.info(f"Cache system initialized (default TTL={cache_ttl}s)")
         
+        # 3. Relatório periódico das estatísticas de cache (log estruturado)
+        start_cache_stats_reporter(getattr(config, "CACHE_STATS_LOG_INTERVAL", 0))
+        
         return True
         
     except Exception as e:
@@ -95,39 +111,64 @@ def shutdown_performance_optimizations():
         stats = cache.get_stats()
         logging.info(f"Cache stats: {stats}")
         
+        # Último relatório detalhado antes de encerrar
+        stop_cache_stats_reporter()
+        log_cache_report()
+        
     except Exception as e:
         logging.error(f"Error shutting down performance optimizations: {e}")
 
 
 # Decoradores utilitários para facilitar uso do cache
-def cache_connections(ttl: int = 60):
+# O parâmetro ``tags`` aceita tags extras (ex: "user:42") ou uma função que as
+# calcula a partir dos argumentos; o prefixo já é aplicado como tag.
+# Sem ``ttl`` explícito vale o TTL do namespace (``cache.ttl`` no config.json),
+# cujos padrões estão em ``DEFAULT_NAMESPACE_TTLS``.
+def cache_connections(ttl: Optional[int] = None, tags=None):
     """Cache para lista de conexões (1 minuto default)."""
-    return cached(ttl=ttl, key_prefix="connections")
+    return cached(ttl=ttl, key_prefix="connections", tags=tags)
 
 
-def cache_groups(ttl: int = 300):
+def cache_catalog(ttl: Optional[int] = None, tags=None):
+    """
+    Cache para o catálogo de conexões sem presença (1 minuto default; 15 minutos
+    com o log de alterações ativo).
+
+    Também recebe a tag "connections": as invalidações de conexões, grupos e
+    permissões descartam o catálogo.
+    """
+    extra_tags = ["connections"] if tags is None else tags
+    return cached(ttl=ttl, key_prefix="catalog", tags=extra_tags)
+
+
+def cache_groups(ttl: Optional[int] = None, tags=None):
     """Cache para lista de grupos (5 minutos default)."""
-    return cached(ttl=ttl, key_prefix="groups")
+    return cached(ttl=ttl, key_prefix="groups", tags=tags)
 
 
-def cache_users(ttl: int = 300):
+def cache_users(ttl: Optional[int] = None, tags=None):
     """Cache para dados de usuários (5 minutos default)."""
-    return cached(ttl=ttl, key_prefix="users")
+    return cached(ttl=ttl, key_prefix="users", tags=tags)
 
 
-def cache_permissions(ttl: int = 180):
+def cache_permissions(ttl: Optional[int] = None, tags=None):
     """Cache para permissões (3 minutos default)."""
-    return cached(ttl=ttl, key_prefix="permissions")
+    return cached(ttl=ttl, key_prefix="permissions", tags=tags)
 
 
-def cache_config(ttl: int = 600):
+def cache_config(ttl: Optional[int] = None, tags=None):
     """Cache para configurações (10 minutos default)."""
-    return cached(ttl=ttl, key_prefix="config")
+    return cached(ttl=ttl, key_prefix="config", tags=tags)
 
 
-def invalidate_connection_caches():
-    """Invalida todos os caches relacionados a conexões."""
-    _invalidate_connection_caches()
+def invalidate_connection_caches(connection_id: Optional[int] = None):
+    """
+    Invalida todos os caches relacionados a conexões.
+
+    Args:
+        connection_id: ID da conexão alterada (opcional)
+    """
+    _invalidate_connection_caches(connection_id)
     logging.debug("Connection caches invalidated")
 
 
@@ -157,7 +198,7 @@ def invalidate_group_caches(group_id: Optional[int] = None):
 """
 class OptimizedConnectionRepository(ConnectionRepository):
     
-    @cache_connections(ttl=60)
+    @cache_connections()
     def select_all(self, username: str):
         # Usa connection pool automaticamente via DatabaseManager atualizado
         return super().select_all(username)
@@ -4,7 +4,7 @@ import logging
 import os
 import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import requests
 
@@ -179,32 +179,37 @@ class CodecInstaller:
 
         return success
 
-    def get_recommended_codec_fallback(self) -> list:
+    def get_recommended_codec_fallback(self, preferred_codecs: Optional[List[str]] = None) -> list:
         """
         Retorna lista de codecs em ordem de preferência para fallback.
 
+        Args:
+            preferred_codecs: Ordem medida pela calibração do encoder (nomes fourcc).
+                Quando informada, substitui o teste do OpenH264: a calibração só
+                lista codecs que abriram nesta máquina.
+
         Returns:
             Lista de fourcc codes para tentar
         """
         import cv2
 
-        codecs = []
+        names = list(preferred_codecs or [])
 
-        # Se OpenH264 está funcionando, usa primeiro
-        if self.check_openh264_installed():
-            codecs.append(cv2.VideoWriter_fourcc(*"H264"))
+        # Sem calibração: se OpenH264 está funcionando, usa primeiro
+        if not names and self.check_openh264_installed():
+            names.append("H264")
 
         # Fallbacks
-        codecs.extend(
-            [
-                cv2.VideoWriter_fourcc(*"XVID"),  # Xvid
-                cv2.VideoWriter_fourcc(*"MP4V"),  # MPEG-4
-                cv2.VideoWriter_fourcc(*"MJPG"),  # Motion JPEG
-                cv2.VideoWriter_fourcc(*"X264"),  # x264
-            ]
-        )
-
-        return codecs
+        for name in (
+            "XVID",  # Xvid
+            "MP4V",  # MPEG-4
+            "MJPG",  # Motion JPEG
+            "X264",  # x264
+        ):
+            if name not in names:
+                names.append(name)
+
+        return [cv2.VideoWriter_fourcc(*name) for name in names]
 
 
 def ensure_codecs_installed(install_dir: Optional[str] = None) -> CodecInstaller:
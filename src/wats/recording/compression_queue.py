@@ -0,0 +1,533 @@
+# WATS_Project/wats_app/recording/compression_queue.py
+
+"""
+Bounded background queue for post-recording ffmpeg compression.
+
+Finished recordings used to get one daemon thread each, all running a full
+libx264 transcode at once. Closing several sessions together saturated the
+CPU while the user kept working. Jobs now go through a queue with a
+concurrency limit derived from the core count, ffmpeg runs at below-normal
+priority, pending jobs survive restarts (JSON state file next to the
+recordings) and progress is reported per job.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+
+from .ffmpeg_writer import DEFAULT_PRESET, find_ffmpeg
+
+STATE_FILE_NAME = ".compression_queue.json"
+
+
+class CompressionStatus(Enum):
+    """Status of a compression job."""
+
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class CompressionJob:
+    """Represents a compression job."""
+
+    id: str
+    video_file: Path
+    crf: int
+    preset: str
+    created_at: datetime
+    status: CompressionStatus = CompressionStatus.PENDING
+    progress: int = 0  # 0-100
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        data["status"] = self.status.value
+        data["video_file"] = str(self.video_file)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompressionJob":
+        """Rebuild a job saved with to_dict()."""
+        data = dict(data)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        data["status"] = CompressionStatus(data["status"])
+        data["video_file"] = Path(data["video_file"])
+        return cls(**data)
+
+
+def default_max_concurrent_jobs(cpu_count: Optional[int] = None) -> int:
+    """One compression job per 4 cores, at least one."""
+    cores = cpu_count or os.cpu_count() or 1
+    return max(1, cores // 4)
+
+
+def build_compression_command(
+    ffmpeg: str, video_file: Path, tmp_file: Path, crf: int, preset: str, threads: int
+) -> List[str]:
+    """ffmpeg re-encode with libx264, reporting progress as key=value lines on stdout."""
+    return [
+        ffmpeg,
+        "-y",
+        "-nostats",
+        "-progress",
+        "pipe:1",
+        "-i",
+        str(video_file),
+        "-c:v",
+        "libx264",
+        "-preset",
+        str(preset),
+        "-crf",
+        str(crf),
+        "-threads",
+        str(threads),
+        "-c:a",
+        "aac",
+        "-b:a",
+        "128k",
+        str(tmp_file),
+    ]
+
+
+class CompressionQueue:
+    """
+    Runs recording compression jobs with a concurrency limit.
+
+    Features:
+    - At most max_concurrent_jobs ffmpeg processes at a time
+    - ffmpeg at below-normal priority, with threads split between jobs
+    - Pending jobs persisted to state_file and resumed on start()
+    - Progress tracking and callbacks
+    """
+
+    def __init__(
+        self,
+        state_file: Optional[Path] = None,
+        max_concurrent_jobs: Optional[int] = None,
+        ffmpeg_path: Optional[str] = None,
+        low_priority: bool = True,
+    ):
+        """
+        Initialize the compression queue.
+
+        Args:
+            state_file: File to persist pending jobs
+            max_concurrent_jobs: Maximum simultaneous ffmpeg processes (default: cores / 4)
+            ffmpeg_path: ffmpeg executable (default: looked up in PATH)
+            low_priority: Run ffmpeg below normal priority
+        """
+        self.state_file = Path(state_file) if state_file else None
+        self.max_concurrent_jobs = max(1, int(max_concurrent_jobs or default_max_concurrent_jobs()))
+        self.threads_per_job = max(1, (os.cpu_count() or 1) // self.max_concurrent_jobs)
+        self.ffmpeg_path = ffmpeg_path
+        self.low_priority = low_priority
+
+        # Job queue and tracking
+        self.job_queue: Queue[CompressionJob] = Queue()
+        self.pending_jobs: Dict[str, CompressionJob] = {}
+        self.active_jobs: Dict[str, CompressionJob] = {}
+        self.completed_jobs: Dict[str, CompressionJob] = {}
+        self.failed_jobs: Dict[str, CompressionJob] = {}
+        self._processes: Dict[str, subprocess.Popen] = {}
+
+        # Threading
+        self.worker_threads: List[threading.Thread] = []
+        self.running = False
+        self.lock = threading.Lock()
+
+        # Callbacks
+        self.on_compression_started: Optional[Callable[[CompressionJob], None]] = None
+        self.on_compression_progress: Optional[Callable[[CompressionJob], None]] = None
+        self.on_compression_completed: Optional[Callable[[CompressionJob], None]] = None
+        self.on_compression_failed: Optional[Callable[[CompressionJob], None]] = None
+
+        # Load jobs left over from the previous run
+        self._load_state()
+
+        logging.info(
+            f"CompressionQueue initialized with {self.max_concurrent_jobs} workers "
+            f"({self.threads_per_job} threads per job)"
+        )
+
+    def start(self):
+        """Start the worker threads (resumes persisted jobs)."""
+        if self.running:
+            return
+
+        self.running = True
+        self.worker_threads = []
+        for i in range(self.max_concurrent_jobs):
+            thread = threading.Thread(
+                target=self._worker_thread, name=f"CompressionWorker-{i+1}", daemon=True
+            )
+            thread.start()
+            self.worker_threads.append(thread)
+
+        logging.info(f"CompressionQueue started with {len(self.worker_threads)} workers")
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Stop the workers.
+
+        Running ffmpeg processes are terminated; their jobs stay pending in the
+        state file and start over on the next start().
+        """
+        if not self.running:
+            return
+
+        self.running = False
+        with self.lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+        for thread in self.worker_threads:
+            thread.join(timeout=timeout)
+        self.worker_threads = []
+
+        self._save_state()
+        logging.info("CompressionQueue stopped")
+
+    def queue_compression(
+        self, video_file: Path, crf: int = 28, preset: str = DEFAULT_PRESET
+    ) -> str:
+        """
+        Queue a recording for compression.
+
+        Args:
+            video_file: Path to the video file (replaced by the compressed one)
+            crf: H.264 CRF value
+            preset: libx264 preset
+
+        Returns:
+            Compression job ID (the existing one if the file is already queued)
+        """
+        video_file = Path(video_file)
+        with self.lock:
+            for job in list(self.pending_jobs.values()) + list(self.active_jobs.values()):
+                if job.video_file == video_file:
+                    return job.id
+
+            job = CompressionJob(
+                id=f"compress_{int(time.time() * 1000)}_{video_file.stem}",
+                video_file=video_file,
+                crf=int(crf),
+                preset=preset,
+                created_at=datetime.now(),
+            )
+            self.pending_jobs[job.id] = job
+
+        self.job_queue.put(job)
+        self._save_state()
+
+        logging.info(f"Queued compression: {job.id} ({video_file.name}, CRF={crf})")
+        return job.id
+
+    def get_task_status(self, job_id: str) -> Optional[CompressionJob]:
+        """Get the status of a compression job."""
+        with self.lock:
+            for jobs in (
+                self.active_jobs,
+                self.pending_jobs,
+                self.completed_jobs,
+                self.failed_jobs,
+            ):
+                if job_id in jobs:
+                    return jobs[job_id]
+            return None
+
+    def get_queue_status(self) -> Dict[str, Any]:
+        """Get overall queue status, with progress of running jobs."""
+        with self.lock:
+            return {
+                "pending_jobs": len(self.pending_jobs),
+                "active_jobs": len(self.active_jobs),
+                "completed_jobs": len(self.completed_jobs),
+                "failed_jobs": len(self.failed_jobs),
+                "max_concurrent_jobs": self.max_concurrent_jobs,
+                "is_running": self.running,
+                "progress": {
+                    job.video_file.name: job.progress for job in self.active_jobs.values()
+                },
+            }
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no job is pending or running. Returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self.lock:
+                if not self.pending_jobs and not self.active_jobs:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _worker_thread(self):
+        """Worker thread that processes compression jobs."""
+        thread_name = threading.current_thread().name
+        logging.debug(f"Compression worker {thread_name} started")
+
+        while self.running:
+            try:
+                try:
+                    job = self.job_queue.get(timeout=1.0)
+                except Empty:
+                    continue
+
+                with self.lock:
+                    if self.pending_jobs.pop(job.id, None) is None:
+                        self.job_queue.task_done()
+                        continue
+                    job.status = CompressionStatus.IN_PROGRESS
+                    job.progress = 0
+                    self.active_jobs[job.id] = job
+
+                self._process_job(job)
+                self.job_queue.task_done()
+
+            except Exception as e:
+                logging.error(f"Error in compression worker {thread_name}: {e}")
+
+    def _process_job(self, job: CompressionJob):
+        """Compress one file and replace the original (keeps it on failure)."""
+        self._notify(self.on_compression_started, job)
+        error = None
+        try:
+            error = self._compress(job)
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Unexpected error during compression: {e}", exc_info=True)
+
+        with self.lock:
+            self.active_jobs.pop(job.id, None)
+            if error is None:
+                job.status = CompressionStatus.COMPLETED
+                job.progress = 100
+                self.completed_jobs[job.id] = job
+            elif not self.running:
+                # Interrupted by stop(): retried on the next start()
+                job.status = CompressionStatus.PENDING
+                job.progress = 0
+                self.pending_jobs[job.id] = job
+                self.job_queue.put(job)
+            else:
+                job.status = CompressionStatus.FAILED
+                job.last_error = error
+                self.failed_jobs[job.id] = job
+        self._save_state()
+
+        if job.status == CompressionStatus.COMPLETED:
+            self._notify(self.on_compression_completed, job)
+        elif job.status == CompressionStatus.FAILED:
+            self._notify(self.on_compression_failed, job)
+
+    def _compress(self, job: CompressionJob) -> Optional[str]:
+        """Run ffmpeg for a job. Returns an error message, or None on success."""
+        video_file = job.video_file
+        if not video_file.exists():
+            logging.warning(f"Compression requested but file not found: {video_file}")
+            return "file not found"
+
+        ffmpeg_cmd = find_ffmpeg(self.ffmpeg_path)
+        if not ffmpeg_cmd:
+            logging.warning("ffmpeg not found in PATH; skipping compression")
+            return "ffmpeg not found"
+
+        tmp_file = video_file.with_suffix(".tmp.mp4")
+        cmd = build_compression_command(
+            ffmpeg_cmd, video_file, tmp_file, job.crf, job.preset, self.threads_per_job
+        )
+        duration_us = self._probe_duration(video_file) * 1_000_000
+
+        creationflags = 0
+        if sys.platform == "win32":
+            creationflags = subprocess.CREATE_NO_WINDOW
+            if self.low_priority:
+                creationflags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+
+        logging.info(f"Compressing {video_file.name} -> CRF={job.crf}")
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                creationflags=creationflags,
+            )
+            if self.low_priority and hasattr(os, "setpriority"):
+                try:
+                    os.setpriority(os.PRIO_PROCESS, process.pid, 10)
+                except OSError:
+                    pass
+            with self.lock:
+                self._processes[job.id] = process
+            try:
+                for line in process.stdout:
+                    key, _, value = line.strip().partition("=")
+                    # out_time_ms is also in microseconds (ffmpeg naming quirk)
+                    if key in ("out_time_us", "out_time_ms") and duration_us > 0:
+                        try:
+                            progress = min(99, int(int(value) * 100 / duration_us))
+                        except ValueError:
+                            continue
+                        if progress > job.progress:
+                            job.progress = progress
+                            self._notify(self.on_compression_progress, job)
+                process.wait()
+            finally:
+                with self.lock:
+                    self._processes.pop(job.id, None)
+
+            if process.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode("utf-8", errors="replace")[-2000:].strip()
+                if self.running:
+                    logging.error(f"ffmpeg failed for {video_file.name}: {message}")
+                self._remove(tmp_file)
+                return message or f"ffmpeg exited with code {process.returncode}"
+
+        # Replace original with compressed file
+        backup = video_file.with_suffix(".bak.mp4")
+        try:
+            video_file.rename(backup)
+            tmp_file.rename(video_file)
+        except Exception as e:
+            logging.error(f"Failed to replace original file after compression: {e}")
+            if backup.exists() and not video_file.exists():
+                backup.rename(video_file)
+            self._remove(tmp_file)
+            return str(e)
+        self._remove(backup)
+
+        logging.info(f"Compression completed and replaced original: {video_file.name}")
+        return None
+
+    @staticmethod
+    def _probe_duration(video_file: Path) -> float:
+        """Duration of a video in seconds (0 if unknown)."""
+        capture = cv2.VideoCapture(str(video_file))
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            return frames / fps if fps > 0 and frames > 0 else 0.0
+        finally:
+            capture.release()
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            if path.exists():
+                path.unlink()
+        except Exception:
+            logging.debug(f"Could not remove {path}")
+
+    @staticmethod
+    def _notify(callback: Optional[Callable[[CompressionJob], None]], job: CompressionJob):
+        if callback:
+            try:
+                callback(job)
+            except Exception as e:
+                logging.error(f"Error in compression callback: {e}")
+
+    def _save_state(self):
+        """Save pending and running jobs to disk."""
+        if not self.state_file:
+            return
+
+        try:
+            with self.lock:
+                jobs = list(self.pending_jobs.values()) + list(self.active_jobs.values())
+                state = {
+                    # Running jobs start over after a restart
+                    "pending_jobs": [
+                        dict(job.to_dict(), status=CompressionStatus.PENDING.value, progress=0)
+                        for job in jobs
+                    ],
+                    "saved_at": datetime.now().isoformat(),
+                }
+
+                temp_path = self.state_file.with_suffix(".tmp")
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f, indent=2, ensure_ascii=False)
+                os.replace(temp_path, self.state_file)
+
+            logging.debug(f"Compression state saved to {self.state_file}")
+
+        except Exception as e:
+            logging.error(f"Failed to save compression state: {e}")
+
+    def _load_state(self):
+        """Re-queue jobs saved by a previous run."""
+        if not self.state_file or not self.state_file.exists():
+            return
+
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+            for job_data in state.get("pending_jobs", []):
+                job = CompressionJob.from_dict(job_data)
+                backup = job.video_file.with_suffix(".bak.mp4")
+                if not job.video_file.exists() and backup.exists():
+                    # Interrupted between the two renames of the replacement
+                    backup.rename(job.video_file)
+                if not job.video_file.exists():
+                    continue
+                self.pending_jobs[job.id] = job
+                self.job_queue.put(job)
+
+            logging.info(f"Compression state loaded: {len(self.pending_jobs)} pending jobs")
+
+        except Exception as e:
+            logging.error(f"Failed to load compression state: {e}")
+
+
+_shared_queues: Dict[str, CompressionQueue] = {}
+_shared_queues_lock = threading.Lock()
+
+
+def get_compression_queue(
+    recordings_dir: Any,
+    max_concurrent_jobs: Optional[int] = None,
+    ffmpeg_path: Optional[str] = None,
+) -> CompressionQueue:
+    """
+    Started queue shared by every recording manager of a recordings directory,
+    so the concurrency limit holds for the whole process.
+    """
+    recordings_dir = Path(recordings_dir)
+    key = str(recordings_dir.resolve())
+    with _shared_queues_lock:
+        queue = _shared_queues.get(key)
+        if queue is None:
+            recordings_dir.mkdir(parents=True, exist_ok=True)
+            queue = CompressionQueue(
+                state_file=recordings_dir / STATE_FILE_NAME,
+                max_concurrent_jobs=max_concurrent_jobs,
+                ffmpeg_path=ffmpeg_path,
+            )
+            _shared_queues[key] = queue
+        queue.start()
+        return queue
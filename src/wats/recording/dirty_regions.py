@@ -0,0 +1,227 @@
+# WATS_Project/wats_app/recording/dirty_regions.py
+"""
+Conversão só dos tiles que mudaram (dirty rectangles).
+
+Em capturas grandes (vários monitores, 4K) quase sempre só uma área pequena
+muda entre dois frames: o texto sendo digitado, uma janela, o relógio. Mesmo
+assim o ``FrameConverter`` converte (e redimensiona) o frame inteiro a cada
+tick.
+
+Aqui a tela é dividida em tiles de ``tile_size`` pixels:
+
+- ``DirtyTileTracker`` compara uma amostra de baixa resolução (uma linha a
+  cada ``sample_stride``, como o ``FrameChangeDetector``) com a do frame
+  anterior e devolve a máscara dos tiles que mudaram. Da amostra anterior só
+  são atualizados os tiles sujos;
+- ``DirtyRegionConverter`` mantém o conteúdo de cada buffer do
+  ``FrameBufferPool`` entre usos e só converte BGRA→BGR (e redimensiona) os
+  tiles que mudaram desde a última vez que aquele buffer foi preenchido.
+
+Os buffers circulam entre captura e encoder, então cada um está alguns frames
+"atrasado": a região atualizada é a união das máscaras desde o último uso do
+buffer. Se muitos tiles mudaram, o frame inteiro é convertido (sai mais
+barato que muitos recortes). Mudanças menores que o passo da amostra podem
+escapar da comparação; a cada ``full_refresh_frames`` todos os buffers são
+convertidos por inteiro de novo.
+"""
+
+import math
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_buffers import FrameBufferPool, FrameConverter
+
+DEFAULT_TILE_SIZE = 64
+DEFAULT_SAMPLE_STRIDE = 4
+DEFAULT_FULL_REFRESH_FRAMES = 100
+
+# Acima desta fração de tiles sujos, converter o frame inteiro sai mais barato
+MAX_DIRTY_RATIO = 0.5
+# Máscaras guardadas: buffers mais "atrasados" que isso são convertidos por inteiro
+MAX_BUFFER_AGE = 32
+
+
+def dirty_runs(mask: np.ndarray) -> Iterator[Tuple[int, int, int]]:
+    """(linha, coluna inicial, coluna final) de cada sequência horizontal de tiles sujos."""
+    for row in np.flatnonzero(mask.any(axis=1)):
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], mask[row], [False]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            yield int(row), int(start), int(end)
+
+
+class DirtyTileTracker:
+    """Máscara dos tiles que mudaram entre dois frames, por uma amostra de linhas."""
+
+    def __init__(
+        self, tile_size: int = DEFAULT_TILE_SIZE, sample_stride: int = DEFAULT_SAMPLE_STRIDE
+    ):
+        """
+        Args:
+            tile_size: Lado do tile em pixels (arredondado para múltiplo de 8 e de sample_stride)
+            sample_stride: Distância entre as linhas amostradas (1 = frame inteiro)
+        """
+        self.sample_stride = max(1, int(sample_stride))
+        unit = math.lcm(8, self.sample_stride)
+        self.tile_size = max(1, -(-int(tile_size) // unit)) * unit
+        self._previous: Optional[np.ndarray] = None
+        self._changed: Optional[np.ndarray] = None
+
+    def grid_shape(self, height: int, width: int) -> Tuple[int, int]:
+        return -(-height // self.tile_size), -(-width // self.tile_size)
+
+    def update(self, bgra: np.ndarray) -> np.ndarray:
+        """
+        Compara o frame com o anterior.
+
+        Returns:
+            Máscara booleana (linhas, colunas) de tiles; tudo True no primeiro
+            frame e quando o tamanho da captura muda
+        """
+        height, width = bgra.shape[:2]
+        rows, cols = self.grid_shape(height, width)
+        step = self.tile_size // self.sample_stride
+        # Um uint32 por pixel BGRA: uma comparação por pixel em vez de quatro
+        sample = bgra.view(np.uint32)[:: self.sample_stride, :, 0]
+
+        if self._previous is None or self._previous.shape != sample.shape:
+            self._previous = np.array(sample)
+            # Com bordas até múltiplos do tile, para reduzir por reshape
+            self._changed = np.zeros((rows * step, cols * self.tile_size), dtype=bool)
+            return np.ones((rows, cols), dtype=bool)
+
+        np.not_equal(sample, self._previous, out=self._changed[: sample.shape[0], :width])
+        # OU dentro de cada tile: 8 pixels por uint64, primeiro nas linhas, depois nas colunas
+        words = self._changed.view(np.uint64).reshape(rows, step, -1)
+        mask = np.bitwise_or.reduce(words, axis=1).reshape(rows, cols, -1).any(axis=2)
+
+        # Fora dos tiles sujos a amostra anterior continua igual: só eles são copiados
+        tile = self.tile_size
+        for row, start, end in dirty_runs(mask):
+            y0, y1 = row * step, (row + 1) * step
+            x0, x1 = start * tile, end * tile
+            self._previous[y0:y1, x0:x1] = sample[y0:y1, x0:x1]
+        return mask
+
+    def reset(self):
+        """Esquece o último frame: o próximo terá todos os tiles sujos."""
+        self._previous = None
+
+
+class DirtyRegionConverter(FrameConverter):
+    """``FrameConverter`` que só converte os tiles que mudaram em cada buffer."""
+
+    def __init__(
+        self,
+        pool: Optional[FrameBufferPool] = None,
+        resolution_scale: float = 1.0,
+        interpolation: int = cv2.INTER_AREA,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        sample_stride: int = DEFAULT_SAMPLE_STRIDE,
+        full_refresh_frames: int = DEFAULT_FULL_REFRESH_FRAMES,
+    ):
+        super().__init__(pool, resolution_scale, interpolation)
+        self.tracker = DirtyTileTracker(tile_size, sample_stride)
+        self.full_refresh_frames = max(1, int(full_refresh_frames))
+
+        self._input_shape: Optional[Tuple[int, ...]] = None
+        self._generation = 0
+        self._last_refresh = 0
+        self._masks: Deque[np.ndarray] = deque(maxlen=MAX_BUFFER_AGE)
+        # id(buffer) -> (referência fraca, geração do conteúdo do buffer)
+        self._buffer_generations: Dict[int, Tuple[Any, int]] = {}
+        self._scratch: Optional[np.ndarray] = None
+
+        self.frames_converted = 0
+        self.full_frames = 0
+        self.tiles_converted = 0
+        self.tiles_total = 0
+
+    def convert(self, bgra: np.ndarray) -> np.ndarray:
+        """BGRA → BGR num buffer do pool, atualizando só os tiles sujos daquele buffer."""
+        if bgra.shape != self._input_shape:
+            # Captura redimensionada: nenhum buffer guardado serve mais
+            self._input_shape = bgra.shape
+            self._masks.clear()
+            self._buffer_generations.clear()
+            self.tracker.reset()
+
+        mask = self.tracker.update(bgra)
+        self._generation += 1
+        self._masks.append(mask)
+        if self._generation - self._last_refresh >= self.full_refresh_frames:
+            # Corrige mudanças que a amostra não pegou, em todos os buffers
+            self._last_refresh = self._generation
+            self._buffer_generations.clear()
+
+        frame = self.pool.acquire(self.frame_shape(bgra))
+        dirty = self._dirty_since_last_use(frame)
+        self.frames_converted += 1
+        self.tiles_total += mask.size
+
+        if dirty is None or dirty.mean() > MAX_DIRTY_RATIO:
+            self.convert_into(bgra, frame)
+            self.full_frames += 1
+            self.tiles_converted += mask.size
+        elif dirty.any():
+            self._convert_tiles(bgra, frame, dirty)
+            self.tiles_converted += int(dirty.sum())
+
+        self._buffer_generations[id(frame)] = (weakref.ref(frame), self._generation)
+        return frame
+
+    def _dirty_since_last_use(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """União das máscaras desde que ``frame`` foi preenchido (None = inteiro)."""
+        entry = self._buffer_generations.get(id(frame))
+        if entry is None or entry[0]() is not frame:
+            return None
+        age = self._generation - entry[1]
+        if age > len(self._masks):
+            return None
+        masks = list(self._masks)[-age:]
+        return np.logical_or.reduce(masks) if len(masks) > 1 else masks[0]
+
+    def _convert_tiles(self, bgra: np.ndarray, frame: np.ndarray, dirty: np.ndarray):
+        """Converte cada sequência horizontal de tiles sujos com uma chamada."""
+        tile = self.tracker.tile_size
+        height, width = bgra.shape[:2]
+        for row, start, end in dirty_runs(dirty):
+            y0, y1 = row * tile, min(height, (row + 1) * tile)
+            self._convert_rect(bgra, frame, start * tile, y0, min(width, end * tile), y1)
+
+    def _convert_rect(
+        self, bgra: np.ndarray, frame: np.ndarray, x0: int, y0: int, x1: int, y1: int
+    ):
+        """Converte o retângulo ``[y0:y1, x0:x1]`` da captura para o mesmo lugar em ``frame``."""
+        source = bgra[y0:y1, x0:x1]
+        if self.resolution_scale == 1.0:
+            cv2.cvtColor(source, cv2.COLOR_BGRA2BGR, dst=frame[y0:y1, x0:x1])
+            return
+
+        # Mesmo retângulo no frame escalado
+        height, width = bgra.shape[:2]
+        out_height, out_width = frame.shape[:2]
+        dx0, dx1 = x0 * out_width // width, x1 * out_width // width
+        dy0, dy1 = y0 * out_height // height, y1 * out_height // height
+        if dx1 <= dx0 or dy1 <= dy0:
+            return
+        if self._scratch is None or self._scratch.shape[1] < out_width or (
+            self._scratch.shape[0] < dy1 - dy0
+        ):
+            self._scratch = np.empty((dy1 - dy0 + 1, out_width, 4), dtype=np.uint8)
+        scaled = self._scratch[: dy1 - dy0, : dx1 - dx0]
+        cv2.resize(source, (dx1 - dx0, dy1 - dy0), dst=scaled, interpolation=self.interpolation)
+        cv2.cvtColor(scaled, cv2.COLOR_BGRA2BGR, dst=frame[dy0:dy1, dx0:dx1])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "frames_converted": self.frames_converted,
+            "full_frames": self.full_frames,
+            "tiles_converted": self.tiles_converted,
+            "converted_ratio": (
+                round(self.tiles_converted / self.tiles_total, 3) if self.tiles_total else 0.0
+            ),
+        }
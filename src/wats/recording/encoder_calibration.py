@@ -0,0 +1,305 @@
+# WATS_Project/wats_app/recording/encoder_calibration.py
+"""
+Calibração do encoder por máquina.
+
+Antes, o ``SmartSessionRecorder`` usava o primeiro codec que abrisse, sem
+olhar velocidade nem tamanho do arquivo. Aqui cada codec do OpenCV e cada
+preset do libx264 (se houver ffmpeg) codifica alguns frames sintéticos com
+cara de tela (fundo liso, blocos de "texto", cursor andando) e registramos:
+
+- tempo de parede e de CPU por frame;
+- bytes gerados por frame.
+
+As medições ficam em cache no diretório de dados do usuário e só são
+refeitas se a máquina mudar (CPU, versão do OpenCV, ffmpeg). A escolha
+para um FPS e resolução é calculada na leitura:
+
+- só entram no topo os candidatos que sustentam o FPS com folga
+  (``FPS_HEADROOM``);
+- entre eles, vence o menor ``bytes/frame × (1 + núcleos de CPU usados)``.
+
+Os que não sustentam o FPS vão para o fim da lista, do mais rápido para o
+mais lento.
+"""
+
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .ffmpeg_writer import ENCODER_FFMPEG, ENCODER_OPENCV, find_ffmpeg, open_ffmpeg_writer
+
+CALIBRATION_FILE_NAME = "encoder_calibration.json"
+CALIBRATION_FRAME_SIZE = (1280, 720)
+CALIBRATION_FRAMES = 30
+
+# Mesmos codecs do CodecInstaller.get_recommended_codec_fallback
+OPENCV_CODECS = ("H264", "XVID", "MP4V", "MJPG", "X264")
+FFMPEG_PRESETS = ("ultrafast", "superfast", "veryfast", "faster")
+
+# O encoder divide a CPU com a captura: exige 50% de folga sobre o FPS alvo
+FPS_HEADROOM = 1.5
+
+
+@dataclass
+class EncoderBenchmark:
+    """Medição de um codec (OpenCV) ou preset (ffmpeg)."""
+
+    encoder: str
+    name: str
+    opened: bool
+    frames: int = 0
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    size_bytes: int = 0
+
+
+@dataclass
+class EncoderChoice:
+    """Resultado da calibração para um FPS/resolução."""
+
+    opencv_codecs: List[str]
+    ffmpeg_preset: Optional[str]
+
+
+def synthetic_frames(width: int, height: int, count: int, seed: int = 0):
+    """Frames BGR parecidos com uma sessão RDP: quase estáticos, mudanças pequenas."""
+    rng = np.random.default_rng(seed)
+    base = np.full((height, width, 3), 240, dtype=np.uint8)
+    base[: max(1, height // 20)] = (120, 80, 40)  # barra de título
+    # Linhas de "texto": faixas de ruído escuro com espaçamento regular
+    line_height = max(2, height // 60)
+    for top in range(height // 10, height - line_height, line_height * 2):
+        line_width = int(width * rng.uniform(0.3, 0.9))
+        text = rng.integers(0, 2, (line_height, line_width, 1), dtype=np.uint8) * 200
+        base[top : top + line_height, :line_width] -= text
+
+    frame = base.copy()
+    cursor = max(2, width // 100)
+    for index in range(count):
+        # Cursor/digitação: só um bloco pequeno muda a cada frame
+        x = (index * cursor * 3) % max(1, width - cursor)
+        y = height // 2
+        frame[y : y + cursor, x : x + cursor] = rng.integers(0, 255, (3,), dtype=np.uint8)
+        yield frame
+
+
+def machine_fingerprint(ffmpeg: Optional[str]) -> Dict[str, Any]:
+    """O que invalida a calibração quando muda."""
+    return {
+        "machine": platform.node(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "ffmpeg": ffmpeg,
+    }
+
+
+def select_encoders(
+    benchmarks: List[EncoderBenchmark],
+    target_fps: float,
+    frame_size: Optional[Tuple[int, int]] = None,
+    calibration_size: Tuple[int, int] = CALIBRATION_FRAME_SIZE,
+) -> EncoderChoice:
+    """Ordena os candidatos medidos para o FPS e a resolução de gravação."""
+    scale = 1.0
+    if frame_size and calibration_size[0] * calibration_size[1] > 0:
+        scale = (frame_size[0] * frame_size[1]) / (calibration_size[0] * calibration_size[1])
+
+    ranked: Dict[str, List[Tuple[Tuple, str]]] = {ENCODER_OPENCV: [], ENCODER_FFMPEG: []}
+    for bench in benchmarks:
+        if not bench.opened or bench.frames <= 0 or bench.seconds <= 0:
+            continue
+        seconds_per_frame = bench.seconds / bench.frames * scale
+        achievable_fps = 1.0 / seconds_per_frame
+        cpu_cores = bench.cpu_seconds / bench.frames * scale * target_fps
+        bytes_per_frame = bench.size_bytes / bench.frames * scale
+        if achievable_fps >= target_fps * FPS_HEADROOM:
+            key = (0, bytes_per_frame * (1.0 + cpu_cores))
+        else:
+            key = (1, -achievable_fps)
+        ranked.setdefault(bench.encoder, []).append((key, bench.name))
+
+    opencv = [name for _, name in sorted(ranked[ENCODER_OPENCV])]
+    ffmpeg = [name for _, name in sorted(ranked[ENCODER_FFMPEG])]
+    return EncoderChoice(opencv_codecs=opencv, ffmpeg_preset=ffmpeg[0] if ffmpeg else None)
+
+
+class EncoderCalibrator:
+    """Mede os encoders disponíveis uma vez por máquina e guarda em cache."""
+
+    def __init__(
+        self,
+        cache_file: Optional[Path] = None,
+        ffmpeg_path: Optional[str] = None,
+        frame_size: Tuple[int, int] = CALIBRATION_FRAME_SIZE,
+        frames: int = CALIBRATION_FRAMES,
+        fps: float = 10.0,
+    ):
+        """
+        Args:
+            cache_file: JSON com as medições (padrão: <dados do usuário>/cache/)
+            ffmpeg_path: Executável do ffmpeg (padrão: procura no PATH)
+            frame_size: Resolução dos frames sintéticos
+            frames: Frames codificados por candidato
+            fps: FPS declarado aos encoders durante a medição
+        """
+        if cache_file is None:
+            from ..config import get_user_data_dir
+
+            cache_file = Path(get_user_data_dir()) / "cache" / CALIBRATION_FILE_NAME
+        self.cache_file = Path(cache_file)
+        self.ffmpeg = find_ffmpeg(ffmpeg_path)
+        self.frame_size = (int(frame_size[0]), int(frame_size[1]))
+        self.frames = max(1, int(frames))
+        self.fps = fps
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[List[EncoderBenchmark]]:
+        """Medições em cache, se forem desta máquina."""
+        data = self._read_cache()
+        if data is None:
+            return None
+        return [EncoderBenchmark(**item) for item in data.get("benchmarks", [])]
+
+    def run(self) -> List[EncoderBenchmark]:
+        """Mede todos os candidatos e grava o cache."""
+        with self._lock:
+            started = time.perf_counter()
+            benchmarks: List[EncoderBenchmark] = []
+            with tempfile.TemporaryDirectory(prefix="wats_calibration_") as work_dir:
+                for codec in OPENCV_CODECS:
+                    benchmarks.append(self._benchmark_opencv(codec, Path(work_dir)))
+                if self.ffmpeg:
+                    for preset in FFMPEG_PRESETS:
+                        benchmarks.append(self._benchmark_ffmpeg(preset, Path(work_dir)))
+
+            self._save(benchmarks)
+            logging.info(
+                f"Calibração do encoder concluída em {time.perf_counter() - started:.1f}s: "
+                + ", ".join(
+                    f"{b.encoder}/{b.name}="
+                    + (f"{b.frames / b.seconds:.0f}fps" if b.opened and b.seconds else "n/d")
+                    for b in benchmarks
+                )
+            )
+            return benchmarks
+
+    def load_or_run(self) -> List[EncoderBenchmark]:
+        return self.load() or self.run()
+
+    def start_background(self) -> Optional[threading.Thread]:
+        """Calibra numa thread em segundo plano se ainda não houver cache."""
+        if self.load() is not None:
+            return None
+        thread = threading.Thread(target=self._run_safely, name="EncoderCalibration", daemon=True)
+        thread.start()
+        return thread
+
+    def get_choice(
+        self, target_fps: float, frame_size: Optional[Tuple[int, int]] = None
+    ) -> Optional[EncoderChoice]:
+        """Escolha para o FPS/resolução a partir do cache (None se não calibrado)."""
+        data = self._read_cache()
+        if not data or not data.get("benchmarks"):
+            return None
+        benchmarks = [EncoderBenchmark(**item) for item in data["benchmarks"]]
+        calibration_size = tuple(data.get("frame_size") or self.frame_size)
+        return select_encoders(benchmarks, target_fps, frame_size, calibration_size)
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Cache de calibração inválido ({self.cache_file}): {e}")
+            return None
+        if data.get("fingerprint") != machine_fingerprint(self.ffmpeg):
+            logging.info("Calibração do encoder desatualizada para esta máquina")
+            return None
+        return data
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            logging.error(f"Falha na calibração do encoder: {e}", exc_info=True)
+
+    def _benchmark_opencv(self, codec: str, work_dir: Path) -> EncoderBenchmark:
+        path = work_dir / f"opencv_{codec}.avi"
+        fourcc = cv2.VideoWriter_fourcc(*codec)
+        writer = cv2.VideoWriter(str(path), fourcc, self.fps, self.frame_size)
+        if not writer.isOpened():
+            writer.release()
+            return EncoderBenchmark(ENCODER_OPENCV, codec, opened=False)
+
+        width, height = self.frame_size
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for frame in synthetic_frames(width, height, self.frames):
+            writer.write(frame)
+        writer.release()
+        seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        return EncoderBenchmark(
+            ENCODER_OPENCV,
+            codec,
+            opened=True,
+            frames=self.frames,
+            seconds=seconds,
+            cpu_seconds=cpu_seconds,
+            size_bytes=path.stat().st_size if path.exists() else 0,
+        )
+
+    def _benchmark_ffmpeg(self, preset: str, work_dir: Path) -> EncoderBenchmark:
+        path = work_dir / f"ffmpeg_{preset}.mp4"
+        writer = open_ffmpeg_writer(
+            path, self.fps, self.frame_size, preset=preset, ffmpeg_path=self.ffmpeg
+        )
+        if not writer:
+            return EncoderBenchmark(ENCODER_FFMPEG, preset, opened=False)
+
+        width, height = self.frame_size
+        wall_start = time.perf_counter()
+        for frame in synthetic_frames(width, height, self.frames):
+            writer.write(frame)
+        # O libx264 ainda codifica os frames em buffer ao fechar: mede depois do release
+        ok = writer.release()
+        seconds = time.perf_counter() - wall_start
+        return EncoderBenchmark(
+            ENCODER_FFMPEG,
+            preset,
+            opened=ok,
+            frames=self.frames,
+            seconds=seconds,
+            cpu_seconds=writer.cpu_seconds or 0.0,
+            size_bytes=path.stat().st_size if path.exists() else 0,
+        )
+
+    def _save(self, benchmarks: List[EncoderBenchmark]):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {
+                "fingerprint": machine_fingerprint(self.ffmpeg),
+                "created_at": datetime.now().isoformat(),
+                "frame_size": list(self.frame_size),
+                "benchmarks": [asdict(b) for b in benchmarks],
+            }
+            temp_path = self.cache_file.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.cache_file)
+        except Exception as e:
+            logging.error(f"Não foi possível salvar a calibração do encoder: {e}")
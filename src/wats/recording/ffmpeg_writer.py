@@ -0,0 +1,326 @@
+# WATS_Project/wats_app/recording/ffmpeg_writer.py
+"""
+Encoder por pipe para um processo ffmpeg (libx264).
+
+Em vez de gravar com ``cv2.VideoWriter`` (mp4v/XVID, arquivos grandes) e
+depois recodificar o arquivo inteiro com ffmpeg para H.264, os frames BGR
+são enviados crus (``-f rawvideo``) pelo stdin de um ffmpeg que fica aberto
+durante todo o segmento. O arquivo final já sai comprimido, em uma passada.
+
+``FFmpegVideoWriter`` tem a mesma interface usada do ``cv2.VideoWriter``
+(``isOpened``/``write``/``release``), então os gravadores só trocam a
+criação do writer.
+
+Frames repetidos (tela parada) chegam com ``write(frame, repeats)``. O ffmpeg
+descarta as cópias idênticas com ``mpdecimate`` antes do libx264 e grava o
+vídeo com frame rate variável (``-fps_mode vfr``): os frames mantidos ficam
+com o timestamp original, então a linha do tempo não muda, mas o encoder só
+comprime o que mudou. Em tela parada um frame por segundo ainda é mantido,
+para o fim do vídeo não encurtar e a busca continuar funcionando.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+ENCODER_FFMPEG = "ffmpeg"
+ENCODER_OPENCV = "opencv"
+ENCODERS = (ENCODER_FFMPEG, ENCODER_OPENCV)
+
+DEFAULT_PRESET = "veryfast"
+DEFAULT_CRF = 28
+
+
+def find_ffmpeg(configured_path: Optional[str] = None) -> Optional[str]:
+    """Caminho do executável do ffmpeg: o configurado, se existir, senão o do PATH."""
+    if configured_path:
+        candidate = Path(os.path.expandvars(configured_path)).expanduser()
+        if candidate.is_file():
+            return str(candidate)
+        logging.warning(f"ffmpeg configurado não encontrado: {configured_path}; tentando o PATH")
+    return shutil.which("ffmpeg")
+
+
+def build_ffmpeg_command(
+    ffmpeg: str,
+    output: str,
+    width: int,
+    height: int,
+    fps: float,
+    crf: int = DEFAULT_CRF,
+    preset: str = DEFAULT_PRESET,
+) -> List[str]:
+    """Linha de comando: rawvideo BGR no stdin → H.264 (yuv420p) no arquivo."""
+    # Descarta só frames idênticos ao anterior, no máximo ~1 s seguido
+    max_dropped = max(1, int(round(fps)))
+    return [
+        ffmpeg,
+        "-hide_banner",
+        "-loglevel", "error",
+        "-nostats",
+        # Progresso (total_size etc.) em linhas chave=valor no stdout
+        "-progress", "pipe:1",
+        "-y",
+        "-f", "rawvideo",
+        "-pix_fmt", "bgr24",
+        "-s", f"{width}x{height}",
+        "-r", str(fps),
+        "-i", "-",
+        "-an",
+        # yuv420p exige dimensões pares: descarta no máximo 1 px de borda
+        "-vf", f"crop=trunc(iw/2)*2:trunc(ih/2)*2,mpdecimate=hi=0:lo=0:frac=0:max={max_dropped}",
+        "-fps_mode", "vfr",
+        "-c:v", "libx264",
+        "-preset", str(preset),
+        "-crf", str(crf),
+        "-pix_fmt", "yuv420p",
+        output,
+    ]
+
+
+class FFmpegVideoWriter:
+    """Writer compatível com ``cv2.VideoWriter`` que envia frames a um ffmpeg."""
+
+    backend = ENCODER_FFMPEG
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        crf: int = DEFAULT_CRF,
+        preset: str = DEFAULT_PRESET,
+        ffmpeg_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            path: Arquivo de saída (o container vem da extensão, ex.: .mp4)
+            fps: Frames por segundo do vídeo
+            frame_size: (largura, altura) dos frames BGR que serão escritos
+            crf: Qualidade H.264 (0-51, menor = melhor)
+            preset: Preset do libx264 (ultrafast ... veryslow)
+            ffmpeg_path: Executável do ffmpeg (padrão: procura no PATH)
+        """
+        self.path = str(path)
+        self.width, self.height = int(frame_size[0]), int(frame_size[1])
+        self.frame_bytes = self.width * self.height * 3
+        self.frames_written = 0
+        self.bytes_sent = 0
+        # Bytes já gravados no arquivo, segundo o próprio ffmpeg (-progress)
+        self.bytes_written = 0
+        # CPU total (usuário + sistema) do ffmpeg, preenchido por release()
+        self.cpu_seconds: Optional[float] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._stderr = None
+
+        ffmpeg = find_ffmpeg(ffmpeg_path)
+        if not ffmpeg:
+            logging.warning("ffmpeg não encontrado; encoder por pipe indisponível")
+            return
+
+        cmd = build_ffmpeg_command(ffmpeg, self.path, self.width, self.height, fps, crf, preset)
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        try:
+            # stderr em arquivo: um PIPE não lido travaria o ffmpeg quando enchesse
+            self._stderr = tempfile.TemporaryFile()
+            self._process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._stderr,
+                creationflags=creationflags,
+            )
+            self._progress_thread = threading.Thread(
+                target=self._read_progress,
+                args=(self._process.stdout,),
+                name="FFmpegProgress",
+                daemon=True,
+            )
+            self._progress_thread.start()
+        except OSError as e:
+            logging.error(f"Falha ao iniciar ffmpeg: {e}")
+            self._close_stderr()
+            self._process = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        """PID do processo ffmpeg (None se não estiver rodando)."""
+        return self._process.pid if self._process is not None else None
+
+    def isOpened(self) -> bool:  # noqa: N802 - mesma interface do cv2.VideoWriter
+        return (
+            self._process is not None
+            and self._process.poll() is None
+            and self._process.stdin is not None
+            and not self._process.stdin.closed
+        )
+
+    def write(self, frame: np.ndarray, repeats: int = 1):
+        """Envia um frame BGR (altura, largura, 3) ao ffmpeg, ``repeats`` vezes seguidas."""
+        if not self.isOpened():
+            raise IOError(
+                f"ffmpeg não está rodando para {Path(self.path).name}: {self._stderr_tail()}"
+            )
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError(
+                f"Frame {frame.shape[1]}x{frame.shape[0]} não corresponde ao writer "
+                f"{self.width}x{self.height}"
+            )
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        data = memoryview(frame).cast("B")
+        for _ in range(repeats):
+            # As cópias só passam pelo pipe: o mpdecimate as tira antes do encoder
+            self._process.stdin.write(data)
+        self.frames_written += repeats
+        self.bytes_sent += self.frame_bytes * repeats
+
+    def release(self, timeout: float = 30.0) -> bool:
+        """Fecha o stdin e espera o ffmpeg finalizar o arquivo."""
+        process, self._process = self._process, None
+        if process is None:
+            return False
+
+        ok = False
+        try:
+            if process.stdin and not process.stdin.closed:
+                process.stdin.close()
+            self._wait(process, timeout)
+            ok = process.returncode == 0
+            if not ok:
+                logging.error(
+                    f"ffmpeg terminou com código {process.returncode} para "
+                    f"{Path(self.path).name}: {self._stderr_tail()}"
+                )
+        except (OSError, ValueError) as e:
+            # BrokenPipe ao fechar: o ffmpeg já tinha saído
+            logging.error(f"Erro ao finalizar ffmpeg: {e}")
+        except subprocess.TimeoutExpired:
+            logging.error(
+                f"ffmpeg não finalizou em {timeout:.0f}s; encerrando {Path(self.path).name}"
+            )
+            process.kill()
+            process.wait()
+        finally:
+            if self._progress_thread:
+                self._progress_thread.join(timeout=1.0)
+                self._progress_thread = None
+            self._close_stderr()
+        return ok
+
+    def _wait(self, process: subprocess.Popen, timeout: float):
+        """Espera o ffmpeg sair e guarda o tempo de CPU final dele em ``cpu_seconds``."""
+        if hasattr(os, "wait4"):
+            # POSIX: o próprio wait4 devolve o rusage do filho, com o flush final
+            deadline = time.monotonic() + timeout
+            delay = 0.0005
+            while True:
+                try:
+                    pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+                except ChildProcessError:
+                    # Já recolhido por um poll() anterior: sem rusage
+                    process.wait(timeout=timeout)
+                    return
+                if pid:
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    self.cpu_seconds = rusage.ru_utime + rusage.ru_stime
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(process.args, timeout)
+                delay = min(delay * 2, remaining, 0.05)
+                time.sleep(delay)
+
+        process.wait(timeout=timeout)
+        try:
+            import psutil
+
+            # Windows: o Popen mantém o handle aberto, então os tempos finais
+            # do processo encerrado ainda podem ser lidos
+            times = psutil.Process(process.pid).cpu_times()
+            self.cpu_seconds = times.user + times.system
+        except Exception:
+            pass
+
+    def _read_progress(self, stdout):
+        """Lê o -progress do ffmpeg (também evita que o pipe de stdout encha)."""
+        try:
+            for line in iter(stdout.readline, b""):
+                key, _, value = line.partition(b"=")
+                if key == b"total_size":
+                    try:
+                        self.bytes_written = int(value)
+                    except ValueError:
+                        pass
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                stdout.close()
+            except OSError:
+                pass
+
+    def _stderr_tail(self, limit: int = 2000) -> str:
+        if not self._stderr:
+            return ""
+        try:
+            self._stderr.seek(0)
+            return self._stderr.read().decode("utf-8", errors="replace")[-limit:].strip()
+        except Exception:
+            return ""
+
+    def _close_stderr(self):
+        if self._stderr:
+            try:
+                self._stderr.close()
+            except Exception:
+                pass
+            self._stderr = None
+
+    def __del__(self):
+        try:
+            if self._process is not None:
+                self.release(timeout=5.0)
+        except Exception:
+            pass
+
+
+def open_ffmpeg_writer(
+    path: Any,
+    fps: float,
+    frame_size: Tuple[int, int],
+    crf: int = DEFAULT_CRF,
+    preset: str = DEFAULT_PRESET,
+    ffmpeg_path: Optional[str] = None,
+) -> Optional[FFmpegVideoWriter]:
+    """Abre um ``FFmpegVideoWriter``; None se o ffmpeg não estiver disponível."""
+    writer = FFmpegVideoWriter(str(path), fps, frame_size, crf, preset, ffmpeg_path)
+    if writer.isOpened():
+        return writer
+    writer.release()
+    return None
+
+
+def write_frame(writer: Any, frame: np.ndarray, repeats: int = 1):
+    """
+    Grava ``frame`` ``repeats`` vezes em qualquer writer.
+
+    O ``FFmpegVideoWriter`` recebe a contagem de uma vez (as cópias não são
+    codificadas). O ``cv2.VideoWriter`` só grava frame rate constante, então
+    recebe o mesmo frame já convertido de novo a cada repetição.
+    """
+    if isinstance(writer, FFmpegVideoWriter):
+        writer.write(frame, repeats)
+        return
+    for _ in range(repeats):
+        writer.write(frame)
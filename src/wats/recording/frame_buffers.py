@@ -0,0 +1,115 @@
+# WATS_Project/wats_app/recording/frame_buffers.py
+"""
+Conversão de captura sem alocações por frame.
+
+O caminho antigo fazia três alocações de um frame inteiro a cada tick:
+``np.array(screenshot)`` (cópia), ``cv2.cvtColor`` (array novo) e
+``cv2.resize`` (outro array novo). Aqui:
+
+- o buffer BGRA devolvido pelo MSS (``screenshot.raw``) é só embrulhado
+  com ``np.frombuffer``, sem cópia;
+- a redução de escala, quando há, é feita antes da conversão (menos pixels
+  para converter), num buffer de trabalho reaproveitado;
+- a conversão BGRA→BGR escreve (``dst=``) num buffer do ``FrameBufferPool``.
+
+Os buffers do pool vão para a fila do encoder e voltam ao pool quando o
+encoder termina de usá-los (``FramePipeline(release=pool.release)``).
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """Buffers de frame reaproveitados, todos com o mesmo formato."""
+
+    def __init__(self, dtype=np.uint8):
+        self.dtype = dtype
+        self.shape: Optional[Tuple[int, ...]] = None
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Buffer livre com o formato pedido (aloca se não houver)."""
+        with self._lock:
+            if shape != self.shape:
+                # Janela redimensionada: buffers antigos não servem mais
+                self.shape = shape
+                self._free.clear()
+            if self._free:
+                self.reuses += 1
+                return self._free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=self.dtype)
+
+    def release(self, buffer: Any):
+        """Devolve um buffer ao pool (ignora outros objetos e formatos antigos)."""
+        if not isinstance(buffer, np.ndarray):
+            return
+        with self._lock:
+            if buffer.shape == self.shape and buffer.dtype == self.dtype:
+                self._free.append(buffer)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "allocations": self.allocations,
+                "reuses": self.reuses,
+                "free_buffers": len(self._free),
+            }
+
+
+class FrameConverter:
+    """Converte capturas do MSS em frames BGR (escalados) usando o pool."""
+
+    def __init__(
+        self,
+        pool: Optional[FrameBufferPool] = None,
+        resolution_scale: float = 1.0,
+        interpolation: int = cv2.INTER_AREA,
+    ):
+        self.pool = pool or FrameBufferPool()
+        self.resolution_scale = resolution_scale
+        self.interpolation = interpolation
+        self._scaled_bgra: Optional[np.ndarray] = None
+
+    @staticmethod
+    def wrap(screenshot) -> np.ndarray:
+        """Vista BGRA (altura, largura, 4) sobre o buffer da captura, sem cópia."""
+        return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+            screenshot.height, screenshot.width, 4
+        )
+
+    def frame_shape(self, bgra: np.ndarray) -> Tuple[int, int, int]:
+        """Formato do frame BGR (já escalado) gerado a partir de ``bgra``."""
+        height, width = bgra.shape[:2]
+        if self.resolution_scale != 1.0:
+            width = max(1, int(width * self.resolution_scale))
+            height = max(1, int(height * self.resolution_scale))
+        return height, width, 3
+
+    def convert(self, bgra: np.ndarray) -> np.ndarray:
+        """BGRA → BGR num buffer do pool, reduzindo a escala antes se configurado."""
+        frame = self.pool.acquire(self.frame_shape(bgra))
+        self.convert_into(bgra, frame)
+        return frame
+
+    def convert_into(self, bgra: np.ndarray, frame: np.ndarray):
+        """Converte o frame inteiro em ``frame`` (formato de ``frame_shape``)."""
+        source = bgra
+        if self.resolution_scale != 1.0:
+            new_height, new_width = frame.shape[:2]
+            scaled_shape = (new_height, new_width, 4)
+            if self._scaled_bgra is None or self._scaled_bgra.shape != scaled_shape:
+                self._scaled_bgra = np.empty(scaled_shape, dtype=np.uint8)
+            cv2.resize(
+                bgra, (new_width, new_height), dst=self._scaled_bgra, interpolation=self.interpolation
+            )
+            source = self._scaled_bgra
+
+        cv2.cvtColor(source, cv2.COLOR_BGRA2BGR, dst=frame)
@@ -0,0 +1,297 @@
+# WATS_Project/wats_app/recording/frame_pipeline.py
+"""
+Pipeline captura → encoder para os gravadores de sessão.
+
+A thread de captura só faz grab/conversão/redimensionamento e empurra o frame
+para um ring buffer limitado; uma thread de encoder drena o buffer e chama o
+``VideoWriter``. Assim um ``write()`` lento (disco ocupado, codec travando)
+não atrasa a cadência de captura.
+
+Quando o buffer enche, a política de descarte decide o que perder:
+
+- ``drop_oldest``: descarta o frame mais antigo da fila (o vídeo fica mais
+  curto que a sessão, mas sempre com os frames mais recentes);
+- ``duplicate_last``: descarta o frame novo e repete o último da fila no
+  lugar dele (a linha do tempo do vídeo é preservada).
+
+Frames sem mudança (tela parada) entram como ``REPEAT_FRAME``: um marcador
+que só incrementa a repetição da última entrada, sem copiar o frame; o
+encoder grava de novo o último frame para manter a linha do tempo. Com
+``sink_repeats`` a contagem vai inteira para o sink (e dele para o writer),
+que pode evitar codificar as cópias.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+DROP_OLDEST = "drop_oldest"
+DUPLICATE_LAST = "duplicate_last"
+DROP_POLICIES = (DROP_OLDEST, DUPLICATE_LAST)
+
+# Marcador de "tela não mudou": o encoder repete o último frame gravado
+REPEAT_FRAME = object()
+
+DEFAULT_FRAME_QUEUE_SIZE = 10  # ~1s a 10 FPS; ~60 MB com frames 1080p BGR
+
+
+class FrameQueue:
+    """
+    Ring buffer limitado de frames, seguro entre threads.
+
+    Cada entrada é ``[frame, repeticoes, pts]``: com ``duplicate_last`` o frame
+    repetido não é copiado, só tem o contador incrementado. ``pts`` é o
+    timestamp de apresentação dado pelo agendador (segundos desde o início).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_FRAME_QUEUE_SIZE,
+        drop_policy: str = DROP_OLDEST,
+        on_discard: Optional[Callable[[Any], None]] = None,
+    ):
+        """
+        Args:
+            maxsize: Capacidade da fila em frames
+            drop_policy: ``drop_oldest`` ou ``duplicate_last``
+            on_discard: Chamado com cada frame descartado (para devolver o buffer)
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Invalid drop policy '{drop_policy}' (use one of {DROP_POLICIES})")
+
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.on_discard = on_discard
+        self._items: Deque[List[Any]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._in_flight = 0
+
+        self.frames_put = 0
+        self.frames_dropped = 0
+        self.frames_duplicated = 0
+        self.frames_repeated = 0
+        self.max_depth = 0
+
+    def put(self, frame: Any, pts: Optional[float] = None) -> bool:
+        """
+        Enfileira um frame sem bloquear. ``REPEAT_FRAME`` nunca ocupa espaço
+        extra: vira uma repetição a mais da última entrada.
+
+        Returns:
+            False se o frame novo foi descartado (fila cheia com ``duplicate_last``)
+        """
+        with self._cond:
+            self.frames_put += 1
+            accepted = True
+
+            if frame is REPEAT_FRAME:
+                self.frames_repeated += 1
+                if self._items:
+                    self._items[-1][1] += 1
+                else:
+                    self._items.append([REPEAT_FRAME, 1, pts])
+            elif len(self._items) >= self.maxsize:
+                self.frames_dropped += 1
+                if self.drop_policy == DROP_OLDEST:
+                    discarded = self._items.popleft()[0]
+                    self._items.append([frame, 1, pts])
+                else:
+                    self._items[-1][1] += 1
+                    self.frames_duplicated += 1
+                    discarded = frame
+                    accepted = False
+                if self.on_discard and discarded is not REPEAT_FRAME:
+                    self.on_discard(discarded)
+            else:
+                self._items.append([frame, 1, pts])
+
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+            return accepted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[Any, int, Optional[float]]]:
+        """
+        Retira o próximo frame. Retorna ``(frame, repeticoes, pts)`` ou None se a
+        fila estiver vazia ao fim do timeout (ou fechada e vazia).
+
+        Quem recebe um frame deve chamar ``task_done()`` ao terminar de gravá-lo.
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            frame, repeats, pts = self._items.popleft()
+            self._in_flight += 1
+            return frame, repeats, pts
+
+    def task_done(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar e o frame em gravação terminar."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self):
+        """Acorda o consumidor; ``get()`` passa a devolver None quando a fila esvaziar."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class FramePipeline:
+    """
+    Thread de encoder que drena uma ``FrameQueue`` e entrega os frames a ``sink``.
+
+    ``sink`` roda sempre na thread do encoder e é chamado uma vez por
+    repetição do frame; com ``sink_repeats`` é chamado uma vez por entrada
+    como ``sink(frame, repeticoes)``. Erros no sink são registrados e não
+    param o pipeline.
+
+    ``release`` recebe cada frame que o pipeline não vai mais usar (descartado
+    na fila ou substituído como "último frame" do encoder), para devolver o
+    buffer a um ``FrameBufferPool``.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[..., None],
+        maxsize: int = DEFAULT_FRAME_QUEUE_SIZE,
+        drop_policy: str = DROP_OLDEST,
+        name: str = "FrameEncoder",
+        release: Optional[Callable[[Any], None]] = None,
+        sink_repeats: bool = False,
+    ):
+        self.sink = sink
+        self.sink_repeats = sink_repeats
+        self.release = release
+        self.queue = FrameQueue(maxsize, drop_policy, on_discard=release)
+        self.name = name
+        self.frames_written = 0
+        self.sink_errors = 0
+        self.last_pts: Optional[float] = None
+        self._last_frame: Any = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+
+    def submit(self, frame: Any, pts: Optional[float] = None) -> bool:
+        """Enfileira um frame capturado (nunca bloqueia a captura)."""
+        return self.queue.put(frame, pts)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Espera os frames já enfileirados serem gravados.
+
+        Usado antes de trocar/fechar o writer, para os frames pendentes irem
+        para o arquivo certo. Chamado da própria thread do encoder não espera.
+        """
+        if not self._thread or threading.current_thread() is self._thread:
+            return True
+        if not self.queue.join(timeout):
+            logging.warning(
+                f"{self.name}: {len(self.queue)} frames ainda pendentes após {timeout:.1f}s"
+            )
+            return False
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Grava o que está na fila e encerra a thread do encoder."""
+        self.queue.close()
+        finished = True
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            finished = not self._thread.is_alive()
+            if not finished:
+                logging.warning(f"{self.name}: encoder não terminou em {timeout:.1f}s")
+
+        # Com o encoder parado o último frame não será mais repetido
+        if finished and self.release and self._last_frame is not None:
+            self.release(self._last_frame)
+            self._last_frame = None
+
+        stats = self.get_stats()
+        if stats["frames_dropped"] or stats["frames_duplicated"]:
+            logging.info(
+                f"{self.name}: {stats['frames_dropped']} frames descartados, "
+                f"{stats['frames_duplicated']} duplicados "
+                f"(política: {stats['drop_policy']}, fila: {stats['queue_size']})"
+            )
+
+    def _run(self):
+        while True:
+            item = self.queue.get(timeout=0.5)
+            if item is None:
+                if self.queue.closed:
+                    break
+                continue
+
+            frame, repeats, pts = item
+            if frame is REPEAT_FRAME:
+                frame = self._last_frame
+            else:
+                # O último frame fica retido para repetições; o anterior volta ao pool
+                if self.release and self._last_frame is not None:
+                    self.release(self._last_frame)
+                self._last_frame = frame
+            if frame is None:
+                # Repetição antes de qualquer frame gravado: nada a repetir
+                self.queue.task_done()
+                continue
+
+            try:
+                if self.sink_repeats:
+                    self.sink(frame, repeats)
+                    self.frames_written += repeats
+                else:
+                    for _ in range(repeats):
+                        self.sink(frame)
+                        self.frames_written += 1
+                if pts is not None:
+                    self.last_pts = pts
+            except Exception as e:
+                self.sink_errors += 1
+                logging.error(f"{self.name}: erro ao gravar frame: {e}")
+            finally:
+                self.queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "drop_policy": self.queue.drop_policy,
+            "queue_size": self.queue.maxsize,
+            "queue_depth": len(self.queue),
+            "max_queue_depth": self.queue.max_depth,
+            "frames_captured": self.queue.frames_put,
+            "frames_written": self.frames_written,
+            "frames_dropped": self.queue.frames_dropped,
+            "frames_duplicated": self.queue.frames_duplicated,
+            "frames_repeated": self.queue.frames_repeated,
+            "sink_errors": self.sink_errors,
+            "last_pts": self.last_pts,
+        }
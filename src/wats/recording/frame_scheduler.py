@@ -0,0 +1,141 @@
+# WATS_Project/wats_app/recording/frame_scheduler.py
+"""
+Agendador de frames por deadline para os loops de captura.
+
+Os horários dos frames são calculados de forma absoluta sobre o relógio
+monotônico (``início + n / fps``), então o tempo gasto capturando não se
+acumula como atraso. Entre um frame e outro a thread dorme uma única vez até
+o próximo deadline (uma wakeup por frame), em vez de acordar a cada 10 ms.
+
+Se a captura perder deadlines (máquina ocupada), os horários perdidos são
+pulados em vez de capturados em rajada; ficam contados em ``missed_deadlines``.
+"""
+
+import ctypes
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class FrameScheduler:
+    """Marca o ritmo de captura em ``fps`` frames por segundo."""
+
+    def __init__(
+        self,
+        fps: float,
+        clock: Callable[[], float] = time.monotonic,
+        high_resolution_timer: bool = True,
+    ):
+        """
+        Args:
+            fps: Frames por segundo desejados
+            clock: Relógio monotônico (injetável para testes)
+            high_resolution_timer: No Windows, pede timer de 1 ms durante a gravação
+                (o padrão de ~15,6 ms arredonda cada espera)
+        """
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+
+        self.fps = float(fps)
+        self.interval = 1.0 / self.fps
+        self.clock = clock
+        self.high_resolution_timer = high_resolution_timer and sys.platform == "win32"
+        self._timer_raised = False
+
+        self.start_time: Optional[float] = None
+        self.next_deadline: Optional[float] = None
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.late_frames = 0
+        self.max_lateness = 0.0
+        self.last_pts: Optional[float] = None
+
+    def start(self):
+        """Zera o relógio; o primeiro frame sai imediatamente."""
+        self.start_time = self.clock()
+        self.next_deadline = self.start_time
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.late_frames = 0
+        self.max_lateness = 0.0
+        self.last_pts = None
+        self._raise_timer_resolution()
+
+    def stop(self):
+        self._restore_timer_resolution()
+
+    def wait(self, stop_event: Optional[threading.Event] = None) -> Optional[float]:
+        """
+        Dorme até o deadline do próximo frame.
+
+        Returns:
+            Timestamp de apresentação do frame (segundos desde ``start()``, na
+            grade de ``1/fps``) ou None se ``stop_event`` foi sinalizado.
+        """
+        if self.start_time is None:
+            self.start()
+
+        remaining = self.next_deadline - self.clock()
+        if remaining > 0:
+            if stop_event is not None:
+                if stop_event.wait(remaining):
+                    return None
+            else:
+                time.sleep(remaining)
+        elif stop_event is not None and stop_event.is_set():
+            return None
+
+        now = self.clock()
+        lateness = now - self.next_deadline
+        if lateness > self.interval:
+            # Perdeu um ou mais horários: pula para o último, sem rajada
+            missed = int(lateness / self.interval)
+            self.missed_deadlines += missed
+            self.next_deadline += missed * self.interval
+            lateness -= missed * self.interval
+        if lateness > self.interval / 2:
+            self.late_frames += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+
+        pts = self.next_deadline - self.start_time
+        self.next_deadline += self.interval
+        self.frames += 1
+        self.last_pts = pts
+        return pts
+
+    @property
+    def achieved_fps(self) -> float:
+        if self.start_time is None or not self.frames:
+            return 0.0
+        elapsed = self.clock() - self.start_time
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "target_fps": self.fps,
+            "achieved_fps": round(self.achieved_fps, 2),
+            "frames": self.frames,
+            "missed_deadlines": self.missed_deadlines,
+            "late_frames": self.late_frames,
+            "max_lateness_ms": round(self.max_lateness * 1000, 1),
+        }
+
+    def _raise_timer_resolution(self):
+        if not self.high_resolution_timer or self._timer_raised:
+            return
+        try:
+            ctypes.windll.winmm.timeBeginPeriod(1)
+            self._timer_raised = True
+        except Exception as e:
+            logging.debug(f"Não foi possível ajustar a resolução do timer: {e}")
+
+    def _restore_timer_resolution(self):
+        if not self._timer_raised:
+            return
+        try:
+            ctypes.windll.winmm.timeEndPeriod(1)
+        except Exception as e:
+            logging.debug(f"Não foi possível restaurar a resolução do timer: {e}")
+        self._timer_raised = False
@@ -2,13 +2,13 @@
 # Supports multiple concurrent RDP session recordings
 
 import logging
-import shutil
-import subprocess
 import threading
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
 from ..config import get_config
+from .compression_queue import CompressionQueue, get_compression_queue
+from .ffmpeg_writer import ENCODER_FFMPEG
 from .session_recorder import SessionRecorder
 
 
@@ -25,6 +25,7 @@ class MultiSessionRecordingManager:
         self.callbacks: Dict[str, Callable] = {}
         self._lock = threading.Lock()
         self.settings = None
+        self.compression_queue: Optional[CompressionQueue] = None
 
         logging.info("MultiSessionRecordingManager initialized")
 
@@ -155,8 +156,12 @@ class MultiSessionRecordingManager:
                     )
 
                     # Start compression in background if enabled
+                    # (skipped when the ffmpeg encoder already wrote the final H.264 file)
                     recording_config = self.recording_configs.get(session_id, {})
-                    if recording_config.get("compress_enabled", False):
+                    if (
+                        recording_config.get("compress_enabled", False)
+                        and getattr(recorder, "encoder_backend", None) != ENCODER_FFMPEG
+                    ):
                         self._compress_recording_async(video_path, recording_config)
 
                     # Call callback if provided
@@ -294,76 +299,29 @@ class MultiSessionRecordingManager:
 
     def _compress_recording_async(self, video_path: str, recording_config: Dict[str, Any]):
         """
-        Compress a recording file using ffmpeg in a background thread.
+        Queue a recording file for background ffmpeg compression.
+
+        Jobs share a bounded, low-priority queue, so stopping several sessions at
+        once doesn't start one full transcode per file.
 
         Args:
             video_path: Path to the video file to compress
             recording_config: Recording configuration with compression settings
         """
-
-        def compress_task():
-            try:
-                video_file = Path(video_path)
-                if not video_file.exists():
-                    logging.warning(f"Compression requested but file not found: {video_file}")
-                    return
-
-                ffmpeg_cmd = shutil.which("ffmpeg")
-                if not ffmpeg_cmd:
-                    logging.warning("ffmpeg not found in PATH; skipping compression")
-                    return
-
-                crf = recording_config.get("compress_crf", 28)
-                tmp_file = video_file.with_suffix(".tmp.mp4")
-
-                # Build ffmpeg command
-                cmd = [
-                    ffmpeg_cmd,
-                    "-y",
-                    "-i",
-                    str(video_file),
-                    "-c:v",
-                    "libx264",
-                    "-preset",
-                    "veryfast",
-                    "-crf",
-                    str(crf),
-                    "-c:a",
-                    "aac",
-                    "-b:a",
-                    "128k",
-                    str(tmp_file),
-                ]
-
-                logging.info(f"Compressing {video_file.name} -> CRF={crf}")
-                proc = subprocess.run(
-                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-                )
-
-                if proc.returncode != 0:
-                    logging.error(f"ffmpeg failed for {video_file.name}: {proc.stderr}")
-                    if tmp_file.exists():
-                        tmp_file.unlink()
-                    return
-
-                # Replace original with compressed file
-                try:
-                    backup = video_file.with_suffix(".bak.mp4")
-                    video_file.rename(backup)
-                    tmp_file.rename(video_file)
-                    backup.unlink()
-                    logging.info(f"Compression completed and replaced original: {video_file.name}")
-                except Exception as e:
-                    logging.error(f"Failed to replace original file after compression: {e}")
-                    if tmp_file.exists():
-                        tmp_file.unlink()
-
-            except Exception as e:
-                logging.error(f"Unexpected error during compression: {e}")
-
-        # Start compression in background thread
-        compress_thread = threading.Thread(target=compress_task, daemon=True)
-        compress_thread.start()
+        video_file = Path(video_path)
+        recordings_dir = (
+            getattr(self.settings, "RECORDING_OUTPUT_DIR", None) if self.settings else None
+        ) or video_file.parent
+        self.compression_queue = get_compression_queue(
+            recordings_dir,
+            max_concurrent_jobs=getattr(self.settings, "RECORDING_COMPRESSION_MAX_JOBS", 0) or None,
+            ffmpeg_path=getattr(self.settings, "RECORDING_FFMPEG_PATH", "") or None,
+        )
+        return self.compression_queue.queue_compression(
+            video_file,
+            recording_config.get("compress_crf", 28),
+            getattr(self.settings, "RECORDING_COMPRESSION_PRESET", "veryfast"),
+        )
 
     def shutdown(self):
         """Shutdown the recording manager and cleanup resources."""
@@ -372,6 +330,10 @@ class MultiSessionRecordingManager:
             if stopped_sessions:
                 logging.info(f"Stopped recordings for sessions: {stopped_sessions}")
 
+            # Unfinished compressions stay persisted and resume on next start
+            if self.compression_queue:
+                self.compression_queue.stop()
+
             logging.info("MultiSessionRecordingManager shutdown completed")
 
         except Exception as e:
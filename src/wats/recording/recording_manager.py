@@ -8,6 +8,9 @@ import time
 from pathlib import Path
 from typing import Any, Callable, Dict, Optional
 
+from .compression_queue import CompressionQueue, get_compression_queue
+from .encoder_calibration import EncoderCalibrator
+from .ffmpeg_writer import ENCODER_FFMPEG
 from .file_rotation_manager import FileRotationManager
 from .smart_session_recorder import SmartSessionRecorder
 
@@ -45,6 +48,7 @@ class RecordingManager:
         self.settings = settings
         self.smart_recorder: Optional[SmartSessionRecorder] = None
         self.rotation_manager: Optional[FileRotationManager] = None
+        self.compression_queue: Optional[CompressionQueue] = None
         self.api_manager = None  # Optional[ApiIntegrationManager]
 
         # State tracking
@@ -97,6 +101,16 @@ class RecordingManager:
             # Start automatic cleanup
             self.rotation_manager.start_automatic_cleanup()
 
+            # Resume compressions left pending by a previous run
+            if getattr(self.settings, "RECORDING_COMPRESSION_ENABLED", True):
+                self._get_compression_queue()
+
+            # Measure encoders once per machine (cached) without delaying startup
+            if getattr(self.settings, "RECORDING_ENCODER_AUTO_TUNE", True):
+                EncoderCalibrator(
+                    ffmpeg_path=getattr(self.settings, "RECORDING_FFMPEG_PATH", "") or None
+                ).start_background()
+
             # Initialize API upload manager if available and enabled
             if (
                 API_AVAILABLE
@@ -220,8 +234,15 @@ class RecordingManager:
 
             # Stop smart recorder and get created files
             created_files = []
+            already_compressed = set()
             if self.smart_recorder:
                 created_files = self.smart_recorder.stop_recording()
+                # Segmentos do encoder ffmpeg já saem em H.264 com o CRF configurado
+                already_compressed = {
+                    str(segment.file_path)
+                    for segment in self.smart_recorder.all_segments
+                    if segment.encoder == ENCODER_FFMPEG
+                }
 
             # Process created files for compression and upload
             if created_files:
@@ -236,21 +257,17 @@ class RecordingManager:
                     compression_crf = 28
 
                 if compression_enabled:
-                    # Compress in background to avoid blocking shutdown
+                    # Compress in background (bounded queue) to avoid blocking shutdown
                     for file_path in created_files:
-                        try:
-                            Thread = threading.Thread
-                            t = Thread(
-                                target=self._compress_recording_async,
-                                args=(Path(file_path), compression_crf),
-                                daemon=True,
-                            )
-                            t.start()
-                            logging.info(
-                                f"Started background compression for {Path(file_path).name}"
+                        if str(file_path) in already_compressed:
+                            logging.debug(
+                                f"Skipping compression for {Path(file_path).name} (encoded by ffmpeg)"
                             )
+                            continue
+                        try:
+                            self._compress_recording_async(Path(file_path), compression_crf)
                         except Exception as e:
-                            logging.warning(f"Failed to start compression thread: {e}")
+                            logging.warning(f"Failed to queue compression: {e}")
 
                 # Trigger upload if API is available and auto_upload is enabled
                 if (
@@ -458,6 +475,14 @@ class RecordingManager:
             "fps": getattr(self.settings, "RECORDING_FPS", 30),
             "quality": getattr(self.settings, "RECORDING_QUALITY", 75),
             "resolution_scale": getattr(self.settings, "RECORDING_RESOLUTION_SCALE", 1.0),
+            "frame_queue_size": getattr(self.settings, "RECORDING_FRAME_QUEUE_SIZE", 10),
+            "frame_drop_policy": getattr(self.settings, "RECORDING_FRAME_DROP_POLICY", "drop_oldest"),
+            "skip_unchanged_frames": getattr(self.settings, "RECORDING_SKIP_UNCHANGED_FRAMES", True),
+            "change_detection_stride": getattr(
+                self.settings, "RECORDING_CHANGE_DETECTION_STRIDE", 4
+            ),
+            "dirty_region_capture": getattr(self.settings, "RECORDING_DIRTY_REGION_CAPTURE", False),
+            "dirty_tile_size": getattr(self.settings, "RECORDING_DIRTY_TILE_SIZE", 64),
             "inactivity_timeout_minutes": getattr(
                 self.settings, "RECORDING_INACTIVITY_TIMEOUT_MINUTES", 10
             ),
@@ -474,7 +499,11 @@ class RecordingManager:
                 self.settings, "RECORDING_WINDOW_TRACKING_INTERVAL", 1.0
             ),
             "compression_enabled": getattr(self.settings, "RECORDING_COMPRESSION_ENABLED", True),
-            "compression_cr": getattr(self.settings, "RECORDING_COMPRESSION_CRF", 28),
+            "compression_crf": getattr(self.settings, "RECORDING_COMPRESSION_CRF", 28),
+            "compression_preset": getattr(self.settings, "RECORDING_COMPRESSION_PRESET", "veryfast"),
+            "encoder": getattr(self.settings, "RECORDING_ENCODER", "ffmpeg"),
+            "encoder_auto_tune": getattr(self.settings, "RECORDING_ENCODER_AUTO_TUNE", True),
+            "ffmpeg_path": getattr(self.settings, "RECORDING_FFMPEG_PATH", ""),
             "debug_window_tracking": getattr(
                 self.settings, "RECORDING_DEBUG_WINDOW_TRACKING", False
             ),
@@ -591,6 +620,10 @@ class RecordingManager:
             if self.rotation_manager:
                 self.rotation_manager.stop_automatic_cleanup()
 
+            # Unfinished compressions stay persisted and resume on next start
+            if self.compression_queue:
+                self.compression_queue.stop()
+
             if self.api_manager:
                 self.api_manager.shutdown()
 
@@ -635,73 +668,31 @@ class RecordingManager:
         except Exception as e:
             logging.error(f"Error queuing recording upload for {session_id}: {e}")
 
+    def _get_compression_queue(self) -> CompressionQueue:
+        """Shared compression queue for the recordings directory (started on first use)."""
+        if not self.compression_queue:
+            self.compression_queue = get_compression_queue(
+                self.settings.RECORDING_OUTPUT_DIR,
+                max_concurrent_jobs=getattr(self.settings, "RECORDING_COMPRESSION_MAX_JOBS", 0)
+                or None,
+                ffmpeg_path=getattr(self.settings, "RECORDING_FFMPEG_PATH", "") or None,
+            )
+        return self.compression_queue
+
     def _compress_recording_async(self, video_file: Path, crf: int = 28):
-        """Compress a recording file using ffmpeg in a background thread.
+        """Queue a recording file for background ffmpeg compression.
 
-        Replaces the original file on success (keeps original on failure).
+        Jobs run with a concurrency limit and low priority; the original file is
+        replaced on success (kept on failure).
         """
-        try:
-            if not video_file.exists():
-                logging.warning(f"Compression requested but file not found: {video_file}")
-                return
-
-            ffmpeg_cmd = shutil.which("ffmpeg")
-            if not ffmpeg_cmd:
-                logging.warning("ffmpeg not found in PATH; skipping compression")
-                return
-
-            tmp_file = video_file.with_suffix(".tmp.mp4")
-            # Build ffmpeg command: re-encode with libx264 and CRF
-            cmd = [
-                ffmpeg_cmd,
-                "-y",
-                "-i",
-                str(video_file),
-                "-c:v",
-                "libx264",
-                "-preset",
-                "veryfast",
-                "-crf",
-                str(crf),
-                "-c:a",
-                "aac",
-                "-b:a",
-                "128k",
-                str(tmp_file),
-            ]
-
-            logging.info(f"Compressing {video_file.name} -> CRF={crf}")
-            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if proc.returncode != 0:
-                logging.error(f"ffmpeg failed for {video_file.name}: {proc.stderr}")
-                if tmp_file.exists():
-                    try:
-                        tmp_file.unlink()
-                    except Exception:
-                        pass
-                return
+        preset = getattr(self.settings, "RECORDING_COMPRESSION_PRESET", "veryfast")
+        return self._get_compression_queue().queue_compression(video_file, crf, preset)
 
-            # Replace original with compressed file
-            try:
-                backup = video_file.with_suffix(".bak.mp4")
-                video_file.rename(backup)
-                tmp_file.rename(video_file)
-                try:
-                    backup.unlink()
-                except Exception:
-                    logging.debug(f"Could not remove backup {backup}")
-                logging.info(f"Compression completed and replaced original: {video_file.name}")
-            except Exception as e:
-                logging.error(f"Failed to replace original file after compression: {e}")
-                # Cleanup tmp
-                if tmp_file.exists():
-                    try:
-                        tmp_file.unlink()
-                    except Exception:
-                        pass
-
-        except Exception as e:
-            logging.error(f"Unexpected error during compression: {e}", exc_info=True)
+    def get_compression_status(self) -> Optional[Dict[str, Any]]:
+        """Get background compression queue status (pending/active jobs and progress)."""
+        if not self.compression_queue:
+            return None
+        return self.compression_queue.get_queue_status()
 
     def _upload_older_recordings_async(self):
         """Upload older recordings in a background thread."""
@@ -0,0 +1,146 @@
+# WATS_Project/wats_app/recording/rotation_monitor.py
+"""
+Checagem barata de rotação de arquivo.
+
+Antes, o ``SessionRecorder`` chamava ``exists()`` + ``stat()`` no arquivo a
+cada frame capturado (60 syscalls/s a 30 fps, por gravação). O
+``SmartSessionRecorder`` estimava o tamanho por ``frames × 50 KB``, a cada
+iteração do loop.
+
+O ``RotationMonitor`` guarda os contadores do arquivo atual:
+
+- frames escritos, alimentado pela thread do encoder;
+- bytes do arquivo, lidos do contador do próprio writer quando existe
+  (``FFmpegVideoWriter.bytes_written``); sem ele, um ``stat()`` por checagem;
+- tempo desde a abertura do arquivo.
+
+A decisão de rotacionar é avaliada no máximo uma vez por
+``check_interval`` (1 s). Entre uma checagem e outra, ``should_rotate()``
+só compara o relógio.
+
+Na mesma checagem, ``approaching`` indica que o limite (duração, ou tamanho
+projetado pela taxa atual) será atingido em até ``prepare_lead`` segundos:
+é a deixa para abrir o writer do próximo arquivo em segundo plano.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_CHECK_INTERVAL = 1.0
+DEFAULT_PREPARE_LEAD = 5.0
+
+ROTATE_DURATION = "duration"
+ROTATE_SIZE = "size"
+
+
+class RotationMonitor:
+    """Contadores do arquivo atual e checagem de rotação em intervalo fixo."""
+
+    def __init__(
+        self,
+        max_bytes: float,
+        max_duration: float,
+        check_interval: float = DEFAULT_CHECK_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        prepare_lead: float = DEFAULT_PREPARE_LEAD,
+    ):
+        """
+        Args:
+            max_bytes: Tamanho do arquivo que dispara a rotação
+            max_duration: Duração (segundos) que dispara a rotação
+            check_interval: Intervalo mínimo entre checagens (segundos)
+            clock: Relógio monotônico (injetável nos testes)
+            prepare_lead: Antecedência (segundos) com que ``approaching`` liga
+        """
+        self.max_bytes = max_bytes
+        self.max_duration = max_duration
+        self.check_interval = check_interval
+        self.clock = clock
+        self.prepare_lead = prepare_lead
+        self._lock = threading.Lock()
+
+        self.path: Optional[Path] = None
+        self.writer: Any = None
+        self.frames_written = 0
+        self.size_bytes = 0
+        self.checks = 0
+        self.size_probes = 0
+        self.approaching = False
+        self._started = clock()
+        self._next_check = self._started
+
+    def reset(self, path: Optional[Path], writer: Any = None):
+        """Novo arquivo (ou nenhum, com ``path=None``): zera os contadores."""
+        with self._lock:
+            self.path = Path(path) if path else None
+            self.writer = writer
+            self.frames_written = 0
+            self.size_bytes = 0
+            self.approaching = False
+            self._started = self.clock()
+            self._next_check = self._started + self.check_interval
+
+    def on_frame_written(self, count: int = 1):
+        """Chamado pela thread do encoder após cada write()."""
+        with self._lock:
+            self.frames_written += count
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self._started
+
+    def should_rotate(self) -> Optional[str]:
+        """
+        Motivo da rotação (``"duration"``/``"size"``) ou None.
+
+        Fora do intervalo de checagem retorna None sem tocar no disco.
+        """
+        now = self.clock()
+        with self._lock:
+            if self.path is None or now < self._next_check:
+                return None
+            self._next_check = now + self.check_interval
+            self.checks += 1
+
+        elapsed = now - self._started
+        if elapsed >= self.max_duration:
+            return ROTATE_DURATION
+        size = self._refresh_size()
+        if size >= self.max_bytes:
+            return ROTATE_SIZE
+
+        rate = size / elapsed if elapsed > 0 else 0.0
+        self.approaching = (
+            elapsed + self.prepare_lead >= self.max_duration
+            or size + rate * self.prepare_lead >= self.max_bytes
+        )
+        return None
+
+    def _refresh_size(self) -> int:
+        counter = getattr(self.writer, "bytes_written", 0)
+        if isinstance(counter, int) and counter > 0:
+            self.size_bytes = counter
+            return counter
+
+        # Writer sem contador (cv2.VideoWriter): um stat() por checagem
+        path = self.path
+        if path is None:
+            return self.size_bytes
+        self.size_probes += 1
+        try:
+            self.size_bytes = os.stat(path).st_size
+        except OSError:
+            pass
+        return self.size_bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "frames_written": self.frames_written,
+            "size_bytes": self.size_bytes,
+            "elapsed_seconds": round(self.elapsed, 1),
+            "checks": self.checks,
+            "size_probes": self.size_probes,
+        }
@@ -5,7 +5,7 @@ import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import cv2
 import mss
@@ -15,6 +15,27 @@ import win32con
 import win32gui
 import win32process
 
+from .change_detector import DEFAULT_ROW_STRIDE, FrameChangeDetector
+from .dirty_regions import DEFAULT_TILE_SIZE, DirtyRegionConverter
+from .ffmpeg_writer import (
+    DEFAULT_PRESET,
+    ENCODER_FFMPEG,
+    ENCODER_OPENCV,
+    ENCODERS,
+    open_ffmpeg_writer,    write_frame,
+)
+from .frame_buffers import FrameBufferPool, FrameConverter
+from .frame_pipeline import (
+    DEFAULT_FRAME_QUEUE_SIZE,
+    DROP_OLDEST,
+    DROP_POLICIES,
+    REPEAT_FRAME,
+    FramePipeline,
+)
+from .frame_scheduler import FrameScheduler
+from .rotation_monitor import ROTATE_SIZE, RotationMonitor
+from .writer_prefetch import PreparedWriter, WriterPrefetcher
+
 
 class SessionRecorder:
     """
@@ -36,6 +57,15 @@ class SessionRecorder:
         resolution_scale: float = 1.0,
         recording_mode: str = "full_screen",
         force_window_maximized: bool = True,
+        frame_queue_size: int = DEFAULT_FRAME_QUEUE_SIZE,
+        frame_drop_policy: str = DROP_OLDEST,
+        skip_unchanged_frames: bool = True,
+        change_detection_stride: int = DEFAULT_ROW_STRIDE,
+        encoder: str = ENCODER_FFMPEG,
+        encoder_preset: str = DEFAULT_PRESET,
+        ffmpeg_path: Optional[str] = None,
+        dirty_region_capture: bool = False,
+        dirty_tile_size: int = DEFAULT_TILE_SIZE,
     ):
         """
         Initialize the session recorder.
@@ -49,6 +79,15 @@ class SessionRecorder:
             resolution_scale: Scale factor for resolution (1.0 = full, 0.5 = half)
             recording_mode: "full_screen", "rdp_window", or "active_window"
             force_window_maximized: Force RDP window to be maximized (prevents FFmpeg errors)
+            frame_queue_size: Frames buffered between capture and encoder threads
+            frame_drop_policy: "drop_oldest" or "duplicate_last" when the buffer is full
+            skip_unchanged_frames: Send a repeat marker instead of converting/encoding a static screen
+            change_detection_stride: Row sampling stride for the change detector
+            encoder: "ffmpeg" (pipe to libx264, final file in one pass) or "opencv" (VideoWriter)
+            encoder_preset: libx264 preset used by the ffmpeg encoder (CRF comes from quality)
+            ffmpeg_path: ffmpeg executable (default: looked up in PATH)
+            dirty_region_capture: Only convert the tiles that changed since the previous frame
+            dirty_tile_size: Tile size (pixels) for dirty region tracking
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -67,13 +106,52 @@ class SessionRecorder:
             logging.warning(f"Invalid recording mode '{recording_mode}', using 'full_screen'")
             self.recording_mode = "full_screen"
 
+        # Capture/encode pipeline settings
+        self.frame_queue_size = max(1, int(frame_queue_size))
+        self.frame_drop_policy = frame_drop_policy
+        if self.frame_drop_policy not in DROP_POLICIES:
+            logging.warning(f"Invalid frame drop policy '{frame_drop_policy}', using '{DROP_OLDEST}'")
+            self.frame_drop_policy = DROP_OLDEST
+        # Encoder backend; falls back to OpenCV when ffmpeg can't be started
+        self.encoder = encoder.lower()
+        if self.encoder not in ENCODERS:
+            logging.warning(f"Invalid encoder '{encoder}', using '{ENCODER_FFMPEG}'")
+            self.encoder = ENCODER_FFMPEG
+        self.encoder_preset = encoder_preset
+        self.ffmpeg_path = ffmpeg_path
+        self.encoder_backend: Optional[str] = None
+        # Frame buffers reused between the capture and encoder threads
+        self.frame_buffer_pool = FrameBufferPool()
+        if dirty_region_capture:
+            # Large captures where little changes: convert only the changed tiles
+            self.frame_converter = DirtyRegionConverter(
+                self.frame_buffer_pool,
+                self.resolution_scale,
+                tile_size=dirty_tile_size,
+                sample_stride=change_detection_stride,
+            )
+        else:
+            self.frame_converter = FrameConverter(self.frame_buffer_pool, self.resolution_scale)
+        self.change_detector: Optional[FrameChangeDetector] = (
+            FrameChangeDetector(change_detection_stride) if skip_unchanged_frames else None
+        )
+
         # Recording state
         self.is_recording = False
         self.recording_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
 
         # Current recording info
-        self.current_writer: Optional[cv2.VideoWriter] = None
+        self.current_writer: Optional[Any] = None
+        # Writer is used by the encoder thread; rotation/cleanup come from other threads
+        self._writer_lock = threading.RLock()
+        self.frame_pipeline: Optional[FramePipeline] = None
+        self.frame_scheduler: Optional[FrameScheduler] = None
+        # Size/duration of the current file, checked about once per second
+        self.rotation_monitor = RotationMonitor(self.max_file_size, self.max_duration)
+        # Next file's writer is opened ahead of time; the encoder switches between two frames
+        self.writer_prefetcher = WriterPrefetcher("SessionWriterPrefetch")
+        self._rotation_pending = False
         self.current_file: Optional[Path] = None
         self.recording_start_time: Optional[float] = None
         self.session_id: Optional[str] = None
@@ -93,7 +171,8 @@ class SessionRecorder:
         logging.info(
             f"SessionRecorder initialized - Output: {self.output_dir}, "
             f"Max size: {max_file_size_mb}MB, Max duration: {max_duration_minutes}min, "
-            f"FPS: {fps}, Quality: {quality}, Scale: {resolution_scale}, Mode: {self.recording_mode}")
+            f"FPS: {fps}, Quality: {quality}, Scale: {resolution_scale}, Mode: {self.recording_mode}, "
+            f"Encoder: {self.encoder}")
 
     def _get_monitor_config(self) -> Dict[str, int]:
         """Get monitor configuration based on recording mode."""
@@ -200,7 +279,11 @@ class SessionRecorder:
         """
         try:
             logging.info(f"🔄 Recriando VideoWriter com novas dimensões: {width}x{height}")
-            
+
+            # Writer preparado para a rotação tem as dimensões antigas
+            self.writer_prefetcher.discard()
+            self._rotation_pending = False
+
             # Fecha writer atual
             if self.current_writer:
                 self.current_writer.release()
@@ -213,23 +296,13 @@ class SessionRecorder:
             
             self.current_file = self.output_dir / filename
             
-            # Cria novo VideoWriter. Tenta codec primário e fallbacks se necessário.
-            tried_codecs = []
-            for codec in ("mp4v", "XVID", "avc1"):
-                tried_codecs.append(codec)
-                fourcc = cv2.VideoWriter_fourcc(*codec)
-                self.current_writer = cv2.VideoWriter(
-                    str(self.current_file), fourcc, self.fps, (width, height)
-                )
-                if self.current_writer.isOpened():
-                    logging.info(f"✅ Novo VideoWriter criado com codec {codec}: {self.current_file}")
-                    break
-
-            if not self.current_writer or not self.current_writer.isOpened():
-                raise Exception(f"Failed to open new VideoWriter (tried: {tried_codecs})")
+            # Cria novo writer (ffmpeg ou VideoWriter com fallbacks de codec)
+            self.current_writer = self._open_video_writer(width, height)
+            logging.info(f"✅ Novo writer criado ({self.encoder_backend}): {self.current_file}")
 
-            # Reseta tempo de início do arquivo atual
+            # Reseta tempo de início e contadores do arquivo atual
             self.recording_start_time = time.time()
+            self.rotation_monitor.reset(self.current_file, self.current_writer)
 
             # Atualiza dimensões conhecidas para evitar mismatch entre writer e frames
             try:
@@ -579,6 +652,7 @@ class SessionRecorder:
                 "recorder_settings": {
                     "fps": self.fps,
                     "quality": self.quality,
+                    "encoder": self.encoder,
                     "resolution_scale": self.resolution_scale,
                     "max_file_size_mb": self.max_file_size / (1024 * 1024),
                     "max_duration_minutes": self.max_duration / 60,
@@ -648,36 +722,64 @@ class SessionRecorder:
         try:
             self._create_new_video_file(session_id, connection_info)
 
-            frame_interval = 1.0 / self.fps
-            last_frame_time = time.time()
+            # Encoder thread drains captured frames so a slow write() doesn't stall capture
+            self.frame_pipeline = FramePipeline(
+                self._write_frame,
+                maxsize=self.frame_queue_size,
+                drop_policy=self.frame_drop_policy,
+                name=f"SessionEncoder-{session_id}",
+                release=self.frame_buffer_pool.release,
+                sink_repeats=True,
+            )
+            self.frame_pipeline.start()
 
-            while not self.stop_event.is_set():
-                current_time = time.time()
+            # Absolute deadlines on the monotonic clock: one wakeup per frame, no drift
+            self.frame_scheduler = FrameScheduler(self.fps)
+            self.frame_scheduler.start()
+            if self.change_detector:
+                self.change_detector.reset()
 
-                # Check if we need to capture a frame
-                if current_time - last_frame_time >= frame_interval:
-                    self._capture_and_write_frame(thread_sct)
-                    last_frame_time = current_time
+            while True:
+                pts = self.frame_scheduler.wait(self.stop_event)
+                if pts is None:
+                    break
 
-                    # Check if we need to rotate the file
-                    if self._should_rotate_file():
-                        self._rotate_video_file(session_id, connection_info)
+                frame = self._capture_frame(thread_sct)
+                if frame is not None:
+                    self.frame_pipeline.submit(frame, pts)
 
-                # Small sleep to prevent excessive CPU usage
-                time.sleep(0.01)
+                # Check if we need to rotate the file
+                if self._should_rotate_file():
+                    self._rotate_video_file(session_id, connection_info)
+                elif self.rotation_monitor.approaching:
+                    self._prepare_next_video_file(session_id, connection_info)
 
         except Exception as e:
             logging.error(f"Error in recording loop: {e}")
         finally:
+            # Write out queued frames before releasing the writer
+            if self.frame_pipeline:
+                self.frame_pipeline.stop()
+            if self.frame_scheduler:
+                self.frame_scheduler.stop()
+                logging.info(f"Recording cadence: {self.frame_scheduler.get_stats()}")
+            if self.change_detector:
+                logging.info(f"Unchanged frames skipped: {self.change_detector.get_stats()}")
             # Clean up thread-specific MSS instance
             try:
                 thread_sct.close()
             except Exception as e:
                 logging.warning(f"Error closing MSS instance: {e}")
+            self.writer_prefetcher.close()
+            self._rotation_pending = False
             self._cleanup_current_recording()
 
-    def _capture_and_write_frame(self, sct_instance):
-        """Capture a screen frame and write it to the video file."""
+    def _capture_frame(self, sct_instance) -> Optional[np.ndarray]:
+        """
+        Capture a screen frame (BGR, scaled) for the encoder thread.
+
+        Returns REPEAT_FRAME when the screen did not change since the last frame.
+        """
         try:
             # Update window position if recording specific window
             if self.recording_mode in ["rdp_window", "active_window"] and self.target_window_handle:
@@ -703,22 +805,30 @@ class SessionRecorder:
             # Capture screen/window using thread-specific MSS instance
             screenshot = sct_instance.grab(self.monitor)
 
-            # Convert to numpy array
-            frame = np.array(screenshot)
+            # BGRA view over the MSS buffer (no copy)
+            bgra = self.frame_converter.wrap(screenshot)
 
-            # Convert BGRA to BGR for OpenCV
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            # Static screen: skip conversion/resize, the encoder repeats the last frame
+            if self.change_detector and not self.change_detector.has_changed(bgra):
+                return REPEAT_FRAME
+
+            # Scale (if configured) and convert BGRA to BGR into a pooled buffer
+            return self.frame_converter.convert(bgra)
+
+        except Exception as e:
+            logging.error(f"Error capturing frame: {e}")
+            return None
+
+    def _write_frame(self, frame: np.ndarray, repeats: int = 1):
+        """Write a captured frame (``repeats`` times) to the video file, on the encoder thread."""
+        with self._writer_lock:
+            # Rotation requested: switch to the pre-opened writer before this frame
+            if self._rotation_pending:
+                self._swap_to_next_video_file()
 
-            # Resize if scaling is applied
-            if self.resolution_scale != 1.0:
-                height, width = frame.shape[:2]
-                new_width = int(width * self.resolution_scale)
-                new_height = int(height * self.resolution_scale)
-                frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            
             # Obtém dimensões finais do frame
             final_height, final_width = frame.shape[:2]
-            
+
             # Verifica se as dimensões mudaram (janela foi redimensionada ou movida)
             if self._check_window_dimension_change(final_width, final_height):
                 logging.warning(
@@ -741,7 +851,8 @@ class SessionRecorder:
             # Write frame to video
             if self.current_writer:
                 try:
-                    self.current_writer.write(frame)
+                    write_frame(self.current_writer, frame, repeats)
+                    self.rotation_monitor.on_frame_written(repeats)
                 except Exception as write_error:
                     logging.error(
                         f"❌ Erro ao escrever frame (FFmpeg/OpenCV): {write_error}. "
@@ -776,9 +887,6 @@ class SessionRecorder:
                     except Exception as recreate_exc:
                         logging.error(f"Falha ao recriar VideoWriter: {recreate_exc}", exc_info=True)
 
-        except Exception as e:
-            logging.error(f"Error capturing frame: {e}")
-
     def _create_new_video_file(self, session_id: str, connection_info: Dict[str, Any]):
         """Create a new video file for recording."""
         try:
@@ -798,22 +906,12 @@ class SessionRecorder:
                 width = int(width * self.resolution_scale)
                 height = int(height * self.resolution_scale)
 
-            # Create VideoWriter with preferred codecs and fallback if needed
-            tried_codecs = []
-            for codec in ("mp4v", "XVID", "avc1"):
-                tried_codecs.append(codec)
-                fourcc = cv2.VideoWriter_fourcc(*codec)
-                self.current_writer = cv2.VideoWriter(
-                    str(self.current_file), fourcc, self.fps, (width, height)
-                )
-                if self.current_writer.isOpened():
-                    logging.info(
-                        f"Created new video file: {self.current_file} (dimensions: {width}x{height}, codec={codec})"
-                    )
-                    break
-
-            if not self.current_writer or not self.current_writer.isOpened():
-                raise Exception(f"Failed to open VideoWriter (tried: {tried_codecs})")
+            self.current_writer = self._open_video_writer(width, height)
+            self.rotation_monitor.reset(self.current_file, self.current_writer)
+            logging.info(
+                f"Created new video file: {self.current_file} "
+                f"(dimensions: {width}x{height}, encoder={self.encoder_backend})"
+            )
 
             # Store writer dimensions to prevent unexpected mismatches
             self.last_frame_width = int(width)
@@ -823,46 +921,138 @@ class SessionRecorder:
             logging.error(f"Error creating video file: {e}", exc_info=True)
             raise
 
+    def _open_video_writer(self, width: int, height: int):
+        """Open a writer for self.current_file and record its encoder backend."""
+        writer, self.encoder_backend = self._open_writer(self.current_file, width, height)
+        return writer
+
+    def _open_writer(self, path: Path, width: int, height: int) -> Tuple[Any, str]:
+        """
+        Open a writer for path and return it with its encoder backend.
+
+        With the ffmpeg encoder, frames are piped to libx264 and the file is
+        already compressed when closed. Otherwise (or if ffmpeg can't be
+        started) falls back to OpenCV's VideoWriter with codec fallbacks.
+        """
+        if self.encoder == ENCODER_FFMPEG:
+            writer = open_ffmpeg_writer(
+                path,
+                self.fps,
+                (width, height),
+                crf=self.quality,
+                preset=self.encoder_preset,
+                ffmpeg_path=self.ffmpeg_path,
+            )
+            if writer:
+                return writer, ENCODER_FFMPEG
+            logging.warning("ffmpeg encoder unavailable, falling back to OpenCV VideoWriter")
+
+        tried_codecs = []
+        for codec in ("mp4v", "XVID", "avc1"):
+            tried_codecs.append(codec)
+            fourcc = cv2.VideoWriter_fourcc(*codec)
+            writer = cv2.VideoWriter(str(path), fourcc, self.fps, (width, height))
+            if writer.isOpened():
+                logging.debug(f"VideoWriter opened with codec {codec}")
+                return writer, ENCODER_OPENCV
+
+        raise Exception(f"Failed to open VideoWriter (tried: {tried_codecs})")
+
     def _should_rotate_file(self) -> bool:
-        """Check if the current file should be rotated."""
+        """Check if the current file should be rotated (evaluated at most once per second)."""
         if not self.current_file or not self.recording_start_time:
             return False
 
-        # Check file size
-        try:
-            if self.current_file.exists():
-                file_size = self.current_file.stat().st_size
-                if file_size >= self.max_file_size:
-                    logging.info(f"Rotating file due to size: {file_size / (1024*1024):.1f}MB")
-                    return True
-        except Exception as e:
-            logging.error(f"Error checking file size: {e}")
+        reason = self.rotation_monitor.should_rotate()
+        if reason == ROTATE_SIZE:
+            logging.info(
+                f"Rotating file due to size: {self.rotation_monitor.size_bytes / (1024*1024):.1f}MB"
+            )
+        elif reason:
+            logging.info(
+                f"Rotating file due to duration: {self.rotation_monitor.elapsed / 60:.1f}min"
+            )
+        return reason is not None
 
-        # Check duration
-        elapsed_time = time.time() - self.recording_start_time
-        if elapsed_time >= self.max_duration:
-            logging.info(f"Rotating file due to duration: {elapsed_time / 60:.1f}min")
-            return True
+    def _prepare_next_video_file(self, session_id: str, connection_info: Dict[str, Any]):
+        """Open the next file's writer on a helper thread, ahead of the rotation."""
+        if self.writer_prefetcher.pending or self.writer_prefetcher.ready:
+            return
+        if self.last_frame_width is None or self.last_frame_height is None:
+            return
 
-        return False
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        connection_name = connection_info.get("name", "Unknown").replace(" ", "_")
+        path = self.output_dir / f"{session_id}_{connection_name}_{timestamp}.mp4"
+        if path.exists():
+            # Same second as the file being written
+            path = path.with_name(f"{path.stem}_next{path.suffix}")
+        # Same dimensions as the frames currently being written
+        frame_size = (self.last_frame_width, self.last_frame_height)
+
+        def open_next() -> PreparedWriter:
+            writer, backend = self._open_writer(path, *frame_size)
+            return PreparedWriter(path, writer, frame_size, backend)
+
+        if self.writer_prefetcher.prepare(open_next):
+            logging.debug(f"Opening next video file in background: {path}")
 
     def _rotate_video_file(self, session_id: str, connection_info: Dict[str, Any]):
-        """Rotate to a new video file."""
+        """
+        Rotate to a new video file without a gap.
+
+        The next writer is normally already open (see _prepare_next_video_file);
+        the encoder thread switches to it between two frames, so no frame is
+        lost and capture never waits for a file to be opened or closed.
+        """
         try:
-            self._cleanup_current_recording()
-            self._create_new_video_file(session_id, connection_info)
+            self._prepare_next_video_file(session_id, connection_info)
+            self._rotation_pending = True
         except Exception as e:
             logging.error(f"Error rotating video file: {e}")
 
+    def _swap_to_next_video_file(self):
+        """Switch to the pre-opened writer (encoder thread, under the writer lock)."""
+        if self.writer_prefetcher.pending:
+            # Still opening: keep writing to the current file
+            return
+        self._rotation_pending = False
+
+        prepared = self.writer_prefetcher.take()
+        if prepared is None:
+            logging.warning("Next video file could not be opened in background, rotating inline")
+            connection_info = {
+                "name": getattr(self, "current_connection_name", "Unknown"),
+                "ip": getattr(self, "current_connection_ip", "Unknown"),
+            }
+            self._cleanup_current_recording()
+            self._create_new_video_file(self.session_id or "unknown", connection_info)
+            return
+
+        old_writer, old_file = self.current_writer, self.current_file
+        self.current_writer = prepared.writer
+        self.current_file = prepared.path
+        self.encoder_backend = prepared.encoder
+        self.recording_start_time = time.time()
+        self.rotation_monitor.reset(prepared.path, prepared.writer)
+        self.last_frame_width, self.last_frame_height = prepared.frame_size
+
+        # Closing (ffmpeg flush / container index) happens off the encoder thread
+        if old_writer:
+            self.writer_prefetcher.retire(old_writer)
+        logging.info(f"Rotated video file: {old_file} -> {prepared.path}")
+
     def _cleanup_current_recording(self):
         """Clean up the current recording resources."""
         try:
-            if self.current_writer:
-                self.current_writer.release()
-                self.current_writer = None
+            with self._writer_lock:
+                if self.current_writer:
+                    self.current_writer.release()
+                    self.current_writer = None
 
-            self.current_file = None
-            self.recording_start_time = None
+                self.current_file = None
+                self.recording_start_time = None
+                self.rotation_monitor.reset(None)
 
         except Exception as e:
             logging.error(f"Error cleaning up recording: {e}")
@@ -880,8 +1070,21 @@ class SessionRecorder:
                 time.time() - self.recording_start_time if self.recording_start_time else 0
             ),
             "output_directory": str(self.output_dir),
+            "encoder": self.encoder_backend,
         }
 
+        if self.frame_pipeline:
+            info["pipeline"] = self.frame_pipeline.get_stats()
+            info["frame_buffers"] = self.frame_buffer_pool.get_stats()
+        if self.frame_scheduler:
+            info["cadence"] = self.frame_scheduler.get_stats()
+        if self.change_detector:
+            info["change_detection"] = self.change_detector.get_stats()
+        if isinstance(self.frame_converter, DirtyRegionConverter):
+            info["dirty_regions"] = self.frame_converter.get_stats()
+        info["rotation"] = self.rotation_monitor.get_stats()
+        info["writer_prefetch"] = self.writer_prefetcher.get_stats()
+
         if self.current_file and self.current_file.exists():
             try:
                 info["current_file_size"] = self.current_file.stat().st_size
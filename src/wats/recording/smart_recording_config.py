@@ -32,9 +32,18 @@ SMART_RECORDING_DEFAULTS = {
     "fps": 30,  # Frames per second
     "quality": 75,  # Recording quality (0-100)
     "resolution_scale": 1.0,  # Resolution scaling factor
-    "compression_enabled": True,  # Enable post-recording compression
-    "compression_crf": 28,  # H.264 CRF value for compression
-    "compression_preset": "veryfast",  # ffmpeg preset for compression
+    "frame_queue_size": 10,  # Frames buffered between capture and encoder threads
+    "frame_drop_policy": "drop_oldest",  # "drop_oldest" or "duplicate_last" when buffer is full
+    "skip_unchanged_frames": True,  # Repeat last frame instead of re-encoding a static screen
+    "change_detection_stride": 4,  # Row sampling stride for change detection
+    "dirty_region_capture": False,  # Convert only the tiles that changed (large captures)
+    "dirty_tile_size": 64,  # Tile size in pixels for dirty region tracking
+    "encoder": "ffmpeg",  # "ffmpeg" (libx264 pipe, one pass) or "opencv" (VideoWriter)
+    "ffmpeg_path": "",  # ffmpeg executable (empty = look up in PATH)
+    "encoder_auto_tune": True,  # Pick codec/preset from the cached per-machine calibration
+    "compression_enabled": True,  # Enable post-recording compression (OpenCV files only)
+    "compression_crf": 28,  # H.264 CRF value for the ffmpeg encoder and compression
+    "compression_preset": "veryfast",  # libx264 preset for the ffmpeg encoder and compression
     # Debug and logging settings
     "debug_window_tracking": False,  # Enable debug logging for window tracking
     "debug_activity_monitoring": False,  # Enable debug logging for activity
@@ -68,6 +77,20 @@ def get_smart_recording_config(
             "resolution_scale": "resolution_scale",
             "max_file_size_mb": "max_file_size_mb",
             "max_duration_minutes": "max_file_duration_minutes",
+            "frame_queue_size": "frame_queue_size",
+            "frame_drop_policy": "frame_drop_policy",
+            "skip_unchanged_frames": "skip_unchanged_frames",
+            "change_detection_stride": "change_detection_stride",
+            "dirty_region_capture": "dirty_region_capture",
+            "dirty_tile_size": "dirty_tile_size",
+            "encoder": "encoder",
+            "ffmpeg_path": "ffmpeg_path",
+            "encoder_auto_tune": "encoder_auto_tune",
+            "compression": {
+                "enabled": "compression_enabled",
+                "crf": "compression_crf",
+                "preset": "compression_preset",
+            },
             # Smart recording specific settings
             "smart_recording": {
                 "window_tracking_interval": "window_tracking_interval",
@@ -99,6 +122,13 @@ def get_smart_recording_config(
                 if config_key in smart_config:
                     config[internal_key] = smart_config[config_key]
 
+        # Apply encoder compression settings
+        if isinstance(config_dict.get("compression"), dict):
+            compression_config = config_dict["compression"]
+            for config_key, internal_key in config_mappings["compression"].items():
+                if config_key in compression_config:
+                    config[internal_key] = compression_config[config_key]
+
     # Then, apply user_settings overrides if provided
     if user_settings:
         # Map settings attributes to config keys
@@ -114,8 +144,18 @@ def get_smart_recording_config(
             "RECORDING_FPS": "fps",
             "RECORDING_QUALITY": "quality",
             "RECORDING_RESOLUTION_SCALE": "resolution_scale",
+            "RECORDING_FRAME_QUEUE_SIZE": "frame_queue_size",
+            "RECORDING_FRAME_DROP_POLICY": "frame_drop_policy",
+            "RECORDING_SKIP_UNCHANGED_FRAMES": "skip_unchanged_frames",
+            "RECORDING_CHANGE_DETECTION_STRIDE": "change_detection_stride",
+            "RECORDING_DIRTY_REGION_CAPTURE": "dirty_region_capture",
+            "RECORDING_DIRTY_TILE_SIZE": "dirty_tile_size",
             "RECORDING_COMPRESSION_ENABLED": "compression_enabled",
             "RECORDING_COMPRESSION_CRF": "compression_crf",
+            "RECORDING_COMPRESSION_PRESET": "compression_preset",
+            "RECORDING_ENCODER": "encoder",
+            "RECORDING_FFMPEG_PATH": "ffmpeg_path",
+            "RECORDING_ENCODER_AUTO_TUNE": "encoder_auto_tune",
             "RECORDING_DEBUG_WINDOW_TRACKING": "debug_window_tracking",
             "RECORDING_DEBUG_ACTIVITY_MONITORING": "debug_activity_monitoring",
         }
@@ -152,6 +192,15 @@ def validate_smart_recording_config(config: dict) -> tuple[bool, list]:
     if config.get("resolution_scale", 0) <= 0 or config.get("resolution_scale", 0) > 2.0:
         errors.append("Resolution scale must be between 0.1 and 2.0")
 
+    if config.get("frame_queue_size", 1) < 1:
+        errors.append("Frame queue size must be at least 1")
+
+    if config.get("frame_drop_policy", "drop_oldest") not in ("drop_oldest", "duplicate_last"):
+        errors.append("Frame drop policy must be 'drop_oldest' or 'duplicate_last'")
+
+    if config.get("dirty_tile_size", 64) < 8:
+        errors.append("Dirty tile size must be at least 8 pixels")
+
     if config.get("inactivity_timeout_minutes", 0) < 1:
         errors.append("Inactivity timeout must be at least 1 minute")
 
@@ -164,6 +213,9 @@ def validate_smart_recording_config(config: dict) -> tuple[bool, list]:
     if config.get("window_tracking_interval", 0) < 0.1:
         errors.append("Window tracking interval must be at least 0.1 seconds")
 
+    if config.get("encoder", "ffmpeg") not in ("ffmpeg", "opencv"):
+        errors.append("Encoder must be 'ffmpeg' or 'opencv'")
+
     # Validate compression settings
     crf = config.get("compression_crf", 23)
     if crf < 0 or crf > 51:
@@ -197,7 +249,16 @@ def create_default_config_file(file_path: str):
             "fps": "Frames per second for recording",
             "quality": "Recording quality (0-100, higher is better)",
             "resolution_scale": "Scale factor for recording resolution",
-            "compression_enabled": "Enable post-recording compression",
+            "frame_queue_size": "Frames buffered between capture and encoder threads",
+            "frame_drop_policy": "What to lose when the frame buffer is full (drop_oldest/duplicate_last)",
+            "skip_unchanged_frames": "Repeat the last frame instead of re-encoding a static screen",
+            "change_detection_stride": "Row sampling stride for change detection (1 = every row)",
+            "dirty_region_capture": "Only convert the screen tiles that changed (large captures)",
+            "dirty_tile_size": "Tile size in pixels for dirty region tracking",
+            "encoder": "ffmpeg (libx264 pipe, compressed file in one pass) or opencv (VideoWriter)",
+            "ffmpeg_path": "ffmpeg executable (empty = look up in PATH)",
+            "encoder_auto_tune": "Pick codec/preset from a cached per-machine encoder benchmark",
+            "compression_enabled": "Enable post-recording compression (OpenCV files only)",
             "compression_cr": "H.264 CRF value (0-51, lower is better quality)",
         },
     }
@@ -14,7 +14,31 @@ import mss
 import numpy as np
 
 from .codec_installer import ensure_codecs_installed
+from .change_detector import DEFAULT_ROW_STRIDE, FrameChangeDetector
+from .dirty_regions import DEFAULT_TILE_SIZE, DirtyRegionConverter
+from .encoder_calibration import EncoderCalibrator
+from .ffmpeg_writer import (
+    DEFAULT_CRF,
+    DEFAULT_PRESET,
+    ENCODER_FFMPEG,
+    ENCODER_OPENCV,
+    ENCODERS,
+    find_ffmpeg,
+    open_ffmpeg_writer,
+    write_frame,
+)
+from .frame_buffers import FrameBufferPool, FrameConverter
+from .frame_pipeline import (
+    DEFAULT_FRAME_QUEUE_SIZE,
+    DROP_OLDEST,
+    DROP_POLICIES,
+    REPEAT_FRAME,
+    FramePipeline,
+)
+from .frame_scheduler import FrameScheduler
 from .interactivity_monitor import ActivityEvent, InteractivityMonitor
+from .rotation_monitor import RotationMonitor
+from .writer_prefetch import PreparedWriter, WriterPrefetcher
 from .window_tracker import WindowInfo, WindowState, WindowTracker
 
 
@@ -38,6 +62,7 @@ class RecordingSegment:
     reason: str
     frame_count: int
     size_bytes: int
+    encoder: str = ENCODER_OPENCV
 
 
 class SmartSessionRecorder:
@@ -96,7 +121,11 @@ class SmartSessionRecorder:
         self.interactivity_monitor: Optional[InteractivityMonitor] = None
 
         # Gravação
-        self.current_writer: Optional[cv2.VideoWriter] = None
+        self.current_writer: Optional[Any] = None
+        # O writer é usado pela thread do encoder; pausas/rotações vêm de outras threads
+        self._writer_lock = threading.RLock()
+        self.frame_pipeline: Optional[FramePipeline] = None
+        self.frame_scheduler: Optional[FrameScheduler] = None
         self.recording_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
         self.pause_event = threading.Event()
@@ -110,6 +139,57 @@ class SmartSessionRecorder:
         self.pause_on_minimized = self.config.get("pause_on_minimized", True)
         self.pause_on_covered = self.config.get("pause_on_covered", True)
         self.max_file_duration = self.config.get("max_file_duration_minutes", 30) * 60
+        # Tamanho/duração do segmento atual, checados ~1x por segundo
+        self.rotation_monitor = RotationMonitor(
+            self.config.get("max_file_size_mb", 100) * 1024 * 1024, self.max_file_duration
+        )
+        # Próximo segmento aberto com antecedência; o encoder troca entre dois frames
+        self.writer_prefetcher = WriterPrefetcher("SmartWriterPrefetch")
+        self._rotation_pending = False
+        self._rotation_reason = "file_rotation"
+        self.frame_queue_size = max(
+            1, int(self.config.get("frame_queue_size", DEFAULT_FRAME_QUEUE_SIZE))
+        )
+        self.frame_drop_policy = self.config.get("frame_drop_policy", DROP_OLDEST)
+        if self.frame_drop_policy not in DROP_POLICIES:
+            logging.warning(
+                f"Política de descarte inválida '{self.frame_drop_policy}', usando '{DROP_OLDEST}'"
+            )
+            self.frame_drop_policy = DROP_OLDEST
+        # Encoder: ffmpeg (libx264 por pipe, arquivo final em uma passada) ou OpenCV
+        self.encoder = str(self.config.get("encoder", ENCODER_FFMPEG)).lower()
+        if self.encoder not in ENCODERS:
+            logging.warning(f"Encoder inválido '{self.encoder}', usando '{ENCODER_FFMPEG}'")
+            self.encoder = ENCODER_FFMPEG
+        self.ffmpeg_path = self.config.get("ffmpeg_path") or None
+        self.encoder_crf = int(self.config.get("compression_crf", DEFAULT_CRF))
+        self.encoder_preset = self.config.get("compression_preset", DEFAULT_PRESET)
+        # Calibração por máquina (cache); sem cache, vale a ordem padrão de codecs
+        self.encoder_calibrator: Optional[EncoderCalibrator] = None
+        if self.config.get("encoder_auto_tune", True):
+            self.encoder_calibrator = EncoderCalibrator(ffmpeg_path=self.ffmpeg_path)
+        # Buffers de frame reaproveitados entre captura e encoder
+        self.frame_buffer_pool = FrameBufferPool()
+        if self.config.get("dirty_region_capture", False):
+            # Captura grande com pouca mudança: só os tiles alterados são convertidos
+            self.frame_converter = DirtyRegionConverter(
+                self.frame_buffer_pool,
+                self.resolution_scale,
+                interpolation=cv2.INTER_LINEAR,
+                tile_size=self.config.get("dirty_tile_size", DEFAULT_TILE_SIZE),
+                sample_stride=self.config.get("change_detection_stride", DEFAULT_ROW_STRIDE),
+            )
+        else:
+            self.frame_converter = FrameConverter(
+                self.frame_buffer_pool, self.resolution_scale, interpolation=cv2.INTER_LINEAR
+            )
+
+        # Tela parada: marcador de repetição em vez de converter/codificar o frame
+        self.change_detector: Optional[FrameChangeDetector] = None
+        if self.config.get("skip_unchanged_frames", True):
+            self.change_detector = FrameChangeDetector(
+                self.config.get("change_detection_stride", DEFAULT_ROW_STRIDE)
+            )
 
         # Callbacks
         self.on_recording_started: Optional[Callable[[str], None]] = None
@@ -293,80 +373,136 @@ class SmartSessionRecorder:
                 if self.interactivity_monitor
                 else None
             ),
+            "pipeline": self.frame_pipeline.get_stats() if self.frame_pipeline else None,
+            "frame_buffers": self.frame_buffer_pool.get_stats(),
+            "encoder": self.current_segment.encoder if self.current_segment else self.encoder,
+            "cadence": self.frame_scheduler.get_stats() if self.frame_scheduler else None,
+            "rotation": self.rotation_monitor.get_stats(),
+            "writer_prefetch": self.writer_prefetcher.get_stats(),
+            "change_detection": (
+                self.change_detector.get_stats() if self.change_detector else None
+            ),
+            "dirty_regions": (
+                self.frame_converter.get_stats()
+                if isinstance(self.frame_converter, DirtyRegionConverter)
+                else None
+            ),
         }
 
     def _recording_loop(self):
         """Loop principal de gravação."""
         thread_sct = mss.mss()
 
+        # Encoder em thread própria: um write() lento não atrasa a captura
+        self.frame_pipeline = FramePipeline(
+            self._write_frame,
+            maxsize=self.frame_queue_size,
+            drop_policy=self.frame_drop_policy,
+            name="SmartSessionEncoder",
+            release=self.frame_buffer_pool.release,
+            sink_repeats=True,
+        )
+        self.frame_pipeline.start()
+
+        # Deadlines absolutos no relógio monotônico: o tempo de captura não atrasa o FPS
+        self.frame_scheduler = FrameScheduler(self.fps)
+        self.frame_scheduler.start()
+
         try:
-            while not self.stop_event.is_set():
+            while True:
+                # Aguarda o deadline do próximo frame
+                pts = self.frame_scheduler.wait(self.stop_event)
+                if pts is None:
+                    break
+
                 try:
                     if self.state == RecordingState.RECORDING:
-                        # Grava frame se não estiver pausado
+                        # Captura frame se não estiver pausado
                         if not self.pause_event.is_set():
-                            self._capture_and_write_frame(thread_sct)
+                            frame = self._capture_frame(thread_sct)
+                            if frame is not None:
+                                self.frame_pipeline.submit(frame, pts)
 
                         # Verifica se deve rotacionar arquivo
                         if self._should_rotate_file():
                             self._rotate_to_new_segment("file_rotation")
-
-                    # Aguarda próximo frame
-                    time.sleep(1.0 / self.fps)
+                        elif self.rotation_monitor.approaching:
+                            self._prepare_next_segment()
 
                 except Exception as e:
                     logging.error(f"Error in recording loop: {e}")
-                    time.sleep(1.0)
+                    if self.stop_event.wait(1.0):
+                        break
 
         except Exception as e:
             logging.error(f"Fatal error in recording loop: {e}")
         finally:
+            # Grava os frames ainda na fila antes de liberar o writer
+            self.frame_pipeline.stop()
+            self.frame_scheduler.stop()
+            logging.info(f"Cadência da gravação: {self.frame_scheduler.get_stats()}")
+            if self.change_detector:
+                logging.info(f"Frames sem mudança: {self.change_detector.get_stats()}")
             thread_sct.close()
             self._cleanup_current_writer()
 
-    def _capture_and_write_frame(self, sct_instance):
-        """Captura e escreve um frame."""
+    def _capture_frame(self, sct_instance) -> Optional[np.ndarray]:
+        """
+        Captura um frame (BGR, redimensionado) para a thread do encoder.
+
+        Retorna REPEAT_FRAME se a tela não mudou desde o frame anterior.
+        """
         try:
             if not self.current_writer or not self.window_tracker:
-                return
+                return None
 
             # Obtém área de gravação
             recording_rect = self.window_tracker.get_window_recording_rect()
             if not recording_rect:
-                return
+                return None
 
             # Captura tela
             screenshot = sct_instance.grab(recording_rect)
 
-            # Converte screenshot para array numpy (método compatível com versões recentes do MSS)
-            frame = np.array(screenshot)
+            # Vista BGRA sobre o buffer do MSS, sem cópia
+            bgra = self.frame_converter.wrap(screenshot)
 
-            # Converte BGRA para BGR (remove canal alpha se presente)
-            if frame.shape[2] == 4:  # BGRA
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-            elif frame.shape[2] == 3:  # RGB
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            # Tela parada: o encoder repete o último frame, sem conversão nem resize
+            if self.change_detector and not self.change_detector.has_changed(bgra):
+                return REPEAT_FRAME
 
+            # Redimensiona (se necessário) e converte BGRA → BGR num buffer do pool
+            frame = self.frame_converter.convert(bgra)
             logging.debug(f"📸 Frame capturado: {frame.shape}, dtype: {frame.dtype}")
 
-            # Redimensiona se necessário
-            if self.resolution_scale != 1.0:
-                height, width = frame.shape[:2]
-                new_width = int(width * self.resolution_scale)
-                new_height = int(height * self.resolution_scale)
-                frame = cv2.resize(frame, (new_width, new_height))
-                logging.debug(f"📏 Frame redimensionado para: {frame.shape}")
+            return frame
+
+        except Exception as e:
+            logging.error(f"Error capturing frame: {e}")
+            return None
+
+    def _write_frame(self, frame: np.ndarray, repeats: int = 1):
+        """Escreve um frame capturado (``repeats`` vezes) no segmento atual (thread do encoder)."""
+        with self._writer_lock:
+            # Rotação pedida: troca para o writer já aberto antes deste frame
+            if self._rotation_pending:
+                self._swap_to_next_segment()
 
-            # Escreve frame
-            self.current_writer.write(frame)
+            # Segmento finalizado (pausa) enquanto o frame estava na fila
+            if not self.current_writer:
+                return
+
+            write_frame(self.current_writer, frame, repeats)
+            self.rotation_monitor.on_frame_written(repeats)
             logging.debug("✍️ Frame escrito no arquivo")
 
             # Atualiza contador
             if self.current_segment:
-                self.current_segment.frame_count += 1
+                previous_count = self.current_segment.frame_count
+                self.current_segment.frame_count += repeats
 
                 # Log periódico de progresso (a cada 300 frames = ~10 segundos a 30fps)
-                if self.current_segment.frame_count % 300 == 0:
+                if self.current_segment.frame_count // 300 > previous_count // 300:
                     duration = time.time() - self.current_segment.start_time
                     fps_actual = self.current_segment.frame_count / duration if duration > 0 else 0
                     logging.info("📊 GRAVAÇÃO EM PROGRESSO:")
@@ -376,15 +512,12 @@ class SmartSessionRecorder:
                     logging.info(f"   📄 Arquivo: {self.current_segment.file_path.name}")
 
                 # Log inicial quando começar a gravar
-                elif self.current_segment.frame_count == 1:
+                elif previous_count == 0:
                     logging.info("🎬 GRAVAÇÃO DE FRAMES INICIADA:")
                     logging.info(f"   📄 Arquivo: {self.current_segment.file_path}")
                     logging.info(f"   📐 Resolução: {frame.shape[1]}x{frame.shape[0]}")
                     logging.info("   🎞️  Primeiro frame capturado com sucesso!")
 
-        except Exception as e:
-            logging.error(f"Error capturing frame: {e}")
-
     def _sanitize_filename(self, name: str) -> str:
         """
         Sanitiza uma string para ser usada como nome de arquivo.
@@ -429,14 +562,43 @@ class SmartSessionRecorder:
             if self.current_segment:
                 self._finalize_current_segment(reason)
 
+            prepared = self._open_segment_writer(reason)
+            if not prepared:
+                return False
+
+            # Primeiro frame do segmento é sempre um frame real
+            if self.change_detector:
+                self.change_detector.reset()
+
+            self._activate_segment(prepared, reason)
+            return True
+
+        except Exception as e:
+            logging.error(f"❌ Error creating new segment: {e}")
+            return False
+
+    def _open_segment_writer(self, reason: str) -> Optional[PreparedWriter]:
+        """
+        Abre o arquivo e o writer do próximo segmento, sem trocar o atual.
+
+        Roda na thread de controle (início/retomada) ou, na rotação, na
+        thread auxiliar do ``WriterPrefetcher``.
+        """
+        try:
             # Obtém nome da conexão e sanitiza para nome de arquivo
             connection_name = self.connection_info.get("name", "conexao_rdp")
             safe_name = self._sanitize_filename(connection_name)
 
             # Cria novo arquivo
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            segment_number = len(self.all_segments) + 1
-            filename = f"{safe_name}_seg{segment_number:03d}_{timestamp}.avi"
+            # O segmento atual (se houver) ainda não está em all_segments
+            segment_number = len(self.all_segments) + (2 if self.current_segment else 1)
+            # ffmpeg grava H.264 em .mp4; os codecs do OpenCV usam .avi
+            use_ffmpeg = (
+                self.encoder == ENCODER_FFMPEG and find_ffmpeg(self.ffmpeg_path) is not None
+            )
+            extension = "mp4" if use_ffmpeg else "avi"
+            filename = f"{safe_name}_seg{segment_number:03d}_{timestamp}.{extension}"
             file_path = self.output_dir / filename
 
             # Log detalhado do local de salvamento
@@ -453,7 +615,7 @@ class SmartSessionRecorder:
             recording_rect = self.window_tracker.get_window_recording_rect()
             if not recording_rect:
                 logging.error("Cannot create segment: no recording area available")
-                return False
+                return None
 
             width = int(recording_rect["width"] * self.resolution_scale)
             height = int(recording_rect["height"] * self.resolution_scale)
@@ -461,8 +623,42 @@ class SmartSessionRecorder:
             logging.info(f"   📐 Resolução: {width}x{height} (escala: {self.resolution_scale})")
             logging.info(f"   🎞️  FPS: {self.fps}")
 
-            # Obtém lista de codecs recomendados (com OpenH264 se disponível)
-            recommended_codecs = self.codec_installer.get_recommended_codec_fallback()
+            # Codec/preset que sustentam o FPS com melhor tamanho/CPU nesta máquina
+            choice = (
+                self.encoder_calibrator.get_choice(self.fps, (width, height))
+                if self.encoder_calibrator
+                else None
+            )
+            preset = (choice.ffmpeg_preset if choice else None) or self.encoder_preset
+
+            new_writer = None
+            encoder = ENCODER_OPENCV
+            if use_ffmpeg:
+                new_writer = open_ffmpeg_writer(
+                    file_path,
+                    self.fps,
+                    (width, height),
+                    crf=self.encoder_crf,
+                    preset=preset,
+                    ffmpeg_path=self.ffmpeg_path,
+                )
+                if new_writer:
+                    encoder = ENCODER_FFMPEG
+                    logging.info(
+                        f"   🎬 Encoder: ffmpeg libx264 (crf {self.encoder_crf}, preset {preset})"
+                    )
+                else:
+                    # O container .mp4 também serve para os codecs do OpenCV
+                    logging.warning("   ⚠️  ffmpeg falhou; usando codecs do OpenCV")
+
+            # Obtém lista de codecs recomendados (calibrados, ou com OpenH264 se disponível)
+            recommended_codecs = (
+                []
+                if new_writer
+                else self.codec_installer.get_recommended_codec_fallback(
+                    choice.opencv_codecs if choice else None
+                )
+            )
 
             # Mapeia códigos para nomes legíveis
             codec_names = {
@@ -474,14 +670,13 @@ class SmartSessionRecorder:
                 cv2.VideoWriter_fourcc(*"X264"): "x264",
             }
 
-            self.current_writer = None
             for fourcc in recommended_codecs:
                 try:
                     codec_name = codec_names.get(fourcc, f"Unknown({fourcc})")
                     writer = cv2.VideoWriter(str(file_path), fourcc, self.fps, (width, height))
 
                     if writer.isOpened():
-                        self.current_writer = writer
+                        new_writer = writer
                         logging.info(f"   🎬 Codec usado: {codec_name}")
                         break
                     else:
@@ -491,94 +686,149 @@ class SmartSessionRecorder:
                     logging.debug(f"   Codec {codec_name} falhou: {e}")
                     continue
 
-            if not self.current_writer or not self.current_writer.isOpened():
+            if not new_writer:
                 logging.error(
                     f"❌ Failed to create video writer for {file_path} - nenhum codec funcionou"
                 )
-                return False
+                return None
+
+            return PreparedWriter(file_path, new_writer, (width, height), encoder)
 
-            # Cria novo segmento
+        except Exception as e:
+            logging.error(f"❌ Error opening segment writer: {e}")
+            return None
+
+    def _activate_segment(self, prepared: PreparedWriter, reason: str):
+        """Passa a gravar no writer aberto (writer e segmento trocam juntos para o encoder)."""
+        with self._writer_lock:
+            self.current_writer = prepared.writer
+            self.rotation_monitor.reset(prepared.path, prepared.writer)
             self.current_segment = RecordingSegment(
-                file_path=file_path,
+                file_path=prepared.path,
                 start_time=time.time(),
                 end_time=None,
                 reason=reason,
                 frame_count=0,
                 size_bytes=0,
+                encoder=prepared.encoder,
             )
 
-            if self.on_new_segment_created:
-                self.on_new_segment_created(self.current_segment)
-
-            logging.info(f"✅ Created new recording segment: {filename} (reason: {reason})")
-            logging.info(f"🎬 GRAVAÇÃO INICIADA - Arquivo: {file_path}")
-            return True
+        if self.on_new_segment_created:
+            self.on_new_segment_created(self.current_segment)
 
-        except Exception as e:
-            logging.error(f"❌ Error creating new segment: {e}")
-            return False
+        logging.info(f"✅ Created new recording segment: {prepared.path.name} (reason: {reason})")
+        logging.info(f"🎬 GRAVAÇÃO INICIADA - Arquivo: {prepared.path}")
 
     def _finalize_current_segment(self, reason: str):
         """Finaliza o segmento atual."""
         if not self.current_segment:
             return
 
-        try:
-            self.current_segment.end_time = time.time()
+        # Rotação pendente perde o sentido: o próximo segmento abre na retomada
+        self._rotation_pending = False
+        self.writer_prefetcher.discard()
 
-            # Fecha writer
-            if self.current_writer:
-                self.current_writer.release()
-                self.current_writer = None
+        # Frames já capturados pertencem a este segmento
+        if self.frame_pipeline:
+            self.frame_pipeline.flush()
 
-            # Obtém tamanho do arquivo
-            if self.current_segment.file_path.exists():
-                self.current_segment.size_bytes = self.current_segment.file_path.stat().st_size
+        try:
+            with self._writer_lock:
+                self.current_segment.end_time = time.time()
+
+                # Fecha writer
+                if self.current_writer:
+                    self.current_writer.release()
+                    self.current_writer = None
+                self.rotation_monitor.reset(None)
 
             # Adiciona à lista de segmentos
             self.all_segments.append(self.current_segment)
-
-            duration = self.current_segment.end_time - self.current_segment.start_time
-            logging.info(
-                f"Finalized segment: {self.current_segment.file_path.name} "
-                f"(duration: {duration:.1f}s, frames: {self.current_segment.frame_count}, "
-                f"size: {self.current_segment.size_bytes / (1024*1024):.1f}MB)"
-            )
+            self._on_segment_closed(self.current_segment)
 
             self.current_segment = None
 
         except Exception as e:
             logging.error(f"Error finalizing segment: {e}")
 
+    def _on_segment_closed(self, segment: RecordingSegment):
+        """Obtém o tamanho do arquivo de um segmento já fechado."""
+        if segment.file_path.exists():
+            segment.size_bytes = segment.file_path.stat().st_size
+
+        duration = segment.end_time - segment.start_time
+        logging.info(
+            f"Finalized segment: {segment.file_path.name} "
+            f"(duration: {duration:.1f}s, frames: {segment.frame_count}, "
+            f"size: {segment.size_bytes / (1024*1024):.1f}MB)"
+        )
+
     def _rotate_to_new_segment(self, reason: str):
-        """Rotaciona para um novo segmento."""
+        """
+        Rotaciona para um novo segmento sem lacuna.
+
+        O writer do próximo segmento normalmente já foi aberto em segundo plano
+        (``_prepare_next_segment``); a thread do encoder troca entre dois frames.
+        """
         if self.state == RecordingState.RECORDING:
+            self._prepare_next_segment(reason)
+            self._rotation_reason = reason
+            self._rotation_pending = True
+
+    def _prepare_next_segment(self, reason: str = "file_rotation"):
+        """Abre o writer do próximo segmento numa thread auxiliar, antes da rotação."""
+        if self.writer_prefetcher.pending or self.writer_prefetcher.ready:
+            return
+        if self.writer_prefetcher.prepare(lambda: self._open_segment_writer(reason)):
+            logging.debug("Abrindo próximo segmento em segundo plano")
+
+    def _swap_to_next_segment(self):
+        """Troca para o writer já aberto (thread do encoder, com o lock do writer)."""
+        if self.writer_prefetcher.pending:
+            # Ainda abrindo: continua gravando no segmento atual
+            return
+        self._rotation_pending = False
+        reason = self._rotation_reason
+
+        prepared = self.writer_prefetcher.take()
+        if prepared is None:
+            logging.warning("⚠️  Próximo segmento não abriu em segundo plano; abrindo agora")
             self._create_new_segment(reason)
+            return
+
+        old_segment, old_writer = self.current_segment, self.current_writer
+        if old_segment:
+            old_segment.end_time = time.time()
+            self.all_segments.append(old_segment)
+        self._activate_segment(prepared, reason)
+
+        # Fechar o arquivo anterior (flush do ffmpeg / índice do container) fica fora do encoder
+        if old_writer:
+            on_released = (lambda: self._on_segment_closed(old_segment)) if old_segment else None
+            self.writer_prefetcher.retire(old_writer, on_released)
 
     def _should_rotate_file(self) -> bool:
-        """Verifica se deve rotacionar para um novo arquivo."""
+        """Verifica se deve rotacionar para um novo arquivo (no máximo 1x por segundo)."""
         if not self.current_segment:
             return False
 
-        # Verifica duração máxima
-        duration = time.time() - self.current_segment.start_time
-        if duration >= self.max_file_duration:
-            return True
-
-        # Verifica tamanho do arquivo (estimado)
-        estimated_size = self.current_segment.frame_count * 50000  # ~50KB por frame estimado
-        max_size = self.config.get("max_file_size_mb", 100) * 1024 * 1024
-        if estimated_size >= max_size:
-            return True
-
-        return False
+        # Duração máxima ou tamanho real do arquivo (contador do writer ou stat())
+        reason = self.rotation_monitor.should_rotate()
+        if reason:
+            stats = self.rotation_monitor.get_stats()
+            logging.info(f"🔄 Rotação de segmento por {reason}: {stats}")
+        return reason is not None
 
     def _cleanup_current_writer(self):
         """Limpa o writer atual."""
+        # Descarta o próximo writer e espera os segmentos anteriores fecharem
+        self._rotation_pending = False
+        self.writer_prefetcher.close()
         try:
-            if self.current_writer:
-                self.current_writer.release()
-                self.current_writer = None
+            with self._writer_lock:
+                if self.current_writer:
+                    self.current_writer.release()
+                    self.current_writer = None
         except Exception as e:
             logging.error(f"Error cleaning up writer: {e}")
 
@@ -0,0 +1,164 @@
+# WATS_Project/wats_app/recording/writer_prefetch.py
+"""
+Troca de segmento sem lacuna.
+
+Antes, a rotação fechava o writer atual e só depois abria o próximo (ffmpeg,
+ou ``cv2.VideoWriter`` tentando vários codecs), na thread de captura. Enquanto
+isso a captura ficava parada e a gravação tinha um buraco visível.
+
+O ``WriterPrefetcher`` abre o writer do próximo arquivo numa thread auxiliar,
+alguns segundos antes do limite de rotação. No limite, a thread do encoder só
+troca a referência do writer entre dois frames (``take``) e o writer antigo é
+fechado em segundo plano (``retire``). Nenhum frame é perdido e a captura
+nunca espera pela abertura/fechamento de arquivos.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class PreparedWriter:
+    """Writer já aberto para o próximo arquivo, ainda sem frames."""
+
+    path: Path
+    writer: Any
+    frame_size: Tuple[int, int]
+    encoder: str
+
+    def discard(self):
+        """Fecha o writer não usado e apaga o arquivo vazio."""
+        try:
+            self.writer.release()
+        except Exception as e:
+            logging.debug(f"Erro ao liberar writer preparado: {e}")
+        try:
+            Path(self.path).unlink()
+        except OSError:
+            pass
+
+
+class WriterPrefetcher:
+    """Abre o próximo writer e fecha o anterior fora das threads de captura/encoder."""
+
+    def __init__(self, name: str = "WriterPrefetch"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._prepared: Optional[PreparedWriter] = None
+        self._retiring: List[threading.Thread] = []
+
+        self.writers_prepared = 0
+        self.writers_swapped = 0
+        self.writers_discarded = 0
+        self.prepare_failures = 0
+
+    @property
+    def pending(self) -> bool:
+        """True enquanto o próximo writer ainda está sendo aberto."""
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    @property
+    def ready(self) -> bool:
+        return self._prepared is not None
+
+    def prepare(self, open_fn: Callable[[], Optional[PreparedWriter]]) -> bool:
+        """
+        Abre o próximo writer em segundo plano com ``open_fn``.
+
+        Não faz nada se já houver um writer pronto ou sendo aberto.
+
+        Returns:
+            True se a abertura foi iniciada agora
+        """
+        with self._lock:
+            if self.pending or self._prepared is not None:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(open_fn,), daemon=True, name=self.name
+            )
+            self._thread.start()
+            return True
+
+    def _run(self, open_fn: Callable[[], Optional[PreparedWriter]]):
+        try:
+            prepared = open_fn()
+        except Exception as e:
+            logging.error(f"{self.name}: erro ao abrir o próximo writer: {e}")
+            prepared = None
+
+        with self._lock:
+            if prepared is None:
+                self.prepare_failures += 1
+            else:
+                self._prepared = prepared
+                self.writers_prepared += 1
+
+    def take(self) -> Optional[PreparedWriter]:
+        """
+        Retira o writer pronto para a troca.
+
+        Retorna None se nada foi preparado, se a abertura falhou ou se ainda
+        está em andamento (ver ``pending``): nesse caso o chamador continua
+        gravando no arquivo atual e tenta de novo no próximo frame.
+        """
+        with self._lock:
+            prepared, self._prepared = self._prepared, None
+            if prepared is not None:
+                self.writers_swapped += 1
+            return prepared
+
+    def discard(self, timeout: float = 10.0):
+        """Descarta o writer preparado (parada, pausa ou mudança de dimensões)."""
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        with self._lock:
+            prepared, self._prepared = self._prepared, None
+        if prepared is not None:
+            self.writers_discarded += 1
+            prepared.discard()
+
+    def retire(self, writer: Any, on_released: Optional[Callable[[], None]] = None):
+        """Fecha ``writer`` numa thread auxiliar e depois chama ``on_released``."""
+
+        def release():
+            try:
+                writer.release()
+            except Exception as e:
+                logging.error(f"{self.name}: erro ao fechar writer anterior: {e}")
+            if on_released:
+                try:
+                    on_released()
+                except Exception as e:
+                    logging.error(f"{self.name}: erro após fechar writer: {e}")
+
+        thread = threading.Thread(target=release, daemon=True, name=f"{self.name}Release")
+        with self._lock:
+            self._retiring = [t for t in self._retiring if t.is_alive()]
+            self._retiring.append(thread)
+        thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Descarta o writer preparado e espera os writers antigos terminarem de fechar."""
+        self.discard(timeout)
+        with self._lock:
+            retiring, self._retiring = self._retiring, []
+        for thread in retiring:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+                if thread.is_alive():
+                    logging.warning(f"{self.name}: writer não fechou em {timeout:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "prepared": self.writers_prepared,
+            "swapped": self.writers_swapped,
+            "discarded": self.writers_discarded,
+            "failures": self.prepare_failures,
+        }
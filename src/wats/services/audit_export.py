@@ -0,0 +1,297 @@
+# WATS_Project/wats_app/services/audit_export.py
+"""
+Exportação de auditoria (logs de acesso e tentativas em sessões protegidas).
+
+Os registros são lidos do banco em blocos, em ordem de chave primária, e
+gravados em arquivos CSV compactados (gzip) com um número máximo de linhas.
+Cada conjunto de dados tem um ``manifest.json`` com os arquivos concluídos,
+as chaves de cada arquivo e o checksum; uma exportação interrompida é
+retomada a partir da última chave gravada, e executar de novo a mesma
+exportação acrescenta apenas os registros novos.
+"""
+
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Fonte de linhas: recebe o último valor de chave exportado e devolve as linhas seguintes
+RowSource = Callable[[int], Iterable[Dict[str, Any]]]
+
+
+def _access_logs_source(db_service, since, until, batch_size) -> RowSource:
+    return lambda after_id: db_service.logs.export_access_logs(
+        after_id=after_id, since=since, until=until, batch_size=batch_size
+    )
+
+
+def _protection_attempts_source(db_service, since, until, batch_size) -> RowSource:
+    from src.wats.db.repositories.session_protection_repository import (
+        SessionProtectionRepository,
+    )
+
+    repository = SessionProtectionRepository(db_service.db_manager)
+    return lambda after_id: repository.export_access_attempts(
+        after_id=after_id, since=since, until=until, batch_size=batch_size
+    )
+
+
+# Conjunto de dados -> (coluna de chave, construtor da fonte de linhas)
+AUDIT_DATASETS: Dict[str, Tuple[str, Callable[..., RowSource]]] = {
+    "access_logs": ("Log_Id", _access_logs_source),
+    "protection_attempts": ("LTent_Id", _protection_attempts_source),
+}
+
+
+class AuditExporter:
+    """
+    Grava um conjunto de dados em arquivos CSV gzip numerados, com manifest.
+
+    Um arquivo só entra no manifest depois de fechado e renomeado; o manifest
+    é regravado de forma atômica a cada arquivo. Assim o manifest nunca
+    referencia um arquivo incompleto e ``last_key`` é sempre retomável.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        dataset: str,
+        key_column: str,
+        rows_per_file: int = 100_000,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        """
+        Args:
+            output_dir: Diretório do conjunto de dados (arquivos + manifest)
+            dataset: Nome do conjunto de dados (prefixo dos arquivos)
+            key_column: Coluna de chave crescente usada para retomar
+            rows_per_file: Máximo de linhas por arquivo
+            since/until: Filtros da exportação (gravados no manifest)
+        """
+        if rows_per_file <= 0:
+            raise ValueError("rows_per_file deve ser maior que zero.")
+
+        self.output_dir = output_dir
+        self.dataset = dataset
+        self.key_column = key_column
+        self.rows_per_file = rows_per_file
+        self.filters = {
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+        }
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+
+    @property
+    def last_key(self) -> int:
+        """Última chave exportada (0 se nada foi exportado)."""
+        return self.manifest["last_key"]
+
+    def export(self, source: RowSource) -> Dict[str, Any]:
+        """
+        Exporta as linhas da fonte a partir de ``last_key``.
+
+        Returns:
+            Manifest atualizado
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest["completed"] = False
+        self._save_manifest()
+
+        started = time.perf_counter()
+        exported = 0
+        writer: Optional[_ChunkWriter] = None
+
+        for row in source(self.last_key):
+            if writer is None:
+                writer = _ChunkWriter(self._next_file_path(), list(row.keys()), self.key_column)
+            writer.write(row)
+            exported += 1
+
+            if writer.rows >= self.rows_per_file:
+                self._commit_chunk(writer)
+                writer = None
+
+        if writer is not None:
+            self._commit_chunk(writer)
+
+        self.manifest["completed"] = True
+        self._save_manifest()
+        logging.info(
+            f"Exportação de auditoria '{self.dataset}': {exported} registros em "
+            f"{time.perf_counter() - started:.1f}s (última chave {self.last_key})"
+        )
+        return self.manifest
+
+    def _commit_chunk(self, writer: "_ChunkWriter"):
+        """Fecha o arquivo em andamento e o registra no manifest."""
+        entry = writer.close()
+        self.manifest["files"].append(entry)
+        self.manifest["columns"] = writer.columns
+        self.manifest["last_key"] = entry["last_key"]
+        self.manifest["total_rows"] += entry["rows"]
+        self._save_manifest()
+        logging.debug(f"Auditoria '{self.dataset}': {entry['file']} ({entry['rows']} linhas)")
+
+    def _next_file_path(self) -> str:
+        sequence = len(self.manifest["files"]) + 1
+        return os.path.join(self.output_dir, f"{self.dataset}_{sequence:05d}.csv.gz")
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Carrega o manifest existente (mesmos filtros) ou cria um novo."""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Manifest com versão desconhecida: {self.manifest_path}")
+            if manifest.get("filters") != self.filters:
+                raise ValueError(
+                    f"A exportação em {self.output_dir} usa outros filtros "
+                    f"({manifest.get('filters')}); use outro diretório."
+                )
+            return manifest
+
+        return {
+            "version": MANIFEST_VERSION,
+            "dataset": self.dataset,
+            "key_column": self.key_column,
+            "format": "csv.gz",
+            "filters": self.filters,
+            "columns": [],
+            "files": [],
+            "total_rows": 0,
+            "last_key": 0,
+            "completed": False,
+        }
+
+    def _save_manifest(self):
+        """Grava o manifest de forma atômica."""
+        self.manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+class _ChunkWriter:
+    """Arquivo CSV gzip em gravação (nome temporário até ``close``)."""
+
+    def __init__(self, path: str, columns: Sequence[str], key_column: str):
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.columns = list(columns)
+        self.key_column = key_column
+        self.rows = 0
+        self.first_key: Optional[int] = None
+        self.last_key: Optional[int] = None
+
+        self._file = gzip.open(self.temp_path, "wt", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def write(self, row: Dict[str, Any]):
+        key = row[self.key_column]
+        if self.first_key is None:
+            self.first_key = key
+        self.last_key = key
+        self._writer.writerow([_format_value(row.get(column)) for column in self.columns])
+        self.rows += 1
+
+    def close(self) -> Dict[str, Any]:
+        """Fecha, renomeia para o nome final e retorna a entrada do manifest."""
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+        return {
+            "file": os.path.basename(self.path),
+            "rows": self.rows,
+            "first_key": self.first_key,
+            "last_key": self.last_key,
+            "bytes": os.path.getsize(self.path),
+            "sha256": _file_sha256(self.path),
+        }
+
+
+def _format_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_audit_logs(
+    db_service,
+    output_dir: str,
+    datasets: Iterable[str] = ("access_logs", "protection_attempts"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    rows_per_file: int = 100_000,
+    batch_size: int = 1000,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Exporta os conjuntos de dados de auditoria para ``output_dir/<dataset>/``.
+
+    Executar de novo com os mesmos filtros retoma (ou continua) cada
+    conjunto a partir da última chave gravada.
+
+    Args:
+        db_service: DBService conectado
+        output_dir: Diretório raiz da exportação
+        datasets: Conjuntos de dados (ver AUDIT_DATASETS)
+        since/until: Período (início inclusive, fim exclusivo)
+        rows_per_file: Máximo de linhas por arquivo
+        batch_size: Linhas lidas do banco por vez
+
+    Returns:
+        Manifest de cada conjunto de dados
+    """
+    manifests: Dict[str, Dict[str, Any]] = {}
+    for dataset in datasets:
+        if dataset not in AUDIT_DATASETS:
+            raise ValueError(
+                f"Conjunto de dados desconhecido: {dataset} (use {', '.join(AUDIT_DATASETS)})"
+            )
+
+        key_column, build_source = AUDIT_DATASETS[dataset]
+        exporter = AuditExporter(
+            os.path.join(output_dir, dataset),
+            dataset,
+            key_column,
+            rows_per_file=rows_per_file,
+            since=since,
+            until=until,
+        )
+        if exporter.last_key:
+            logging.info(f"Retomando exportação '{dataset}' após {key_column} {exporter.last_key}")
+        manifests[dataset] = exporter.export(build_source(db_service, since, until, batch_size))
+    return manifests
+
+
+def list_exported_files(output_dir: str) -> List[str]:
+    """Arquivos de todos os conjuntos já exportados em ``output_dir`` (caminhos completos)."""
+    files: List[str] = []
+    for dataset in AUDIT_DATASETS:
+        manifest_path = os.path.join(output_dir, dataset, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        files.extend(os.path.join(output_dir, dataset, entry["file"]) for entry in manifest["files"])
+    return files
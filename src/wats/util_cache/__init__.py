@@ -7,6 +7,7 @@ from src.wats.util_cache.cache import (
     cached as old_cached,
     invalidate_cache,
     invalidate_cache_pattern as old_invalidate_cache_pattern,
+    invalidate_cache_tags,
     clear_all_cache,
 )
 
@@ -19,8 +20,29 @@ from src.wats.util_cache.intelligent_cache import (
     invalidate_group_caches,
     invalidate_connection_caches,
     invalidate_all_caches,
+    enable_shared_cache,
+    configure_namespace_ttls,
 )
 
+# Estatísticas detalhadas (por namespace / função)
+from src.wats.util_cache.cache_stats import (
+    get_cache_report,
+    log_cache_report,
+    start_cache_stats_reporter,
+    stop_cache_stats_reporter,
+)
+
+# Invalidação por log de alterações do banco (opcional)
+from src.wats.util_cache.change_listener import (
+    CacheChangeListener,
+    SQLiteChangeLog,
+    start_cache_change_listener,
+    stop_cache_change_listener,
+)
+
+# Cache compartilhado entre processos (opcional)
+from src.wats.util_cache.shared_cache import SharedSQLiteCache
+
 __all__ = [
     # Cache antigo (compatibilidade)
     "InMemoryCache",
@@ -28,6 +50,7 @@ __all__ = [
     "old_cached",
     "invalidate_cache",
     "old_invalidate_cache_pattern",
+    "invalidate_cache_tags",
     "clear_all_cache",
     
     # Cache inteligente (novo)
@@ -38,5 +61,22 @@ __all__ = [
     "invalidate_group_caches",
     "invalidate_connection_caches",
     "invalidate_all_caches",
+    "enable_shared_cache",
+    "configure_namespace_ttls",
+    
+    # Estatísticas
+    "get_cache_report",
+    "log_cache_report",
+    "start_cache_stats_reporter",
+    "stop_cache_stats_reporter",
+    
+    # Invalidação por log de alterações
+    "CacheChangeListener",
+    "SQLiteChangeLog",
+    "start_cache_change_listener",
+    "stop_cache_change_listener",
+    
+    # Cache compartilhado
+    "SharedSQLiteCache",
 ]
 
@@ -5,18 +5,24 @@ Reduz consultas ao banco e operações de I/O
 
 import time
 import threading
-from typing import Any, Callable, Optional, Dict, Tuple
+from typing import Any, Callable, Optional, Dict, Tuple, Iterable, Set, FrozenSet, Union
 from functools import wraps
 import logging
 
+from src.wats.util_cache.cache_stats import CacheStats, estimate_size
+
 
 class CacheEntry:
-    """Entrada individual do cache com timestamp."""
+    """Entrada individual do cache com timestamp e tags."""
     
-    def __init__(self, value: Any, ttl: int):
+    def __init__(
+        self, value: Any, ttl: int, tags: Optional[Iterable[str]] = None, size: int = 0
+    ):
         self.value = value
         self.timestamp = time.time()
         self.ttl = ttl
+        self.tags: FrozenSet[str] = frozenset(tags or ())
+        self.size = size
     
     def is_expired(self) -> bool:
         """Verifica se a entrada expirou."""
@@ -33,7 +39,8 @@ class InMemoryCache:
     - TTL configurável por entrada
     - Thread-safe com locks
     - Limpeza automática de entradas expiradas
-    - Estatísticas de hit/miss
+    - Estatísticas de hit/miss, detalhadas por namespace e por função
+    - Tags com índice reverso (invalidação sem varrer todas as chaves)
     """
     
     def __init__(self, default_ttl: int = 300, cleanup_interval: int = 60):
@@ -45,6 +52,8 @@ class InMemoryCache:
             cleanup_interval: Intervalo de limpeza automática em segundos
         """
         self._cache: Dict[str, CacheEntry] = {}
+        # Índice reverso tag -> chaves (ex: "connections", "user:42")
+        self._tag_index: Dict[str, Set[str]] = {}
         self._lock = threading.RLock()
         self.default_ttl = default_ttl
         self.cleanup_interval = cleanup_interval
@@ -52,6 +61,7 @@ class InMemoryCache:
         # Estatísticas
         self._hits = 0
         self._misses = 0
+        self.stats = CacheStats()
         
         # Inicia limpeza automática
         self._start_cleanup_thread()
@@ -71,17 +81,26 @@ class InMemoryCache:
             
             if entry is None:
                 self._misses += 1
+                self.stats.record_lookup(key, hit=False)
                 return None
             
             if entry.is_expired():
-                del self._cache[key]
+                self._remove(key, reason="expiration")
                 self._misses += 1
+                self.stats.record_lookup(key, hit=False)
                 return None
             
             self._hits += 1
+            self.stats.record_lookup(key, hit=True)
             return entry.value
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ):
         """
         Armazena valor no cache.
         
@@ -89,24 +108,71 @@ class InMemoryCache:
             key: Chave do cache
             value: Valor a armazenar
             ttl: Tempo de vida (usa default_ttl se None)
+            tags: Tags da entrada (ex: ["connections", "user:42"])
         """
         if ttl is None:
             ttl = self.default_ttl
         
         with self._lock:
-            self._cache[key] = CacheEntry(value, ttl)
+            # Remove a entrada anterior para não deixar tags antigas no índice
+            self._remove(key, reason="replace")
+            entry = CacheEntry(value, ttl, tags, size=estimate_size(value))
+            self._cache[key] = entry
+            self.stats.record_store(key, entry.size)
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
     
     def delete(self, key: str):
         """Remove entrada do cache."""
         with self._lock:
-            self._cache.pop(key, None)
+            self._remove(key)
+    
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Remove todas as entradas marcadas com qualquer uma das tags.
+        
+        Usa o índice reverso, portanto o custo é proporcional ao número
+        de entradas afetadas e não ao tamanho total do cache.
+        
+        Args:
+            tags: Tags a invalidar (ex: "logs", "user:42")
+            
+        Returns:
+            Número de entradas removidas
+        """
+        with self._lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys.update(self._tag_index.get(tag, ()))
+            
+            for key in keys:
+                self._remove(key)
+            
+            return len(keys)
     
     def clear(self):
         """Limpa todo o cache."""
         with self._lock:
             self._cache.clear()
+            self._tag_index.clear()
             self._hits = 0
             self._misses = 0
+            self.stats.reset(keep_memory=False)
+    
+    def _remove(self, key: str, reason: str = "invalidation"):
+        """Remove a entrada e suas referências no índice de tags (chamar com lock)."""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        
+        self.stats.record_removal(key, entry.size, reason)
+        
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
     
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do cache."""
@@ -116,12 +182,23 @@ class InMemoryCache:
             
             return {
                 'size': len(self._cache),
+                'tags': len(self._tag_index),
                 'hits': self._hits,
                 'misses': self._misses,
                 'hit_rate': round(hit_rate, 2),
                 'total_requests': total_requests
             }
     
+    def get_detailed_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas por namespace e por função decorada.
+        
+        Returns:
+            Dict com ``namespaces`` e ``functions`` (hits, misses, histograma de
+            tempo de carga, evictions, invalidações e bytes estimados)
+        """
+        return self.stats.snapshot()
+    
     def _cleanup_expired(self):
         """Remove entradas expiradas do cache."""
         with self._lock:
@@ -131,7 +208,7 @@ class InMemoryCache:
             ]
             
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key, reason="expiration")
     
     def _start_cleanup_thread(self):
         """Inicia thread de limpeza automática."""
@@ -170,17 +247,30 @@ def get_cache(default_ttl: int = 300) -> InMemoryCache:
         return _global_cache
 
 
-def cached(ttl: Optional[int] = None, key_prefix: str = "", namespace: str = ""):
+TagsSpec = Union[Iterable[str], Callable[..., Iterable[str]], None]
+
+
+def cached(
+    ttl: Optional[int] = None,
+    key_prefix: str = "",
+    namespace: str = "",
+    tags: TagsSpec = None,
+):
     """
     Decorator para cachear resultado de funções.
     
+    As entradas são sempre marcadas com o namespace como tag, o que permite
+    invalidá-las via ``invalidate_cache(namespace=...)`` sem varrer o cache.
+    
     Args:
         ttl: Tempo de vida do cache em segundos
         key_prefix: Prefixo para a chave do cache (deprecated, use namespace)
         namespace: Namespace do cache (ex: "users", "connections")
+        tags: Tags extras; lista fixa ou função que recebe os mesmos
+              argumentos da função decorada e retorna as tags
     
     Usage:
-        @cached(ttl=300, namespace="users")
+        @cached(ttl=300, namespace="users", tags=lambda user_id: [f"user:{user_id}"])
         def get_user(user_id):
             return fetch_user_from_db(user_id)
     """
@@ -189,6 +279,12 @@ def cached(ttl: Optional[int] = None, key_prefix: str = "", namespace: str = "")
         key_prefix = namespace
     
     def decorator(func: Callable) -> Callable:
+        stats_name = (
+            f"{key_prefix}:{func.__qualname__}"
+            if key_prefix
+            else f"{func.__module__}.{func.__name__}"
+        )
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Gera chave do cache baseada em args/kwargs
@@ -199,13 +295,18 @@ def cached(ttl: Optional[int] = None, key_prefix: str = "", namespace: str = "")
             cached_value = cache.get(cache_key)
             
             if cached_value is not None:
+                cache.stats.record_call(stats_name, hit=True)
                 return cached_value
             
             # Cache miss - executa função
+            started = time.perf_counter()
             result = func(*args, **kwargs)
+            cache.stats.record_call(
+                stats_name, hit=False, load_seconds=time.perf_counter() - started
+            )
             
             # Armazena no cache
-            cache.set(cache_key, result, ttl)
+            cache.set(cache_key, result, ttl, tags=_resolve_tags(tags, key_prefix, args, kwargs))
             
             return result
         
@@ -220,6 +321,21 @@ def cached(ttl: Optional[int] = None, key_prefix: str = "", namespace: str = "")
     return decorator
 
 
+def _resolve_tags(spec: TagsSpec, prefix: str, args: Tuple, kwargs: Dict) -> Set[str]:
+    """Calcula as tags de uma entrada a partir do namespace e da especificação do decorator."""
+    resolved: Set[str] = {prefix} if prefix else set()
+    if spec is None:
+        return resolved
+    
+    try:
+        extra = spec(*args, **kwargs) if callable(spec) else spec
+        resolved.update(str(tag) for tag in extra or ())
+    except Exception as e:
+        logging.error(f"Error resolving cache tags: {e}")
+    
+    return resolved
+
+
 def _generate_cache_key(func: Callable, args: Tuple, kwargs: Dict, prefix: str) -> str:
     """Gera chave única para o cache baseada na função e argumentos."""
     func_name = f"{func.__module__}.{func.__name__}"
@@ -234,10 +350,26 @@ def _generate_cache_key(func: Callable, args: Tuple, kwargs: Dict, prefix: str)
     return key
 
 
+def invalidate_cache_tags(*tags: str) -> int:
+    """
+    Invalida as entradas marcadas com as tags informadas (via índice reverso).
+    
+    Args:
+        tags: Tags a invalidar (ex: "logs", "user:42", "group:7")
+        
+    Returns:
+        Número de entradas removidas
+    """
+    return get_cache().invalidate_tags(*tags)
+
+
 def invalidate_cache_pattern(pattern: str):
     """
     Invalida todas as entradas do cache que correspondem ao padrão.
     
+    Percorre todas as chaves; para invalidações frequentes prefira
+    ``invalidate_cache_tags``.
+    
     Args:
         pattern: Padrão para matching (ex: "user:*")
     """
@@ -284,6 +416,11 @@ def invalidate_cache(namespace: str = "", pattern: str = "*"):
     """
     cache = get_cache()
     
+    # Namespace inteiro: usa o índice de tags (sem varrer as chaves)
+    if namespace and pattern == "*":
+        cache.invalidate_tags(namespace)
+        return
+    
     # Constrói padrão completo
     if namespace:
         full_pattern = f"*{namespace}*{pattern}"
@@ -0,0 +1,325 @@
+"""
+Estatísticas detalhadas do cache para WATS
+Contadores por namespace e por função decorada, histograma de tempo de carga
+e relatório periódico no log estruturado
+"""
+
+import logging
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+# Limites (ms) das faixas do histograma de tempo de carga; a última faixa é "acima de"
+LOAD_TIME_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Profundidade máxima percorrida ao estimar o tamanho de um valor
+_MAX_SIZE_DEPTH = 4
+
+
+class CacheCounters:
+    """Contadores de um namespace ou de uma função decorada."""
+
+    __slots__ = (
+        "hits",
+        "misses",
+        "loads",
+        "load_time_total",
+        "load_time_max",
+        "load_histogram",
+        "evictions",
+        "expirations",
+        "invalidations",
+        "entries",
+        "bytes",
+    )
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_time_total = 0.0
+        self.load_time_max = 0.0
+        self.load_histogram: List[int] = [0] * (len(LOAD_TIME_BUCKETS_MS) + 1)
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.entries = 0
+        self.bytes = 0
+
+    def add_load(self, seconds: float):
+        """Registra o tempo de uma carga (execução da função em cache miss)."""
+        elapsed_ms = seconds * 1000
+        self.loads += 1
+        self.load_time_total += seconds
+        self.load_time_max = max(self.load_time_max, seconds)
+
+        for index, limit in enumerate(LOAD_TIME_BUCKETS_MS):
+            if elapsed_ms <= limit:
+                self.load_histogram[index] += 1
+                return
+        self.load_histogram[-1] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Retorna os contadores em formato serializável."""
+        total = self.hits + self.misses
+        histogram = {
+            f"<={limit}ms": count
+            for limit, count in zip(LOAD_TIME_BUCKETS_MS, self.load_histogram)
+        }
+        histogram[f">{LOAD_TIME_BUCKETS_MS[-1]}ms"] = self.load_histogram[-1]
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 2) if total else 0,
+            'loads': self.loads,
+            'avg_load_ms': round(self.load_time_total / self.loads * 1000, 2) if self.loads else 0,
+            'max_load_ms': round(self.load_time_max * 1000, 2),
+            # Tempo de banco economizado estimado pela média de carga
+            'saved_ms': round(self.hits * self.load_time_total / self.loads * 1000, 2)
+            if self.loads
+            else 0,
+            'load_histogram': histogram,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'entries': self.entries,
+            'estimated_bytes': self.bytes,
+        }
+
+
+class CacheStats:
+    """
+    Estatísticas de um cache, agrupadas por namespace e por função.
+
+    O namespace é o prefixo da chave (parte anterior ao primeiro ``:``),
+    que nos decorators corresponde a ``key_prefix``/``namespace``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, CacheCounters] = {}
+        self._functions: Dict[str, CacheCounters] = {}
+
+    def record_lookup(self, key: str, hit: bool):
+        """Registra um acesso ao cache (chamado pelo próprio cache no ``get``)."""
+        with self._lock:
+            counters = self._counters(self._namespaces, namespace_of(key))
+            if hit:
+                counters.hits += 1
+            else:
+                counters.misses += 1
+
+    def record_call(self, function: str, hit: bool, load_seconds: Optional[float] = None):
+        """
+        Registra uma chamada de função decorada.
+
+        Args:
+            function: Nome qualificado da função (ex: "permissions:Repo.list")
+            hit: True se o resultado veio do cache
+            load_seconds: Tempo de execução da função em cache miss
+        """
+        namespace = namespace_of(function)
+        with self._lock:
+            counters = self._counters(self._functions, function)
+            if hit:
+                counters.hits += 1
+                return
+
+            counters.misses += 1
+            if load_seconds is not None:
+                counters.add_load(load_seconds)
+                self._counters(self._namespaces, namespace).add_load(load_seconds)
+
+    def record_store(self, key: str, size: int):
+        """Registra a gravação de uma entrada com o tamanho estimado."""
+        with self._lock:
+            counters = self._counters(self._namespaces, namespace_of(key))
+            counters.entries += 1
+            counters.bytes += size
+
+    def record_removal(self, key: str, size: int, reason: str):
+        """
+        Registra a remoção de uma entrada.
+
+        Args:
+            key: Chave removida
+            size: Tamanho estimado registrado na gravação
+            reason: "eviction", "expiration", "invalidation" ou "replace"
+        """
+        with self._lock:
+            counters = self._counters(self._namespaces, namespace_of(key))
+            counters.entries = max(0, counters.entries - 1)
+            counters.bytes = max(0, counters.bytes - size)
+            if reason == "eviction":
+                counters.evictions += 1
+            elif reason == "expiration":
+                counters.expirations += 1
+            elif reason == "invalidation":
+                counters.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas por namespace e por função.
+
+        Returns:
+            Dict com ``namespaces``, ``functions`` e totais de memória
+        """
+        with self._lock:
+            namespaces = {name: c.as_dict() for name, c in sorted(self._namespaces.items())}
+            functions = {name: c.as_dict() for name, c in sorted(self._functions.items())}
+
+        return {
+            'namespaces': namespaces,
+            'functions': functions,
+            'total_entries': sum(ns['entries'] for ns in namespaces.values()),
+            'total_estimated_bytes': sum(ns['estimated_bytes'] for ns in namespaces.values()),
+        }
+
+    def reset(self, keep_memory: bool = True):
+        """
+        Zera os contadores.
+
+        Args:
+            keep_memory: Mantém entradas/bytes dos namespaces (o conteúdo do cache
+                         continua o mesmo); use False quando o cache for limpo
+        """
+        with self._lock:
+            self._functions.clear()
+            if not keep_memory:
+                self._namespaces.clear()
+                return
+
+            for name, old in list(self._namespaces.items()):
+                fresh = CacheCounters()
+                fresh.entries = old.entries
+                fresh.bytes = old.bytes
+                self._namespaces[name] = fresh
+
+    @staticmethod
+    def _counters(table: Dict[str, CacheCounters], name: str) -> CacheCounters:
+        """Obtém ou cria os contadores de um nome (chamar com lock)."""
+        counters = table.get(name)
+        if counters is None:
+            counters = table[name] = CacheCounters()
+        return counters
+
+
+def namespace_of(key: str) -> str:
+    """Extrai o namespace (prefixo antes do primeiro ``:``) de uma chave."""
+    namespace = key.split(":", 1)[0]
+    return namespace or "default"
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Estima o tamanho em bytes de um valor em cache.
+
+    Percorre listas, tuplas, dicts, sets e linhas de cursor até uma profundidade
+    limitada; é uma estimativa para comparar namespaces, não uma medição exata.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= _MAX_SIZE_DEPTH or isinstance(value, (str, bytes, bytearray)):
+        return size
+
+    if isinstance(value, dict):
+        return size + sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+            for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)) or _is_row(value):
+        return size + sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+def _is_row(value: Any) -> bool:
+    """Identifica linhas de cursor (pyodbc.Row / sqlite3.Row) sem importar os drivers."""
+    return type(value).__name__ == "Row" and hasattr(value, "__len__")
+
+
+# ----------------------------------------------------------------------
+# Relatório consolidado e dump periódico
+# ----------------------------------------------------------------------
+
+
+def get_cache_report() -> Dict[str, Any]:
+    """
+    Relatório dos dois caches da aplicação (inteligente e legado).
+
+    Returns:
+        Dict com ``get_stats()`` e as estatísticas detalhadas de cada cache
+    """
+    from src.wats.util_cache import cache as legacy_cache
+    from src.wats.util_cache import intelligent_cache
+
+    report: Dict[str, Any] = {}
+    for name, cache in (
+        ("intelligent", intelligent_cache.get_cache()),
+        ("legacy", legacy_cache.get_cache()),
+    ):
+        report[name] = {'summary': cache.get_stats(), **cache.get_detailed_stats()}
+    return report
+
+
+def log_cache_report(logger_name: str = "performance"):
+    """
+    Grava o relatório de cache no log estruturado.
+
+    Uma linha por namespace, com os contadores em ``extra_fields``
+    (mesmo formato de ``WASTLogger.log_performance``).
+    """
+    logger = logging.getLogger(logger_name)
+    report = get_cache_report()
+
+    for cache_name, data in report.items():
+        for namespace, counters in data['namespaces'].items():
+            extra_data = {"cache": cache_name, "namespace": namespace, **counters}
+            logger.info(
+                f"Cache stats: {cache_name}/{namespace}", extra={"extra_fields": extra_data}
+            )
+        for function, counters in data['functions'].items():
+            extra_data = {"cache": cache_name, "function": function, **counters}
+            logger.info(f"Cache stats: {cache_name}/{function}", extra={"extra_fields": extra_data})
+
+
+_reporter_thread: Optional[threading.Thread] = None
+_reporter_stop = threading.Event()
+
+
+def start_cache_stats_reporter(interval: int = 900) -> bool:
+    """
+    Inicia a thread que grava o relatório de cache periodicamente.
+
+    Args:
+        interval: Intervalo em segundos (0 desativa)
+
+    Returns:
+        True se o relatório periódico foi iniciado
+    """
+    global _reporter_thread
+
+    if interval <= 0:
+        return False
+    if _reporter_thread is not None and _reporter_thread.is_alive():
+        return True
+
+    def report_loop():
+        while not _reporter_stop.wait(interval):
+            try:
+                log_cache_report()
+            except Exception as e:
+                logging.error(f"Error logging cache stats: {e}")
+
+    _reporter_stop.clear()
+    _reporter_thread = threading.Thread(target=report_loop, name="CacheStatsReporter", daemon=True)
+    _reporter_thread.start()
+    logging.info(f"Cache stats reporter started (interval={interval}s)")
+    return True
+
+
+def stop_cache_stats_reporter():
+    """Para a thread de relatório periódico."""
+    global _reporter_thread
+
+    _reporter_stop.set()
+    _reporter_thread = None
@@ -0,0 +1,120 @@
+"""
+Snapshot local do catálogo de conexões (warm start)
+Permite exibir a árvore imediatamente na abertura, antes da consulta ao banco
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, List, Optional, Sequence
+
+from src.wats.config import expand_system_variables
+
+SNAPSHOT_VERSION = 1
+
+# Layout das linhas de ConnectionRepository.select_all / select_catalog
+ROW_WIDTH = 12
+PASSWORD_INDEX = 4
+CONNECTED_USERS_INDEX = 6
+
+
+def catalog_version(rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Versão do catálogo: hash estável do conteúdo das linhas.
+
+    Igual entre processos e execuções para o mesmo conteúdo, permitindo
+    detectar se o catálogo mudou sem comparar linha a linha.
+    """
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(repr(tuple(row)).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+def get_snapshot_path(username: str) -> str:
+    """
+    Retorna o caminho do snapshot do usuário (um arquivo por usuário).
+
+    Fica no perfil do usuário do SO (%LOCALAPPDATA%), e não na pasta de dados
+    do WATS, que todos os usuários do servidor de terminais podem ler.
+    """
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", username or "default")
+    snapshot_dir = expand_system_variables("{LOCALAPPDATA}/WATS/cache/snapshots")
+    return os.path.join(os.path.normpath(snapshot_dir), f"catalog_{safe_name}.json.gz")
+
+
+def save_catalog_snapshot(username: str, rows: Sequence[Sequence[Any]]) -> bool:
+    """
+    Persiste o resultado de ``select_all`` para o próximo início.
+
+    Senhas e usuários conectados não são gravados: o arquivo fica em disco
+    e a presença só é válida no momento da consulta. O arquivo é criado
+    legível só pelo dono (0600; no Windows vale a ACL do perfil).
+
+    Args:
+        username: Usuário da sessão
+        rows: Linhas retornadas por ``select_all``
+
+    Returns:
+        True se o snapshot foi gravado
+    """
+    catalog = []
+    for row in rows:
+        values = list(row)
+        if len(values) != ROW_WIDTH:
+            logging.debug(f"Snapshot ignorado: linha com {len(values)} colunas")
+            return False
+        values[PASSWORD_INDEX] = ""
+        values[CONNECTED_USERS_INDEX] = ""
+        catalog.append(values)
+
+    path = get_snapshot_path(username)
+    temp_path = f"{path}.tmp"
+    payload = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "rows": catalog}
+
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        # Troca atômica: leitores nunca veem um arquivo pela metade
+        os.replace(temp_path, path)
+        logging.debug(f"Snapshot do catálogo salvo ({len(catalog)} conexões): {path}")
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        logging.warning(f"Não foi possível salvar o snapshot do catálogo: {e}")
+        return False
+
+
+def load_catalog_snapshot(username: str) -> Optional[List[tuple]]:
+    """
+    Carrega o último snapshot do catálogo do usuário.
+
+    Args:
+        username: Usuário da sessão
+
+    Returns:
+        Linhas no formato de ``select_all`` ou None se não houver snapshot válido
+    """
+    path = get_snapshot_path(username)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        if payload.get("version") != SNAPSHOT_VERSION:
+            return None
+
+        rows = [tuple(row) for row in payload.get("rows", []) if len(row) == ROW_WIDTH]
+        logging.info(f"Snapshot do catálogo carregado ({len(rows)} conexões)")
+        return rows
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        logging.warning(f"Snapshot do catálogo inválido, ignorando: {e}")
+        return None
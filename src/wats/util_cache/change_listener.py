@@ -0,0 +1,263 @@
+"""
+Invalidação de cache orientada a eventos para WATS
+Consulta periodicamente o log de alterações do banco e invalida apenas as tags afetadas
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+# Tabela alterada -> tags a invalidar ("{key}" é substituído pela chave registrada).
+# Registros sem chave (NULL) invalidam apenas as tags sem "{key}".
+CHANGE_LOG_TAGS: Dict[str, Tuple[str, ...]] = {
+    "Conexao_WTS": ("connections", "connection:{key}"),
+    "Grupo_WTS": ("groups", "group:{key}", "connections"),
+    "Usuario_Sistema_WTS": ("users", "user:{key}"),
+    "Permissao_Grupo_WTS": ("permissions", "user:{key}", "connections"),
+    "Permissao_Conexao_Individual_WTS": ("user:{key}", "connections"),
+}
+
+
+class ChangeLogSource(Protocol):
+    """Origem do log de alterações (ChangeLogRepository ou SQLiteChangeLog)."""
+
+    def get_last_change_id(self) -> int:
+        """Maior Chg_Id atual (0 se o log estiver vazio)."""
+        ...
+
+    def list_changes_since(
+        self, last_id: int, limit: int = 500
+    ) -> List[Tuple[int, str, Optional[int]]]:
+        """Alterações ``(Chg_Id, tabela, chave)`` posteriores a ``last_id``, em ordem."""
+        ...
+
+
+def tags_for_change(table: str, key: Optional[Any]) -> Set[str]:
+    """
+    Converte uma linha do log de alterações nas tags de cache afetadas.
+
+    Tabelas desconhecidas não geram tags (são ignoradas).
+    """
+    tags: Set[str] = set()
+    for template in CHANGE_LOG_TAGS.get(table, ()):
+        if "{key}" not in template:
+            tags.add(template)
+        elif key is not None:
+            tags.add(template.format(key=key))
+    return tags
+
+
+class CacheChangeListener:
+    """
+    Aplica ao cache as alterações registradas no log do banco.
+
+    Na primeira consulta posiciona-se no fim do log (alterações anteriores já
+    estão refletidas no banco que alimentará o cache). Falhas de leitura não
+    perdem alterações: a próxima consulta continua do último Chg_Id processado.
+    """
+
+    def __init__(
+        self,
+        source: ChangeLogSource,
+        interval: float = 5.0,
+        batch_size: int = 500,
+        invalidate: Optional[Callable[..., Any]] = None,
+    ):
+        """
+        Inicializa o listener.
+
+        Args:
+            source: Origem do log de alterações
+            interval: Intervalo entre consultas em segundos
+            batch_size: Máximo de alterações lidas por consulta
+            invalidate: Função que recebe as tags a invalidar
+                        (padrão: ``invalidate_tags`` do cache inteligente)
+        """
+        self.source = source
+        self.interval = interval
+        self.batch_size = batch_size
+        self._invalidate = invalidate or _invalidate_intelligent_cache
+        self._last_id: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Estatísticas
+        self.changes_processed = 0
+        self.errors = 0
+
+    @property
+    def last_id(self) -> Optional[int]:
+        """Último Chg_Id processado (None antes da primeira consulta)."""
+        return self._last_id
+
+    def poll_once(self) -> int:
+        """
+        Lê as alterações pendentes e invalida as tags correspondentes.
+
+        Returns:
+            Número de alterações processadas
+        """
+        if self._last_id is None:
+            self._last_id = self.source.get_last_change_id()
+            return 0
+
+        processed = 0
+        while True:
+            changes = self.source.list_changes_since(self._last_id, self.batch_size)
+            if not changes:
+                break
+
+            tags: Set[str] = set()
+            for change_id, table, key in changes:
+                tags.update(tags_for_change(table, key))
+            if tags:
+                self._invalidate(*sorted(tags))
+
+            self._last_id = changes[-1][0]
+            processed += len(changes)
+            if len(changes) < self.batch_size:
+                break
+
+        if processed:
+            self.changes_processed += processed
+            logging.debug(f"Change log: {processed} alterações aplicadas ao cache")
+        return processed
+
+    def start(self):
+        """Inicia a thread de consulta periódica."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._poll_loop, name="CacheChangeListener", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Cache change listener started (interval={self.interval}s)")
+
+    def stop(self, timeout: float = 2.0):
+        """Para a thread de consulta."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _poll_loop(self):
+        """Loop de consulta do log de alterações."""
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"Error polling cache change log: {e}")
+
+            if self._stop_event.wait(self.interval):
+                break
+
+
+def _invalidate_intelligent_cache(*tags: str):
+    """Invalida as tags no cache inteligente (singleton atual)."""
+    from src.wats.util_cache.intelligent_cache import get_cache
+
+    get_cache().invalidate_tags(*tags)
+
+
+class SQLiteChangeLog:
+    """
+    Log de alterações em SQLite, com a mesma API de ChangeLogRepository.
+
+    Substitui a tabela do SQL Server em testes e no desenvolvimento local;
+    ``record_change`` faz o papel dos triggers.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS Cache_Change_Log_WTS (
+                Chg_Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Chg_Tabela TEXT NOT NULL,
+                Chg_Chave INTEGER NULL,
+                Chg_Data REAL NOT NULL
+            )
+            """
+        )
+
+    def record_change(self, table: str, key: Optional[int] = None):
+        """Registra uma alteração (equivalente aos triggers do SQL Server)."""
+        self.record_changes([(table, key)])
+
+    def record_changes(self, changes: Iterable[Tuple[str, Optional[int]]]):
+        """Registra várias alterações em uma única transação."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave, Chg_Data) "
+                "VALUES (?, ?, ?)",
+                [(table, key, now) for table, key in changes],
+            )
+
+    def get_last_change_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT IFNULL(MAX(Chg_Id), 0) FROM Cache_Change_Log_WTS"
+            ).fetchone()
+        return int(row[0])
+
+    def list_changes_since(
+        self, last_id: int, limit: int = 500
+    ) -> List[Tuple[int, str, Optional[int]]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT Chg_Id, Chg_Tabela, Chg_Chave FROM Cache_Change_Log_WTS "
+                "WHERE Chg_Id > ? ORDER BY Chg_Id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+
+    def cleanup(self, retention_seconds: float = 86400) -> int:
+        """Remove alterações antigas (equivalente a sp_Cleanup_Cache_Change_Log_WTS)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM Cache_Change_Log_WTS WHERE Chg_Data < ?",
+                (time.time() - retention_seconds,),
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Listener global (um por processo)
+_listener: Optional[CacheChangeListener] = None
+
+
+def start_cache_change_listener(source: ChangeLogSource, interval: float = 5.0):
+    """
+    Inicia o listener global de invalidação por log de alterações.
+
+    Args:
+        source: Origem do log (ex: ``DBService.change_log``)
+        interval: Intervalo entre consultas em segundos
+
+    Returns:
+        CacheChangeListener instance
+    """
+    global _listener
+
+    stop_cache_change_listener()
+    _listener = CacheChangeListener(source, interval=interval)
+    _listener.start()
+    return _listener
+
+
+def stop_cache_change_listener():
+    """Para o listener global, se estiver ativo."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -7,9 +7,11 @@ import logging
 import threading
 import time
 from datetime import datetime, timedelta
-from typing import Any, Optional, Dict, Set, Callable
+from typing import Any, Optional, Dict, Set, Callable, Iterable, Union
 from functools import wraps
 
+from src.wats.util_cache.cache_stats import CacheStats, estimate_size
+
 
 class IntelligentCache:
     """
@@ -17,10 +19,11 @@ class IntelligentCache:
     
     Features:
     - TTL configurável por padrão de chave
+    - Invalidação por tag com índice reverso (ex: "connections", "user:42")
     - Invalidação por pattern (ex: "users:*")
     - Callbacks de invalidação
     - Thread-safe
-    - Estatísticas de hit/miss
+    - Estatísticas de hit/miss, detalhadas por namespace e por função
     """
 
     def __init__(self, default_ttl: int = 60, max_size: int = 1000):
@@ -32,6 +35,8 @@ class IntelligentCache:
             max_size: Tamanho máximo do cache (default: 1000 itens)
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
+        # Índice reverso tag -> chaves
+        self._tag_index: Dict[str, Set[str]] = {}
         self._lock = threading.RLock()
         self.default_ttl = default_ttl
         self.max_size = max_size
@@ -39,6 +44,7 @@ class IntelligentCache:
         # Estatísticas
         self._hits = 0
         self._misses = 0
+        self.stats = CacheStats()
         
         # Callbacks de invalidação
         self._invalidation_callbacks: Dict[str, Set[Callable]] = {}
@@ -63,20 +69,29 @@ class IntelligentCache:
         with self._lock:
             if key not in self._cache:
                 self._misses += 1
+                self.stats.record_lookup(key, hit=False)
                 return default
             
             entry = self._cache[key]
             
             # Verifica se expirou
             if self._is_expired(entry):
-                del self._cache[key]
+                self._remove(key, reason="expiration")
                 self._misses += 1
+                self.stats.record_lookup(key, hit=False)
                 return default
             
             self._hits += 1
+            self.stats.record_lookup(key, hit=True)
             return entry['value']
 
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ):
         """
         Armazena valor no cache.
         
@@ -84,19 +99,30 @@ class IntelligentCache:
             key: Chave do cache
             value: Valor a armazenar
             ttl: TTL customizado (usa default se None)
+            tags: Tags da entrada (ex: ["connections", "user:42"])
         """
         with self._lock:
+            # Reinsere no fim do dict: a ordem de inserção passa a ser a ordem de criação
+            self._remove(key, reason="replace")
+            
             # Limpa cache se atingir max_size
             if len(self._cache) >= self.max_size:
                 self._evict_oldest()
             
             expires_at = datetime.now() + timedelta(seconds=ttl or self.default_ttl)
+            entry_tags = frozenset(tags or ())
+            size = estimate_size(value)
             
             self._cache[key] = {
                 'value': value,
                 'expires_at': expires_at,
-                'created_at': datetime.now()
+                'created_at': datetime.now(),
+                'tags': entry_tags,
+                'size': size,
             }
+            self.stats.record_store(key, size)
+            for tag in entry_tags:
+                self._tag_index.setdefault(tag, set()).add(key)
 
     def invalidate(self, key: str):
         """
@@ -107,13 +133,44 @@ class IntelligentCache:
         """
         with self._lock:
             if key in self._cache:
-                del self._cache[key]
+                self._remove(key)
                 logging.debug(f"Cache invalidated: {key}")
 
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Invalida todas as chaves marcadas com qualquer uma das tags.
+        
+        Consulta apenas o índice reverso, sem percorrer o cache inteiro.
+        
+        Args:
+            tags: Tags a invalidar (ex: "connections", "user:42", "group:7")
+            
+        Returns:
+            Número de chaves removidas
+        """
+        with self._lock:
+            keys_to_delete: Set[str] = set()
+            for tag in tags:
+                keys_to_delete.update(self._tag_index.get(tag, ()))
+            
+            for key in keys_to_delete:
+                self._remove(key)
+            
+            if keys_to_delete:
+                logging.debug(f"Cache invalidated tags {tags}: {len(keys_to_delete)} keys")
+            
+            for tag in tags:
+                self._invoke_callbacks(tag)
+            
+            return len(keys_to_delete)
+
     def invalidate_pattern(self, pattern: str):
         """
         Invalida todas as chaves que correspondem ao pattern.
         
+        Percorre todas as chaves; para invalidações frequentes prefira
+        ``invalidate_tags``.
+        
         Args:
             pattern: Pattern com wildcard (* ou ?)
                      Ex: "users:*", "connections:123:*"
@@ -127,7 +184,7 @@ class IntelligentCache:
             ]
             
             for key in keys_to_delete:
-                del self._cache[key]
+                self._remove(key)
             
             if keys_to_delete:
                 logging.info(f"Cache invalidated pattern '{pattern}': {len(keys_to_delete)} keys")
@@ -139,7 +196,8 @@ class IntelligentCache:
         """Limpa todo o cache."""
         with self._lock:
             count = len(self._cache)
-            self._cache.clear()
+            for key in list(self._cache):
+                self._remove(key)
             logging.info(f"Cache cleared: {count} keys removed")
 
     def register_invalidation_callback(self, pattern: str, callback: Callable):
@@ -173,15 +231,27 @@ class IntelligentCache:
         return datetime.now() > entry['expires_at']
 
     def _evict_oldest(self):
-        """Remove entrada mais antiga do cache."""
+        """Remove entrada mais antiga do cache (primeira na ordem de inserção)."""
         if not self._cache:
             return
         
-        oldest_key = min(
-            self._cache.keys(),
-            key=lambda k: self._cache[k]['created_at']
-        )
-        del self._cache[oldest_key]
+        oldest_key = next(iter(self._cache))
+        self._remove(oldest_key, reason="eviction")
+
+    def _remove(self, key: str, reason: str = "invalidation"):
+        """Remove a chave e suas referências no índice de tags (chamar com lock)."""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        
+        self.stats.record_removal(key, entry.get('size', 0), reason)
+        
+        for tag in entry.get('tags', ()):
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
 
     def _cleanup_loop(self):
         """Loop de limpeza de entradas expiradas."""
@@ -201,7 +271,7 @@ class IntelligentCache:
             ]
             
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key, reason="expiration")
             
             if expired_keys:
                 logging.debug(f"Cache cleanup: {len(expired_keys)} expired keys removed")
@@ -223,14 +293,26 @@ class IntelligentCache:
                 'total_requests': total,
                 'hit_rate': round(hit_rate, 2),
                 'current_size': len(self._cache),
-                'max_size': self.max_size
+                'max_size': self.max_size,
+                'tags': len(self._tag_index),
             }
 
+    def get_detailed_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas por namespace e por função decorada.
+        
+        Returns:
+            Dict com ``namespaces`` e ``functions`` (hits, misses, histograma de
+            tempo de carga, evictions, invalidações e bytes estimados)
+        """
+        return self.stats.snapshot()
+
     def reset_stats(self):
         """Reseta estatísticas."""
         with self._lock:
             self._hits = 0
             self._misses = 0
+            self.stats.reset()
 
 
 # Singleton global
@@ -257,20 +339,92 @@ def get_cache(default_ttl: int = 60, max_size: int = 1000) -> IntelligentCache:
         return _cache
 
 
-def cached(ttl: Optional[int] = None, key_prefix: str = ""):
+def enable_shared_cache(db_path: str, default_ttl: int = 60, max_size: int = 5000):
+    """
+    Substitui o singleton por um cache SQLite compartilhado entre processos.
+    
+    Todas as instâncias do WATS que apontarem para o mesmo arquivo passam a
+    reutilizar os resultados umas das outras. Os namespaces com credenciais
+    ou permissões continuam só em memória de cada processo.
+    
+    Args:
+        db_path: Caminho do arquivo SQLite do cache
+        default_ttl: TTL padrão em segundos
+        max_size: Número máximo de entradas
+        
+    Returns:
+        SharedSQLiteCache instance
+    """
+    from src.wats.util_cache.shared_cache import SharedSQLiteCache
+    
+    global _cache
+    
+    with _cache_lock:
+        _cache = SharedSQLiteCache(db_path, default_ttl=default_ttl, max_size=max_size)
+        return _cache
+
+
+TagsSpec = Union[Iterable[str], Callable[..., Iterable[str]], None]
+
+# TTL padrão (segundos) por namespace; ajustável via ``configure_namespace_ttls``
+DEFAULT_NAMESPACE_TTLS: Dict[str, int] = {
+    "connections": 60,
+    "catalog": 60,
+    "groups": 300,
+    "users": 300,
+    "permissions": 180,
+    "config": 600,
+}
+# Padrões com o log de alterações ativo: a versão do catálogo é calculada no cliente e
+# não detecta edições de outros clientes, então o TTL longo só vale com invalidação remota
+CHANGE_LOG_NAMESPACE_TTLS: Dict[str, int] = {
+    "catalog": 900,
+}
+_namespace_ttls: Dict[str, int] = dict(DEFAULT_NAMESPACE_TTLS)
+
+
+def configure_namespace_ttls(ttls: Dict[str, int]):
+    """
+    Ajusta o TTL usado pelos decorators que não informam ``ttl`` explícito.
+    
+    Vale também para funções já decoradas (o TTL é resolvido a cada gravação).
+    
+    Args:
+        ttls: Mapeamento namespace -> TTL em segundos (valores <= 0 são ignorados)
+    """
+    for namespace, ttl in ttls.items():
+        if ttl and int(ttl) > 0:
+            _namespace_ttls[namespace] = int(ttl)
+    logging.info(f"Cache TTLs per namespace: {_namespace_ttls}")
+
+
+def get_namespace_ttl(namespace: str) -> Optional[int]:
+    """Retorna o TTL configurado para o namespace (None = TTL padrão do cache)."""
+    return _namespace_ttls.get(namespace)
+
+
+def cached(ttl: Optional[int] = None, key_prefix: str = "", tags: TagsSpec = None):
     """
     Decorator para cachear resultados de funções.
     
+    As entradas são marcadas com ``key_prefix`` como tag, além das tags extras.
+    Cada chamada é contabilizada nas estatísticas por função do cache
+    (hit/miss e tempo de execução em miss).
+    
     Args:
-        ttl: TTL customizado (usa default se None)
+        ttl: TTL customizado (None usa o TTL do namespace ou o padrão do cache)
         key_prefix: Prefixo da chave de cache
+        tags: Tags extras; lista fixa ou função que recebe os mesmos
+              argumentos da função decorada e retorna as tags
         
     Usage:
-        @cached(ttl=300, key_prefix="users")
+        @cached(ttl=300, key_prefix="users", tags=lambda user_id: [f"user:{user_id}"])
         def get_user(user_id):
             return db.query(User).get(user_id)
     """
     def decorator(func: Callable) -> Callable:
+        stats_name = f"{key_prefix}:{func.__qualname__}"
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             cache = get_cache()
@@ -278,18 +432,27 @@ def cached(ttl: Optional[int] = None, key_prefix: str = ""):
             # Gerar chave de cache
             cache_key = f"{key_prefix}:{func.__name__}"
             if args:
-                cache_key += f":{':'.join(map(str, args))}"
+                cache_key += f":{':'.join(map(_key_part, args))}"
             if kwargs:
                 cache_key += f":{':'.join(f'{k}={v}' for k, v in sorted(kwargs.items()))}"
             
             # Tentar obter do cache
             result = cache.get(cache_key)
             if result is not None:
+                cache.stats.record_call(stats_name, hit=True)
                 return result
             
             # Executar função e cachear resultado
+            started = time.perf_counter()
             result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
+            cache.stats.record_call(
+                stats_name, hit=False, load_seconds=time.perf_counter() - started
+            )
+            
+            entry_ttl = ttl if ttl is not None else _namespace_ttls.get(key_prefix)
+            cache.set(
+                cache_key, result, entry_ttl, tags=_resolve_tags(tags, key_prefix, args, kwargs)
+            )
             
             return result
         
@@ -297,32 +460,79 @@ def cached(ttl: Optional[int] = None, key_prefix: str = ""):
     return decorator
 
 
+def _key_part(arg: Any) -> str:
+    """
+    Representação estável de um argumento para a chave de cache.
+    
+    Objetos sem ``__repr__`` próprio (ex: ``self`` de repositórios) usam o nome
+    da classe em vez do endereço de memória, mantendo a chave igual entre
+    processos (necessário para o cache compartilhado).
+    """
+    if type(arg).__repr__ is object.__repr__:
+        return type(arg).__qualname__
+    return str(arg)
+
+
+def _resolve_tags(spec: TagsSpec, prefix: str, args: tuple, kwargs: Dict) -> Set[str]:
+    """Calcula as tags de uma entrada a partir do prefixo e da especificação do decorator."""
+    resolved: Set[str] = {prefix} if prefix else set()
+    if spec is None:
+        return resolved
+    
+    try:
+        extra = spec(*args, **kwargs) if callable(spec) else spec
+        resolved.update(str(tag) for tag in extra or ())
+    except Exception as e:
+        logging.error(f"Error resolving cache tags: {e}")
+    
+    return resolved
+
+
 # Funções de conveniência para invalidação
-def invalidate_user_caches(user_id: int):
-    """Invalida todos os caches relacionados a um usuário."""
+def invalidate_user_caches(user_id: Optional[int] = None):
+    """
+    Invalida os caches relacionados a um usuário.
+    
+    Sem ``user_id`` invalida os namespaces inteiros de usuários e permissões.
+    """
     cache = get_cache()
-    cache.invalidate_pattern(f"users:{user_id}:*")
-    cache.invalidate_pattern(f"permissions:{user_id}:*")
-    cache.invalidate_pattern("connections:*")  # Conexões podem ser afetadas
+    if user_id is None:
+        cache.invalidate_tags("users", "permissions", "connections")
+    else:
+        # Conexões podem ser afetadas pelas permissões do usuário
+        cache.invalidate_tags(f"user:{user_id}", "connections")
     logging.info(f"✅ Cache invalidated for user {user_id}")
 
 
-def invalidate_group_caches(group_id: int):
-    """Invalida todos os caches relacionados a um grupo."""
+def invalidate_group_caches(group_id: Optional[int] = None):
+    """
+    Invalida os caches relacionados a um grupo.
+    
+    Sempre invalida os namespaces de grupos, permissões e conexões; com
+    ``group_id`` também as entradas com a tag do grupo.
+    """
     cache = get_cache()
-    cache.invalidate_pattern(f"groups:{group_id}:*")
-    cache.invalidate_pattern("permissions:*")  # Permissões de grupo afetadas
-    cache.invalidate_pattern("connections:*")  # Conexões podem ser afetadas
+    # As listagens em cache (select_all, catálogo) reúnem todos os grupos e só
+    # têm a tag do namespace: com ``group_id`` ele também é invalidado
+    tags = ["groups", "permissions", "connections"]
+    if group_id is not None:
+        tags.append(f"group:{group_id}")
+    cache.invalidate_tags(*tags)
     logging.info(f"✅ Cache invalidated for group {group_id}")
 
 
 def invalidate_connection_caches(connection_id: Optional[int] = None):
-    """Invalida caches de conexões."""
+    """
+    Invalida caches de conexões.
+
+    Com ``connection_id`` também invalida o namespace inteiro: as listagens
+    em cache contêm todas as conexões e não têm a tag de cada uma.
+    """
     cache = get_cache()
     if connection_id:
-        cache.invalidate_pattern(f"connections:{connection_id}:*")
+        cache.invalidate_tags(f"connection:{connection_id}", "connections")
     else:
-        cache.invalidate_pattern("connections:*")
+        cache.invalidate_tags("connections")
     logging.info(f"✅ Cache invalidated for connection{'s' if not connection_id else f' {connection_id}'}")
 
 
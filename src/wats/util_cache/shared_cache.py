@@ -0,0 +1,522 @@
+"""
+Cache compartilhado entre processos para WATS
+Instâncias de todos os usuários do host reutilizam o mesmo cache
+"""
+
+import base64
+import fnmatch
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from src.wats.util_cache.cache_stats import CacheCounters, CacheStats, namespace_of
+from src.wats.util_cache.intelligent_cache import IntelligentCache
+
+# Namespaces que nunca vão para o arquivo, que todos os usuários do host leem e gravam:
+# linhas com credenciais (connections, catalog) e dados de autorização (is_admin em
+# users, permissions). Ficam num cache em memória do processo.
+PRIVATE_NAMESPACES = frozenset({"connections", "catalog", "users", "permissions"})
+
+
+class SharedSQLiteCache:
+    """
+    Cache persistente em SQLite (modo WAL) compartilhado entre processos.
+
+    Expõe a mesma API dos caches em memória (get/set/delete/invalidate_tags/
+    invalidate_pattern/get_stats), de modo que pode substituir o singleton de
+    ``intelligent_cache`` sem alterar os repositórios.
+
+    Features:
+    - Um único arquivo por host (pasta de dados do WATS), lido e gravado por
+      todos os usuários do servidor de terminais
+    - Namespaces com credenciais ou dados de autorização (``PRIVATE_NAMESPACES``)
+      ficam só em memória do processo e nunca são gravados no arquivo
+    - WAL: leitores de outras instâncias não bloqueiam escritas
+    - TTL por entrada e índice de tags em tabela própria
+    - Serialização JSON com tipos do banco (datetime, Decimal, bytes);
+      não usa pickle, pois o arquivo pode ser gravado por outros usuários
+
+    Estatísticas de hit/miss são locais ao processo.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        default_ttl: int = 60,
+        max_size: int = 5000,
+        cleanup_interval: int = 60,
+        private_namespaces: Iterable[str] = PRIVATE_NAMESPACES,
+    ):
+        """
+        Inicializa o cache compartilhado.
+
+        Args:
+            db_path: Caminho do arquivo SQLite
+            default_ttl: TTL padrão em segundos
+            max_size: Número máximo de entradas no arquivo
+            cleanup_interval: Intervalo de limpeza de expirados em segundos
+            private_namespaces: Namespaces mantidos só em memória do processo
+        """
+        self.db_path = db_path
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.cleanup_interval = cleanup_interval
+
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+        # Estatísticas (por processo)
+        self._hits = 0
+        self._misses = 0
+        self.stats = CacheStats()
+
+        # Callbacks de invalidação (por processo)
+        self._invalidation_callbacks: Dict[str, Set[Callable]] = {}
+
+        # Camada em memória dos namespaces privados (mesmas estatísticas)
+        self.private_namespaces = frozenset(private_namespaces)
+        self._private = IntelligentCache(default_ttl=default_ttl, max_size=max_size)
+        self._private.stats = self.stats
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+        self._cleanup_thread.start()
+
+        logging.info(f"SharedSQLiteCache initialized ({db_path}, TTL={default_ttl}s)")
+
+    def _is_private(self, key: str) -> bool:
+        """Indica se a chave pertence a um namespace mantido só em memória."""
+        return namespace_of(key) in self.private_namespaces
+
+    # ------------------------------------------------------------------
+    # Conexão / schema
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual (uma por thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        """Cria as tabelas do cache se não existirem."""
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries(expires_at);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags(key);
+            """
+        )
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Obtém valor do cache.
+
+        Args:
+            key: Chave do cache
+            default: Valor padrão se não encontrado/expirado
+
+        Returns:
+            Valor armazenado ou default
+        """
+        if self._is_private(key):
+            return self._private.get(key, default)
+
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading shared cache: {e}")
+            row = None
+
+        with self._lock:
+            if row is None or row[1] < time.time():
+                self._misses += 1
+                self.stats.record_lookup(key, hit=False)
+                return default
+            self._hits += 1
+            self.stats.record_lookup(key, hit=True)
+
+        try:
+            return _decode(json.loads(row[0]))
+        except (ValueError, TypeError, KeyError) as e:
+            logging.warning(f"Invalid shared cache entry '{key}': {e}")
+            self._delete_where("key = ?", (key,), reason="expiration")
+            return default
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ):
+        """
+        Armazena valor no cache.
+
+        Valores que não podem ser serializados são ignorados (apenas não são cacheados).
+
+        Args:
+            key: Chave do cache
+            value: Valor a armazenar
+            ttl: TTL customizado (usa default se None)
+            tags: Tags da entrada (ex: ["connections", "user:42"])
+        """
+        if self._is_private(key):
+            self._private.set(key, value, ttl, tags=tags)
+            return
+
+        try:
+            payload = json.dumps(_encode(value), ensure_ascii=False, separators=(",", ":"))
+        except TypeError as e:
+            logging.debug(f"Shared cache skipped '{key}': {e}")
+            return
+
+        now = time.time()
+        expires_at = now + (ttl or self.default_ttl)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now),
+                )
+                conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                    [(tag, key) for tag in set(tags or ())],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.error(f"Error writing shared cache: {e}")
+
+    def delete(self, key: str):
+        """Remove entrada do cache."""
+        if self._is_private(key):
+            self._private.invalidate(key)
+        else:
+            self._delete_where("key = ?", (key,))
+
+    def invalidate(self, key: str):
+        """Alias de ``delete`` (compatível com IntelligentCache)."""
+        self.delete(key)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Invalida todas as entradas marcadas com qualquer uma das tags.
+
+        Args:
+            tags: Tags a invalidar
+
+        Returns:
+            Número de entradas removidas
+        """
+        if not tags:
+            return 0
+
+        placeholders = ", ".join("?" for _ in tags)
+        removed = self._private.invalidate_tags(*tags)
+        removed += self._delete_where(
+            f"key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))", tuple(tags)
+        )
+        for tag in tags:
+            self._invoke_callbacks(tag)
+        return removed
+
+    def invalidate_pattern(self, pattern: str):
+        """
+        Invalida as chaves que correspondem ao pattern (wildcards * e ?).
+
+        Args:
+            pattern: Pattern no formato do fnmatch (ex: "users:*")
+        """
+        self._private.invalidate_pattern(pattern)
+        # GLOB usa a mesma sintaxe de * e ? do fnmatch
+        self._delete_where("key GLOB ?", (pattern,))
+        self._invoke_callbacks(pattern)
+
+    def invalidate_all(self):
+        """Limpa todo o cache (para todas as instâncias)."""
+        self._private.invalidate_all()
+        self._delete_where("1 = 1", ())
+        logging.info("Shared cache cleared")
+
+    def clear(self):
+        """Limpa todo o cache e zera as estatísticas locais."""
+        self.invalidate_all()
+        self.reset_stats()
+
+    def register_invalidation_callback(self, pattern: str, callback: Callable):
+        """
+        Registra callback a ser chamado quando pattern/tag for invalidado neste processo.
+
+        Args:
+            pattern: Pattern de chave ou tag
+            callback: Função a ser chamada (sem argumentos)
+        """
+        with self._lock:
+            self._invalidation_callbacks.setdefault(pattern, set()).add(callback)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do cache.
+
+        Returns:
+            Dict com hits/misses locais e tamanho do arquivo compartilhado
+        """
+        try:
+            conn = self._connect()
+            size = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            tags = conn.execute("SELECT COUNT(DISTINCT tag) FROM cache_tags").fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Error reading shared cache stats: {e}")
+            size, tags = 0, 0
+
+        private = self._private.get_stats()
+        with self._lock:
+            hits = self._hits + private['hits']
+            misses = self._misses + private['misses']
+            total = hits + misses
+            hit_rate = (hits / total * 100) if total > 0 else 0
+
+            return {
+                'hits': hits,
+                'misses': misses,
+                'total_requests': total,
+                'hit_rate': round(hit_rate, 2),
+                'current_size': size + private['current_size'],
+                'private_size': private['current_size'],
+                'max_size': self.max_size,
+                'tags': tags,
+                'backend': 'sqlite',
+                'path': self.db_path,
+            }
+
+    def get_detailed_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas por namespace e por função.
+
+        Hits, misses e tempos são do processo atual; entradas e bytes
+        vêm do arquivo compartilhado (tamanho do JSON gravado), exceto nos
+        namespaces privados, que ficam em memória.
+        """
+        snapshot = self.stats.snapshot()
+        try:
+            rows = self._connect().execute(
+                "SELECT key, length(value) FROM cache_entries WHERE expires_at >= ?",
+                (time.time(),),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading shared cache stats: {e}")
+            return snapshot
+
+        namespaces = snapshot['namespaces']
+        for namespace, counters in namespaces.items():
+            if namespace not in self.private_namespaces:
+                counters['entries'] = 0
+                counters['estimated_bytes'] = 0
+        for key, size in rows:
+            counters = namespaces.setdefault(namespace_of(key), CacheCounters().as_dict())
+            counters['entries'] += 1
+            counters['estimated_bytes'] += size or 0
+
+        snapshot['total_entries'] = sum(ns['entries'] for ns in namespaces.values())
+        snapshot['total_estimated_bytes'] = sum(
+            ns['estimated_bytes'] for ns in namespaces.values()
+        )
+        return snapshot
+
+    def reset_stats(self):
+        """Reseta estatísticas locais."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._private.reset_stats()
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _delete_where(self, where: str, params: tuple, reason: str = "invalidation") -> int:
+        """Remove entradas (e suas tags) que satisfazem a condição."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                keys = [
+                    row[0]
+                    for row in conn.execute(f"SELECT key FROM cache_entries WHERE {where}", params)
+                ]
+                if keys:
+                    key_params = [(k,) for k in keys]
+                    conn.executemany("DELETE FROM cache_entries WHERE key = ?", key_params)
+                    conn.executemany("DELETE FROM cache_tags WHERE key = ?", key_params)
+                conn.execute("COMMIT")
+                for key in keys:
+                    self.stats.record_removal(key, 0, reason)
+                return len(keys)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.error(f"Error deleting from shared cache: {e}")
+            return 0
+
+    def _invoke_callbacks(self, pattern: str):
+        """Invoca callbacks registrados para um pattern/tag."""
+        with self._lock:
+            callbacks = [
+                callback
+                for callback_pattern, registered in self._invalidation_callbacks.items()
+                if fnmatch.fnmatch(pattern, callback_pattern)
+                for callback in registered
+            ]
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Error in invalidation callback: {e}")
+
+    def _cleanup_expired(self):
+        """Remove entradas expiradas e aplica o limite de tamanho."""
+        removed = self._delete_where("expires_at < ?", (time.time(),), reason="expiration")
+
+        try:
+            size = self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error:
+            size = 0
+
+        if size > self.max_size:
+            removed += self._delete_where(
+                "key IN (SELECT key FROM cache_entries ORDER BY created_at LIMIT ?)",
+                (size - self.max_size,),
+                reason="eviction",
+            )
+
+        if removed:
+            logging.debug(f"Shared cache cleanup: {removed} keys removed")
+
+    def _cleanup_loop(self):
+        """Loop de limpeza de entradas expiradas."""
+        while True:
+            try:
+                time.sleep(self.cleanup_interval)
+                self._cleanup_expired()
+            except Exception as e:
+                logging.error(f"Error in shared cache cleanup loop: {e}")
+
+
+# ----------------------------------------------------------------------
+# Serialização (JSON com marcação de tipos)
+# ----------------------------------------------------------------------
+
+_TYPE_KEY = "__t"
+
+
+def _encode(value: Any) -> Any:
+    """Converte o valor para estruturas JSON, marcando tipos não nativos."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {_TYPE_KEY: "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {_TYPE_KEY: "date", "v": value.isoformat()}
+    if isinstance(value, dt_time):
+        return {_TYPE_KEY: "time", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_TYPE_KEY: "decimal", "v": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {_TYPE_KEY: "bytes", "v": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, dict):
+        return {
+            _TYPE_KEY: "dict",
+            "v": [[_encode(k), _encode(v)] for k, v in value.items()],
+        }
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {_TYPE_KEY: "set", "v": [_encode(item) for item in value]}
+    if isinstance(value, tuple) or _is_row(value):
+        # pyodbc.Row e sqlite3.Row são gravados como tupla (acesso por índice preservado)
+        return {_TYPE_KEY: "tuple", "v": [_encode(item) for item in value]}
+    raise TypeError(f"Tipo não suportado no cache compartilhado: {type(value).__name__}")
+
+
+def _decode(value: Any) -> Any:
+    """Reconstrói o valor gravado por ``_encode``."""
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    kind = value[_TYPE_KEY]
+    raw = value["v"]
+    if kind == "tuple":
+        return tuple(_decode(item) for item in raw)
+    if kind == "dict":
+        return {_decode(k): _decode(v) for k, v in raw}
+    if kind == "set":
+        return {_decode(item) for item in raw}
+    if kind == "datetime":
+        return datetime.fromisoformat(raw)
+    if kind == "date":
+        return date.fromisoformat(raw)
+    if kind == "time":
+        return dt_time.fromisoformat(raw)
+    if kind == "decimal":
+        return Decimal(raw)
+    if kind == "bytes":
+        return base64.b64decode(raw)
+    raise ValueError(f"Tipo desconhecido no cache compartilhado: {kind}")
+
+
+def _is_row(value: Any) -> bool:
+    """Identifica linhas de cursor (pyodbc.Row / sqlite3.Row) sem importar os drivers."""
+    return (
+        type(value).__name__ == "Row"
+        and hasattr(value, "__len__")
+        and hasattr(value, "__getitem__")
+    )
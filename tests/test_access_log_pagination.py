@@ -0,0 +1,91 @@
+"""Testes da paginação por chave e do streaming dos logs de acesso (SQLite)."""
+
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.repositories.log_repository import LogRepository
+from src.wats.db.sql_dialect import limit_clause
+from src.wats.util_cache.cache import invalidate_cache
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor com context manager, como o do pyodbc."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def repo():
+    conn = sqlite3.connect(":memory:", factory=_Connection)
+    conn.execute(
+        """
+        CREATE TABLE Log_Acesso_WTS (
+            Log_Id INTEGER PRIMARY KEY, Usu_Nome_Maquina TEXT, Con_Codigo INTEGER,
+            Con_Nome_Acessado TEXT, Log_DataHora_Inicio TIMESTAMP, Log_DataHora_Fim TIMESTAMP,
+            Log_Tipo_Conexao TEXT
+        )
+        """
+    )
+    base = datetime(2025, 1, 1)
+    # Dois logs por instante: a chave precisa do Log_Id para desempatar
+    conn.executemany(
+        "INSERT INTO Log_Acesso_WTS VALUES (?, ?, 1, 'Srv', ?, NULL, 'RDP')",
+        [
+            (log_id, "alice" if log_id % 2 else "bob", base + timedelta(minutes=log_id // 2))
+            for log_id in range(1, 26)
+        ],
+    )
+    manager = SimpleNamespace(
+        PARAM="?", db_type="sqlite", driver_module=sqlite3, get_cursor=conn.cursor
+    )
+    invalidate_cache(namespace="logs")
+    yield LogRepository(manager)
+    invalidate_cache(namespace="logs")
+    conn.close()
+
+
+def test_keyset_pages_cover_all_rows_once_in_order(repo):
+    seen = []
+    key = None
+    while True:
+        rows, key = repo.get_access_logs_page(limit=7, after=key)
+        seen.extend(row["Log_Id"] for row in rows)
+        if key is None:
+            break
+
+    assert seen == sorted(seen, reverse=True)
+    assert sorted(seen) == list(range(1, 26))
+
+
+def test_user_filter_and_history(repo):
+    rows, _ = repo.get_access_logs_page(limit=100, user_machine_name="bob")
+    assert {row["Usu_Nome_Maquina"] for row in rows} == {"bob"}
+    assert [row["Log_Id"] for row in repo.get_user_access_history("alice", limit=3)] == [25, 23, 21]
+
+
+def test_iterator_streams_with_filters(repo):
+    since = datetime(2025, 1, 1, 0, 5)
+    logs = list(repo.iter_access_logs(batch_size=4, since=since))
+
+    assert [row["Log_Id"] for row in logs] == list(range(25, 9, -1))
+    assert len(repo.get_access_logs(limit=5, offset=20)) == 5
+
+
+def test_limit_clause_parameter_order():
+    assert limit_clause("sqlite", "?", 10, 30) == ("LIMIT ? OFFSET ?", (10, 30))
+    assert limit_clause("sqlserver", "?", 10, 30) == (
+        "OFFSET ? ROWS FETCH NEXT ? ROWS ONLY",
+        (30, 10),
+    )
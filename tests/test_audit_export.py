@@ -0,0 +1,122 @@
+"""Testes da exportação de auditoria em arquivos CSV gzip com manifest (SQLite)."""
+
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.repositories.log_repository import LogRepository
+from src.wats.services.audit_export import AuditExporter, export_audit_logs
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor com context manager, como o do pyodbc."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", factory=_Connection)
+    conn.execute(
+        """
+        CREATE TABLE Log_Acesso_WTS (
+            Log_Id INTEGER PRIMARY KEY, Usu_Nome_Maquina TEXT, Con_Codigo INTEGER,
+            Con_Nome_Acessado TEXT, Log_DataHora_Inicio TIMESTAMP, Log_DataHora_Fim TIMESTAMP,
+            Log_Tipo_Conexao TEXT
+        )
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def _insert_logs(conn, ids):
+    base = datetime(2025, 1, 1)
+    conn.executemany(
+        "INSERT INTO Log_Acesso_WTS VALUES (?, 'alice', 1, 'Srv', ?, NULL, 'RDP')",
+        [(log_id, base + timedelta(minutes=log_id)) for log_id in ids],
+    )
+
+
+def _db_service(conn):
+    manager = SimpleNamespace(
+        PARAM="?", db_type="sqlite", driver_module=sqlite3, get_cursor=conn.cursor
+    )
+    return SimpleNamespace(logs=LogRepository(manager), db_manager=manager)
+
+
+def _read_ids(path):
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        return [int(row["Log_Id"]) for row in csv.DictReader(f)]
+
+
+def test_export_chunks_files_and_writes_manifest(conn, tmp_path):
+    _insert_logs(conn, range(1, 24))
+
+    manifest = export_audit_logs(
+        _db_service(conn), str(tmp_path), datasets=["access_logs"], rows_per_file=10, batch_size=4
+    )["access_logs"]
+
+    files = [entry["file"] for entry in manifest["files"]]
+    assert files == ["access_logs_00001.csv.gz", "access_logs_00002.csv.gz", "access_logs_00003.csv.gz"]
+    assert [entry["rows"] for entry in manifest["files"]] == [10, 10, 3]
+    assert manifest["completed"] and manifest["total_rows"] == 23 and manifest["last_key"] == 23
+
+    exported = [i for name in files for i in _read_ids(tmp_path / "access_logs" / name)]
+    assert exported == list(range(1, 24))
+    assert not list((tmp_path / "access_logs").glob("*.tmp"))
+
+    on_disk = json.loads((tmp_path / "access_logs" / "manifest.json").read_text(encoding="utf-8"))
+    assert on_disk["files"] == manifest["files"]
+
+
+def test_interrupted_export_resumes_after_last_file(conn, tmp_path):
+    _insert_logs(conn, range(1, 16))
+    output = tmp_path / "access_logs"
+
+    def failing_source(after_id):
+        for row in _db_service(conn).logs.export_access_logs(after_id=after_id, batch_size=3):
+            if row["Log_Id"] == 8:
+                raise RuntimeError("conexão perdida")
+            yield row
+
+    exporter = AuditExporter(str(output), "access_logs", "Log_Id", rows_per_file=5)
+    with pytest.raises(RuntimeError):
+        exporter.export(failing_source)
+
+    # Só o primeiro arquivo foi concluído; o segundo ficou como .tmp
+    resumed = AuditExporter(str(output), "access_logs", "Log_Id", rows_per_file=5)
+    assert resumed.last_key == 5 and not resumed.manifest["completed"]
+
+    _insert_logs(conn, [16, 17])
+    manifest = resumed.export(
+        lambda after_id: _db_service(conn).logs.export_access_logs(after_id=after_id)
+    )
+
+    exported = [i for entry in manifest["files"] for i in _read_ids(output / entry["file"])]
+    assert exported == list(range(1, 18))
+    assert manifest["completed"] and manifest["last_key"] == 17
+
+
+def test_resume_with_different_filters_is_rejected(conn, tmp_path):
+    _insert_logs(conn, range(1, 4))
+    export_audit_logs(_db_service(conn), str(tmp_path), datasets=["access_logs"])
+
+    with pytest.raises(ValueError):
+        export_audit_logs(
+            _db_service(conn), str(tmp_path), datasets=["access_logs"], since=datetime(2025, 1, 1)
+        )
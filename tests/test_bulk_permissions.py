@@ -0,0 +1,115 @@
+"""Testes das concessões/revogações de permissões individuais em lote (SQLite)."""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)  # performance -> connection_pool
+
+from src.wats.db.database_manager import DatabaseManager  # noqa: E402
+from src.wats.db.repositories.individual_permission_repository import (  # noqa: E402
+    IndividualPermissionRepository,
+)
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor com context manager, como o do pyodbc."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def repo():
+    conn = sqlite3.connect(":memory:", factory=_Connection)
+    conn.execute(
+        """
+        CREATE TABLE Permissao_Conexao_Individual_WTS (
+            Id INTEGER PRIMARY KEY, Usu_Id INTEGER, Con_Codigo INTEGER,
+            Data_Inicio TIMESTAMP, Data_Fim TIMESTAMP, Criado_Por_Usu_Id INTEGER,
+            Data_Criacao TIMESTAMP, Ativo BOOLEAN, Observacoes TEXT
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO Permissao_Conexao_Individual_WTS (Usu_Id, Con_Codigo, Ativo) VALUES (1, 10, 1)"
+    )
+    conn.commit()
+    manager = SimpleNamespace(
+        PARAM="?",
+        db_type="sqlite",
+        driver_module=sqlite3,
+        use_effective_permissions=False,
+        get_transactional_connection=lambda: conn,
+        enable_fast_executemany=lambda cursor: None,
+    )
+    manager.get_transactional_cursor = lambda: DatabaseManager.get_transactional_cursor(manager)
+    yield IndividualPermissionRepository(manager), conn
+    conn.close()
+
+
+def _active(conn):
+    rows = conn.execute(
+        "SELECT Usu_Id, Con_Codigo FROM Permissao_Conexao_Individual_WTS WHERE Ativo = 1 "
+        "ORDER BY 1, 2"
+    )
+    return rows.fetchall()
+
+
+def test_bulk_grant_skips_existing_and_duplicates(repo):
+    repository, conn = repo
+    pairs = [(1, 10), (1, 11), (2, 10), (2, 11), (2, 11)]
+
+    success, message = repository.grant_individual_access_bulk(pairs, granted_by_user_id=99)
+
+    assert success, message
+    assert "1 já possuía" in message
+    assert _active(conn) == [(1, 10), (1, 11), (2, 10), (2, 11)]
+
+    success, _ = repository.grant_individual_access_bulk([(1, 10)], granted_by_user_id=99)
+    assert not success
+
+
+def test_bulk_temporary_grant_and_revoke(repo):
+    repository, conn = repo
+
+    success, _ = repository.grant_temporary_access_bulk(
+        [(3, 10), (3, 12)], granted_by_user_id=99, duration_hours=0.5
+    )
+    assert success
+    ends = conn.execute(
+        "SELECT Data_Fim FROM Permissao_Conexao_Individual_WTS WHERE Usu_Id = 3"
+    ).fetchall()
+    assert len(ends) == 2 and all(end is not None for (end,) in ends)
+
+    success, message = repository.revoke_individual_access_bulk([(1, 10), (3, 12), (4, 1)])
+    assert success
+    assert message.startswith("2 ")
+    assert _active(conn) == [(3, 10)]
+
+
+def test_failed_refresh_rolls_back_the_grant(repo):
+    repository, conn = repo
+
+    def failing_refresh(user_id, cursor=None):
+        raise sqlite3.OperationalError("database is locked")
+
+    repository.effective_perm_repo.refresh_user = failing_refresh
+
+    # A permissão não fica gravada sem as permissões efetivas correspondentes
+    success, _ = repository.grant_individual_access(2, 20, granted_by_user_id=99)
+    assert not success
+    success, _ = repository.grant_individual_access_bulk([(2, 21)], granted_by_user_id=99)
+    assert not success
+    success, _ = repository.revoke_individual_access(1, 10)
+    assert not success
+    assert _active(conn) == [(1, 10)]
@@ -0,0 +1,92 @@
+"""Testes das estatísticas por namespace/função dos caches do WATS."""
+
+import logging
+
+from src.wats.util_cache import cache_stats, intelligent_cache
+from src.wats.util_cache.cache import InMemoryCache
+from src.wats.util_cache.intelligent_cache import IntelligentCache
+
+
+def test_decorated_function_stats_track_hits_misses_and_load_time(monkeypatch):
+    cache = IntelligentCache(default_ttl=60)
+    monkeypatch.setattr(intelligent_cache, "_cache", cache)
+
+    @intelligent_cache.cached(key_prefix="groups")
+    def list_groups(page):
+        return [page]
+
+    list_groups(1)
+    list_groups(1)
+    list_groups(2)
+
+    stats = cache.get_detailed_stats()
+    function = stats["functions"]["groups:" + list_groups.__qualname__]
+    assert (function["hits"], function["misses"], function["loads"]) == (1, 2, 2)
+    assert sum(function["load_histogram"].values()) == 2
+
+    namespace = stats["namespaces"]["groups"]
+    assert (namespace["hits"], namespace["misses"], namespace["entries"]) == (1, 2, 2)
+    assert namespace["estimated_bytes"] > 0
+
+
+def test_namespace_ttl_is_used_when_decorator_has_no_ttl(monkeypatch):
+    cache = IntelligentCache(default_ttl=60)
+    monkeypatch.setattr(intelligent_cache, "_cache", cache)
+    monkeypatch.setattr(intelligent_cache, "_namespace_ttls", {})
+    intelligent_cache.configure_namespace_ttls({"config": 3600, "users": 0})
+
+    @intelligent_cache.cached(key_prefix="config")
+    def load_settings():
+        return {"a": 1}
+
+    load_settings()
+    entry = next(iter(cache._cache.values()))
+    remaining = (entry["expires_at"] - entry["created_at"]).total_seconds()
+    assert remaining > 3000
+    assert intelligent_cache.get_namespace_ttl("users") is None
+
+
+def test_removals_are_counted_by_reason():
+    cache = IntelligentCache(default_ttl=60, max_size=2)
+    cache.set("connections:a", [1, 2, 3], tags=["connections"])
+    cache.set("connections:b", [4], tags=["connections"])
+    cache.set("users:c", "x")  # Evicta connections:a
+    cache.invalidate_tags("connections")
+
+    connections = cache.get_detailed_stats()["namespaces"]["connections"]
+    assert connections["evictions"] == 1
+    assert connections["invalidations"] == 1
+    assert connections["entries"] == 0
+    assert connections["estimated_bytes"] == 0
+
+
+def test_legacy_cache_stats_and_report_logging(monkeypatch, caplog):
+    legacy = InMemoryCache(default_ttl=60)
+    legacy.set("logs:x", "abc")
+    legacy.get("logs:x")
+    legacy.get("logs:missing")
+
+    namespace = legacy.get_detailed_stats()["namespaces"]["logs"]
+    assert (namespace["hits"], namespace["misses"], namespace["entries"]) == (1, 1, 1)
+
+    monkeypatch.setattr(cache_stats, "get_cache_report", lambda: {
+        "legacy": {"namespaces": {"logs": namespace}, "functions": {}},
+    })
+    with caplog.at_level(logging.INFO, logger="performance"):
+        cache_stats.log_cache_report()
+
+    record = caplog.records[-1]
+    assert record.extra_fields["namespace"] == "logs"
+    assert record.extra_fields["hits"] == 1
+
+
+def test_catalog_ttl_is_long_only_with_the_change_log(monkeypatch):
+    from src.wats.config import Settings
+
+    monkeypatch.delenv("CACHE_TTL_CATALOG", raising=False)
+    monkeypatch.setenv("CACHE_CHANGE_LOG_ENABLED", "false")
+    # Sem o log, edições de outros clientes só chegam quando o TTL vence
+    assert Settings().CACHE_NAMESPACE_TTLS["catalog"] == 60
+
+    monkeypatch.setenv("CACHE_CHANGE_LOG_ENABLED", "true")
+    assert Settings().CACHE_NAMESPACE_TTLS["catalog"] == 900
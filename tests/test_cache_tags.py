@@ -0,0 +1,98 @@
+"""Testes da invalidação por tags (índice reverso) dos caches do WATS."""
+
+from src.wats.util_cache import cache as old_cache_module
+from src.wats.util_cache import intelligent_cache
+from src.wats.util_cache.cache import InMemoryCache
+from src.wats.util_cache.intelligent_cache import IntelligentCache
+
+
+def test_in_memory_cache_invalidate_tags_only_touches_tagged_entries():
+    cache = InMemoryCache(default_ttl=60)
+    cache.set("a", 1, tags=["connections", "user:1"])
+    cache.set("b", 2, tags=["connections"])
+    cache.set("c", 3, tags=["groups"])
+
+    assert cache.invalidate_tags("user:1") == 1
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    assert cache.invalidate_tags("connections") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["tags"] == 1
+
+
+def test_in_memory_cache_overwrite_replaces_tags():
+    cache = InMemoryCache(default_ttl=60)
+    cache.set("a", 1, tags=["old"])
+    cache.set("a", 2, tags=["new"])
+
+    assert cache.invalidate_tags("old") == 0
+    assert cache.get("a") == 2
+    cache.delete("a")
+    assert cache.get_stats()["tags"] == 0
+
+
+def test_cached_decorator_tags_namespace_and_callable(monkeypatch):
+    cache = InMemoryCache(default_ttl=60)
+    monkeypatch.setattr(old_cache_module, "_global_cache", cache)
+    calls = []
+
+    @old_cache_module.cached(namespace="logs", tags=lambda user: [f"user:{user}"])
+    def fetch(user):
+        calls.append(user)
+        return [user]
+
+    fetch("alice")
+    fetch("bob")
+    fetch("alice")
+    assert calls == ["alice", "bob"]
+
+    old_cache_module.invalidate_cache_tags("user:alice")
+    fetch("alice")
+    fetch("bob")
+    assert calls == ["alice", "bob", "alice"]
+
+    old_cache_module.invalidate_cache(namespace="logs")
+    assert cache.get_stats()["size"] == 0
+
+
+def test_intelligent_cache_invalidate_tags_and_eviction():
+    cache = IntelligentCache(default_ttl=60, max_size=2)
+    cache.set("k1", 1, tags=["connections"])
+    cache.set("k2", 2, tags=["group:7"])
+    cache.set("k3", 3, tags=["connections"])  # Evicta k1 (mais antiga)
+
+    assert cache.get("k1") is None
+    assert cache.invalidate_tags("connections") == 1
+    assert cache.get("k2") == 2
+    assert cache.get_stats()["tags"] == 1
+
+
+def test_intelligent_cache_helpers_use_tags(monkeypatch):
+    cache = IntelligentCache(default_ttl=60)
+    monkeypatch.setattr(intelligent_cache, "_cache", cache)
+    cache.set("connections:select_all:x", 1, tags=["connections"])
+    cache.set("permissions:list:42", 2, tags=["permissions", "user:42"])
+    cache.set("permissions:list:43", 3, tags=["permissions", "user:43"])
+
+    intelligent_cache.invalidate_user_caches(42)
+    assert cache.get("connections:select_all:x") is None
+    assert cache.get("permissions:list:42") is None
+    assert cache.get("permissions:list:43") == 3
+
+    intelligent_cache.invalidate_user_caches()
+    assert cache.get("permissions:list:43") is None
+
+
+def test_id_specific_helpers_also_drop_namespace_listings(monkeypatch):
+    cache = IntelligentCache(default_ttl=60)
+    monkeypatch.setattr(intelligent_cache, "_cache", cache)
+    # Listagens cobrem todas as conexões/grupos: só têm a tag do namespace
+    cache.set("connections:select_all:alice", 1, tags=["connections"])
+    cache.set("groups:admin_get_all_groups", 2, tags=["groups"])
+
+    intelligent_cache.invalidate_connection_caches(7)
+    assert cache.get("connections:select_all:alice") is None
+
+    intelligent_cache.invalidate_group_caches(3)
+    assert cache.get("groups:admin_get_all_groups") is None
@@ -0,0 +1,65 @@
+"""Testes do snapshot local do catálogo de conexões (warm start)."""
+
+import gzip
+import os
+import stat
+
+from src.wats.util_cache import catalog_snapshot
+
+
+def _row(con_id, pwd="secret", users="bob"):
+    return (
+        con_id, "10.0.0.1", f"Srv{con_id}", "admin", pwd, "Grupo", users, None, "", None, "", "RDP"
+    )
+
+
+def test_snapshot_roundtrip_strips_passwords_and_presence(temp_dir, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(temp_dir))
+
+    assert catalog_snapshot.save_catalog_snapshot("DOMAIN\\alice", [_row(1), _row(2)])
+
+    rows = catalog_snapshot.load_catalog_snapshot("DOMAIN\\alice")
+    assert [row[0] for row in rows] == [1, 2]
+    assert all(row[4] == "" and row[6] == "" for row in rows)
+    assert catalog_snapshot.load_catalog_snapshot("bob") is None
+
+
+def test_invalid_snapshot_is_ignored(temp_dir, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(temp_dir))
+    path = catalog_snapshot.get_snapshot_path("alice")
+    catalog_snapshot.save_catalog_snapshot("alice", [_row(1)])
+
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("{corrompido")
+
+    assert catalog_snapshot.load_catalog_snapshot("alice") is None
+
+
+def test_rows_with_unexpected_layout_are_not_saved(temp_dir, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(temp_dir))
+
+    assert not catalog_snapshot.save_catalog_snapshot("alice", [(1, "x")])
+    assert catalog_snapshot.load_catalog_snapshot("alice") is None
+
+
+def test_catalog_version_changes_only_with_content():
+    version = catalog_snapshot.catalog_version([_row(1), _row(2)])
+
+    assert catalog_snapshot.catalog_version([list(_row(1)), _row(2)]) == version
+    assert catalog_snapshot.catalog_version([_row(1), _row(2, pwd="nova")]) != version
+    assert catalog_snapshot.catalog_version([_row(2), _row(1)]) != version
+
+
+def test_snapshot_is_private_to_the_os_user(temp_dir, monkeypatch):
+    from src.wats.config import get_user_data_dir
+
+    monkeypatch.setenv("LOCALAPPDATA", str(temp_dir / "alice"))
+    path = catalog_snapshot.get_snapshot_path("alice")
+
+    # Fora da pasta do WATS, que todos os usuários do servidor de terminais leem
+    assert path.startswith(str(temp_dir / "alice"))
+    assert not path.startswith(get_user_data_dir())
+
+    assert catalog_snapshot.save_catalog_snapshot("alice", [_row(1)])
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
@@ -0,0 +1,64 @@
+"""Testes do detector de frames sem mudança (tela RDP parada)."""
+
+import numpy as np
+
+from src.wats.recording.change_detector import FrameChangeDetector
+
+
+def _frame(value=0, shape=(120, 160, 4)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_static_screen_is_detected_as_unchanged():
+    detector = FrameChangeDetector()
+    frame = _frame(10)
+
+    assert detector.has_changed(frame)  # primeiro frame
+    assert not detector.has_changed(frame.copy())
+    assert not detector.has_changed(frame.copy())
+
+    stats = detector.get_stats()
+    assert stats["frames_checked"] == 3
+    assert stats["frames_unchanged"] == 2
+
+
+def test_small_change_on_sampled_rows_is_detected():
+    detector = FrameChangeDetector(row_stride=4)
+    frame = _frame(10)
+    detector.has_changed(frame)
+
+    # "Texto" de 8 px de altura sempre cruza uma linha amostrada
+    changed = frame.copy()
+    changed[50:58, 70:75] = 255
+    assert detector.has_changed(changed)
+
+
+def test_resolution_change_and_reset_force_a_new_frame():
+    detector = FrameChangeDetector()
+    detector.has_changed(_frame(0))
+
+    assert detector.has_changed(_frame(0, shape=(100, 160, 4)))
+
+    detector.reset()
+    assert detector.has_changed(_frame(0, shape=(100, 160, 4)))
+
+
+def test_works_on_non_contiguous_views():
+    detector = FrameChangeDetector(row_stride=2)
+    frame = _frame(5, shape=(120, 160, 4))[:, 10:150]
+
+    assert detector.has_changed(frame)
+    assert not detector.has_changed(frame)
+
+
+def test_thin_change_between_sampled_rows_is_caught_within_stride():
+    detector = FrameChangeDetector(row_stride=4)
+    frame = _frame(10)
+    detector.has_changed(frame)
+
+    # Sublinhado de 1 px numa linha fora da próxima amostra (deslocamento 0)
+    changed = frame.copy()
+    changed[53, 20:140] = 255
+    results = [detector.has_changed(changed) for _ in range(4)]
+    assert results.count(True) == 1
+    assert not detector.has_changed(changed)  # depois de visto, volta a ser estático
@@ -0,0 +1,77 @@
+"""Testes da invalidação de cache pelo log de alterações (stand-in SQLite)."""
+
+import sqlite3
+from contextlib import closing
+from types import SimpleNamespace
+
+from src.wats.db.repositories.change_log_repository import ChangeLogRepository
+from src.wats.util_cache.change_listener import (
+    CacheChangeListener,
+    SQLiteChangeLog,
+    tags_for_change,
+)
+from src.wats.util_cache.intelligent_cache import IntelligentCache
+
+
+def test_tags_for_change_maps_tables_and_keys():
+    assert tags_for_change("Conexao_WTS", 7) == {"connections", "connection:7"}
+    assert tags_for_change("Permissao_Grupo_WTS", None) == {"permissions", "connections"}
+    assert tags_for_change("Tabela_Desconhecida", 1) == set()
+
+
+def test_listener_skips_history_and_invalidates_new_changes():
+    log = SQLiteChangeLog()
+    log.record_change("Conexao_WTS", 1)  # Anterior ao início: não invalida nada
+    cache = IntelligentCache(default_ttl=600)
+    listener = CacheChangeListener(log, invalidate=cache.invalidate_tags)
+
+    cache.set("connections:select_all:alice", [1], tags=["connections"])
+    cache.set("permissions:list:42", [2], tags=["permissions", "user:42"])
+    cache.set("permissions:list:43", [3], tags=["permissions", "user:43"])
+    cache.set("groups:all", [4], tags=["groups"])
+
+    assert listener.poll_once() == 0
+    assert cache.get("connections:select_all:alice") == [1]
+
+    log.record_change("Permissao_Conexao_Individual_WTS", 42)
+    assert listener.poll_once() == 1
+    assert cache.get("permissions:list:42") is None
+    assert cache.get("connections:select_all:alice") is None
+    assert cache.get("permissions:list:43") == [3]
+    assert cache.get("groups:all") == [4]
+    assert listener.poll_once() == 0
+
+
+def test_listener_reads_in_batches():
+    log = SQLiteChangeLog()
+    invalidated = []
+    listener = CacheChangeListener(log, batch_size=2, invalidate=lambda *t: invalidated.append(t))
+    listener.poll_once()
+
+    log.record_changes([("Grupo_WTS", i) for i in range(5)])
+    assert listener.poll_once() == 5
+    assert len(invalidated) == 3
+    assert listener.last_id == log.get_last_change_id()
+
+
+def test_repository_limits_the_backlog_in_sql():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE Cache_Change_Log_WTS "
+        "(Chg_Id INTEGER PRIMARY KEY, Chg_Tabela TEXT, Chg_Chave INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave) VALUES ('Grupo_WTS', ?)",
+        [(i,) for i in range(10)],
+    )
+    statements = []
+    conn.set_trace_callback(statements.append)
+    manager = SimpleNamespace(
+        PARAM="?", ISNULL="IFNULL", db_type="sqlite", driver_module=sqlite3,
+        get_cursor=lambda: closing(conn.cursor()),
+    )
+
+    changes = ChangeLogRepository(manager).list_changes_since(3, limit=4)
+
+    assert [change[0] for change in changes] == [4, 5, 6, 7]
+    assert "LIMIT 4" in statements[-1]
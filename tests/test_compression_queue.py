@@ -0,0 +1,133 @@
+"""Testes da fila de compressão em segundo plano."""
+
+import json
+import stat
+import sys
+import threading
+
+import pytest
+
+from src.wats.recording.compression_queue import (
+    CompressionQueue,
+    CompressionStatus,
+    build_compression_command,
+    default_max_concurrent_jobs,
+)
+
+# "ffmpeg" falso: reporta progresso no stdout e grava a entrada + marcador na saída
+FAKE_FFMPEG = """#!{python}
+import sys, time
+args = sys.argv[1:]
+source = args[args.index("-i") + 1]
+for us in (250000, 500000, 1000000):
+    print("out_time_us=%d" % us, flush=True)
+    print("progress=continue", flush=True)
+    time.sleep({delay})
+print("progress=end", flush=True)
+with open(source, "rb") as src, open(args[-1], "wb") as out:
+    out.write(src.read() + b"-compressed")
+"""
+
+
+def make_fake_ffmpeg(tmp_path, delay=0.0):
+    if sys.platform == "win32":
+        pytest.skip("script com shebang não é executável no Windows")
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable, delay=delay))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+def test_concurrency_follows_core_count():
+    assert default_max_concurrent_jobs(1) == 1
+    assert default_max_concurrent_jobs(4) == 1
+    assert default_max_concurrent_jobs(16) == 4
+
+
+def test_command_limits_threads_and_reports_progress(tmp_path):
+    cmd = build_compression_command(
+        "ffmpeg", tmp_path / "a.avi", tmp_path / "a.tmp.mp4", 30, "faster", 2
+    )
+    joined = " ".join(cmd)
+
+    assert "-progress pipe:1" in joined
+    assert "-preset faster -crf 30 -threads 2" in joined
+    assert cmd[-1] == str(tmp_path / "a.tmp.mp4")
+
+
+def test_job_replaces_original_and_reports_progress(tmp_path, monkeypatch):
+    video = tmp_path / "rec.mp4"
+    video.write_bytes(b"raw")
+    monkeypatch.setattr(CompressionQueue, "_probe_duration", staticmethod(lambda path: 1.0))
+
+    queue = CompressionQueue(
+        state_file=tmp_path / "state.json",
+        max_concurrent_jobs=1,
+        ffmpeg_path=make_fake_ffmpeg(tmp_path),
+    )
+    progress = []
+    queue.on_compression_progress = lambda job: progress.append(job.progress)
+    job_id = queue.queue_compression(video, crf=30)
+    assert queue.queue_compression(video, crf=30) == job_id  # já na fila
+
+    queue.start()
+    try:
+        assert queue.wait_until_idle(timeout=10)
+    finally:
+        queue.stop()
+
+    job = queue.get_task_status(job_id)
+    assert job.status == CompressionStatus.COMPLETED
+    assert job.progress == 100
+    assert progress == [25, 50, 99]
+    assert video.read_bytes() == b"raw-compressed"
+    assert not video.with_suffix(".tmp.mp4").exists()
+    assert json.loads((tmp_path / "state.json").read_text())["pending_jobs"] == []
+
+
+def test_pending_jobs_survive_restart(tmp_path):
+    video = tmp_path / "rec.avi"
+    video.write_bytes(b"raw")
+    state_file = tmp_path / "state.json"
+
+    first = CompressionQueue(state_file=state_file, max_concurrent_jobs=1)
+    job_id = first.queue_compression(video, crf=26, preset="faster")
+    # Processo encerrado antes de qualquer worker rodar
+
+    second = CompressionQueue(
+        state_file=state_file, max_concurrent_jobs=1, ffmpeg_path=make_fake_ffmpeg(tmp_path)
+    )
+    job = second.get_task_status(job_id)
+    assert job.status == CompressionStatus.PENDING
+    assert (job.crf, job.preset) == (26, "faster")
+
+    second.start()
+    try:
+        assert second.wait_until_idle(timeout=10)
+    finally:
+        second.stop()
+    assert video.read_bytes() == b"raw-compressed"
+
+
+def test_stop_interrupts_running_job_and_keeps_it_pending(tmp_path, monkeypatch):
+    video = tmp_path / "rec.mp4"
+    video.write_bytes(b"raw")
+    state_file = tmp_path / "state.json"
+    monkeypatch.setattr(CompressionQueue, "_probe_duration", staticmethod(lambda path: 1.0))
+
+    queue = CompressionQueue(
+        state_file=state_file,
+        max_concurrent_jobs=1,
+        ffmpeg_path=make_fake_ffmpeg(tmp_path, delay=5),
+    )
+    running = threading.Event()
+    queue.on_compression_progress = lambda job: running.set()
+    job_id = queue.queue_compression(video)
+    queue.start()
+    assert running.wait(timeout=10)
+    queue.stop()
+
+    assert queue.get_task_status(job_id).status == CompressionStatus.PENDING
+    assert video.read_bytes() == b"raw"
+    pending = json.loads(state_file.read_text())["pending_jobs"]
+    assert [job["id"] for job in pending] == [job_id]
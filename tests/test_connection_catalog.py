@@ -0,0 +1,98 @@
+"""Testes do catálogo de conexões separado da presença (SQLite)."""
+
+import sqlite3
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)  # performance -> connection_pool
+
+from src.wats.db.query_registry import QueryRegistry  # noqa: E402
+from src.wats.db.repositories.connection_repository import ConnectionRepository  # noqa: E402
+from src.wats.util_cache.intelligent_cache import get_cache  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE Grupo_WTS (Gru_Codigo INTEGER PRIMARY KEY, Gru_Nome TEXT);
+    CREATE TABLE Conexao_WTS (
+        Con_Codigo INTEGER PRIMARY KEY, Con_Nome TEXT, Con_IP TEXT, Con_Usuario TEXT,
+        Con_Senha TEXT, Gru_Codigo INTEGER, con_tipo TEXT, con_particularidade TEXT,
+        con_cliente TEXT, Extra TEXT, sec TEXT
+    );
+    CREATE TABLE Usuario_Conexao_WTS (Con_Codigo INTEGER, Usu_Nome TEXT);
+"""
+
+
+@pytest.fixture
+def repo():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO Grupo_WTS VALUES (1, 'Clientes')")
+    conn.executemany(
+        "INSERT INTO Conexao_WTS VALUES (?, ?, ?, 'adm', 'x', 1, 'RDP', NULL, NULL, NULL, NULL)",
+        [(1, "Servidor A", "10.0.0.1"), (2, "Servidor B", "10.0.0.2")],
+    )
+    conn.executemany(
+        "INSERT INTO Usuario_Conexao_WTS VALUES (?, ?)",
+        [(1, "bruno"), (1, "ana"), (2, "carla")],
+    )
+
+    @contextmanager
+    def get_cursor():
+        yield conn.cursor()
+
+    queries = QueryRegistry({"PARAM": "?", "ISNULL": "IFNULL", "NOW": "datetime('now')"})
+
+    def execute_query(name, template, params=(), fetch=None):
+        return conn.execute(queries.sql(name, template), params).fetchall()
+
+    manager = SimpleNamespace(
+        PARAM="?",
+        ISNULL="IFNULL",
+        driver_module=sqlite3,
+        use_effective_permissions=False,
+        get_string_agg_mode=lambda: "group_concat",
+        get_cursor=get_cursor,
+        execute_query=execute_query,
+    )
+    user_repo = SimpleNamespace(get_user_role=lambda username: (1, True))
+    get_cache().invalidate_all()
+    yield ConnectionRepository(manager, user_repo), conn
+    get_cache().invalidate_all()
+    conn.close()
+
+
+def test_catalog_has_no_presence_and_stable_version(repo):
+    repository, conn = repo
+    version, rows = repository.select_catalog("admin")
+
+    assert [row[0] for row in rows] == [1, 2]
+    assert all(row[6] == "" for row in rows)
+    assert all(len(row) == 12 for row in rows)
+
+    # Presença mudando não altera o catálogo nem a versão
+    conn.execute("DELETE FROM Usuario_Conexao_WTS")
+    get_cache().invalidate_tags("catalog")
+    assert repository.select_catalog("admin")[0] == version
+
+    conn.execute("UPDATE Conexao_WTS SET Con_IP = '10.0.0.9' WHERE Con_Codigo = 2")
+    get_cache().invalidate_tags("connections")
+    assert repository.select_catalog("admin")[0] != version
+
+
+def test_presence_is_aggregated_per_connection(repo):
+    repository, _ = repo
+    assert repository.select_presence() == {1: "ana|bruno", 2: "carla"}
+
+
+def test_editing_a_connection_refreshes_cached_select_all(repo):
+    repository, conn = repo
+    rows = repository.select_all("admin")
+    assert rows[1][1] == "10.0.0.2"
+
+    # Mesmo com o id da conexão, a listagem (só com a tag "connections") é descartada
+    ok, _ = repository.admin_update_connection(
+        2, {"con_nome": "Servidor B", "gru_codigo": 1, "con_ip": "10.0.0.9"}
+    )
+    assert ok
+    assert repository.select_all("admin")[1][1] == "10.0.0.9"
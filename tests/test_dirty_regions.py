@@ -0,0 +1,86 @@
+"""Testes da conversão só dos tiles que mudaram."""
+
+import cv2
+import numpy as np
+
+from src.wats.recording.dirty_regions import DirtyRegionConverter, DirtyTileTracker
+from src.wats.recording.frame_buffers import FrameBufferPool
+
+
+def _screen(width=256, height=192, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, (height, width, 4), dtype=np.uint8)
+
+
+def _expected(bgra, scale=1.0):
+    if scale != 1.0:
+        height, width = bgra.shape[:2]
+        size = (int(width * scale), int(height * scale))
+        bgra = cv2.resize(bgra, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+
+
+def test_tracker_marks_only_the_changed_tile():
+    tracker = DirtyTileTracker(tile_size=64, sample_stride=4)
+    screen = _screen()
+
+    assert tracker.update(screen).all()  # primeiro frame
+    assert not tracker.update(screen.copy()).any()
+
+    changed = screen.copy()
+    changed[70:80, 140:150] += 1
+    mask = tracker.update(changed)
+    assert mask.shape == (3, 4)
+    assert np.argwhere(mask).tolist() == [[1, 2]]
+
+
+def test_rotating_buffers_stay_identical_to_full_conversion():
+    pool = FrameBufferPool()
+    converter = DirtyRegionConverter(pool, tile_size=32, sample_stride=2)
+    screen = _screen()
+    in_flight = []
+
+    for i in range(12):
+        # "Cursor" andando pela tela; três buffers em circulação (fila + encoder)
+        screen[40:48, 10 + i * 16 : 18 + i * 16] = i * 20
+        frame = converter.convert(screen)
+        assert np.array_equal(frame, _expected(screen))
+        in_flight.append(frame)
+        if len(in_flight) > 2:
+            pool.release(in_flight.pop(0))
+
+    stats = converter.get_stats()
+    assert stats["full_frames"] == 3  # um por buffer novo
+    assert stats["converted_ratio"] < 0.5
+
+
+def test_scaled_dirty_tiles_match_scaled_conversion():
+    pool = FrameBufferPool()
+    converter = DirtyRegionConverter(pool, resolution_scale=0.5, tile_size=32, sample_stride=2)
+    screen = _screen()
+    pool.release(converter.convert(screen))
+
+    screen[64:96, 128:160] = 200  # exatamente um tile
+    frame = converter.convert(screen)
+    assert frame.shape == (96, 128, 3)
+    assert np.array_equal(frame, _expected(screen, 0.5))
+    assert converter.full_frames == 1
+
+
+def test_resize_and_periodic_refresh_convert_the_whole_frame():
+    pool = FrameBufferPool()
+    converter = DirtyRegionConverter(pool, tile_size=32, full_refresh_frames=3)
+    screen = _screen()
+    for _ in range(2):
+        pool.release(converter.convert(screen))
+    assert converter.full_frames == 1
+
+    # Mudança de 1 linha entre as amostradas: só o refresh periódico corrige
+    screen[1, :] = 0
+    frame = converter.convert(screen)
+    assert converter.full_frames == 2
+    assert np.array_equal(frame, _expected(screen))
+
+    other = converter.convert(_screen(128, 96))
+    assert other.shape == (96, 128, 3)
+    assert converter.full_frames == 3
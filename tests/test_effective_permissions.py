@@ -0,0 +1,81 @@
+"""Testes da manutenção da tabela de permissões efetivas (SQLite)."""
+
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.repositories.effective_permission_repository import (
+    EffectivePermissionRepository,
+)
+
+SCHEMA = """
+    CREATE TABLE Conexao_WTS (Con_Codigo INTEGER PRIMARY KEY, Gru_Codigo INTEGER);
+    CREATE TABLE Permissao_Grupo_WTS (Usu_Id INTEGER, Gru_Codigo INTEGER);
+    CREATE TABLE Permissao_Conexao_Individual_WTS (
+        Id INTEGER PRIMARY KEY, Usu_Id INTEGER, Con_Codigo INTEGER,
+        Data_Inicio TIMESTAMP, Data_Fim TIMESTAMP, Ativo BOOLEAN
+    );
+    CREATE TABLE Permissao_Efetiva_WTS (
+        Usu_Id INTEGER, Con_Codigo INTEGER, Origem TEXT, Data_Inicio TIMESTAMP, Data_Fim TIMESTAMP
+    );
+"""
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO Conexao_WTS VALUES (?, ?)", [(1, 10), (2, 10), (3, 20)])
+    conn.executemany("INSERT INTO Permissao_Grupo_WTS VALUES (?, ?)", [(7, 10), (8, 20)])
+    conn.execute(
+        "INSERT INTO Permissao_Conexao_Individual_WTS VALUES (1, 7, 3, ?, ?, 1)",
+        (datetime.now(), datetime.now() + timedelta(hours=1)),
+    )
+    yield conn
+    conn.close()
+
+
+def _repo(enabled=True):
+    manager = SimpleNamespace(PARAM="?", driver_module=sqlite3, use_effective_permissions=enabled)
+    return EffectivePermissionRepository(manager)
+
+
+def _effective(conn, user_id):
+    rows = conn.execute(
+        "SELECT Con_Codigo, Origem FROM Permissao_Efetiva_WTS WHERE Usu_Id = ? ORDER BY 1",
+        (user_id,),
+    )
+    return rows.fetchall()
+
+
+def test_rebuild_and_refresh_user_follow_group_and_individual_permissions(db):
+    repo = _repo()
+    repo.rebuild_all(db.cursor())
+    assert _effective(db, 7) == [(1, "G"), (2, "G"), (3, "I")]
+    assert _effective(db, 8) == [(3, "G")]
+
+    db.execute("DELETE FROM Permissao_Grupo_WTS WHERE Usu_Id = 7")
+    repo.refresh_user(7, db.cursor())
+    assert _effective(db, 7) == [(3, "I")]
+    assert _effective(db, 8) == [(3, "G")]
+
+
+def test_refresh_connection_and_permission(db):
+    repo = _repo()
+    repo.rebuild_all(db.cursor())
+
+    db.execute("UPDATE Conexao_WTS SET Gru_Codigo = 20 WHERE Con_Codigo = 1")
+    repo.refresh_connection(1, db.cursor())
+    assert _effective(db, 7) == [(2, "G"), (3, "I")]
+    assert _effective(db, 8) == [(1, "G"), (3, "G")]
+
+    db.execute("UPDATE Permissao_Conexao_Individual_WTS SET Ativo = 0 WHERE Id = 1")
+    repo.refresh_permission(1, db.cursor())
+    assert _effective(db, 7) == [(2, "G")]
+
+
+def test_disabled_repository_does_nothing(db):
+    _repo(enabled=False).rebuild_all(db.cursor())
+    assert _effective(db, 7) == []
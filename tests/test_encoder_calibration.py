@@ -0,0 +1,84 @@
+"""Testes da calibração do encoder por máquina."""
+
+import json
+
+import cv2
+
+from src.wats.recording import encoder_calibration
+from src.wats.recording.codec_installer import CodecInstaller
+from src.wats.recording.encoder_calibration import (
+    EncoderBenchmark,
+    EncoderCalibrator,
+    select_encoders,
+)
+
+
+def bench(encoder, name, fps, cpu_per_frame, bytes_per_frame, frames=10):
+    return EncoderBenchmark(
+        encoder,
+        name,
+        opened=True,
+        frames=frames,
+        seconds=frames / fps,
+        cpu_seconds=cpu_per_frame * frames,
+        size_bytes=bytes_per_frame * frames,
+    )
+
+
+BENCHMARKS = [
+    bench("opencv", "MJPG", fps=200, cpu_per_frame=0.005, bytes_per_frame=90_000),
+    bench("opencv", "XVID", fps=50, cpu_per_frame=0.015, bytes_per_frame=20_000),
+    bench("opencv", "H264", fps=8, cpu_per_frame=0.12, bytes_per_frame=5_000),
+    EncoderBenchmark("opencv", "X264", opened=False),
+    bench("ffmpeg", "ultrafast", fps=120, cpu_per_frame=0.01, bytes_per_frame=30_000),
+    bench("ffmpeg", "veryfast", fps=40, cpu_per_frame=0.03, bytes_per_frame=8_000),
+]
+
+
+def test_selection_prefers_small_output_among_encoders_that_keep_up():
+    choice = select_encoders(BENCHMARKS, target_fps=10)
+
+    # H264 é o menor, mas não sustenta 10 fps: vai para o fim
+    assert choice.opencv_codecs == ["XVID", "MJPG", "H264"]
+    assert choice.ffmpeg_preset == "veryfast"
+
+
+def test_selection_scales_with_resolution():
+    # 4x os pixels da calibração: veryfast cai para 10 fps, abaixo da folga
+    choice = select_encoders(
+        BENCHMARKS, target_fps=10, frame_size=(2560, 1440), calibration_size=(1280, 720)
+    )
+    assert choice.ffmpeg_preset == "ultrafast"
+    assert choice.opencv_codecs[0] == "MJPG"
+
+
+def test_calibration_is_cached_per_machine(tmp_path, monkeypatch):
+    cache_file = tmp_path / "calibration.json"
+    calibrator = EncoderCalibrator(cache_file=cache_file, frame_size=(64, 48), frames=3)
+    calibrator.ffmpeg = None  # só OpenCV no teste
+
+    assert calibrator.load() is None
+    results = calibrator.run()
+    assert {b.name for b in results} == set(encoder_calibration.OPENCV_CODECS)
+    assert any(b.opened and b.size_bytes > 0 for b in results)
+
+    calls = []
+    monkeypatch.setattr(EncoderCalibrator, "run", lambda self: calls.append(1))
+    assert calibrator.start_background() is None  # já calibrado
+    assert calibrator.get_choice(10) is not None
+    assert calls == []
+
+    data = json.loads(cache_file.read_text())
+    data["fingerprint"]["cpu_count"] = -1  # outra máquina
+    cache_file.write_text(json.dumps(data))
+    assert calibrator.load() is None
+
+
+def test_codec_fallback_follows_calibrated_order(tmp_path, monkeypatch):
+    installer = CodecInstaller(str(tmp_path))
+    monkeypatch.setattr(installer, "check_openh264_installed", lambda: True)
+
+    assert installer.get_recommended_codec_fallback(["MJPG", "XVID"]) == [
+        cv2.VideoWriter_fourcc(*name) for name in ("MJPG", "XVID", "MP4V", "X264")
+    ]
+    assert installer.get_recommended_codec_fallback()[0] == cv2.VideoWriter_fourcc(*"H264")
@@ -0,0 +1,175 @@
+"""Testes do encoder por pipe para o ffmpeg."""
+
+import shutil
+import stat
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from src.wats.recording import ffmpeg_writer
+from src.wats.recording.ffmpeg_writer import (
+    FFmpegVideoWriter,
+    build_ffmpeg_command,
+    find_ffmpeg,
+    open_ffmpeg_writer,
+    write_frame,
+)
+
+# "ffmpeg" falso: copia o stdin para o arquivo de saída (último argumento)
+# e reporta o tamanho gravado como o -progress do ffmpeg
+FAKE_FFMPEG = """#!{python}
+import shutil, sys
+with open(sys.argv[-1], "wb") as out:
+    shutil.copyfileobj(sys.stdin.buffer, out)
+    print("total_size=%d" % out.tell(), flush=True)
+print("progress=end", flush=True)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("script com shebang não é executável no Windows")
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+def test_command_pipes_raw_bgr_into_libx264():
+    cmd = build_ffmpeg_command("ffmpeg", "out.mp4", 1920, 1080, 10, crf=30, preset="faster")
+
+    assert cmd[0] == "ffmpeg" and cmd[-1] == "out.mp4"
+    joined = " ".join(cmd)
+    assert "-f rawvideo -pix_fmt bgr24 -s 1920x1080 -r 10 -i -" in joined
+    assert "-c:v libx264 -preset faster -crf 30 -pix_fmt yuv420p" in joined
+    assert "-progress pipe:1" in joined
+    # Cópias idênticas saem antes do encoder; os frames mantidos guardam o timestamp
+    assert "mpdecimate=hi=0:lo=0:frac=0:max=10" in joined
+    assert "-fps_mode vfr" in joined
+
+
+def test_find_ffmpeg_prefers_configured_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    configured = tmp_path / "ffmpeg.exe"
+    configured.write_bytes(b"")
+
+    assert find_ffmpeg(str(configured)) == str(configured)
+    assert find_ffmpeg(str(tmp_path / "missing.exe")) == "/usr/bin/ffmpeg"
+
+
+def test_open_returns_none_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmpeg_writer, "find_ffmpeg", lambda path=None: None)
+    assert open_ffmpeg_writer(tmp_path / "out.mp4", 10, (8, 8)) is None
+
+
+def test_frames_are_streamed_through_stdin(tmp_path, fake_ffmpeg):
+    output = tmp_path / "out.raw"
+    writer = FFmpegVideoWriter(str(output), 10, (4, 2), ffmpeg_path=fake_ffmpeg)
+    assert writer.isOpened()
+
+    frames = [np.full((2, 4, 3), value, dtype=np.uint8) for value in (1, 2, 3)]
+    for frame in frames:
+        writer.write(frame)
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((4, 4, 3), dtype=np.uint8))
+
+    assert writer.release()
+    assert not writer.isOpened()
+    assert writer.frames_written == 3
+    assert writer.bytes_written == output.stat().st_size == 2 * 4 * 3 * 3
+    assert output.read_bytes() == b"".join(frame.tobytes() for frame in frames)
+
+
+def test_repeats_are_sent_with_one_write_call(tmp_path, fake_ffmpeg):
+    output = tmp_path / "out.raw"
+    writer = FFmpegVideoWriter(str(output), 10, (4, 2), ffmpeg_path=fake_ffmpeg)
+    frame = np.full((2, 4, 3), 7, dtype=np.uint8)
+
+    writer.write(frame, repeats=3)
+    assert writer.release()
+    assert writer.frames_written == 3
+    assert output.read_bytes() == frame.tobytes() * 3
+
+
+def test_write_frame_repeats_on_opencv_style_writers():
+    class CountingWriter:
+        def __init__(self):
+            self.frames = []
+
+        def write(self, frame):
+            self.frames.append(frame)
+
+    writer = CountingWriter()
+    frame = np.zeros((2, 4, 3), dtype=np.uint8)
+    write_frame(writer, frame, 4)
+
+    # Frame rate constante: o mesmo buffer convertido, sem conversão nova
+    assert len(writer.frames) == 4
+    assert all(written is frame for written in writer.frames)
+
+
+def test_release_reports_cpu_of_the_final_flush(tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("script com shebang não é executável no Windows")
+    # Como o libx264 ao fechar: o trabalho pesado vem depois do fim do stdin
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "sys.stdin.buffer.read()\n"
+        "end = time.process_time() + 0.3\n"
+        "while time.process_time() < end:\n"
+        "    pass\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+    writer = FFmpegVideoWriter(str(tmp_path / "out.raw"), 10, (4, 2), ffmpeg_path=str(script))
+    writer.write(np.zeros((2, 4, 3), dtype=np.uint8))
+    assert writer.release()
+    assert writer.cpu_seconds >= 0.3
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg não instalado")
+def test_real_encode_produces_h264_file(tmp_path):
+    output = tmp_path / "out.mp4"
+    writer = open_ffmpeg_writer(output, 10, (65, 49))
+    assert writer is not None
+
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        writer.write(rng.integers(0, 255, (49, 65, 3), dtype=np.uint8))
+    assert writer.release()
+
+    capture = cv2.VideoCapture(str(output))
+    try:
+        # Dimensões ímpares são cortadas para pares (yuv420p)
+        assert int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) == 64
+        assert int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) == 48
+        assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 10
+    finally:
+        capture.release()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg não instalado")
+def test_repeated_frames_are_not_encoded(tmp_path):
+    output = tmp_path / "static.mp4"
+    writer = open_ffmpeg_writer(output, 10, (64, 48))
+    assert writer is not None
+
+    rng = np.random.default_rng(0)
+    # 2 s de tela: dois frames distintos, cada um parado por 1 s
+    for _ in range(2):
+        writer.write(rng.integers(0, 255, (48, 64, 3), dtype=np.uint8), repeats=10)
+    assert writer.frames_written == 20
+    assert writer.release()
+
+    capture = cv2.VideoCapture(str(output))
+    try:
+        # Só os frames distintos (e no máximo um por segundo parado) chegam ao libx264
+        encoded = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        assert 2 <= encoded <= 4
+    finally:
+        capture.release()
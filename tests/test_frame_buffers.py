@@ -0,0 +1,73 @@
+"""Testes da conversão sem cópia e do pool de buffers de frame."""
+
+import cv2
+import numpy as np
+
+from src.wats.recording.frame_buffers import FrameBufferPool, FrameConverter
+from src.wats.recording.frame_pipeline import FramePipeline
+
+
+class FakeScreenShot:
+    def __init__(self, width=64, height=48, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        self.height = height
+        self.raw = bytearray(rng.integers(0, 255, width * height * 4, dtype=np.uint8).tobytes())
+
+
+def test_wrap_is_a_view_over_the_mss_buffer():
+    screenshot = FakeScreenShot()
+    bgra = FrameConverter.wrap(screenshot)
+
+    assert bgra.shape == (48, 64, 4)
+    screenshot.raw[0] = 7
+    assert bgra[0, 0, 0] == 7
+
+
+def test_convert_matches_cvtcolor_and_reuses_buffers():
+    pool = FrameBufferPool()
+    converter = FrameConverter(pool)
+    screenshot = FakeScreenShot()
+    bgra = converter.wrap(screenshot)
+
+    first = converter.convert(bgra)
+    assert np.array_equal(first, cv2.cvtColor(np.array(bgra), cv2.COLOR_BGRA2BGR))
+
+    pool.release(first)
+    second = converter.convert(bgra)
+    assert second is first
+    assert pool.get_stats() == {"allocations": 1, "reuses": 1, "free_buffers": 0}
+
+
+def test_scaled_convert_and_resolution_change():
+    pool = FrameBufferPool()
+    converter = FrameConverter(pool, resolution_scale=0.5)
+
+    frame = converter.convert(converter.wrap(FakeScreenShot(64, 48)))
+    assert frame.shape == (24, 32, 3)
+    pool.release(frame)
+
+    # Janela redimensionada: buffers do formato antigo são descartados
+    other = converter.convert(converter.wrap(FakeScreenShot(80, 60)))
+    assert other.shape == (30, 40, 3)
+    assert other is not frame
+    pool.release(frame)
+    assert pool.get_stats()["free_buffers"] == 0
+
+
+def test_pipeline_returns_buffers_to_pool():
+    pool = FrameBufferPool()
+    written = []
+    pipeline = FramePipeline(lambda f: written.append(f.copy()), maxsize=2, release=pool.release)
+
+    buffers = [pool.acquire((4, 4, 3)) for _ in range(3)]
+    for value, buffer in enumerate(buffers):
+        buffer.fill(value)
+        pipeline.submit(buffer)  # fila de 2: o primeiro é descartado e devolvido
+
+    assert pool.get_stats()["free_buffers"] == 1
+    pipeline.start()
+    pipeline.stop()
+
+    assert [int(f[0, 0, 0]) for f in written] == [1, 2]
+    assert pool.get_stats()["free_buffers"] == 3
@@ -0,0 +1,131 @@
+"""Testes do pipeline captura → encoder dos gravadores (fila limitada e descarte)."""
+
+import threading
+
+import pytest
+
+from src.wats.recording.frame_pipeline import (
+    DROP_OLDEST,
+    DUPLICATE_LAST,
+    REPEAT_FRAME,
+    FramePipeline,
+    FrameQueue,
+)
+
+
+def _drain(queue):
+    items = []
+    while len(queue):
+        frame, repeats, _pts = queue.get(timeout=0)
+        queue.task_done()
+        items.append((frame, repeats))
+    return items
+
+
+def test_drop_oldest_keeps_most_recent_frames():
+    queue = FrameQueue(maxsize=3, drop_policy=DROP_OLDEST)
+    for frame in range(5):
+        assert queue.put(frame)
+
+    assert _drain(queue) == [(2, 1), (3, 1), (4, 1)]
+    assert queue.frames_dropped == 2
+    assert queue.frames_duplicated == 0
+    assert queue.max_depth == 3
+
+
+def test_duplicate_last_preserves_timeline():
+    queue = FrameQueue(maxsize=2, drop_policy=DUPLICATE_LAST)
+    results = [queue.put(frame) for frame in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert _drain(queue) == [(0, 1), (1, 4)]
+    assert queue.frames_dropped == 3
+    assert queue.frames_duplicated == 3
+
+
+def test_invalid_policy_is_rejected():
+    with pytest.raises(ValueError):
+        FrameQueue(maxsize=2, drop_policy="newest")
+
+
+def test_slow_encoder_does_not_block_capture():
+    release = threading.Event()
+    written = []
+
+    def slow_sink(frame):
+        release.wait(5)
+        written.append(frame)
+
+    pipeline = FramePipeline(slow_sink, maxsize=4, drop_policy=DUPLICATE_LAST)
+    pipeline.start()
+
+    # Encoder travado no primeiro frame: a captura continua sem bloquear
+    for frame in range(20):
+        pipeline.submit(frame)
+
+    release.set()
+    assert pipeline.flush(timeout=5)
+    pipeline.stop()
+
+    stats = pipeline.get_stats()
+    assert stats["frames_captured"] == 20
+    # Cada frame capturado vira um frame gravado (descartados são repetidos)
+    assert stats["frames_written"] == len(written) == 20
+    assert stats["frames_duplicated"] == stats["frames_dropped"] > 0
+    assert written == sorted(written)
+
+
+def test_sink_errors_do_not_stop_pipeline():
+    written = []
+
+    def flaky_sink(frame):
+        if frame == 1:
+            raise IOError("disk full")
+        written.append(frame)
+
+    pipeline = FramePipeline(flaky_sink, maxsize=8)
+    pipeline.start()
+    for frame in range(4):
+        pipeline.submit(frame)
+    pipeline.stop()
+
+    assert written == [0, 2, 3]
+    assert pipeline.get_stats()["sink_errors"] == 1
+
+
+def test_repeat_markers_reuse_last_frame_without_queue_space():
+    written = []
+    pipeline = FramePipeline(written.append, maxsize=2)
+
+    pipeline.submit(REPEAT_FRAME)  # nada gravado ainda: ignorado
+    pipeline.submit("a", 0.0)
+    pipeline.submit(REPEAT_FRAME, 0.1)
+    pipeline.submit(REPEAT_FRAME, 0.2)
+    assert len(pipeline.queue) == 2
+
+    pipeline.start()
+    pipeline.stop()
+
+    assert written == ["a", "a", "a"]
+    stats = pipeline.get_stats()
+    assert stats["frames_repeated"] == 3
+    assert stats["frames_dropped"] == 0
+
+
+def test_sink_repeats_passes_the_count_in_one_call():
+    calls = []
+    pipeline = FramePipeline(
+        lambda frame, repeats: calls.append((frame, repeats)), maxsize=2, sink_repeats=True
+    )
+
+    pipeline.submit("a", 0.0)
+    for pts in (0.1, 0.2, 0.3, 0.4):
+        pipeline.submit(REPEAT_FRAME, pts)
+    pipeline.submit("b", 0.5)
+
+    pipeline.start()
+    pipeline.stop()
+
+    # Uma chamada por frame distinto: o writer recebe a contagem, não as cópias
+    assert calls == [("a", 5), ("b", 1)]
+    assert pipeline.get_stats()["frames_written"] == 6
@@ -0,0 +1,79 @@
+"""Testes do agendador de frames por deadline usado nos loops de captura."""
+
+import threading
+
+import pytest
+
+from src.wats.recording.frame_scheduler import FrameScheduler
+
+
+class FakeClock:
+    """Relógio monotônico manual; ``wait`` avança o tempo como um Event."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, timeout):
+        self.sleeps.append(timeout)
+        self.now += timeout
+        return False
+
+    def is_set(self):
+        return False
+
+
+def test_deadlines_are_absolute_and_work_time_does_not_drift():
+    clock = FakeClock()
+    scheduler = FrameScheduler(10, clock=clock)
+    scheduler.start()
+
+    timestamps = []
+    for _ in range(5):
+        timestamps.append(scheduler.wait(clock))
+        clock.now += 0.03  # captura + conversão
+
+    assert timestamps == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+    # Uma espera por frame, descontando o trabalho: 0.1 - 0.03
+    assert clock.sleeps == pytest.approx([0.07] * 4)
+    assert scheduler.missed_deadlines == 0
+
+
+def test_missed_deadlines_are_skipped_not_burst():
+    clock = FakeClock()
+    scheduler = FrameScheduler(10, clock=clock)
+    scheduler.start()
+
+    assert scheduler.wait(clock) == 0.0
+    clock.now += 0.35  # travou por 3,5 intervalos
+
+    assert scheduler.wait(clock) == pytest.approx(0.3)
+    assert scheduler.missed_deadlines == 2
+    assert scheduler.wait(clock) == pytest.approx(0.4)
+    assert clock.sleeps == pytest.approx([0.05])
+
+
+def test_stats_report_achieved_vs_target_fps():
+    clock = FakeClock()
+    scheduler = FrameScheduler(20, clock=clock)
+    scheduler.start()
+    for _ in range(20):
+        scheduler.wait(clock)
+
+    stats = scheduler.get_stats()
+    assert stats["target_fps"] == 20
+    assert stats["frames"] == 20
+    assert stats["achieved_fps"] == pytest.approx(20 / 0.95, rel=1e-3)
+
+
+def test_wait_returns_none_when_stopped():
+    stop_event = threading.Event()
+    scheduler = FrameScheduler(1)
+    scheduler.start()
+
+    assert scheduler.wait(stop_event) == 0.0
+    stop_event.set()
+    assert scheduler.wait(stop_event) is None
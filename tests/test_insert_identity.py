@@ -0,0 +1,146 @@
+"""Testes da identidade retornada pelos INSERTs com os triggers do log de alterações."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)  # performance -> connection_pool
+
+from src.wats.db.database_manager import DatabaseManager  # noqa: E402
+from src.wats.db.repositories.base_repository import BaseRepository  # noqa: E402
+from src.wats.db.repositories.connection_repository import ConnectionRepository  # noqa: E402
+from src.wats.db.repositories.user_repository import UserRepository  # noqa: E402
+
+SCHEMA = os.path.join(
+    os.path.dirname(__file__), "..", "scripts", "create_wats_database_sqlite.sql"
+)
+
+# Mesmo papel dos triggers de scripts/create_cache_change_log.sql
+CHANGE_LOG_TRIGGERS = """
+    CREATE TABLE Cache_Change_Log_WTS (
+        Chg_Id INTEGER PRIMARY KEY AUTOINCREMENT, Chg_Tabela TEXT, Chg_Chave INTEGER
+    );
+    CREATE TRIGGER TR_Usuario_CacheLog AFTER INSERT ON Usuario_Sistema_WTS
+    BEGIN
+        INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+        VALUES ('Usuario_Sistema_WTS', NEW.Usu_Id);
+    END;
+    CREATE TRIGGER TR_Conexao_CacheLog AFTER INSERT ON Conexao_WTS
+    BEGIN
+        INSERT INTO Cache_Change_Log_WTS (Chg_Tabela, Chg_Chave)
+        VALUES ('Conexao_WTS', NEW.Con_Codigo);
+    END;
+"""
+
+
+class FakeSqlServerCursor:
+    """
+    Cursor que imita as identidades do SQL Server com um trigger gravando no log.
+
+    ``SCOPE_IDENTITY()`` só enxerga o INSERT do mesmo lote; ``@@IDENTITY`` é a
+    última identidade da sessão, que é a gerada pelo trigger.
+    """
+
+    def __init__(self):
+        self.next_row_id = 41
+        self.session_identity = None
+        self._results = []
+        self.batches = []
+
+    def execute(self, sql, params=()):
+        self.batches.append(sql)
+        scope_identity = None
+        self._results = []
+        for statement in filter(None, (part.strip() for part in sql.split(";"))):
+            if statement.startswith("INSERT"):
+                self.next_row_id += 1
+                scope_identity = self.next_row_id
+                self.session_identity = 1000 + self.next_row_id  # Chg_Id do trigger
+                self._results.append(None)  # contagem de linhas
+            elif "SCOPE_IDENTITY()" in statement:
+                self._results.append([(scope_identity,)])
+            elif "@@IDENTITY" in statement:
+                self._results.append([(self.session_identity,)])
+        return self
+
+    @property
+    def description(self):
+        return None if not self._results or self._results[0] is None else [("ID",)]
+
+    def nextset(self):
+        self._results.pop(0)
+        return bool(self._results)
+
+    def fetchone(self):
+        return self._results[0].pop(0)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.delenv("WATS_DEMO_MODE", raising=False)
+    settings = SimpleNamespace(DB_TYPE="sqlite", DB_DATABASE=str(tmp_path / "wats.db"))
+    manager = DatabaseManager(settings)
+
+    conn = manager.sqlite_pool.connection()
+    with open(SCHEMA, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.executescript(CHANGE_LOG_TRIGGERS)
+    # Log à frente das tabelas: os ids do log e das tabelas não coincidem
+    conn.executemany(
+        "INSERT INTO Cache_Change_Log_WTS (Chg_Tabela) VALUES (?)", [("Grupo_WTS",)] * 50
+    )
+    conn.execute("INSERT INTO Grupo_WTS (Gru_Nome) VALUES ('Suporte')")
+    conn.commit()
+
+    yield manager
+    manager.close()
+
+
+def test_created_user_and_connection_ids_ignore_trigger_inserts(manager):
+    refreshed = []
+    users = UserRepository(manager)
+    users.effective_perm_repo.refresh_user = lambda user_id, cursor=None: refreshed.append(
+        ("user", user_id)
+    )
+    connections = ConnectionRepository(manager, users)
+    connections.effective_perm_repo.refresh_connection = (
+        lambda con_id, cursor=None: refreshed.append(("connection", con_id))
+    )
+
+    assert users.admin_create_user("ana", "", False, True, [1])[0]
+    assert connections.admin_create_connection({"con_nome": "srv01", "con_ip": "10.0.0.1"})[0]
+
+    conn = manager.sqlite_pool.connection()
+    user_id = conn.execute("SELECT Usu_Id FROM Usuario_Sistema_WTS WHERE Usu_Nome = 'ana'")
+    user_id = user_id.fetchone()[0]
+    con_id = conn.execute("SELECT Con_Codigo FROM Conexao_WTS WHERE Con_Nome = 'srv01'")
+    con_id = con_id.fetchone()[0]
+
+    assert refreshed == [("user", user_id), ("connection", con_id)]
+    granted = conn.execute("SELECT Usu_Id FROM Permissao_Grupo_WTS").fetchall()
+    assert granted == [(user_id,)]
+    assert conn.execute("SELECT MAX(Chg_Id) FROM Cache_Change_Log_WTS").fetchone()[0] > 50
+
+
+def test_sqlserver_reads_scope_identity_in_the_insert_batch(monkeypatch):
+    monkeypatch.delenv("WATS_DEMO_MODE", raising=False)
+    settings = SimpleNamespace(
+        DB_TYPE="sqlserver",
+        DB_SERVER="srv",
+        DB_DATABASE="wats",
+        DB_UID="u",
+        DB_PWD="p",
+        DB_READ_REPLICA_SERVER=None,
+    )
+    repository = BaseRepository(DatabaseManager(settings, use_connection_pool=False))
+    cursor = FakeSqlServerCursor()
+
+    new_id = repository._insert_returning_id(
+        cursor, "INSERT INTO Usuario_Sistema_WTS (Usu_Nome) VALUES (?)", ("ana",)
+    )
+
+    # O id da linha inserida, não o Chg_Id gerado pelo trigger
+    assert new_id == 42
+    assert len(cursor.batches) == 1
+    assert "@@IDENTITY" not in cursor.batches[0]
@@ -0,0 +1,82 @@
+"""Testes do registro de consultas nomeadas do DatabaseManager."""
+
+import sqlite3
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.database_manager import DatabaseManager
+from src.wats.db.query_registry import QueryRegistry
+
+HEARTBEAT = "UPDATE Sessao SET Hb = {NOW} WHERE Id = {PARAM}"
+
+
+def test_templates_are_rendered_once_per_dialect():
+    registry = QueryRegistry({"PARAM": "?", "NOW": "GETDATE()"})
+
+    sql = registry.sql("hb", HEARTBEAT)
+    assert sql == "UPDATE Sessao SET Hb = GETDATE() WHERE Id = ?"
+    assert registry.sql("hb", HEARTBEAT) is sql
+    assert registry.get("hb") is sql
+
+    with pytest.raises(ValueError):
+        registry.register("hb", "DELETE FROM Sessao")
+
+
+def test_track_counts_executions_errors_and_rows():
+    registry = QueryRegistry({})
+
+    with registry.track("q") as stats:
+        stats.rows += 3
+    with pytest.raises(RuntimeError):
+        with registry.track("q"):
+            raise RuntimeError("falhou")
+
+    counters = registry.get_stats()["q"]
+    assert counters["executions"] == 2
+    assert counters["errors"] == 1
+    assert counters["rows"] == 3
+
+
+@pytest.fixture
+def pooled_manager(monkeypatch):
+    monkeypatch.delenv("WATS_DEMO_MODE", raising=False)
+    settings = SimpleNamespace(DB_TYPE="sqlite", DB_DATABASE=":memory:")
+    manager = DatabaseManager(settings, use_connection_pool=False)
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Sessao (Id INTEGER PRIMARY KEY, Hb TEXT)")
+
+    @contextmanager
+    def get_connection():
+        yield conn
+
+    manager.use_connection_pool = True
+    manager.connection_pool = SimpleNamespace(get_connection=get_connection)
+    yield manager, conn
+    manager.close()
+    conn.close()
+
+
+def test_execute_reuses_cursor_per_connection_and_statement(pooled_manager):
+    manager, conn = pooled_manager
+
+    inserted = manager.execute_many(
+        "sessao.insert", "INSERT INTO Sessao (Id) VALUES ({PARAM})", [(1,), (2,)]
+    )
+    assert inserted == 2
+    assert manager.execute_query("sessao.hb", HEARTBEAT, (1,)) == 1
+    assert manager.execute_query("sessao.hb", HEARTBEAT, (3,)) == 0
+
+    cursors = manager._prepared_cursors[id(conn)][1]
+    first = cursors["sessao.hb"]
+    manager.execute_query("sessao.hb", HEARTBEAT, (2,))
+    assert cursors["sessao.hb"] is first
+    assert set(cursors) == {"sessao.insert", "sessao.hb"}
+
+    rows = manager.execute_query(
+        "sessao.all", "SELECT Id FROM Sessao WHERE Hb IS NOT NULL ORDER BY Id", fetch="all"
+    )
+    assert [row[0] for row in rows] == [1, 2]
+    assert manager.get_query_stats()["sessao.hb"]["executions"] == 3
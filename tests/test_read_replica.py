@@ -0,0 +1,111 @@
+"""Testes do roteamento de leituras para a réplica (ReadReplicaRouter + replica_read)."""
+
+import sqlite3
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.read_replica import ReadReplicaRouter, replica_read
+from src.wats.util_cache.intelligent_cache import get_cache
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor com context manager, como o do pyodbc."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+def _database(name):
+    conn = sqlite3.connect(":memory:", factory=_Connection, check_same_thread=False)
+    conn.execute("CREATE TABLE Grupo_WTS (Gru_Nome TEXT)")
+    conn.execute("INSERT INTO Grupo_WTS VALUES (?)", (name,))
+    return conn
+
+
+class _Pool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.checked_out = 0
+
+    @contextmanager
+    def get_connection(self):
+        self.checked_out += 1
+        try:
+            yield self.conn
+        finally:
+            self.checked_out -= 1
+
+
+class _Repo:
+    def __init__(self, db):
+        self.db = db
+
+    @replica_read
+    def admin_get_all_groups(self):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT Gru_Nome FROM Grupo_WTS")
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_group_names_for_update(self):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT Gru_Nome FROM Grupo_WTS")
+            return [row[0] for row in cursor.fetchall()]
+
+
+@pytest.fixture
+def setup():
+    primary = _database("primario")
+    pool = _Pool(_database("replica"))
+    router = ReadReplicaRouter(lambda: pool, driver_error=sqlite3.Error, retry_seconds=60)
+    assert router.connect()
+
+    def get_cursor():
+        # Mesmo roteamento de DatabaseManager.get_cursor
+        return router.get_cursor() or primary.cursor()
+
+    repo = _Repo(SimpleNamespace(read_replica=router, get_cursor=get_cursor))
+    yield router, pool, repo
+    primary.close()
+    pool.conn.close()
+
+
+def test_routed_reads_use_replica_and_release_connection(setup):
+    router, pool, repo = setup
+
+    assert repo.admin_get_all_groups() == ["replica"]
+    assert repo.get_group_names_for_update() == ["primario"]
+    assert pool.checked_out == 0
+    assert router.get_stats()["replica_reads"] == 1
+
+
+def test_cache_invalidation_pins_reads_to_primary(setup):
+    router, _, repo = setup
+    assert router.available()
+
+    get_cache().invalidate_tags("groups")
+
+    assert repo.admin_get_all_groups() == ["primario"]
+    router._primary_until = 0  # fim da janela de leitura no primário
+    assert repo.admin_get_all_groups() == ["replica"]
+
+
+def test_replica_failure_falls_back_to_primary(setup):
+    router, pool, repo = setup
+    pool.conn.execute("DROP TABLE Grupo_WTS")
+
+    assert repo.admin_get_all_groups() == ["primario"]
+    assert pool.checked_out == 0
+    stats = router.get_stats()
+    assert stats["failures"] == 1 and stats["fallbacks"] == 1
+    # Fora de uso até retry_seconds
+    assert not router.available()
@@ -0,0 +1,139 @@
+"""Testes da checagem de rotação por contadores."""
+
+import os
+
+from src.wats.recording.rotation_monitor import (
+    ROTATE_DURATION,
+    ROTATE_SIZE,
+    RotationMonitor,
+)
+
+FPS = 30
+MB = 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingWriter:
+    """Writer com contador de bytes, como o FFmpegVideoWriter."""
+
+    def __init__(self):
+        self.bytes_written = 0
+
+
+def count_stats(monkeypatch, path):
+    """Conta os stat() feitos no arquivo gravado."""
+    calls = []
+    real_stat = os.stat
+
+    def counting_stat(target, *args, **kwargs):
+        if os.fspath(target) == os.fspath(path):
+            calls.append(target)
+        return real_stat(target, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", counting_stat)
+    return calls
+
+
+def test_one_minute_of_frames_syscall_counts(tmp_path, monkeypatch):
+    video = tmp_path / "rec.avi"
+    video.write_bytes(b"x")
+    calls = count_stats(monkeypatch, video)
+
+    # Antes: exists() + stat() a cada frame
+    for _ in range(60 * FPS):
+        if video.exists():
+            video.stat()
+    assert len(calls) == 2 * 60 * FPS
+
+    # Depois, writer sem contador (OpenCV): um stat() por segundo
+    calls.clear()
+    clock = FakeClock()
+    monitor = RotationMonitor(100 * MB, 30 * 60, clock=clock)
+    monitor.reset(video)
+    for _ in range(60 * FPS):
+        clock.now += 1 / FPS
+        monitor.on_frame_written()
+        assert monitor.should_rotate() is None
+    assert 50 <= len(calls) <= 60  # ~1 por segundo
+    assert monitor.size_probes == len(calls)
+
+    # Depois, writer com contador (ffmpeg): nenhum stat()
+    calls.clear()
+    writer = CountingWriter()
+    monitor.reset(video, writer)
+    for _ in range(60 * FPS):
+        clock.now += 1 / FPS
+        writer.bytes_written += 1000
+        monitor.on_frame_written()
+        monitor.should_rotate()
+    assert calls == []
+    assert monitor.get_stats()["frames_written"] == 60 * FPS
+
+
+def test_rotates_on_size_counter_at_next_check():
+    clock = FakeClock()
+    writer = CountingWriter()
+    monitor = RotationMonitor(1 * MB, 30 * 60, clock=clock)
+    monitor.reset("rec.mp4", writer)
+
+    writer.bytes_written = 2 * MB
+    assert monitor.should_rotate() is None  # ainda dentro do intervalo
+    clock.now += 1.0
+    assert monitor.should_rotate() == ROTATE_SIZE
+    assert monitor.size_bytes == 2 * MB
+
+
+def test_rotates_on_duration_and_resets_per_file():
+    clock = FakeClock()
+    monitor = RotationMonitor(100 * MB, 10, clock=clock)
+    monitor.reset("rec.mp4", CountingWriter())
+
+    clock.now = 9.5
+    assert monitor.should_rotate() is None
+    clock.now = 10.5
+    assert monitor.should_rotate() == ROTATE_DURATION
+
+    monitor.reset("rec_part2.mp4", CountingWriter())
+    clock.now = 12.0
+    assert monitor.should_rotate() is None
+    assert monitor.elapsed == 1.5
+
+
+def test_no_file_never_rotates():
+    clock = FakeClock()
+    monitor = RotationMonitor(0, 0, clock=clock)
+    monitor.reset(None)
+    clock.now = 100.0
+    assert monitor.should_rotate() is None
+
+
+def test_approaching_signals_before_the_limit():
+    clock = FakeClock()
+    writer = CountingWriter()
+    monitor = RotationMonitor(100 * MB, 60, clock=clock, prepare_lead=5)
+    monitor.reset("rec.mp4", writer)
+
+    clock.now = 50.0
+    assert monitor.should_rotate() is None
+    assert not monitor.approaching
+    clock.now = 55.5
+    assert monitor.should_rotate() is None
+    assert monitor.approaching
+
+    # Tamanho projetado: 1 MB/s chega a 10 MB em menos de 5 s
+    size_monitor = RotationMonitor(10 * MB, 3600, clock=clock, prepare_lead=5)
+    size_monitor.reset("rec.mp4", writer)
+    clock.now += 6.0
+    writer.bytes_written = 6 * MB
+    assert size_monitor.should_rotate() is None
+    assert size_monitor.approaching
+
+    size_monitor.reset("rec_part2.mp4", writer)
+    assert not size_monitor.approaching
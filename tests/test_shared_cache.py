@@ -0,0 +1,108 @@
+"""Testes do cache compartilhado entre processos (SQLite/WAL)."""
+
+import sqlite3
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from src.wats.util_cache import intelligent_cache
+from src.wats.util_cache.shared_cache import SharedSQLiteCache
+
+
+def test_entries_are_visible_to_other_instances(temp_dir):
+    path = str(temp_dir / "shared.db")
+    writer = SharedSQLiteCache(path, default_ttl=60)
+    reader = SharedSQLiteCache(path, default_ttl=60)
+
+    key = "groups:admin_get_all_groups:GroupRepository"
+    writer.set(key, [(1, "Suporte")], tags=["groups"])
+
+    assert reader.get(key) == [(1, "Suporte")]
+    assert reader.invalidate_tags("groups") == 1
+    assert writer.get(key) is None
+
+
+def test_database_types_roundtrip(temp_dir):
+    cache = SharedSQLiteCache(str(temp_dir / "shared.db"))
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT 1 AS a, 'x' AS b").fetchone()
+    value = {
+        "when": datetime(2025, 1, 2, 3, 4, 5),
+        "amount": Decimal("1.50"),
+        "raw": b"\x00\x01",
+        "groups": {1, 2},
+        "row": row,
+    }
+
+    cache.set("k", value)
+
+    restored = cache.get("k")
+    assert restored["when"] == value["when"]
+    assert restored["amount"] == Decimal("1.50")
+    assert restored["raw"] == b"\x00\x01"
+    assert restored["groups"] == {1, 2}
+    assert restored["row"] == (1, "x")
+
+
+def test_expired_and_unsupported_values(temp_dir):
+    cache = SharedSQLiteCache(str(temp_dir / "shared.db"))
+    cache.set("short", 1, ttl=1)
+    cache.set("object", object())
+
+    assert cache.get("object") is None
+    time.sleep(1.1)
+    assert cache.get("short", default="miss") == "miss"
+    cache._cleanup_expired()
+    assert cache.get_stats()["current_size"] == 0
+
+
+def test_cached_decorator_keys_are_process_independent(temp_dir, monkeypatch):
+    shared = SharedSQLiteCache(str(temp_dir / "shared.db"))
+    monkeypatch.setattr(intelligent_cache, "_cache", shared)
+
+    class Repo:
+        def __init__(self):
+            self.calls = 0
+
+        @intelligent_cache.cached(ttl=60, key_prefix="groups")
+        def select_all(self, username):
+            self.calls += 1
+            return [(self.calls, username)]
+
+    first, second = Repo(), Repo()
+    assert first.select_all("alice") == [(1, "alice")]
+    # Outra instância (ou processo) reutiliza o resultado
+    assert second.select_all("alice") == [(1, "alice")]
+    assert second.calls == 0
+
+
+def test_secret_namespaces_never_reach_the_shared_file(temp_dir):
+    path = str(temp_dir / "shared.db")
+    cache = SharedSQLiteCache(path)
+    other_user = SharedSQLiteCache(path)
+
+    key = "connections:select_all:ConnectionRepository:alice"
+    cache.set(key, [(1, "10.0.0.1", "admin", "s3nh4")], tags=["connections"])
+    cache.set("users:get_user_role:UserRepository:alice", (7, True), tags=["user:7"])
+
+    # Fica só na memória deste processo
+    assert cache.get(key) == [(1, "10.0.0.1", "admin", "s3nh4")]
+    assert other_user.get(key) is None
+    rows = sqlite3.connect(path).execute("SELECT key, value FROM cache_entries").fetchall()
+    assert rows == []
+
+    # Invalidação e estatísticas cobrem as duas camadas
+    assert cache.get_stats()["current_size"] == 2
+    assert cache.get_detailed_stats()["namespaces"]["connections"]["entries"] == 1
+    assert cache.invalidate_tags("connections", "user:7") == 2
+    assert cache.get(key) is None
+
+
+def test_default_path_is_shared_by_the_host(monkeypatch):
+    from src.wats.config import Settings, get_user_data_dir
+
+    monkeypatch.delenv("CACHE_SHARED_PATH", raising=False)
+    settings = Settings()
+
+    assert settings.CACHE_SHARED_PATH.startswith(get_user_data_dir())
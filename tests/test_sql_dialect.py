@@ -0,0 +1,43 @@
+"""Testes dos trechos de SQL dependentes de dialeto."""
+
+import sqlite3
+
+import pytest
+
+from src.wats.db import sql_dialect
+from src.wats.db.sql_dialect import string_agg_subquery
+
+
+def test_group_concat_subquery_aggregates_sorted_per_group():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Usuario_Conexao_WTS (Con_Codigo INTEGER, Usu_Nome TEXT)")
+    conn.executemany(
+        "INSERT INTO Usuario_Conexao_WTS VALUES (?, ?)",
+        [(1, "carol"), (1, "alice"), (2, "bob"), (1, "bob")],
+    )
+
+    query = string_agg_subquery(
+        sql_dialect.GROUP_CONCAT, "Usuario_Conexao_WTS", "Con_Codigo", "Usu_Nome", "Usu_Nome"
+    )
+    rows = dict(conn.execute(f"SELECT * FROM ({query}) ORDER BY Con_Codigo").fetchall())
+
+    assert rows == {1: "alice|bob|carol", 2: "bob"}
+
+
+def test_sqlserver_modes_emit_expected_constructs():
+    args = ("Usuario_Conexao_WTS", "Con_Codigo", "Usu_Nome", "Usu_Nome")
+
+    string_agg = string_agg_subquery(sql_dialect.STRING_AGG, *args)
+    assert "WITHIN GROUP (ORDER BY Usu_Nome)" in string_agg
+    assert "NVARCHAR(MAX)" in string_agg
+
+    for_xml = string_agg_subquery(sql_dialect.FOR_XML, *args, separator=", ")
+    assert "FOR XML PATH('')" in for_xml
+    assert "1, 2, ''" in for_xml  # Remove o separador inicial inteiro
+
+
+def test_invalid_mode_or_separator_is_rejected():
+    with pytest.raises(ValueError):
+        string_agg_subquery("listagg", "t", "g", "v", "a")
+    with pytest.raises(ValueError):
+        string_agg_subquery(sql_dialect.STRING_AGG, "t", "g", "v", "a", separator="'")
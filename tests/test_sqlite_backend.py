@@ -0,0 +1,103 @@
+"""Testes do modo SQLite: conexões por thread, PRAGMAs e dialeto dos repositórios."""
+
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.database_manager import DatabaseManager
+from src.wats.db.repositories.session_protection_repository import SessionProtectionRepository
+from src.wats.db.sql_dialect import minutes_until, now_minus, top_clause
+from src.wats.db.sqlite_pool import SQLiteConnectionPool
+
+SCHEMA = os.path.join(
+    os.path.dirname(__file__), "..", "scripts", "create_wats_database_sqlite.sql"
+)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.delenv("WATS_DEMO_MODE", raising=False)
+    settings = SimpleNamespace(DB_TYPE="sqlite", DB_DATABASE=str(tmp_path / "wats.db"))
+    manager = DatabaseManager(settings)
+
+    with open(SCHEMA, encoding="utf-8") as f:
+        manager.sqlite_pool.connection().executescript(f.read())
+    with manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO Conexao_WTS (Con_Nome, Con_IP) VALUES ('srv01', '10.0.0.1')")
+
+    yield manager
+    manager.close()
+
+
+def test_pool_applies_pragmas_and_reuses_connection_per_thread(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.connection()
+
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 256 * 1024 * 1024
+
+    other = []
+    worker = threading.Thread(target=lambda: other.append(pool.connection()))
+    worker.start()
+    worker.join()
+    assert other[0] is not conn
+
+    conn.close()  # devolve, não fecha
+    conn.execute("SELECT 1")
+    assert pool.get_stats()["open_connections"] == 2
+
+    pool.close_all()
+    assert pool.get_stats()["open_connections"] == 0
+
+
+def test_manager_uses_thread_connections_with_transactions(manager):
+    conn = manager.get_transactional_connection()
+    assert conn is manager.get_transactional_connection()
+
+    conn.cursor().execute("INSERT INTO Grupo_WTS (Gru_Nome) VALUES ('Suporte')")
+    conn.rollback()
+
+    # O cursor transacional confirma ao sair do with (como o pyodbc)
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO Grupo_WTS (Gru_Nome) VALUES ('Infra')")
+
+    with manager.get_pooled_connection() as pooled:
+        pooled.cursor().execute("INSERT INTO Grupo_WTS (Gru_Nome) VALUES ('Descartado')")
+
+    rows = manager.execute_query(
+        "grupos.nomes", "SELECT Gru_Nome FROM Grupo_WTS ORDER BY Gru_Nome", fetch="all"
+    )
+    assert [row[0] for row in rows] == ["Infra"]
+
+
+def test_session_protection_runs_on_sqlite(manager):
+    repository = SessionProtectionRepository(manager)
+
+    success, _, protection_id = repository.create_session_protection(
+        1, "alice", "PC01", "segredo", 30
+    )
+    assert success and protection_id
+
+    protected, info = repository.is_session_protected(1)
+    assert protected and info["protected_by"] == "alice"
+    assert 29 <= info["minutes_remaining"] <= 30
+
+    assert repository.validate_session_password(1, "segredo", "bob", "PC02")["valid"]
+    assert not repository.validate_session_password(1, "errada", "bob", "PC02")["valid"]
+    stats = repository.get_protection_statistics.__wrapped__(repository)
+    assert stats["total_attempts_today"] == 2
+    assert stats["failed_attempts_today"] == 1
+
+    assert repository.remove_session_protection(1, "alice")[0]
+    assert repository.is_session_protected(1) == (False, None)
+
+
+def test_dialect_helpers_render_sqlserver_and_sqlite():
+    assert top_clause("sqlserver", 1) == ("TOP 1", "")
+    assert top_clause("sqlite", 1) == ("", "LIMIT 1")
+    assert minutes_until("sqlserver", "c") == "DATEDIFF(MINUTE, GETDATE(), c)"
+    assert now_minus("sqlite", 5) == "datetime('now', 'localtime', '-5 minutes')"
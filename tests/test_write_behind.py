@@ -0,0 +1,124 @@
+"""Testes da fila de gravação diferida (diário local + aplicação em lotes, SQLite)."""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.wats.db.query_registry import QueryRegistry
+from src.wats.db.repositories.log_repository import LogRepository
+from src.wats.db.write_behind import WriteBehindJournal
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.executescript(
+        """
+        CREATE TABLE Usuario_Conexao_WTS (
+            Con_Codigo INTEGER, Usu_Nome TEXT, Usu_IP TEXT, Usu_Nome_Maquina TEXT,
+            Usu_Usuario_Maquina TEXT, Usu_Dat_Conexao TIMESTAMP, Usu_Last_Heartbeat TIMESTAMP
+        );
+        CREATE TABLE Log_Acesso_WTS (Log_Id INTEGER PRIMARY KEY, Log_DataHora_Fim TIMESTAMP);
+        INSERT INTO Log_Acesso_WTS VALUES (7, NULL);
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def _manager(conn, online=True):
+    @contextmanager
+    def pooled():
+        yield conn
+
+    dialect = {"PARAM": "?", "NOW": "datetime('now')"}
+    return SimpleNamespace(
+        PARAM="?",
+        NOW="datetime('now')",
+        db_type="sqlite",
+        driver_module=sqlite3,
+        queries=QueryRegistry(dialect),
+        write_behind=None,
+        get_pooled_connection=lambda: pooled() if online else None,
+    )
+
+
+def _start(manager, journal_dir, **kwargs):
+    journal = WriteBehindJournal(manager, str(journal_dir), fsync=False, **kwargs)
+    repo = LogRepository(manager)
+    repo.register_write_behind(journal)
+    assert journal.start()
+    manager.write_behind = journal
+    return journal, repo
+
+
+def test_presence_insert_and_delete_keep_session_order(conn, tmp_path):
+    journal, repo = _start(_manager(conn), tmp_path)
+    try:
+        assert repo.insert_connection_log(1, "alice", "10.0.0.1", "PC1", "alice")
+        # Enquanto o INSERT está pendente, o heartbeat não consulta o banco
+        # e o DELETE entra na fila depois dele
+        assert repo.update_heartbeat(1, "alice")
+        assert repo.delete_connection_log(1, "alice")
+        repo.insert_connection_log(2, "bob", "10.0.0.2", "PC2", "bob")
+        assert repo.log_access_end(7)
+
+        assert journal.flush(timeout=5)
+        users = conn.execute("SELECT Con_Codigo, Usu_Nome FROM Usuario_Conexao_WTS").fetchall()
+        assert users == [(2, "bob")]
+        assert conn.execute("SELECT Log_DataHora_Fim FROM Log_Acesso_WTS").fetchone()[0]
+        assert not journal.has_pending(repo._presence_session(1, "alice"))
+        assert journal.get_stats()["applied"] == 4
+    finally:
+        journal.stop(timeout=1)
+
+    # Fila vazia: o diário foi compactado
+    assert (tmp_path / "write_behind.jsonl").read_text() == ""
+
+
+def test_pending_entries_are_replayed_after_restart(conn, tmp_path):
+    offline = _manager(conn, online=False)
+    journal, repo = _start(offline, tmp_path, flush_interval=0.01, retry_interval=0.01)
+    enqueued_at = datetime.now()
+    repo.insert_connection_log(3, "carol", "10.0.0.3", "PC3", "carol")
+    ended_at = datetime(2025, 1, 2, 3, 4, 5)
+    journal.enqueue("logs.log_access_end", (7, ended_at), session="access:7")
+    journal.stop(timeout=0.2)
+    assert conn.execute("SELECT COUNT(*) FROM Usuario_Conexao_WTS").fetchone()[0] == 0
+
+    time.sleep(0.05)
+    replayed_at = datetime.now()
+    journal, _ = _start(_manager(conn), tmp_path)
+    try:
+        assert journal.flush(timeout=5)
+    finally:
+        journal.stop(timeout=1)
+
+    assert conn.execute("SELECT Usu_Nome FROM Usuario_Conexao_WTS").fetchall() == [("carol",)]
+    # Conexão e heartbeat do enfileiramento, não da reaplicação
+    connected_at, heartbeat = conn.execute(
+        "SELECT Usu_Dat_Conexao, Usu_Last_Heartbeat FROM Usuario_Conexao_WTS"
+    ).fetchone()
+    assert connected_at == heartbeat
+    assert enqueued_at <= datetime.fromisoformat(connected_at) < replayed_at
+    assert conn.execute("SELECT Log_DataHora_Fim FROM Log_Acesso_WTS").fetchone()[0] == str(
+        ended_at.isoformat(sep=" ")
+    )
+
+
+def test_failing_entry_is_dropped_without_blocking_the_queue(conn, tmp_path):
+    journal, repo = _start(_manager(conn), tmp_path, retry_interval=0.01, max_attempts=2)
+    journal.register("test.fail", lambda cursor: cursor.execute("SELECT * FROM Tabela_Inexistente"))
+    try:
+        journal.enqueue("test.fail")
+        repo.insert_connection_log(4, "dave", "10.0.0.4", "PC4", "dave")
+        assert journal.flush(timeout=5)
+    finally:
+        journal.stop(timeout=1)
+
+    assert conn.execute("SELECT Usu_Nome FROM Usuario_Conexao_WTS").fetchall() == [("dave",)]
+    assert journal.get_stats()["dropped"] == 1
@@ -0,0 +1,117 @@
+"""Testes da troca de segmento com o próximo writer aberto antecipadamente."""
+
+import threading
+import time
+
+from src.wats.recording.frame_pipeline import FramePipeline
+from src.wats.recording.writer_prefetch import PreparedWriter, WriterPrefetcher
+
+
+class SlowWriter:
+    """Writer cuja abertura e fechamento demoram, como ffmpeg/VideoWriter."""
+
+    def __init__(self, name, release_delay=0.0):
+        self.name = name
+        self.release_delay = release_delay
+        self.frames = []
+        self.released = threading.Event()
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def release(self):
+        time.sleep(self.release_delay)
+        self.released.set()
+
+
+def prepared_writer(tmp_path, name, open_delay=0.0, release_delay=0.0):
+    time.sleep(open_delay)
+    path = tmp_path / f"{name}.mp4"
+    path.write_bytes(b"")
+    return PreparedWriter(path, SlowWriter(name, release_delay), (4, 2), "opencv")
+
+
+def test_prepare_opens_once_in_background(tmp_path):
+    prefetcher = WriterPrefetcher()
+    opener_threads = []
+
+    def open_next():
+        opener_threads.append(threading.current_thread())
+        return prepared_writer(tmp_path, "seg2", open_delay=0.1)
+
+    assert prefetcher.prepare(open_next)
+    assert prefetcher.pending
+    assert prefetcher.take() is None  # ainda abrindo
+    assert not prefetcher.prepare(open_next)
+
+    prefetcher._thread.join(5)
+    assert opener_threads[0] is not threading.current_thread()
+    prepared = prefetcher.take()
+    assert prepared.writer.name == "seg2"
+    assert prefetcher.take() is None
+    assert prefetcher.get_stats()["swapped"] == 1
+
+
+def test_failed_open_is_counted_and_leaves_nothing_ready():
+    prefetcher = WriterPrefetcher()
+
+    def broken():
+        raise RuntimeError("no codec")
+
+    prefetcher.prepare(broken)
+    prefetcher._thread.join(5)
+    assert not prefetcher.pending
+    assert prefetcher.take() is None
+    assert prefetcher.get_stats()["failures"] == 1
+
+
+def test_discard_releases_writer_and_removes_empty_file(tmp_path):
+    prefetcher = WriterPrefetcher()
+    prefetcher.prepare(lambda: prepared_writer(tmp_path, "unused"))
+    prefetcher.discard()
+
+    assert not (tmp_path / "unused.mp4").exists()
+    assert prefetcher.get_stats()["discarded"] == 1
+    assert not prefetcher.ready
+
+
+def test_rotation_loses_no_frames_and_never_blocks_the_encoder(tmp_path):
+    prefetcher = WriterPrefetcher()
+    first = SlowWriter("seg1", release_delay=0.3)
+    state = {"writer": first, "rotate": False}
+    closed = []
+    write_times = []
+
+    def sink(frame):
+        # Mesmo padrão do _write_frame dos recorders
+        if state["rotate"] and not prefetcher.pending:
+            prepared = prefetcher.take()
+            state["rotate"] = False
+            old = state["writer"]
+            state["writer"] = prepared.writer
+            prefetcher.retire(old, lambda: closed.append(old.name))
+        start = time.perf_counter()
+        state["writer"].write(frame)
+        write_times.append(time.perf_counter() - start)
+
+    pipeline = FramePipeline(sink, maxsize=64)
+    pipeline.start()
+    try:
+        for i in range(40):
+            if i == 10:
+                # "approaching": abertura lenta começa antes do limite
+                prefetcher.prepare(lambda: prepared_writer(tmp_path, "seg2", open_delay=0.2))
+            if i == 15:
+                state["rotate"] = True
+            pipeline.submit(i)
+            time.sleep(0.01)
+    finally:
+        pipeline.stop()
+        prefetcher.close()
+
+    second = state["writer"]
+    assert second.name == "seg2"
+    assert first.frames + second.frames == list(range(40))
+    assert first.frames and second.frames
+    assert closed == ["seg1"] and first.released.is_set()
+    assert max(write_times) < 0.1